@@ -120,6 +120,24 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cold tier for files of long-closed jobs (see tier_closed_job_media)
+MEDIA_ARCHIVE_ROOT = Path(os.environ.get('MEDIA_ARCHIVE_ROOT', BASE_DIR / 'media_archive'))
+DEFAULT_FILE_STORAGE = 'common.storage.TieredFileSystemStorage'
+
+# Cache for precomputed dashboard stats and the writer availability matrix
+# (common.caching). The LocMemCache default is per process: each worker keeps
+# its own copy and refresh lock, so every worker reruns the aggregations once
+# per freshness window (30s), and invalidate() only reaches the worker that
+# called it; the others may serve figures up to 30s old. Multi-worker
+# deployments should set CACHE_BACKEND/CACHE_LOCATION to a shared backend,
+# e.g. django.core.cache.backends.memcached.PyLibMCCache and 127.0.0.1:11211.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'crm-default'),
+    }
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
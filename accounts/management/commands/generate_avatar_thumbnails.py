@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import CustomUser
+from accounts.services import generate_avatar_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill fixed-size WebP/JPEG profile image variants for users whose "
+        "thumbnails are missing or out of date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants even when they already exist.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Users fetched per database round trip (default: 200).',
+        )
+
+    def handle(self, *args, **options):
+        users = (
+            CustomUser.objects.exclude(profile_image='')
+            .exclude(profile_image__isnull=True)
+            .only('pk', 'profile_image', 'profile_image_digest')
+        )
+        if not options['force']:
+            users = users.filter(profile_image_digest='')
+
+        generated = 0
+        failed = 0
+        for user in users.iterator(chunk_size=max(1, options['chunk_size'])):
+            if generate_avatar_variants(user, force=options['force']):
+                generated += 1
+            else:
+                failed += 1
+                self.stderr.write(f"  skipped user {user.pk}: unreadable image {user.profile_image.name}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated thumbnails for {generated} users ({failed} skipped)."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.12 on 2026-10-19 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_auto_20251121_1127'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_image_digest',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+    ]
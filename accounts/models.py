@@ -7,19 +7,21 @@ from pathlib import Path
 from uuid import uuid4
 import random
 import string
+from common.uploads import sharded_upload
 from .managers import CustomUserManager
 
 
+@sharded_upload('profile')
 def profile_image_upload_path(instance, filename):
     """
-    Store profile pictures in media/profile as EmployeeID_Name.ext.
+    Store profile pictures in media/profile/xx/yy/ as EmployeeID_Name.ext.
     Falls back to user id if employee id is missing.
     """
     base_id = instance.employee_id or f"user{instance.pk or uuid4().hex[:6]}"
     name_source = instance.get_full_name() or instance.username or 'profile'
     name_part = slugify(name_source, allow_unicode=True) or 'profile'
     ext = Path(filename).suffix or '.jpg'
-    return f"profile/{base_id}_{name_part}{ext.lower()}"
+    return f"{base_id}_{name_part}{ext.lower()}"
 
 
 class CustomUser(AbstractUser):
@@ -48,6 +50,8 @@ class CustomUser(AbstractUser):
     phone = models.CharField(max_length=15, blank=True, null=True)  # FILLED AUTOMATICALLY
     alternate_email = models.EmailField(blank=True, default="")
     profile_image = models.ImageField(upload_to=profile_image_upload_path, null=True, blank=True)
+    # Content hash of profile_image; names its thumbnail variants (see accounts.services.avatars)
+    profile_image_digest = models.CharField(max_length=16, blank=True, default='')
     
     # Role and Department
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='user')
@@ -160,6 +164,13 @@ class CustomUser(AbstractUser):
         self.approved_at = timezone.now()
         self.save()
 
+    # ---------- PROFILE IMAGE VARIANTS ----------
+    @classmethod
+    def iter_media_variants(cls, chunk_size=2000):
+        """Thumbnail files kept alive for collect_orphaned_media."""
+        from .services.avatars import iter_avatar_variant_names
+        return iter_avatar_variant_names(chunk_size=chunk_size)
+
 
 # --------------------------------------------------
 # LOGIN LOG MODEL
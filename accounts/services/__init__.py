@@ -1,3 +1,17 @@
-from .activity_logger import log_activity_event
+from .activity_logger import build_activity_event, log_activity_event, log_activity_events
+from .avatars import (
+    avatar_url,
+    delete_avatar_variants,
+    generate_avatar_variants,
+    iter_avatar_variant_names,
+)
 
-__all__ = ['log_activity_event']
+__all__ = [
+    'avatar_url',
+    'build_activity_event',
+    'delete_avatar_variants',
+    'generate_avatar_variants',
+    'iter_avatar_variant_names',
+    'log_activity_event',
+    'log_activity_events',
+]
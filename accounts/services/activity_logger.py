@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from django.utils import timezone
 
@@ -32,6 +32,31 @@ EVENT_CATEGORY_MAP = {
 }
 
 
+def build_activity_event(
+    event_key: str,
+    *,
+    subject_user: Optional[CustomUser] = None,
+    performed_by: Optional[CustomUser] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    category: Optional[str] = None,
+) -> ActivityLog:
+    """Unsaved ActivityLog for ``event_key``; see ``log_activity_event``."""
+
+    payload = metadata.copy() if metadata else {}
+    resolved_category = category or EVENT_CATEGORY_MAP.get(event_key, ActivityLog.CATEGORY_GENERAL)
+
+    return ActivityLog(
+        event_key=event_key,
+        category=resolved_category,
+        subject_user=subject_user,
+        performed_by=performed_by,
+        metadata={
+            **payload,
+            'logged_at': timezone.now().isoformat(),
+        },
+    )
+
+
 def log_activity_event(
     event_key: str,
     *,
@@ -57,16 +82,23 @@ def log_activity_event(
         Overrides default category inference if provided.
     """
 
-    payload = metadata.copy() if metadata else {}
-    resolved_category = category or EVENT_CATEGORY_MAP.get(event_key, ActivityLog.CATEGORY_GENERAL)
-
-    return ActivityLog.objects.create(
-        event_key=event_key,
-        category=resolved_category,
+    event = build_activity_event(
+        event_key,
         subject_user=subject_user,
         performed_by=performed_by,
-        metadata={
-            **payload,
-            'logged_at': timezone.now().isoformat(),
-        },
+        metadata=metadata,
+        category=category,
     )
+    event.save(force_insert=True)
+    return event
+
+
+def log_activity_events(events: List[ActivityLog]) -> List[ActivityLog]:
+    """Persist several ``build_activity_event`` results with a single insert."""
+
+    if events:
+        ActivityLog.objects.bulk_create(events)
+        # bulk_create sends no post_save, so feed the job timelines directly.
+        from common.timeline import append_activity_logs
+        append_activity_logs(events)
+    return events
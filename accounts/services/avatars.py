@@ -0,0 +1,144 @@
+"""Fixed-size profile image variants with content-addressed, cache-busting names."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+from pathlib import PurePosixPath
+from typing import Iterator, List, Optional
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from common.uploads import shard_path
+
+logger = logging.getLogger('accounts')
+
+AVATAR_PREFIX = 'profile/thumbs'
+
+# Square edge in pixels; sized for 2x displays (40px header avatar, 150px profile card).
+AVATAR_SIZES = {
+    'sm': 96,
+    'lg': 320,
+}
+
+AVATAR_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DEFAULT_AVATAR_FORMAT = 'webp'
+
+
+def avatar_digest(data: bytes) -> str:
+    """Short content hash embedded in variant names so a new upload busts caches."""
+    return hashlib.blake2b(data, digest_size=6).hexdigest()
+
+
+def avatar_variant_name(image_name: str, digest: str, size: str, fmt: str = DEFAULT_AVATAR_FORMAT) -> str:
+    stem = PurePosixPath(image_name).stem
+    return shard_path(AVATAR_PREFIX, f"{stem}.{digest}.{size}.{fmt}")
+
+
+def avatar_variant_names(image_name: str, digest: str) -> List[str]:
+    """Every variant file that belongs to ``image_name`` at ``digest``."""
+    if not image_name or not digest:
+        return []
+    return [
+        avatar_variant_name(image_name, digest, size, fmt)
+        for size in AVATAR_SIZES
+        for fmt in AVATAR_FORMATS
+    ]
+
+
+def avatar_url(user, size: str = 'sm', fmt: str = DEFAULT_AVATAR_FORMAT) -> str:
+    """
+    URL of the ``size`` variant of ``user.profile_image``. Falls back to the
+    original upload until variants have been generated; empty without an image.
+    """
+    image = getattr(user, 'profile_image', None)
+    if not image:
+        return ''
+    digest = getattr(user, 'profile_image_digest', '')
+    if not digest or size not in AVATAR_SIZES or fmt not in AVATAR_FORMATS:
+        return image.url
+    return default_storage.url(avatar_variant_name(image.name, digest, size, fmt))
+
+
+def _render_variants(data: bytes):
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', source.size, (255, 255, 255))
+            rgba = source.convert('RGBA')
+            background.paste(rgba, mask=rgba.split()[-1])
+            source = background
+        else:
+            source = source.convert('RGB')
+
+        for size, edge in AVATAR_SIZES.items():
+            thumb = ImageOps.fit(source, (edge, edge), method=Image.LANCZOS)
+            for fmt, (pil_format, save_kwargs) in AVATAR_FORMATS.items():
+                buffer = io.BytesIO()
+                thumb.save(buffer, format=pil_format, **save_kwargs)
+                yield size, fmt, buffer.getvalue()
+
+
+def generate_avatar_variants(user, *, force: bool = False) -> Optional[str]:
+    """
+    Write all variants of ``user.profile_image`` and persist the content digest.
+    Returns the digest, or None when the user has no readable image.
+    """
+    image = user.profile_image
+    if not image:
+        return None
+    try:
+        with default_storage.open(image.name, 'rb') as handle:
+            data = handle.read()
+    except (OSError, ValueError) as exc:
+        logger.warning(f"Cannot read profile image {image.name} for user {user.pk}: {exc}")
+        return None
+
+    digest = avatar_digest(data)
+    if not force and digest == user.profile_image_digest and all(
+        default_storage.exists(name) for name in avatar_variant_names(image.name, digest)
+    ):
+        return digest
+
+    try:
+        for size, fmt, payload in _render_variants(data):
+            name = avatar_variant_name(image.name, digest, size, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(payload))
+    except Exception as exc:
+        logger.warning(f"Could not generate thumbnails for {image.name}: {exc}")
+        return None
+
+    previous = user.profile_image_digest
+    user.profile_image_digest = digest
+    type(user).objects.filter(pk=user.pk).update(profile_image_digest=digest)
+    if previous and previous != digest:
+        delete_avatar_variants(image.name, previous)
+    return digest
+
+
+def delete_avatar_variants(image_name: str, digest: str) -> None:
+    for name in avatar_variant_names(image_name, digest):
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def iter_avatar_variant_names(chunk_size: int = 2000) -> Iterator[str]:
+    """Variant names of every current profile image (used by media GC)."""
+    from accounts.models import CustomUser
+
+    rows = (
+        CustomUser.objects.exclude(profile_image_digest='')
+        .values_list('profile_image', 'profile_image_digest')
+    )
+    for image_name, digest in rows.iterator(chunk_size=chunk_size):
+        yield from avatar_variant_names(image_name, digest)
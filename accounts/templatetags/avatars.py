@@ -0,0 +1,14 @@
+from django import template
+
+from accounts.services import avatar_url as _avatar_url
+
+register = template.Library()
+
+
+@register.filter
+def avatar_url(user, size='sm'):
+    """
+    Usage: {{ user|avatar_url }} or {{ user|avatar_url:"lg" }}.
+    Returns '' when the user has no profile image so templates can fall back.
+    """
+    return _avatar_url(user, size)
@@ -1,3 +1,105 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
 from django.test import TestCase
+from PIL import Image
+
+from accounts.models import CustomUser
+from accounts.services import avatar_url, generate_avatar_variants
+from accounts.services.avatars import AVATAR_SIZES, avatar_variant_name, avatar_variant_names
+
+
+def png_bytes(color, size=(400, 300)):
+    buffer = io.BytesIO()
+    Image.new('RGBA', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class AvatarVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.storage = FileSystemStorage(location=media_root.name, base_url='/media/')
+        patcher = mock.patch('accounts.services.avatars.default_storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = CustomUser.objects.create(username='mia', email='mia@example.com')
+        self.set_image('profile/ab/cd/EMP1_mia.png', png_bytes((200, 40, 40, 128)))
+
+    def set_image(self, name, data):
+        self.storage.save(name, ContentFile(data))
+        CustomUser.objects.filter(pk=self.user.pk).update(profile_image=name)
+        self.user.refresh_from_db()
+
+    def test_variants_are_written_and_digest_saved(self):
+        digest = generate_avatar_variants(self.user)
+        self.assertTrue(digest)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_image_digest, digest)
+
+        names = avatar_variant_names(self.user.profile_image.name, digest)
+        self.assertEqual(len(names), 4)
+        for size, edge in AVATAR_SIZES.items():
+            for fmt in ('webp', 'jpg'):
+                name = avatar_variant_name(self.user.profile_image.name, digest, size, fmt)
+                self.assertIn(f'EMP1_mia.{digest}.{size}.{fmt}', name)
+                with self.storage.open(name) as handle, Image.open(handle) as thumb:
+                    self.assertEqual(thumb.size, (edge, edge))
+                    self.assertEqual(thumb.mode, 'RGB')
+
+        large = avatar_variant_name(self.user.profile_image.name, digest, 'lg')
+        self.assertEqual(avatar_url(self.user, 'lg'), f'/media/{large}')
+
+    def test_up_to_date_variants_are_not_regenerated(self):
+        digest = generate_avatar_variants(self.user)
+        with mock.patch.object(self.storage, 'save') as save:
+            self.assertEqual(generate_avatar_variants(self.user), digest)
+            save.assert_not_called()
+            generate_avatar_variants(self.user, force=True)
+            self.assertEqual(save.call_count, 4)
+
+    def test_new_upload_busts_the_cache_and_drops_old_variants(self):
+        old_digest = generate_avatar_variants(self.user)
+        old_names = avatar_variant_names(self.user.profile_image.name, old_digest)
+
+        self.storage.delete(self.user.profile_image.name)
+        self.set_image(self.user.profile_image.name, png_bytes((10, 120, 10, 255)))
+        new_digest = generate_avatar_variants(self.user)
+
+        self.assertNotEqual(new_digest, old_digest)
+        self.assertFalse(any(self.storage.exists(name) for name in old_names))
+        self.assertTrue(all(
+            self.storage.exists(name) for name in avatar_variant_names(self.user.profile_image.name, new_digest)
+        ))
+        self.assertEqual(
+            set(CustomUser.iter_media_variants()),
+            set(avatar_variant_names(self.user.profile_image.name, new_digest)),
+        )
+
+    def test_unreadable_images_are_skipped(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(profile_image='profile/ab/cd/missing.png')
+        self.user.refresh_from_db()
+        self.assertIsNone(generate_avatar_variants(self.user))
+
+        self.set_image('profile/ab/cd/broken.png', b'not an image')
+        self.assertIsNone(generate_avatar_variants(self.user))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_image_digest, '')
+
+    def test_url_falls_back_to_the_original_upload(self):
+        self.assertEqual(avatar_url(self.user), self.user.profile_image.url)
+        self.assertEqual(avatar_url(CustomUser(username='nobody')), '')
 
-# Create your tests here.
+    def test_command_backfills_missing_variants(self):
+        done = CustomUser.objects.create(username='done', email='done@example.com', profile_image_digest='abc')
+        CustomUser.objects.filter(pk=done.pk).update(profile_image='profile/ab/cd/done.png')
+        out = io.StringIO()
+        call_command('generate_avatar_thumbnails', stdout=out, stderr=io.StringIO())
+        self.assertIn('Generated thumbnails for 1 users (0 skipped)', out.getvalue())
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.profile_image_digest)
@@ -12,7 +12,7 @@ from django.core.files.storage import default_storage
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from .models import CustomUser, LoginLog, UserSession, ProfileChangeRequest
-from .services import log_activity_event
+from .services import delete_avatar_variants, generate_avatar_variants, log_activity_event
 import logging
 import re
 from calendar import monthrange
@@ -97,22 +97,33 @@ def _apply_profile_updates(request, user):
     
     # Profile image
     old_image_path = None
+    old_image_digest = ''
     if 'profile_image' in request.FILES:
         if user.profile_image:
             old_image_path = user.profile_image.name
+            old_image_digest = user.profile_image_digest
         user.profile_image = request.FILES['profile_image']
+        user.profile_image_digest = ''
         changed_fields.append('profile_image')
     
     # Save changes
     if changed_fields:
         timestamp = timezone.now()
         user.profile_updated_at = timestamp
-        user.save(update_fields=list(set(changed_fields + ['profile_updated_at'])))
-        
-        # Delete old image if replaced
+        update_fields = set(changed_fields + ['profile_updated_at'])
+        if 'profile_image' in changed_fields:
+            update_fields.add('profile_image_digest')
+        user.save(update_fields=list(update_fields))
+        
+        # Delete old image (and its thumbnails) if replaced
+        if old_image_path and old_image_digest:
+            delete_avatar_variants(old_image_path, old_image_digest)
         if old_image_path and old_image_path != user.profile_image.name and default_storage.exists(old_image_path):
             default_storage.delete(old_image_path)
         
+        if 'profile_image' in changed_fields:
+            generate_avatar_variants(user)
+        
         log_activity_event(
             'user.profile_updated_at',
             subject_user=user,
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Job, TaskAllocation, WriterProfile, ProcessTeamProfile,
-    JobQuery, AllocationHistory, CountryBankingResource
+    JobQuery, AllocationHistory, AllocationPlan, CountryBankingResource
 )
 
 
@@ -115,6 +115,13 @@ class AllocationHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ['timestamp']
 
 
+@admin.register(AllocationPlan)
+class AllocationPlanAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'created_by', 'created_at', 'applied_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['proposal', 'applied_summary', 'created_at', 'applied_at']
+
+
 @admin.register(CountryBankingResource)
 class CountryBankingResourceAdmin(admin.ModelAdmin):
     list_display = ['country_name', 'created_at', 'updated_at']
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AllocatorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'allocator'
+
+    def ready(self):
+        from .services.availability import connect_writer_availability
+        from .services.capacity import connect_writer_capacity
+        from .services.schedule import connect_allocation_index
+        connect_writer_availability()
+        connect_writer_capacity()
+        connect_allocation_index()
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from allocator.models import WriterProfile
+from allocator.services.recommendation import PROFILE_COLUMNS, WriterMatrix, rank_writers
+
+
+def synthetic_columns(count, seed):
+    rng = np.random.default_rng(seed)
+    max_jobs = rng.integers(1, 10, count)
+    max_words = rng.integers(0, 40, count) * 1000
+    return {
+        'user_id': np.arange(1, count + 1),
+        'is_it_writer': rng.random(count) < 0.3,
+        'is_nonit_writer': rng.random(count) < 0.8,
+        'is_finance_writer': rng.random(count) < 0.5,
+        'is_available': np.ones(count, dtype=bool),
+        'is_sunday_off': rng.random(count) < 0.1,
+        'is_on_holiday': rng.random(count) < 0.05,
+        'is_overloaded': rng.random(count) < 0.05,
+        'max_jobs': max_jobs,
+        'current_jobs': rng.integers(0, max_jobs + 1),
+        'max_words': max_words,
+        'current_words': (rng.random(count) * max_words).astype(np.int64),
+        'total_jobs_completed': rng.integers(0, 200, count),
+        'total_jobs_assigned': rng.integers(0, 250, count),
+        'rating': np.round(rng.random(count) * 5, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the vectorised writer ranking on synthetic profiles (no database "
+        "access) against the per-profile can_accept_job loop it replaces."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def _best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000, sorted(timings)[len(timings) // 2] * 1000
+
+    def handle(self, *args, **options):
+        count, repeat, top_k = options['writers'], max(options['repeat'], 1), options['top']
+        columns = synthetic_columns(count, options['seed'])
+        job = SimpleNamespace(
+            job_category='IT', word_count=3000, deadline=timezone.now() + timedelta(days=2),
+        )
+
+        started = time.perf_counter()
+        matrix = WriterMatrix(columns)
+        build_ms = (time.perf_counter() - started) * 1000
+        best, median = self._best_of(repeat, lambda: rank_writers(job, matrix, top_k=top_k))
+        self.stdout.write(
+            f"vectorised  {count} writers: build {build_ms:.2f} ms, rank top {top_k} "
+            f"best {best:.2f} ms / median {median:.2f} ms"
+        )
+
+        profiles = [
+            WriterProfile(**{column: columns[column][index].item() for column in PROFILE_COLUMNS})
+            for index in range(count)
+        ]
+        best, median = self._best_of(
+            repeat, lambda: [profile.can_accept_job(job) for profile in profiles]
+        )
+        self.stdout.write(
+            f"per-profile {count} writers: can_accept_job only, "
+            f"best {best:.2f} ms / median {median:.2f} ms"
+        )
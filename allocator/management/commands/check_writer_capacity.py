@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from allocator.services.capacity import (
+    CAPACITY_COLLECTION,
+    compute_writer_capacity,
+    rebuild_writer_capacity,
+    stored_writer_capacity,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-category writer capacity summary against a full "
+        "recompute from the writer profiles, optionally replacing it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Rebuild the summary when it has drifted.',
+        )
+
+    def handle(self, *args, **options):
+        expected = compute_writer_capacity()
+        stored = stored_writer_capacity()
+        drifted = 0
+        for category in sorted(set(stored) | set(expected)):
+            actual = expected.get(category, {})
+            summary = stored.get(category, {})
+            for counter in sorted(set(actual) | set(summary)):
+                if actual.get(counter, 0) != summary.get(counter, 0):
+                    drifted += 1
+                    self.stdout.write(
+                        f"  drift {category}.{counter}: stored {summary.get(counter, 0)} != actual {actual.get(counter, 0)}"
+                    )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f"{CAPACITY_COLLECTION} matches the writer profiles."))
+            return
+        if not options['repair']:
+            self.stdout.write(self.style.WARNING(f"{drifted} capacity counters have drifted; run with --repair."))
+            return
+
+        written = rebuild_writer_capacity()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} documents in {CAPACITY_COLLECTION} ({drifted} counters had drifted)."
+        ))
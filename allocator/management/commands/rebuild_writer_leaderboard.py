@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from allocator.services.leaderboard import LEADERBOARD_COLLECTION, rebuild_writer_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Rank writers overall and per category by on-time rate, words "
+        "delivered, rating and reallocation churn into the leaderboard collection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running and rebuild every SECONDS (for a supervised worker process).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            boards = rebuild_writer_leaderboard()
+            summary = ', '.join(f"{board}: {writers}" for board, writers in boards.items())
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {LEADERBOARD_COLLECTION} ({summary} writers)."))
+            if options['every'] <= 0:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from allocator.services.reconciliation import reconcile_profile_loads
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute writer and process team open load from task allocations "
+        "and correct profiles whose current_jobs/current_words have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted profiles.',
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running and reconcile every SECONDS (for a supervised worker process).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self._reconcile(options['dry_run'])
+            if options['every'] <= 0:
+                return
+            time.sleep(options['every'])
+
+    def _reconcile(self, dry_run):
+        drifts = reconcile_profile_loads(dry_run=dry_run)
+        for drift in drifts:
+            status = 'would fix' if dry_run else ('fixed' if drift.corrected else 'skipped (changed concurrently)')
+            self.stdout.write(
+                f"  {drift.role} {drift.user_id}: stored {drift.stored} actual {drift.actual} - {status}"
+            )
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"Dry run: {len(drifts)} profiles have drifted."))
+            return
+        corrected = sum(1 for drift in drifts if drift.corrected)
+        self.stdout.write(self.style.SUCCESS(
+            f"Corrected {corrected} of {len(drifts)} drifted profiles."
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 3.1.12 on 2026-10-19 00:39
+
+import common.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocator', '0004_auto_20251122_1536'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('job_attachments')),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='structure_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('job_structures')),
+        ),
+        migrations.AlterField(
+            model_name='taskallocation',
+            name='ai_summary_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('ai_summaries')),
+        ),
+        migrations.AlterField(
+            model_name='taskallocation',
+            name='final_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('final_submissions')),
+        ),
+        migrations.AlterField(
+            model_name='taskallocation',
+            name='submission_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('task_submissions')),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from allocator.services.capacity import CAPACITY_COLLECTION, rebuild_writer_capacity
+
+
+def build_capacity(apps, schema_editor):
+    rebuild_writer_capacity(app_registry=apps, using=schema_editor.connection.alias)
+
+
+def drop_capacity(apps, schema_editor):
+    schema_editor.connection.connection[CAPACITY_COLLECTION].drop()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocator', '0005_auto_20261019_0609'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_capacity, drop_capacity),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.12 on 2026-10-19 01:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('allocator', '0006_writer_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllocationPlan',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('proposed', 'Proposed'), ('applying', 'Applying'), ('applied', 'Applied'), ('discarded', 'Discarded')], default='proposed', max_length=20)),
+                ('proposal', models.JSONField(default=dict)),
+                ('applied_summary', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocation_plans', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'allocation_plans',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.12 on 2026-10-19 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('allocator', '0007_allocation_plans'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='claim_token',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, limit_choices_to={'role': 'allocator'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_allocator_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
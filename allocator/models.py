@@ -1,6 +1,7 @@
 ﻿from django.db import models
 from django.utils import timezone
 from accounts.models import CustomUser
+from common.uploads import ShardedUploadTo
 
 
 class Job(models.Model):
@@ -97,9 +98,22 @@ class Job(models.Model):
         limit_choices_to={'role': 'allocator'}
     )
     
+    # Allocation claim (allocator.services.job_claims): one allocator at a
+    # time may hold the allocation form for a job until the lease expires.
+    claimed_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_allocator_jobs',
+        limit_choices_to={'role': 'allocator'}
+    )
+    claim_token = models.CharField(max_length=32, null=True, blank=True)
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+    
     # Files
-    attachment = models.FileField(upload_to='job_attachments/', null=True, blank=True)
-    structure_file = models.FileField(upload_to='job_structures/', null=True, blank=True)
+    attachment = models.FileField(upload_to=ShardedUploadTo('job_attachments'), null=True, blank=True)
+    structure_file = models.FileField(upload_to=ShardedUploadTo('job_structures'), null=True, blank=True)
     
     # Additional Resources
     country = models.CharField(max_length=100, blank=True, null=True)
@@ -187,9 +201,9 @@ class TaskAllocation(models.Model):
     status = models.CharField(max_length=20, choices=TASK_STATUS_CHOICES, default='pending')
     
     # Files
-    submission_file = models.FileField(upload_to='task_submissions/', null=True, blank=True)
-    ai_summary_file = models.FileField(upload_to='ai_summaries/', null=True, blank=True)
-    final_file = models.FileField(upload_to='final_submissions/', null=True, blank=True)
+    submission_file = models.FileField(upload_to=ShardedUploadTo('task_submissions'), null=True, blank=True)
+    ai_summary_file = models.FileField(upload_to=ShardedUploadTo('ai_summaries'), null=True, blank=True)
+    final_file = models.FileField(upload_to=ShardedUploadTo('final_submissions'), null=True, blank=True)
     writer_final_link = models.URLField(blank=True, null=True)
     summary_link = models.URLField(blank=True, null=True)
     process_final_link = models.URLField(blank=True, null=True)
@@ -413,6 +427,36 @@ class AllocationHistory(models.Model):
         return f"{self.action} - {self.task_allocation}"
 
 
+class AllocationPlan(models.Model):
+    """Batch auto-allocation proposal awaiting review"""
+    
+    STATUS_CHOICES = [
+        ('proposed', 'Proposed'),
+        ('applying', 'Applying'),
+        ('applied', 'Applied'),
+        ('discarded', 'Discarded'),
+    ]
+    
+    created_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='allocation_plans'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='proposed')
+    proposal = models.JSONField(default=dict)
+    applied_summary = models.JSONField(default=dict, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'allocation_plans'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Allocation plan {self.pk} ({self.get_status_display()})"
+
+
 class CountryBankingResource(models.Model):
     """Country and Banking Sector Resources (from Excel)"""
     
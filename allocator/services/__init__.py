@@ -0,0 +1,80 @@
+from .auto_allocation import (
+    PlanNotApplicable,
+    apply_allocation_plan,
+    build_allocation_plan,
+    create_allocation_plan,
+    solve_assignment,
+    task_windows,
+)
+from .availability import (
+    AVAILABILITY_DAYS,
+    AvailabilityMatrix,
+    get_availability_matrix,
+    rebuild_writer_availability,
+    refresh_writer_availability,
+)
+from .capacity import (
+    compute_writer_capacity,
+    get_writer_capacity,
+    rebuild_writer_capacity,
+    stored_writer_capacity,
+)
+from .dashboard import DASHBOARD_STATS_CACHE_KEY, compute_dashboard_stats, get_dashboard_stats
+from .job_claims import CLAIM_LEASE, ClaimLost, JobClaimed, JobNotClaimable, claim_job, consume_claim, release_claim
+from .leaderboard import (
+    LEADERBOARD_BOARDS,
+    LEADERBOARD_METRICS,
+    get_leaderboard,
+    rank_board,
+    rebuild_writer_leaderboard,
+)
+from .profile_load import adjust_process_load, adjust_writer_load, adjust_writer_loads
+from .reconciliation import compute_open_loads, reconcile_profile_loads
+from .recommendation import DEFAULT_WEIGHTS, RankingWeights, WriterMatrix, rank_writers, score_writers
+from .schedule import AllocationIntervalIndex, allocation_index, discard_allocation_index
+
+__all__ = [
+    'AVAILABILITY_DAYS',
+    'AllocationIntervalIndex',
+    'AvailabilityMatrix',
+    'CLAIM_LEASE',
+    'ClaimLost',
+    'DASHBOARD_STATS_CACHE_KEY',
+    'DEFAULT_WEIGHTS',
+    'JobClaimed',
+    'JobNotClaimable',
+    'LEADERBOARD_BOARDS',
+    'LEADERBOARD_METRICS',
+    'PlanNotApplicable',
+    'RankingWeights',
+    'WriterMatrix',
+    'adjust_process_load',
+    'adjust_writer_load',
+    'adjust_writer_loads',
+    'allocation_index',
+    'apply_allocation_plan',
+    'build_allocation_plan',
+    'claim_job',
+    'compute_dashboard_stats',
+    'compute_open_loads',
+    'compute_writer_capacity',
+    'consume_claim',
+    'create_allocation_plan',
+    'discard_allocation_index',
+    'get_availability_matrix',
+    'get_dashboard_stats',
+    'get_leaderboard',
+    'get_writer_capacity',
+    'rank_board',
+    'rank_writers',
+    'rebuild_writer_availability',
+    'rebuild_writer_capacity',
+    'rebuild_writer_leaderboard',
+    'reconcile_profile_loads',
+    'release_claim',
+    'refresh_writer_availability',
+    'score_writers',
+    'solve_assignment',
+    'stored_writer_capacity',
+    'task_windows',
+]
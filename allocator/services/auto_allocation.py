@@ -0,0 +1,557 @@
+"""
+Batch auto-allocation of the pending queue.
+
+``build_allocation_plan`` proposes a writer and a process team member for
+every pending job at once:
+
+1. each job's eligible writers are scored with ``score_writers`` and the best
+   ``CANDIDATES_PER_JOB`` are kept;
+2. every candidate writer contributes one column per free job slot, and the
+   jobs x slots matrix is solved as a min-cost assignment (Hungarian
+   algorithm, ``solve_assignment``). The benefit of a pair is the writer's
+   score scaled by the job's priority and deadline urgency, and later slots
+   of the same writer cost slightly more so work spreads out. A zero-cost
+   dummy column per job lets the solver leave a job unassigned;
+3. word limits are not a slot constraint, so a writer whose assigned words
+   exceed their free words drops the jobs with the least benefit per word
+   and the problem is solved again (up to ``REPAIR_ROUNDS`` times); jobs
+   still left over go greedily to a shortlisted writer with room;
+4. process team members (AI & plag check and decoration) have no
+   specialisation, so they are handed out greedily by spare capacity,
+   highest-value jobs first.
+
+The result is a JSON-serialisable proposal stored on an ``AllocationPlan``
+for review. ``apply_allocation_plan`` re-checks it against the current
+state and writes it with bulk inserts and bulk updates.
+"""
+
+import heapq
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import CustomUser
+from allocator.models import (
+    AllocationHistory,
+    AllocationPlan,
+    Job,
+    ProcessTeamProfile,
+    TaskAllocation,
+    WriterProfile,
+)
+from common.business_calendar import get_business_calendar
+from common.caching import invalidate
+from common.counters import GLOBAL_USER_ID, apply_deltas
+from common.timeline import append_allocation_histories
+
+from .availability import refresh_writer_availability
+from .dashboard import DASHBOARD_STATS_CACHE_KEY
+from .profile_load import adjust_process_load, adjust_writer_loads
+from .recommendation import PROFILE_COLUMNS, WriterMatrix, score_writers
+from .schedule import discard_allocation_index
+
+logger = logging.getLogger('allocator')
+
+PRIORITY_WEIGHTS = {'urgent': 4.0, 'high': 3.0, 'medium': 2.0, 'low': 1.0}
+CANDIDATES_PER_JOB = 15
+SLOT_PENALTY = 0.05
+REPAIR_ROUNDS = 4
+FORBIDDEN_COST = 1e9
+
+# Share of the time until the deadline given to each stage.
+TASK_WINDOWS = [
+    ('content_creation', 'Content Creation', 0.7),
+    ('ai_plag', 'AI & Plagiarism', 0.85),
+    ('decoration', 'Decoration', 1.0),
+]
+PROCESS_TASKS = ('ai_plag', 'decoration')
+MIN_WINDOW = timedelta(hours=1)
+
+JOB_FIELDS = ['id', 'masking_id', 'job_category', 'word_count', 'deadline', 'priority']
+
+
+class PlanNotApplicable(Exception):
+    """The plan was already applied or discarded."""
+
+
+def solve_assignment(cost):
+    """
+    Min-cost assignment of every row of ``cost`` (n x m, n <= m) to a distinct
+    column; returns the column index per row. Shortest augmenting path
+    Hungarian algorithm, O(n^2 m), with the inner loop over columns vectorised.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    rows, cols = cost.shape
+    if rows > cols:
+        raise ValueError('solve_assignment needs at least as many columns as rows')
+
+    # 1-based potentials and matching as in the classic formulation; column 0
+    # is the virtual start of each augmenting path.
+    u = np.zeros(rows + 1)
+    v = np.zeros(cols + 1)
+    match = np.zeros(cols + 1, dtype=np.int64)
+    way = np.zeros(cols + 1, dtype=np.int64)
+    for row in range(1, rows + 1):
+        match[0] = row
+        current = 0
+        min_slack = np.full(cols + 1, np.inf)
+        used = np.zeros(cols + 1, dtype=bool)
+        while True:
+            used[current] = True
+            matched_row = match[current]
+            slack = cost[matched_row - 1] - u[matched_row] - v[1:]
+            free = ~used[1:]
+            improved = free & (slack < min_slack[1:])
+            min_slack[1:][improved] = slack[improved]
+            way[1:][improved] = current
+            candidates = np.where(free, min_slack[1:], np.inf)
+            target = int(np.argmin(candidates)) + 1
+            delta = candidates[target - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            min_slack[~used] -= delta
+            current = target
+            if match[current] == 0:
+                break
+        while current:
+            previous = way[current]
+            match[current] = match[previous]
+            current = previous
+
+    assignment = np.full(rows, -1, dtype=np.int64)
+    for col in range(1, cols + 1):
+        if match[col]:
+            assignment[match[col] - 1] = col - 1
+    return assignment
+
+
+def _aware(value):
+    if value and timezone.is_naive(value):
+        return timezone.make_aware(value)
+    return value
+
+
+def job_weight(job, now):
+    """Priority weight, boosted up to 2x as the deadline approaches."""
+    weight = PRIORITY_WEIGHTS.get(job['priority'], PRIORITY_WEIGHTS['medium'])
+    deadline = _aware(job['deadline'])
+    if deadline:
+        hours_left = max((deadline - now).total_seconds() / 3600.0, 0.0)
+        weight *= 1.0 + 1.0 / (1.0 + hours_left / 24.0)
+    return weight
+
+
+def task_windows(deadline, now):
+    """
+    Split the working time between ``now`` and ``deadline`` into the task
+    stages by ``TASK_WINDOWS`` share; falls back to wall-clock time when less
+    than ``MIN_WINDOW`` of working time is left.
+    """
+    deadline = _aware(deadline)
+    calendar = get_business_calendar(covering=(now, deadline) if deadline else (now,))
+    working = calendar.working_seconds(now, deadline) if deadline else 0.0
+    span = max((deadline - now) if deadline else MIN_WINDOW, MIN_WINDOW)
+    windows, start = {}, now
+    for task_type, _, share in TASK_WINDOWS:
+        if working >= MIN_WINDOW.total_seconds():
+            end = deadline if share >= 1.0 else calendar.add_working_seconds(now, working * share)
+        else:
+            end = now + span * share
+        windows[task_type] = (start, end)
+        start = end
+    return windows
+
+
+def _process_members(using='default'):
+    """Available, active process members as ``[(spare, user_id, name)]``."""
+    profiles = list(
+        ProcessTeamProfile.objects.using(using).filter(
+            is_available=True, is_sunday_off=False, is_on_holiday=False,
+        ).values_list('user_id', 'max_jobs')
+    )
+    names = {
+        user_id: f"{first_name} {last_name}".strip() or email
+        for user_id, first_name, last_name, email in CustomUser.objects.using(using).filter(
+            id__in=[user_id for user_id, _ in profiles], role='process', is_active=True,
+        ).values_list('id', 'first_name', 'last_name', 'email')
+    }
+    # Process load is measured from open allocations rather than the profile
+    # counter, which was not maintained for process members historically.
+    open_jobs = {}
+    for user_id, job_id in TaskAllocation.objects.using(using).filter(
+        allocated_to_id__in=list(names), task_type__in=PROCESS_TASKS,
+    ).exclude(status='completed').values_list('allocated_to_id', 'job_id'):
+        open_jobs.setdefault(user_id, set()).add(job_id)
+    return [
+        (max_jobs - len(open_jobs.get(user_id, ())), user_id, names[user_id])
+        for user_id, max_jobs in profiles
+        if user_id in names
+    ]
+
+
+def _writer_assignment(jobs, weights, matrix, now):
+    """
+    Return ``(chosen, candidates)``: ``{job index: writer row}`` honouring
+    slots and word limits, and each job's ``{writer row: score}`` shortlist.
+    """
+    if not jobs or not matrix.size:
+        return {}, [{} for _ in jobs]
+
+    candidates, benefits = [], []
+    for job, weight in zip(jobs, weights):
+        scores, eligible, _, _ = score_writers(
+            matrix, job['job_category'], job['word_count'], _aware(job['deadline']), now=now,
+        )
+        rows = np.flatnonzero(eligible)
+        if len(rows) > CANDIDATES_PER_JOB:
+            rows = rows[np.argpartition(-scores[rows], CANDIDATES_PER_JOB - 1)[:CANDIDATES_PER_JOB]]
+        candidates.append({int(row): float(scores[row]) for row in rows})
+        benefits.append({int(row): weight * (1.0 + float(scores[row])) for row in rows})
+
+    # A writer never needs more slots than the jobs nominating them, than
+    # their free job slots, or than the smallest of those jobs fits into
+    # their free words.
+    nominated = {}
+    for job, job_candidates in zip(jobs, candidates):
+        for row in job_candidates:
+            nominated.setdefault(row, []).append(max(job['word_count'], 1))
+    free_slots = np.maximum(matrix.max_jobs - matrix.current_jobs, 0)
+    free_words = matrix.max_words - matrix.current_words
+    columns = []
+    for row in sorted(nominated):
+        word_counts = sorted(nominated[row])
+        fitting = int(np.searchsorted(np.cumsum(word_counts), free_words[row], side='right'))
+        slots = min(int(free_slots[row]), len(word_counts), fitting)
+        columns.extend((row, slot) for slot in range(slots))
+    writer_columns = {}
+    for index, (row, _) in enumerate(columns):
+        writer_columns.setdefault(row, []).append(index)
+
+    # Real slots first, then one zero-cost "unassigned" column per job.
+    cost = np.full((len(jobs), len(columns) + len(jobs)), FORBIDDEN_COST)
+    cost[:, len(columns):] = 0.0
+    for job_index, job_benefits in enumerate(benefits):
+        for row, benefit in job_benefits.items():
+            for slot, column in enumerate(writer_columns.get(row, ())):
+                cost[job_index, column] = -(benefit - SLOT_PENALTY * slot)
+
+    for _ in range(REPAIR_ROUNDS):
+        assignment = solve_assignment(cost)
+        by_writer = {}
+        for job_index, column in enumerate(assignment.tolist()):
+            if column < len(columns) and cost[job_index, column] < FORBIDDEN_COST:
+                by_writer.setdefault(columns[column][0], []).append(job_index)
+
+        overflowing = False
+        for row, job_indexes in by_writer.items():
+            words = sum(jobs[index]['word_count'] for index in job_indexes)
+            if words <= free_words[row]:
+                continue
+            overflowing = True
+            # Drop the least benefit per word until the rest fits.
+            job_indexes.sort(key=lambda index: benefits[index][row] / max(jobs[index]['word_count'], 1))
+            while words > free_words[row]:
+                dropped = job_indexes.pop(0)
+                words -= jobs[dropped]['word_count']
+                cost[dropped, writer_columns[row]] = FORBIDDEN_COST
+        if not overflowing:
+            break
+
+    chosen = {
+        job_index: row
+        for row, job_indexes in by_writer.items()
+        for job_index in job_indexes
+    }
+
+    # Jobs still without a writer after the last round go, highest weight
+    # first, to their best shortlisted writer that has room left.
+    used_slots = {row: len(job_indexes) for row, job_indexes in by_writer.items()}
+    used_words = {
+        row: sum(jobs[index]['word_count'] for index in job_indexes)
+        for row, job_indexes in by_writer.items()
+    }
+    for job_index in range(len(jobs)):
+        if job_index in chosen:
+            continue
+        word_count = jobs[job_index]['word_count']
+        for row in sorted(benefits[job_index], key=benefits[job_index].get, reverse=True):
+            if (used_slots.get(row, 0) < free_slots[row]
+                    and used_words.get(row, 0) + word_count <= free_words[row]):
+                chosen[job_index] = row
+                used_slots[row] = used_slots.get(row, 0) + 1
+                used_words[row] = used_words.get(row, 0) + word_count
+                break
+    return chosen, candidates
+
+
+def build_allocation_plan(jobs=None, matrix=None, now=None, using='default'):
+    """
+    Propose writers and process members for ``jobs`` (default: every pending
+    job). Returns the proposal dict stored on ``AllocationPlan.proposal``.
+    """
+    now = now or timezone.now()
+    if jobs is None:
+        jobs = list(Job.objects.using(using).filter(status='pending').values(*JOB_FIELDS))
+    matrix = matrix if matrix is not None else WriterMatrix.load(using)
+
+    weights = [job_weight(job, now) for job in jobs]
+    order = sorted(range(len(jobs)), key=lambda index: -weights[index])
+    jobs = [jobs[index] for index in order]
+    weights = [weights[index] for index in order]
+
+    chosen, candidates = _writer_assignment(jobs, weights, matrix, now)
+
+    members = [(-spare, user_id, name) for spare, user_id, name in _process_members(using) if spare > 0]
+    heapq.heapify(members)
+
+    assignments, unassigned, objective = [], [], 0.0
+    for job_index, job in enumerate(jobs):
+        entry = {'job_id': job['id'], 'masking_id': job['masking_id']}
+        row = chosen.get(job_index)
+        if row is None:
+            entry['reason'] = 'Writer capacity exhausted' if candidates[job_index] else 'No eligible writer'
+            unassigned.append(entry)
+            continue
+        if not members:
+            entry['reason'] = 'No process team capacity'
+            unassigned.append(entry)
+            continue
+        negative_spare, process_id, process_name = heapq.heappop(members)
+        if negative_spare + 1 < 0:
+            heapq.heappush(members, (negative_spare + 1, process_id, process_name))
+
+        writer_id = int(matrix.user_ids[row])
+        score = candidates[job_index][row]
+        objective += weights[job_index] * (1.0 + score)
+        windows = task_windows(_aware(job['deadline']), now)
+        entry.update({
+            'priority': job['priority'],
+            'job_category': job['job_category'],
+            'word_count': job['word_count'],
+            'deadline': _aware(job['deadline']).isoformat() if job['deadline'] else None,
+            'writer_id': writer_id,
+            'writer_name': matrix.names.get(writer_id, ''),
+            'score': round(score, 4),
+            'process_id': process_id,
+            'process_name': process_name,
+            'tasks': {
+                task_type: {
+                    'user_id': writer_id if task_type == 'content_creation' else process_id,
+                    'start': start.isoformat(),
+                    'end': end.isoformat(),
+                }
+                for task_type, (start, end) in windows.items()
+            },
+        })
+        assignments.append(entry)
+
+    return {
+        'generated_at': now.isoformat(),
+        'assignments': assignments,
+        'unassigned': unassigned,
+        'summary': {
+            'jobs': len(jobs),
+            'assigned': len(assignments),
+            'writers_used': len({entry['writer_id'] for entry in assignments}),
+            'objective': round(objective, 4),
+        },
+    }
+
+
+def create_allocation_plan(user, using='default'):
+    """Build a plan for the pending queue, replacing any earlier unapplied proposal."""
+    proposal = build_allocation_plan(using=using)
+    AllocationPlan.objects.using(using).filter(status='proposed').update(status='discarded')
+    return AllocationPlan.objects.using(using).create(created_by=user, proposal=proposal)
+
+
+def _fits(profile, loads, word_count):
+    jobs, words = loads.get(profile['user_id'], (0, 0))
+    return (
+        profile['is_available']
+        and not (profile['is_sunday_off'] or profile['is_on_holiday'] or profile['is_overloaded'])
+        and profile['current_jobs'] + jobs < profile['max_jobs']
+        and profile['current_words'] + words + word_count <= profile['max_words']
+    )
+
+
+def apply_allocation_plan(plan, user, job_ids=None, using='default'):
+    """
+    Apply ``plan`` (optionally only the assignments for ``job_ids``). Entries
+    whose job is no longer pending (also when it changes while the plan is
+    written), already has allocations, is claimed by another allocator, or
+    whose writer no longer has room are skipped; load counters only count
+    the jobs actually allocated. Returns the summary stored on the plan.
+    Raises ``PlanNotApplicable`` unless the plan is still ``proposed``.
+    """
+    claimed = AllocationPlan.objects.using(using).filter(pk=plan.pk, status='proposed').update(status='applying')
+    if not claimed:
+        raise PlanNotApplicable(plan.pk)
+
+    now = timezone.now()
+    # MongoDB keeps milliseconds; the jobs flipped below are read back by it.
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    entries = [
+        entry for entry in plan.proposal.get('assignments', [])
+        if job_ids is None or entry['job_id'] in job_ids
+    ]
+    entry_job_ids = [entry['job_id'] for entry in entries]
+    pending = set(
+        Job.objects.using(using).filter(id__in=entry_job_ids, status='pending').values_list('id', flat=True)
+    )
+    pending -= set(
+        TaskAllocation.objects.using(using).filter(job_id__in=entry_job_ids).values_list('job_id', flat=True)
+    )
+    # Jobs whose allocation form another allocator has open (job_claims).
+    claimed_elsewhere = set(
+        Job.objects.using(using).filter(
+            id__in=pending, claim_expires_at__gt=now,
+        ).exclude(claimed_by=user).values_list('id', flat=True)
+    )
+    profiles = {
+        row['user_id']: row
+        for row in WriterProfile.objects.using(using).filter(
+            user_id__in={entry['writer_id'] for entry in entries}
+        ).values(*PROFILE_COLUMNS)
+    }
+
+    accepted, skipped, planned = [], [], {}
+    for entry in entries:
+        profile = profiles.get(entry['writer_id'])
+        if entry['job_id'] not in pending:
+            reason = 'Job is no longer pending'
+        elif entry['job_id'] in claimed_elsewhere:
+            reason = 'Job is being allocated by another allocator'
+        elif not profile or not _fits(profile, planned, entry['word_count']):
+            reason = 'Writer no longer has capacity'
+        else:
+            jobs, words = planned.get(entry['writer_id'], (0, 0))
+            planned[entry['writer_id']] = (jobs + 1, words + entry['word_count'])
+            accepted.append(entry)
+            continue
+        skipped.append({'job_id': entry['job_id'], 'masking_id': entry['masking_id'], 'reason': reason})
+
+    users = CustomUser.objects.using(using).in_bulk(
+        {user_id for entry in accepted for user_id in (entry['writer_id'], entry['process_id'])}
+    )
+    labels = {task_type: label for task_type, label, _ in TASK_WINDOWS}
+    allocations = [
+        TaskAllocation(
+            job_id=entry['job_id'],
+            task_type=task_type,
+            allocated_to=users.get(task['user_id']),
+            allocated_by=user,
+            start_date_time=parse_datetime(task['start']),
+            end_date_time=parse_datetime(task['end']),
+            status='pending',
+        )
+        for entry in accepted
+        for task_type, task in entry['tasks'].items()
+    ]
+    accepted_ids = [entry['job_id'] for entry in accepted]
+    histories = []
+
+    try:
+        with transaction.atomic(using=using):
+            if allocations:
+                TaskAllocation.objects.using(using).bulk_create(allocations)
+                # Auto ids are not returned by bulk inserts here; read them
+                # back through the (job, task_type) unique key.
+                allocation_ids = {
+                    (job_id, task_type): pk
+                    for pk, job_id, task_type in TaskAllocation.objects.using(using).filter(
+                        job_id__in=accepted_ids
+                    ).values_list('id', 'job_id', 'task_type')
+                }
+                for allocation in allocations:
+                    allocation.pk = allocation_ids[(allocation.job_id, allocation.task_type)]
+
+                histories = [
+                    AllocationHistory(
+                        task_allocation=allocation,
+                        action='allocated',
+                        new_user=allocation.allocated_to,
+                        changed_by=user,
+                        reason=f"{labels[allocation.task_type]} assigned (auto-allocation plan {plan.pk})",
+                    )
+                    for allocation in allocations
+                ]
+                AllocationHistory.objects.using(using).bulk_create(histories)
+
+            allocated = Job.objects.using(using).filter(id__in=accepted_ids, status='pending').update(
+                status='allocated', allocated_by=user, allocated_at=now, updated_at=now,
+            )
+            if allocated < len(accepted):
+                # Some jobs left ``pending`` after the checks above; keep only
+                # the ones this update flipped.
+                flipped = set(Job.objects.using(using).filter(
+                    id__in=accepted_ids, status='allocated', allocated_by=user, allocated_at=now,
+                ).values_list('id', flat=True))
+                TaskAllocation.objects.using(using).filter(
+                    pk__in=[allocation.pk for allocation in allocations if allocation.job_id not in flipped]
+                ).delete()
+                skipped.extend(
+                    {'job_id': entry['job_id'], 'masking_id': entry['masking_id'], 'reason': 'Job is no longer pending'}
+                    for entry in accepted
+                    if entry['job_id'] not in flipped
+                )
+                accepted = [entry for entry in accepted if entry['job_id'] in flipped]
+                allocations = [allocation for allocation in allocations if allocation.job_id in flipped]
+                histories = [history for history in histories if history.task_allocation.job_id in flipped]
+    except Exception:
+        # Without transactions (djongo) some allocations may already exist.
+        TaskAllocation.objects.using(using).filter(
+            job_id__in=accepted_ids, allocated_by=user, status='pending',
+        ).delete()
+        AllocationPlan.objects.using(using).filter(pk=plan.pk).update(status='proposed')
+        raise
+
+    loads = {}
+    for entry in accepted:
+        jobs, words = loads.get(entry['writer_id'], (0, 0))
+        loads[entry['writer_id']] = (jobs + 1, words + entry['word_count'])
+
+    # Side effects that the bulk writes bypass (signals do not fire for them).
+    if histories:
+        append_allocation_histories(histories, using=using)
+    try:
+        apply_deltas({
+            ('allocator', GLOBAL_USER_ID, 'pending'): -allocated,
+            ('allocator', GLOBAL_USER_ID, 'allocated'): allocated,
+        }, using=using)
+        adjust_writer_loads({
+            user_id: {'jobs': jobs, 'words': words, 'assigned': jobs}
+            for user_id, (jobs, words) in loads.items()
+        }, using=using)
+        process_jobs = {}
+        for entry in accepted:
+            process_jobs[entry['process_id']] = process_jobs.get(entry['process_id'], 0) + 1
+        for user_id, jobs in process_jobs.items():
+            adjust_process_load(user_id, jobs=jobs, using=using)
+    except Exception as exc:
+        logger.error(f"Allocation plan {plan.pk} applied but load counters failed to update: {exc}")
+    invalidate(DASHBOARD_STATS_CACHE_KEY)
+    # Bulk inserts skip the signals that keep these current.
+    discard_allocation_index()
+    try:
+        refresh_writer_availability(loads, using=using)
+    except Exception as exc:
+        logger.warning(f"Writer availability refresh failed after allocation plan {plan.pk}: {exc}")
+
+    summary = {
+        'applied': [entry['job_id'] for entry in accepted],
+        'skipped': skipped,
+        'allocations': len(allocations),
+    }
+    plan.status = 'applied'
+    plan.applied_at = now
+    plan.applied_summary = summary
+    plan.save(using=using, update_fields=['status', 'applied_at', 'applied_summary'])
+    logger.info(
+        f"Allocation plan {plan.pk} applied by {user.email}: {len(accepted)} jobs, {len(skipped)} skipped"
+    )
+    return summary
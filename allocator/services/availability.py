@@ -0,0 +1,335 @@
+"""
+Per-writer daily availability and free word capacity over a rolling horizon.
+
+For each writer and each of the next ``AVAILABILITY_DAYS`` days (local time)
+two values are kept:
+
+* ``available`` - the writer works that day: the profile is available and
+  not overloaded, and the day is working time on the writer's business
+  calendar (holidays, ``is_sunday_off``, ``is_on_holiday`` for today);
+* ``free_words`` - ``max_words`` minus the words of the writer's open
+  content allocations whose window covers that day.
+
+Rows are stored one document per writer in ``writer_availability`` as packed
+arrays (``numpy.packbits`` for the bitmap, little-endian int32 for the free
+words) and recomputed for just the writers concerned when their allocations,
+their profile or their jobs change. The whole table is rebuilt when the day
+or the holiday calendar changes.
+
+Queries load the table once into a ``AvailabilityMatrix`` (cached with
+stale-while-revalidate) and are answered with boolean masks, e.g. Finance
+writers with at least 2000 free words on each of the next 5 working days::
+
+    matrix.writers_with_capacity('Finance', 2000, days=5)
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.apps import apps
+from django.db import connections
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from common.business_calendar import get_business_calendar, holiday_version
+from common.caching import get_or_revalidate, invalidate
+
+logger = logging.getLogger('allocator')
+
+AVAILABILITY_COLLECTION = 'writer_availability'
+AVAILABILITY_INDEX = 'writer_availability_user_uniq'
+AVAILABILITY_META_ID = 'meta'
+AVAILABILITY_CACHE_KEY = 'allocator:writer_availability'
+AVAILABILITY_DAYS = 28
+CLOSED_JOB_STATUSES = ['completed', 'cancelled', 'decoration']
+
+CATEGORY_FLAGS = {
+    'IT': 'is_it_writer',
+    'NONIT': 'is_nonit_writer',
+    'Finance': 'is_finance_writer',
+}
+PROFILE_FIELDS = [
+    'user_id', 'is_it_writer', 'is_nonit_writer', 'is_finance_writer',
+    'is_available', 'is_sunday_off', 'is_on_holiday', 'is_overloaded', 'max_words',
+]
+
+
+def availability_collection(using='default'):
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection.connection[AVAILABILITY_COLLECTION]
+
+
+def _local_day(value):
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return timezone.localtime(value).date()
+
+
+def compute_availability(user_ids=None, first_day=None, days=AVAILABILITY_DAYS, using='default'):
+    """
+    ``(profiles, available, free_words)`` for the given writers (all when
+    None): the profile rows and two ``writers x days`` arrays starting at
+    ``first_day`` (today by default).
+    """
+    WriterProfile = apps.get_model('allocator', 'WriterProfile')
+    TaskAllocation = apps.get_model('allocator', 'TaskAllocation')
+    Job = apps.get_model('allocator', 'Job')
+
+    first_day = first_day or timezone.localdate()
+    profiles = WriterProfile.objects.using(using).all()
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=list(user_ids))
+    profiles = list(profiles.values(*PROFILE_FIELDS))
+    positions = {profile['user_id']: row for row, profile in enumerate(profiles)}
+
+    # Booked words per day via a difference array: +words on the first day
+    # an allocation covers, -words the day after its last.
+    booked = np.zeros((len(profiles), days + 1), dtype=np.int64)
+    allocations = list(TaskAllocation.objects.using(using).filter(
+        task_type='content_creation',
+        allocated_to_id__in=list(positions),
+        end_date_time__gte=timezone.make_aware(datetime.combine(first_day, time())),
+    ).exclude(status='completed').values_list('allocated_to_id', 'job_id', 'start_date_time', 'end_date_time'))
+    words = dict(Job.objects.using(using).filter(
+        id__in={job_id for _, job_id, _, _ in allocations},
+    ).exclude(status__in=CLOSED_JOB_STATUSES).values_list('id', 'word_count'))
+    rows, starts, stops, amounts = [], [], [], []
+    for user_id, job_id, start, end in allocations:
+        if job_id not in words or start is None or end is None:
+            continue
+        rows.append(positions[user_id])
+        starts.append(min(max((_local_day(start) - first_day).days, 0), days))
+        stops.append(min(max((_local_day(end) - first_day).days + 1, 0), days))
+        amounts.append(words[job_id] or 0)
+    if rows:
+        np.add.at(booked, (rows, starts), amounts)
+        np.add.at(booked, (rows, stops), np.negative(amounts))
+    booked = np.cumsum(booked, axis=1)[:, :days]
+
+    max_words = np.asarray([profile['max_words'] or 0 for profile in profiles], dtype=np.int64).reshape(-1, 1)
+    free_words = np.clip(max_words - booked, np.iinfo(np.int32).min, np.iinfo(np.int32).max).astype(np.int32)
+
+    day_list = [first_day + timedelta(days=offset) for offset in range(days)]
+    working = {}
+    for flags in {(bool(p['is_sunday_off']), bool(p['is_on_holiday'])) for p in profiles}:
+        calendar = get_business_calendar(*flags)
+        working[flags] = np.asarray([calendar.working_hours_on(day) > 0 for day in day_list], dtype=bool)
+    available = np.zeros((len(profiles), days), dtype=bool)
+    for row, profile in enumerate(profiles):
+        if profile['is_available'] and not profile['is_overloaded']:
+            available[row] = working[(bool(profile['is_sunday_off']), bool(profile['is_on_holiday']))]
+    return profiles, available, free_words
+
+
+def _documents(profiles, available, free_words, first_day, now):
+    for row, profile in enumerate(profiles):
+        yield {
+            'user_id': profile['user_id'],
+            'first_day': first_day.isoformat(),
+            'days': available.shape[1],
+            'categories': [label for label, flag in CATEGORY_FLAGS.items() if profile[flag]],
+            'available': np.packbits(available[row]).tobytes(),
+            'free_words': free_words[row].astype('<i4').tobytes(),
+            'updated_at': now,
+        }
+
+
+def refresh_writer_availability(user_ids, using='default'):
+    """Recompute and store the rows of ``user_ids``."""
+    from pymongo import DeleteOne, ReplaceOne
+
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+    collection = availability_collection(using)
+    meta = collection.find_one({'_id': AVAILABILITY_META_ID}) or {}
+    first_day = timezone.localdate()
+    if meta.get('first_day') != first_day.isoformat():
+        # The stored table is from another day; the next read rebuilds it.
+        return
+    profiles, available, free_words = compute_availability(user_ids, first_day, meta['days'], using)
+    now = timezone.now()
+    operations = [
+        ReplaceOne({'user_id': document['user_id']}, document, upsert=True)
+        for document in _documents(profiles, available, free_words, first_day, now)
+    ]
+    operations.extend(
+        DeleteOne({'user_id': user_id})
+        for user_id in user_ids - {profile['user_id'] for profile in profiles}
+    )
+    collection.bulk_write(operations, ordered=False)
+    invalidate(AVAILABILITY_CACHE_KEY)
+
+
+def rebuild_writer_availability(days=AVAILABILITY_DAYS, using='default'):
+    """Replace the whole table, starting today. Returns the number of writers."""
+    from pymongo import ReplaceOne
+
+    first_day = timezone.localdate()
+    profiles, available, free_words = compute_availability(None, first_day, days, using)
+    collection = availability_collection(using)
+    collection.create_index('user_id', name=AVAILABILITY_INDEX, unique=True, sparse=True)
+    now = timezone.now()
+    operations = [
+        ReplaceOne({'user_id': document['user_id']}, document, upsert=True)
+        for document in _documents(profiles, available, free_words, first_day, now)
+    ]
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    collection.delete_many({
+        'user_id': {'$nin': [profile['user_id'] for profile in profiles]},
+        '_id': {'$ne': AVAILABILITY_META_ID},
+    })
+    collection.replace_one(
+        {'_id': AVAILABILITY_META_ID},
+        {'first_day': first_day.isoformat(), 'days': days, 'holiday_version': holiday_version(), 'updated_at': now},
+        upsert=True,
+    )
+    invalidate(AVAILABILITY_CACHE_KEY)
+    return len(profiles)
+
+
+class AvailabilityMatrix:
+    """The stored table as ``writers x days`` arrays, with vectorised queries."""
+
+    def __init__(self, first_day, user_ids, categories, available, free_words):
+        self.first_day = first_day
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.available = available
+        self.free_words = free_words
+        self.category_masks = {
+            label: np.asarray([label in labels for labels in categories], dtype=bool)
+            for label in CATEGORY_FLAGS
+        }
+
+    @property
+    def days(self):
+        return self.available.shape[1]
+
+    @classmethod
+    def from_documents(cls, first_day, days, documents):
+        user_ids, categories, available, free_words = [], [], [], []
+        for document in documents:
+            if document.get('first_day') != first_day.isoformat() or document.get('days') != days:
+                continue
+            user_ids.append(document['user_id'])
+            categories.append(document.get('categories') or [])
+            available.append(np.unpackbits(np.frombuffer(document['available'], dtype=np.uint8))[:days])
+            free_words.append(np.frombuffer(document['free_words'], dtype='<i4'))
+        return cls(
+            first_day,
+            user_ids,
+            categories,
+            np.asarray(available, dtype=bool).reshape(len(user_ids), days),
+            np.asarray(free_words, dtype=np.int32).reshape(len(user_ids), days),
+        )
+
+    def working_days(self, count):
+        """Column indexes of the next ``count`` company working days."""
+        calendar = get_business_calendar()
+        columns = [
+            offset for offset in range(self.days)
+            if calendar.working_hours_on(self.first_day + timedelta(days=offset)) > 0
+        ]
+        return columns[:count]
+
+    def writers_with_capacity(self, category=None, min_words=0, days=5, working_days_only=True):
+        """
+        User ids of writers (of ``category`` when given) available with at
+        least ``min_words`` free on each of the next ``days`` (working) days,
+        most free words first.
+        """
+        columns = self.working_days(days) if working_days_only else list(range(min(days, self.days)))
+        if not columns or not self.user_ids.size:
+            return []
+        available = self.available[:, columns]
+        free_words = self.free_words[:, columns]
+        matches = (available & (free_words >= min_words)).all(axis=1)
+        if category:
+            matches &= self.category_masks.get(category, np.zeros(self.user_ids.size, dtype=bool))
+        rows = np.flatnonzero(matches)
+        rows = rows[np.argsort(-free_words[rows].min(axis=1), kind='stable')]
+        return self.user_ids[rows].tolist()
+
+    def row(self, user_id):
+        """``[(day, available, free_words)]`` for one writer, or None."""
+        found = np.flatnonzero(self.user_ids == user_id)
+        if not found.size:
+            return None
+        row = found[0]
+        return [
+            (self.first_day + timedelta(days=offset), bool(self.available[row, offset]), int(self.free_words[row, offset]))
+            for offset in range(self.days)
+        ]
+
+
+def load_availability_matrix(using='default'):
+    """Read the stored table, rebuilding it first when it is from another day or holiday calendar."""
+    collection = availability_collection(using)
+    meta = collection.find_one({'_id': AVAILABILITY_META_ID}) or {}
+    today = timezone.localdate()
+    if meta.get('first_day') != today.isoformat() or meta.get('holiday_version') != holiday_version():
+        rebuild_writer_availability(meta.get('days') or AVAILABILITY_DAYS, using)
+        meta = collection.find_one({'_id': AVAILABILITY_META_ID})
+    return AvailabilityMatrix.from_documents(
+        today, meta['days'], collection.find({'user_id': {'$exists': True}}, {'_id': 0, 'updated_at': 0}),
+    )
+
+
+def get_availability_matrix():
+    """The shared matrix, recomputed at most every 30 seconds unless invalidated."""
+    matrix = get_or_revalidate(AVAILABILITY_CACHE_KEY, load_availability_matrix)
+    if matrix.first_day != timezone.localdate():
+        invalidate(AVAILABILITY_CACHE_KEY)
+        matrix = load_availability_matrix()
+    return matrix
+
+
+# ----------------------------------------------------------------------
+# Signal handlers
+# ----------------------------------------------------------------------
+def _refresh(user_ids):
+    try:
+        refresh_writer_availability(user_ids)
+    except Exception as exc:
+        logger.warning(f"Writer availability refresh failed for {sorted(user_ids)}: {exc}")
+
+
+def _remember_writer(sender, instance, **kwargs):
+    instance._availability_writer_id = instance.__dict__.get('allocated_to_id')
+
+
+def _allocation_changed(sender, instance, raw=False, **kwargs):
+    if raw or instance.task_type != 'content_creation':
+        return
+    _refresh({instance.allocated_to_id, getattr(instance, '_availability_writer_id', None)})
+    instance._availability_writer_id = instance.allocated_to_id
+
+
+def _profile_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _refresh({instance.user_id})
+
+
+def _job_saved(sender, instance, raw=False, **kwargs):
+    if raw or instance.status not in CLOSED_JOB_STATUSES:
+        return
+    TaskAllocation = apps.get_model('allocator', 'TaskAllocation')
+    _refresh(set(TaskAllocation.objects.filter(
+        job_id=instance.pk, task_type='content_creation',
+    ).values_list('allocated_to_id', flat=True)))
+
+
+def connect_writer_availability():
+    """Wire the signal handlers; called from AllocatorConfig.ready()."""
+    uid = 'writer_availability'
+    allocation_model = apps.get_model('allocator', 'TaskAllocation')
+    profile_model = apps.get_model('allocator', 'WriterProfile')
+    post_init.connect(_remember_writer, sender=allocation_model, dispatch_uid=uid)
+    post_save.connect(_allocation_changed, sender=allocation_model, dispatch_uid=uid)
+    post_delete.connect(_allocation_changed, sender=allocation_model, dispatch_uid=uid)
+    post_save.connect(_profile_changed, sender=profile_model, dispatch_uid=uid)
+    post_delete.connect(_profile_changed, sender=profile_model, dispatch_uid=uid)
+    post_save.connect(_job_saved, sender=apps.get_model('allocator', 'Job'), dispatch_uid=uid)
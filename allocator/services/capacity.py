@@ -0,0 +1,244 @@
+"""
+Per-category writer capacity summary.
+
+The allocation page shows, for IT / Non-IT / Finance writers, how many are
+available, engaged or overloaded and how much of their job and word capacity
+is in use. Instead of walking every ``WriterProfile`` on each page load, one
+document per category is kept in the ``writer_capacity`` collection::
+
+    {'category': 'IT', 'total': 14, 'available': 11, 'engaged': 9, ...,
+     'current_words': 52000, 'word_capacity': 90000, 'unbounded_words': 2}
+
+Whenever a profile is saved or deleted, its old contribution is subtracted
+and the new one added with ``$inc``. Only profiles flagged ``is_available``
+count, matching what the page used to iterate. Profiles without a word limit
+are counted in ``unbounded_words`` and sized with the job's word count at
+read time, as before. ``check_writer_capacity`` compares the documents
+against a full recompute and can repair them.
+"""
+
+import logging
+
+from django.apps import apps
+from django.db import connections
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.utils import timezone
+
+logger = logging.getLogger('allocator')
+
+CAPACITY_COLLECTION = 'writer_capacity'
+CAPACITY_INDEX = 'writer_capacity_category_uniq'
+
+CAPACITY_CATEGORIES = [
+    {'label': 'IT', 'flag': 'is_it_writer', 'color': '#2196F3'},
+    {'label': 'Non-IT', 'flag': 'is_nonit_writer', 'color': '#9C27B0'},
+    {'label': 'Finance', 'flag': 'is_finance_writer', 'color': '#4CAF50'},
+]
+CAPACITY_COUNTERS = [
+    'total', 'available', 'engaged', 'overloaded', 'sunday_off', 'holiday',
+    'current_jobs', 'job_capacity', 'current_words', 'word_capacity', 'unbounded_words',
+]
+PROFILE_FIELDS = [
+    'is_available', 'is_sunday_off', 'is_on_holiday', 'is_overloaded',
+    'is_it_writer', 'is_nonit_writer', 'is_finance_writer',
+    'max_jobs', 'current_jobs', 'max_words', 'current_words',
+]
+
+_SNAPSHOT_ATTR = '_writer_capacity_snapshot'
+
+
+def capacity_collection(using='default'):
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection.connection[CAPACITY_COLLECTION]
+
+
+def profile_contribution(values):
+    """
+    ``{(category, counter): n}`` that one profile adds to the summary, from a
+    mapping of ``PROFILE_FIELDS``. Returns None when a field is not loaded.
+    """
+    if any(field not in values for field in PROFILE_FIELDS):
+        return None
+    if not values['is_available']:
+        return {}
+    current_jobs = values['current_jobs'] or 0
+    current_words = values['current_words'] or 0
+    counts = {
+        'total': 1,
+        'available': int(not (values['is_sunday_off'] or values['is_on_holiday'] or values['is_overloaded'])),
+        'engaged': int(current_jobs > 0),
+        'overloaded': int(bool(values['is_overloaded'])),
+        'sunday_off': int(bool(values['is_sunday_off'])),
+        'holiday': int(bool(values['is_on_holiday'])),
+        'current_jobs': current_jobs,
+        'job_capacity': values['max_jobs'] or 1,
+        'current_words': current_words,
+        'word_capacity': values['max_words'] or 0,
+        'unbounded_words': int(not values['max_words']),
+    }
+    contribution = {}
+    for category in CAPACITY_CATEGORIES:
+        if values[category['flag']]:
+            for counter, n in counts.items():
+                if n:
+                    contribution[(category['label'], counter)] = n
+    return contribution
+
+
+def apply_capacity_deltas(deltas, using='default'):
+    """``deltas``: {(category, counter): +/-n}, applied with one bulk_write."""
+    from pymongo import UpdateOne
+
+    by_category = {}
+    for (category, counter), delta in deltas.items():
+        if delta:
+            by_category.setdefault(category, {})[counter] = delta
+    now = timezone.now()
+    operations = [
+        UpdateOne(
+            {'category': category},
+            {'$inc': increments, '$set': {'updated_at': now}},
+            upsert=True,
+        )
+        for category, increments in by_category.items()
+    ]
+    if operations:
+        capacity_collection(using).bulk_write(operations, ordered=False)
+
+
+def _diff(old, new):
+    deltas = dict(new)
+    for key, n in old.items():
+        deltas[key] = deltas.get(key, 0) - n
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+# ----------------------------------------------------------------------
+# Signal handlers
+# ----------------------------------------------------------------------
+def _stored_contribution(instance):
+    row = type(instance)._default_manager.filter(pk=instance.pk).values(*PROFILE_FIELDS).first()
+    return (profile_contribution(row) or {}) if row else {}
+
+
+def _remember_contribution(sender, instance, **kwargs):
+    snapshot = profile_contribution(instance.__dict__) if instance.pk else {}
+    setattr(instance, _SNAPSHOT_ATTR, snapshot)
+
+
+def _capture_previous(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(PROFILE_FIELDS):
+        instance._writer_capacity_previous = False
+        return
+    previous = getattr(instance, _SNAPSHOT_ATTR, {})
+    if previous is None and instance.pk is not None:
+        previous = _stored_contribution(instance)
+    instance._writer_capacity_previous = previous or {}
+
+
+def _apply_save(sender, instance, created, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_writer_capacity_previous', {})
+    if previous is False:
+        return
+    current = profile_contribution(instance.__dict__)
+    if current is None:
+        current = _stored_contribution(instance)
+    try:
+        apply_capacity_deltas(_diff({} if created else previous, current), using=using)
+    except Exception as exc:
+        logger.warning(f"Writer capacity update failed for profile {instance.pk}: {exc}")
+    setattr(instance, _SNAPSHOT_ATTR, current)
+
+
+def _apply_delete(sender, instance, using='default', **kwargs):
+    previous = getattr(instance, _SNAPSHOT_ATTR, None)
+    if previous is None:
+        previous = profile_contribution(instance.__dict__) or {}
+    try:
+        apply_capacity_deltas(_diff(previous, {}), using=using)
+    except Exception as exc:
+        logger.warning(f"Writer capacity update failed for deleted profile {instance.pk}: {exc}")
+
+
+def connect_writer_capacity():
+    """Wire the signal handlers; called from AllocatorConfig.ready()."""
+    model = apps.get_model('allocator', 'WriterProfile')
+    uid = 'writer_capacity'
+    post_init.connect(_remember_contribution, sender=model, dispatch_uid=uid)
+    pre_save.connect(_capture_previous, sender=model, dispatch_uid=uid)
+    post_save.connect(_apply_save, sender=model, dispatch_uid=uid)
+    post_delete.connect(_apply_delete, sender=model, dispatch_uid=uid)
+
+
+# ----------------------------------------------------------------------
+# Reading, recompute and repair
+# ----------------------------------------------------------------------
+def _summary_rows(stored, word_count):
+    rows = []
+    for category in CAPACITY_CATEGORIES:
+        counts = stored.get(category['label'], {})
+        stats = {'label': category['label'], 'color': category['color']}
+        for counter in CAPACITY_COUNTERS:
+            stats[counter] = counts.get(counter, 0)
+        stats['word_capacity'] += stats.pop('unbounded_words') * max(word_count or 0, 1)
+        job_cap = stats['job_capacity'] or 1
+        word_cap = stats['word_capacity'] or 1
+        stats['job_load_pct'] = min(100, int(round((stats['current_jobs'] / job_cap) * 100)))
+        stats['word_load_pct'] = min(100, int(round((stats['current_words'] / word_cap) * 100)))
+        rows.append(stats)
+    return rows
+
+
+def get_writer_capacity(word_count=0, using='default'):
+    """Capacity rows for the allocation page, sized for a job of ``word_count`` words."""
+    stored = {
+        document['category']: document
+        for document in capacity_collection(using).find({}, {'_id': 0, 'updated_at': 0})
+    }
+    return _summary_rows(stored, word_count)
+
+
+def compute_writer_capacity(app_registry=None, using='default'):
+    """Recompute ``{category: {counter: n}}`` from every writer profile."""
+    registry = app_registry or apps
+    model = registry.get_model('allocator', 'WriterProfile')
+    totals = {}
+    for values in model._default_manager.using(using).filter(is_available=True).values(*PROFILE_FIELDS).iterator():
+        for (category, counter), n in profile_contribution(values).items():
+            totals.setdefault(category, {})
+            totals[category][counter] = totals[category].get(counter, 0) + n
+    return totals
+
+
+def stored_writer_capacity(using='default'):
+    return {
+        document['category']: {
+            counter: document[counter] for counter in CAPACITY_COUNTERS if document.get(counter)
+        }
+        for document in capacity_collection(using).find({})
+    }
+
+
+def rebuild_writer_capacity(app_registry=None, using='default'):
+    """Replace the summary with a full recompute. Returns the number of categories written."""
+    from pymongo import ReplaceOne
+
+    totals = compute_writer_capacity(app_registry, using)
+    collection = capacity_collection(using)
+    collection.create_index('category', name=CAPACITY_INDEX, unique=True)
+    now = timezone.now()
+    operations = [
+        ReplaceOne(
+            {'category': category['label']},
+            {'category': category['label'], **totals.get(category['label'], {}), 'updated_at': now},
+            upsert=True,
+        )
+        for category in CAPACITY_CATEGORIES
+    ]
+    collection.bulk_write(operations, ordered=False)
+    return len(operations)
@@ -0,0 +1,105 @@
+"""
+Allocator dashboard statistics.
+
+All headline numbers come from one aggregation over ``jobs``: a ``$facet``
+groups the job counts, and two uncorrelated ``$lookup`` stages fold in the
+in-progress task allocations and the active writer/process headcount. The
+result is cached with stale-while-revalidate, so at most one worker per
+cache reruns the aggregation while the others serve the last result (see
+the CACHES note in settings).
+"""
+
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from allocator.models import Job, TaskAllocation
+from common.caching import get_or_revalidate
+from common.mongo import get_collection
+
+logger = logging.getLogger('allocator')
+
+DASHBOARD_STATS_CACHE_KEY = 'allocator:dashboard:stats'
+DASHBOARD_STATS_FRESH_FOR = 30
+DASHBOARD_STATS_STALE_FOR = 600
+
+JOB_STATUSES = {
+    'pending_allocation': 'pending',
+    'in_progress': 'in_progress',
+    'cancelled': 'cancelled',
+    'hold': 'hold',
+    'completed': 'completed',
+}
+TEAM_ROLES = {'writer': 'total_writers', 'process': 'total_process_team'}
+
+
+def _count_if(condition):
+    return {'$sum': {'$cond': [condition, 1, 0]}}
+
+
+def _column(model, name):
+    return model._meta.get_field(name).column
+
+
+def dashboard_stats_pipeline(now=None):
+    now = now or timezone.now()
+    job_status = '$' + _column(Job, 'status')
+    job_counts = {'_id': None, 'total_jobs': {'$sum': 1}}
+    for stat, status in JOB_STATUSES.items():
+        job_counts[stat] = _count_if({'$eq': [job_status, status]})
+    job_counts['new_jobs'] = _count_if(
+        {'$gte': ['$' + _column(Job, 'created_at'), now - timedelta(days=7)]}
+    )
+
+    return [
+        {'$facet': {'jobs': [{'$group': job_counts}]}},
+        {'$lookup': {
+            'from': TaskAllocation._meta.db_table,
+            'pipeline': [
+                {'$match': {_column(TaskAllocation, 'status'): 'in_progress'}},
+                {'$group': {'_id': '$' + _column(TaskAllocation, 'task_type'), 'n': {'$sum': 1}}},
+            ],
+            'as': 'allocations',
+        }},
+        {'$lookup': {
+            'from': CustomUser._meta.db_table,
+            'pipeline': [
+                {'$match': {
+                    _column(CustomUser, 'role'): {'$in': list(TEAM_ROLES)},
+                    _column(CustomUser, 'is_active'): True,
+                }},
+                {'$group': {'_id': '$' + _column(CustomUser, 'role'), 'n': {'$sum': 1}}},
+            ],
+            'as': 'team',
+        }},
+    ]
+
+
+def compute_dashboard_stats(now=None, using='default'):
+    """Run the dashboard aggregation and return the ``stats`` dict the template expects."""
+    rows = list(get_collection(Job, using).aggregate(dashboard_stats_pipeline(now)))
+    result = rows[0] if rows else {}
+
+    jobs = (result.get('jobs') or [{}])[0]
+    stats = {stat: jobs.get(stat, 0) for stat in ['total_jobs', 'new_jobs', *JOB_STATUSES]}
+
+    in_progress = {row['_id']: row['n'] for row in result.get('allocations', [])}
+    stats['assigned_jobs'] = sum(in_progress.values())
+    stats['process_jobs'] = in_progress.get('ai_plag', 0)
+
+    team = {row['_id']: row['n'] for row in result.get('team', [])}
+    for role, stat in TEAM_ROLES.items():
+        stats[stat] = team.get(role, 0)
+    return stats
+
+
+def get_dashboard_stats():
+    """Cached dashboard stats; fresh for 30s, then served stale while one worker refreshes."""
+    return get_or_revalidate(
+        DASHBOARD_STATS_CACHE_KEY,
+        compute_dashboard_stats,
+        fresh_for=DASHBOARD_STATS_FRESH_FOR,
+        stale_for=DASHBOARD_STATS_STALE_FOR,
+    )
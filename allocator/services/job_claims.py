@@ -0,0 +1,157 @@
+"""
+Leases on the allocation form of a job.
+
+Opening ``allocate_job`` claims the job with one ``findAndModify`` whose
+filter is the precondition: the job is still allocatable and nobody else
+holds a live lease on it::
+
+    {'id': 42, 'status': {'$in': [...]},
+     '$or': [{'claimed_by_id': None}, {'claimed_by_id': me},
+             {'claim_expires_at': {'$lte': now}}]}
+
+The update stores the claimant, a fresh token and the expiry. The token
+travels with the form and submitting it consumes the claim, again with a
+single ``findAndModify`` that only matches the live token. Two allocators
+(or two tabs of the same one) can therefore never both submit: the loser
+gets ``JobClaimed`` naming the holder, or ``ClaimLost`` when its token was
+replaced or expired. No lock is held anywhere; an abandoned form simply
+lets the lease run out.
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+from allocator.models import Job
+from common.mongo import get_collection
+
+CLAIM_LEASE = timedelta(minutes=15)
+CLAIMABLE_STATUSES = ['pending', 'allocated', 'in_progress', 'hold', 'query']
+
+
+class JobNotClaimable(Exception):
+    """The job does not exist or is no longer in an allocatable status."""
+
+
+class JobClaimed(Exception):
+    """Another allocator holds a live claim on the job."""
+
+    def __init__(self, job_id, holder_id, expires_at):
+        super().__init__(job_id, holder_id, expires_at)
+        self.job_id = job_id
+        self.holder_id = holder_id
+        self.expires_at = expires_at
+
+    def holder_name(self):
+        from accounts.models import CustomUser
+
+        holder = CustomUser.objects.filter(id=self.holder_id).only('first_name', 'last_name', 'email').first()
+        if holder is None:
+            return 'another allocator'
+        return holder.get_full_name() or holder.email
+
+
+class ClaimLost(Exception):
+    """The claim token expired or was replaced by a newer claim."""
+
+
+def _columns():
+    meta = Job._meta
+    return {
+        'id': meta.pk.column,
+        'status': meta.get_field('status').column,
+        'claimed_by': meta.get_field('claimed_by').column,
+        'token': meta.get_field('claim_token').column,
+        'expires_at': meta.get_field('claim_expires_at').column,
+    }
+
+
+def _explain_failure(collection, columns, job_id):
+    document = collection.find_one(
+        {columns['id']: job_id},
+        {columns['status']: 1, columns['claimed_by']: 1, columns['expires_at']: 1},
+    )
+    if document is None or document.get(columns['status']) not in CLAIMABLE_STATUSES:
+        return JobNotClaimable(job_id)
+    if document.get(columns['claimed_by']) is not None:
+        expires_at = document.get(columns['expires_at'])
+        if expires_at is not None and timezone.is_naive(expires_at):
+            # pymongo hands back naive UTC datetimes.
+            expires_at = timezone.make_aware(expires_at, timezone.utc)
+        return JobClaimed(job_id, document[columns['claimed_by']], expires_at)
+    return ClaimLost(job_id)
+
+
+def claim_job(job_id, user, lease=CLAIM_LEASE, using='default'):
+    """
+    Claim (or re-claim) ``job_id`` for ``user``. Returns the claim token to
+    submit with the form; raises ``JobClaimed`` or ``JobNotClaimable``.
+    """
+    from pymongo import ReturnDocument
+
+    columns = _columns()
+    collection = get_collection(Job, using)
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    document = collection.find_one_and_update(
+        {
+            columns['id']: job_id,
+            columns['status']: {'$in': CLAIMABLE_STATUSES},
+            '$or': [
+                {columns['claimed_by']: None},
+                {columns['claimed_by']: user.id},
+                {columns['expires_at']: {'$lte': now}},
+            ],
+        },
+        {'$set': {
+            columns['claimed_by']: user.id,
+            columns['token']: token,
+            columns['expires_at']: now + lease,
+        }},
+        projection={columns['id']: 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is None:
+        raise _explain_failure(collection, columns, job_id)
+    return token
+
+
+def consume_claim(job_id, user, token, using='default'):
+    """
+    Atomically take the claim identified by ``token`` before writing the
+    allocation; exactly one submission per claim gets through. Raises
+    ``ClaimLost``, ``JobClaimed`` or ``JobNotClaimable`` otherwise.
+    """
+    columns = _columns()
+    collection = get_collection(Job, using)
+    document = collection.find_one_and_update(
+        {
+            columns['id']: job_id,
+            columns['status']: {'$in': CLAIMABLE_STATUSES},
+            columns['claimed_by']: user.id,
+            columns['token']: token or '',
+            columns['expires_at']: {'$gt': timezone.now()},
+        },
+        {'$set': {columns['claimed_by']: None, columns['token']: None, columns['expires_at']: None}},
+        projection={columns['id']: 1},
+    )
+    if document is None:
+        failure = _explain_failure(collection, columns, job_id)
+        if isinstance(failure, JobClaimed) and failure.holder_id == user.id:
+            # Our own newer claim (another tab) replaced this one.
+            failure = ClaimLost(job_id)
+        raise failure
+
+
+def release_claim(job_id, user, token=None, using='default'):
+    """Drop ``user``'s claim (only the one with ``token`` when given). Returns True if one was held."""
+    columns = _columns()
+    query = {columns['id']: job_id, columns['claimed_by']: user.id}
+    if token:
+        query[columns['token']] = token
+    result = get_collection(Job, using).update_one(
+        query,
+        {'$set': {columns['claimed_by']: None, columns['token']: None, columns['expires_at']: None}},
+    )
+    return bool(result.modified_count)
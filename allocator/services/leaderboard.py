@@ -0,0 +1,255 @@
+"""
+Precomputed writer leaderboard.
+
+Writers are ranked on four metrics:
+
+* ``on_time_rate`` - share of completed projects delivered by the deadline
+  (``WriterStatistics``), shrunk towards the overall rate by
+  ``PRIOR_PROJECTS`` pseudo-projects so one lucky delivery does not top
+  the board;
+* ``words``  - words delivered on completed projects;
+* ``rating`` - ``WriterProfile.rating``;
+* ``churn``  - share of assigned jobs later reallocated away from the writer
+  (``AllocationHistory`` rows naming them as ``previous_user``); lower is
+  better.
+
+Each metric becomes a percentile within the board (ties share one) and the
+score is their weighted sum (``LEADERBOARD_WEIGHTS``, churn inverted). All
+of it is computed with numpy over every writer at once; per category boards
+only mask the rows. The result goes to the ``writer_leaderboard``
+collection, one small document per board::
+
+    {'_id': 'overall', 'writers': 42, 'updated_at': ...,
+     'entries': [{'rank': 1, 'user_id': 7, 'name': '...', 'score': 0.91,
+                  'on_time_rate': 0.96, 'words': 184000, 'rating': 4.8,
+                  'churn': 0.02, 'ranks': {'on_time_rate': 2, ...}}, ...],
+     'tops': {'score': [7, 12, ...], 'words': [12, 3, ...], ...}}
+
+``tops`` lists the best ``LEADERBOARD_SIZE`` writers by the score and by
+each metric; ``entries`` holds every writer named in any of them, with
+ranks taken over the whole board, so sorting by a metric shows its own
+top writers rather than re-sorting the score's.
+
+``rebuild_writer_leaderboard`` (the management command of the same name)
+recomputes all boards and is meant to run periodically; pages and the API
+only read the stored documents.
+"""
+
+import numpy as np
+from django.apps import apps
+from django.db import connections
+from django.utils import timezone
+
+from common.mongo import get_collection
+
+from .availability import CATEGORY_FLAGS
+
+LEADERBOARD_COLLECTION = 'writer_leaderboard'
+OVERALL_BOARD = 'overall'
+LEADERBOARD_BOARDS = [OVERALL_BOARD, *CATEGORY_FLAGS]
+LEADERBOARD_SIZE = 200
+LEADERBOARD_METRICS = ['on_time_rate', 'words', 'rating', 'churn']
+LEADERBOARD_WEIGHTS = {'on_time_rate': 0.4, 'words': 0.25, 'rating': 0.2, 'churn': 0.15}
+LOWER_IS_BETTER = {'churn'}
+PRIOR_PROJECTS = 5
+CHURN_ACTIONS = ['reallocated', 'switched']
+
+
+def leaderboard_collection(using='default'):
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection.connection[LEADERBOARD_COLLECTION]
+
+
+def _reallocations_away(using='default'):
+    """``{user_id: n}`` of allocations moved from the user to someone else."""
+    AllocationHistory = apps.get_model('allocator', 'AllocationHistory')
+    meta = AllocationHistory._meta
+    previous = meta.get_field('previous_user').column
+    new = meta.get_field('new_user').column
+    pipeline = [
+        {'$match': {
+            meta.get_field('action').column: {'$in': CHURN_ACTIONS},
+            previous: {'$ne': None},
+            '$expr': {'$ne': [f'${previous}', f'${new}']},
+        }},
+        {'$group': {'_id': f'${previous}', 'n': {'$sum': 1}}},
+    ]
+    return {row['_id']: row['n'] for row in get_collection(AllocationHistory, using).aggregate(pipeline)}
+
+
+def load_writer_metrics(using='default'):
+    """
+    Metric arrays over every active writer with a profile:
+    ``(user_ids, names, categories, metrics, raw)``. ``categories`` maps a
+    category to a boolean mask, ``metrics`` a metric to the float array it
+    is ranked on and ``raw`` holds the unsmoothed on-time rate (NaN without
+    completed projects) and completed counts for display.
+    """
+    WriterProfile = apps.get_model('allocator', 'WriterProfile')
+    WriterStatistics = apps.get_model('writer', 'WriterStatistics')
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+
+    users = {
+        row['id']: row
+        for row in CustomUser.objects.using(using).filter(role='writer', is_active=True).values(
+            'id', 'first_name', 'last_name', 'email',
+        )
+    }
+    profiles = [
+        row for row in WriterProfile.objects.using(using).values(
+            'user_id', 'rating', 'total_jobs_assigned', *CATEGORY_FLAGS.values(),
+        )
+        if row['user_id'] in users
+    ]
+    statistics = {
+        row['writer_id']: row
+        for row in WriterStatistics.objects.using(using).filter(
+            writer_id__in=[row['user_id'] for row in profiles],
+        ).values('writer_id', 'completed_projects', 'on_time_delivery', 'total_words_written')
+    }
+    churned = _reallocations_away(using)
+
+    user_ids = np.asarray([row['user_id'] for row in profiles], dtype=np.int64)
+    names = []
+    for row in profiles:
+        user = users[row['user_id']]
+        names.append(f"{user['first_name'] or ''} {user['last_name'] or ''}".strip() or user['email'])
+
+    def column(values, dtype=np.float64):
+        return np.asarray(values, dtype=dtype)
+
+    empty = {}
+    completed = column([(statistics.get(row['user_id']) or empty).get('completed_projects') or 0 for row in profiles])
+    on_time = column([(statistics.get(row['user_id']) or empty).get('on_time_delivery') or 0 for row in profiles])
+    assigned = column([row['total_jobs_assigned'] or 0 for row in profiles])
+    moved = column([churned.get(row['user_id'], 0) for row in profiles])
+
+    overall_rate = on_time.sum() / completed.sum() if completed.sum() else 0.0
+    metrics = {
+        'on_time_rate': (on_time + PRIOR_PROJECTS * overall_rate) / (completed + PRIOR_PROJECTS),
+        'words': column([(statistics.get(row['user_id']) or empty).get('total_words_written') or 0 for row in profiles]),
+        'rating': column([row['rating'] or 0.0 for row in profiles]),
+        'churn': moved / np.maximum(assigned, moved).clip(min=1),
+    }
+    raw = {
+        'on_time_rate': np.divide(on_time, completed, out=np.full(len(profiles), np.nan), where=completed > 0),
+        'completed': completed,
+    }
+    categories = {
+        category: column([bool(row[flag]) for row in profiles], dtype=bool)
+        for category, flag in CATEGORY_FLAGS.items()
+    }
+    return user_ids, names, categories, metrics, raw
+
+
+def percentiles(values):
+    """Percentile (0-1) of each value within ``values``; equal values share one."""
+    if values.size < 2:
+        return np.ones(values.size)
+    ordered = np.sort(values)
+    below = np.searchsorted(ordered, values, side='left')
+    through = np.searchsorted(ordered, values, side='right')
+    return (below + through - 1) / 2.0 / (values.size - 1)
+
+
+def metric_ranks(values, lower_is_better=False):
+    """1-based competition rank of each value (ties share the best rank)."""
+    ordered = np.sort(values)
+    if lower_is_better:
+        return np.searchsorted(ordered, values, side='left') + 1
+    return values.size - np.searchsorted(ordered, values, side='right') + 1
+
+
+def rank_board(metrics, weights=LEADERBOARD_WEIGHTS):
+    """``(order, scores, ranks)`` for one board's metric arrays."""
+    size = len(next(iter(metrics.values()))) if metrics else 0
+    scores = np.zeros(size)
+    ranks = {}
+    for metric in LEADERBOARD_METRICS:
+        values = metrics[metric]
+        lower = metric in LOWER_IS_BETTER
+        share = percentiles(values)
+        scores += weights.get(metric, 0.0) * (1.0 - share if lower else share)
+        ranks[metric] = metric_ranks(values, lower)
+    # Best score first; words break ties.
+    order = np.lexsort((-metrics['words'], -scores)) if size else np.zeros(0, dtype=np.int64)
+    return order, scores / max(sum(weights.values()), 1e-9), ranks
+
+
+def _metric_order(values, scores, lower_is_better=False):
+    """Rows best first on ``values``; the composite score breaks ties."""
+    return np.lexsort((-scores, values if lower_is_better else -values))
+
+
+def _board_document(board, user_ids, names, metrics, raw, now):
+    order, scores, ranks = rank_board(metrics)
+    score_ranks = np.empty(user_ids.size, dtype=np.int64)
+    score_ranks[order] = np.arange(1, user_ids.size + 1)
+    tops = {'score': order[:LEADERBOARD_SIZE]}
+    for metric in LEADERBOARD_METRICS:
+        tops[metric] = _metric_order(metrics[metric], scores, metric in LOWER_IS_BETTER)[:LEADERBOARD_SIZE]
+
+    entries = []
+    for row in np.unique(np.concatenate(list(tops.values()))).tolist():
+        rate = raw['on_time_rate'][row]
+        entries.append({
+            'rank': int(score_ranks[row]),
+            'user_id': int(user_ids[row]),
+            'name': names[row],
+            'score': round(float(scores[row]), 4),
+            'on_time_rate': None if np.isnan(rate) else round(float(rate), 4),
+            'completed': int(raw['completed'][row]),
+            'words': int(metrics['words'][row]),
+            'rating': round(float(metrics['rating'][row]), 2),
+            'churn': round(float(metrics['churn'][row]), 4),
+            'ranks': {metric: int(ranks[metric][row]) for metric in LEADERBOARD_METRICS},
+        })
+    entries.sort(key=lambda entry: entry['rank'])
+    return {
+        '_id': board,
+        'writers': int(user_ids.size),
+        'entries': entries,
+        'tops': {key: [int(user_ids[row]) for row in rows.tolist()] for key, rows in tops.items()},
+        'updated_at': now,
+    }
+
+
+def rebuild_writer_leaderboard(using='default'):
+    """Recompute every board and replace the stored documents. Returns ``{board: writers}``."""
+    from pymongo import ReplaceOne
+
+    user_ids, names, categories, metrics, raw = load_writer_metrics(using)
+    now = timezone.now()
+    documents = [_board_document(OVERALL_BOARD, user_ids, names, metrics, raw, now)]
+    for category, mask in categories.items():
+        rows = np.flatnonzero(mask)
+        documents.append(_board_document(
+            category,
+            user_ids[rows],
+            [names[row] for row in rows.tolist()],
+            {metric: values[rows] for metric, values in metrics.items()},
+            {key: values[rows] for key, values in raw.items()},
+            now,
+        ))
+    leaderboard_collection(using).bulk_write(
+        [ReplaceOne({'_id': document['_id']}, document, upsert=True) for document in documents],
+        ordered=False,
+    )
+    return {document['_id']: document['writers'] for document in documents}
+
+
+def get_leaderboard(board=OVERALL_BOARD, using='default'):
+    """The stored board, built on first use only; None for an unknown board."""
+    if board not in LEADERBOARD_BOARDS:
+        return None
+    collection = leaderboard_collection(using)
+    document = collection.find_one({'_id': board})
+    if document is None:
+        rebuild_writer_leaderboard(using)
+        document = collection.find_one({'_id': board})
+    updated_at = document.get('updated_at')
+    if updated_at is not None and timezone.is_naive(updated_at):
+        # pymongo hands back naive UTC datetimes.
+        document['updated_at'] = timezone.make_aware(updated_at, timezone.utc)
+    return document
@@ -0,0 +1,166 @@
+"""
+Atomic load counters for writer and process team profiles.
+
+Allocating, switching and cancelling change a profile's ``current_jobs``,
+``current_words`` and lifetime totals. Doing that as read, modify, ``save()``
+costs two round trips, rewrites the whole document and loses updates when
+two allocators touch the same profile at once. The helpers here apply the
+deltas in one ``findOneAndUpdate`` with an update pipeline, so every counter
+is incremented atomically and never drops below zero::
+
+    {'$set': {'current_jobs': {'$max': [0, {'$add': ['$current_jobs', -1]}]}}}
+
+The pre-update document comes back from the same call, which is enough to
+adjust the writer capacity summary (signals do not fire for these writes).
+"""
+
+import logging
+
+from django.utils import timezone
+
+from allocator.models import ProcessTeamProfile, WriterProfile
+from common.mongo import get_collection
+
+from .capacity import PROFILE_FIELDS, apply_capacity_deltas, profile_contribution
+
+logger = logging.getLogger('allocator')
+
+WRITER_LOAD_FIELDS = {
+    'jobs': 'current_jobs',
+    'words': 'current_words',
+    'assigned': 'total_jobs_assigned',
+    'completed': 'total_jobs_completed',
+}
+PROCESS_LOAD_FIELDS = {
+    'jobs': 'current_jobs',
+    'completed': 'total_jobs_completed',
+}
+
+
+def _columns(model, deltas, names):
+    return {
+        model._meta.get_field(names[name]).column: delta
+        for name, delta in deltas.items()
+        if delta
+    }
+
+
+def _clamped_pipeline(increments, now=None):
+    update = {
+        column: {'$max': [0, {'$add': [{'$ifNull': [f'${column}', 0]}, delta]}]}
+        for column, delta in increments.items()
+    }
+    if now is not None:
+        update['updated_at'] = now
+    return [{'$set': update}]
+
+
+def _owner_column(model):
+    return model._meta.get_field('user').column
+
+
+def _apply_after(document, increments):
+    after = dict(document)
+    for column, delta in increments.items():
+        after[column] = max(0, (document.get(column) or 0) + delta)
+    return after
+
+
+def _update_capacity(before, after, using):
+    deltas = dict(profile_contribution(after) or {})
+    for key, n in (profile_contribution(before) or {}).items():
+        deltas[key] = deltas.get(key, 0) - n
+    try:
+        apply_capacity_deltas({key: n for key, n in deltas.items() if n}, using=using)
+    except Exception as exc:
+        logger.warning(f"Writer capacity update failed for writer {before.get('user_id')}: {exc}")
+
+
+def adjust_writer_load(user_id, jobs=0, words=0, assigned=0, completed=0, using='default'):
+    """
+    Add the given deltas to a writer's profile in one atomic round trip,
+    clamping each counter at zero. Returns the updated counters, or None when
+    the writer has no profile.
+    """
+    from pymongo import ReturnDocument
+
+    increments = _columns(
+        WriterProfile,
+        {'jobs': jobs, 'words': words, 'assigned': assigned, 'completed': completed},
+        WRITER_LOAD_FIELDS,
+    )
+    if not increments:
+        return None
+    projection = {field: 1 for field in PROFILE_FIELDS}
+    projection.update({column: 1 for column in increments})
+    before = get_collection(WriterProfile, using).find_one_and_update(
+        {_owner_column(WriterProfile): user_id},
+        _clamped_pipeline(increments, timezone.now()),
+        projection=projection,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        logger.warning(f"No writer profile for user {user_id}; load change {increments} dropped")
+        return None
+    after = _apply_after(before, increments)
+    _update_capacity(before, after, using)
+    return {column: after[column] for column in increments}
+
+
+def adjust_writer_loads(loads, using='default'):
+    """
+    Bulk form of ``adjust_writer_load`` for ``{user_id: {'jobs': n, 'words': n,
+    'assigned': n, 'completed': n}}``: one bulk write plus one read-back for
+    the capacity summary. The summary is exact for increments; when a
+    decrement was clamped, ``check_writer_capacity`` corrects it.
+    """
+    from pymongo import UpdateOne
+
+    owner = _owner_column(WriterProfile)
+    now = timezone.now()
+    increments_by_user = {}
+    for user_id, deltas in loads.items():
+        increments = _columns(WriterProfile, deltas, WRITER_LOAD_FIELDS)
+        if increments:
+            increments_by_user[user_id] = increments
+    if not increments_by_user:
+        return
+
+    collection = get_collection(WriterProfile, using)
+    collection.bulk_write([
+        UpdateOne({owner: user_id}, _clamped_pipeline(increments, now))
+        for user_id, increments in increments_by_user.items()
+    ], ordered=False)
+
+    projection = {field: 1 for field in PROFILE_FIELDS}
+    projection[owner] = 1
+    for after in collection.find({owner: {'$in': list(increments_by_user)}}, projection):
+        increments = increments_by_user[after[owner]]
+        before = dict(after)
+        for column, delta in increments.items():
+            if column in before:
+                before[column] = max(0, (after.get(column) or 0) - delta)
+        _update_capacity(before, after, using)
+
+
+def adjust_process_load(user_id, jobs=0, completed=0, using='default'):
+    """
+    Add the given deltas to a process team member's profile in one atomic
+    round trip, clamped at zero. Returns the updated counters, or None when
+    the member has no profile.
+    """
+    from pymongo import ReturnDocument
+
+    increments = _columns(ProcessTeamProfile, {'jobs': jobs, 'completed': completed}, PROCESS_LOAD_FIELDS)
+    if not increments:
+        return None
+    document = get_collection(ProcessTeamProfile, using).find_one_and_update(
+        {_owner_column(ProcessTeamProfile): user_id},
+        _clamped_pipeline(increments),
+        projection={column: 1 for column in increments},
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is None:
+        logger.warning(f"No process profile for user {user_id}; load change {increments} dropped")
+        return None
+    return {column: document[column] for column in increments}
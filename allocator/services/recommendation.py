@@ -0,0 +1,210 @@
+"""
+Vectorised writer recommendations for a job.
+
+Writer profiles are loaded once into column arrays (``WriterMatrix``) and a
+job is scored against all of them in a single NumPy pass:
+
+* eligibility - the same rules as ``WriterProfile.can_accept_job``
+  (availability flags, job slots, word limit, IT specialisation), evaluated
+  as boolean masks, with the first failing rule kept as the reason;
+* score - a weighted sum of features in ``[0, 1]``:
+
+  ===============  ==========================================================
+  ``capacity``     share of job slots still free
+  ``words``        share of the word limit still free after taking the job
+  ``specialism``   writer is flagged for the job's category
+  ``rating``       rating out of 5
+  ``reliability``  completed / assigned jobs (neutral 0.5 without history)
+  ``deadline``     can the writer's queued words plus this job be written
+                   before the deadline at ``WORDS_PER_HOUR``
+  ===============  ==========================================================
+
+Ineligible writers are still ranked, after every eligible one. Only the top
+K are sorted (``argpartition``), and each entry carries its per-feature
+contributions so the UI and the JSON API can explain the order.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from django.utils import timezone
+
+RankingWeights = namedtuple(
+    'RankingWeights', ['capacity', 'words', 'specialism', 'rating', 'reliability', 'deadline']
+)
+
+DEFAULT_WEIGHTS = RankingWeights(
+    capacity=0.25, words=0.15, specialism=0.15, rating=0.2, reliability=0.15, deadline=0.1,
+)
+WORDS_PER_HOUR = 250
+MAX_RATING = 5.0
+
+CATEGORY_FLAGS = {
+    'IT': 'is_it_writer',
+    'NONIT': 'is_nonit_writer',
+    'Finance': 'is_finance_writer',
+}
+
+PROFILE_COLUMNS = [
+    'user_id', 'is_it_writer', 'is_nonit_writer', 'is_finance_writer',
+    'is_available', 'is_sunday_off', 'is_on_holiday', 'is_overloaded',
+    'max_jobs', 'current_jobs', 'max_words', 'current_words',
+    'total_jobs_completed', 'total_jobs_assigned', 'rating',
+]
+BOOLEAN_COLUMNS = {
+    'is_it_writer', 'is_nonit_writer', 'is_finance_writer',
+    'is_available', 'is_sunday_off', 'is_on_holiday', 'is_overloaded',
+}
+
+# Checked in order; the first failing rule is the writer's reason.
+INELIGIBLE_REASONS = [
+    ('unavailable', 'Writer is not available'),
+    ('job_limit', 'Maximum job limit reached ({max_jobs})'),
+    ('word_limit', 'Word limit would be exceeded'),
+    ('specialism', 'Not an IT writer'),
+]
+
+
+class WriterMatrix:
+    """Column arrays of writer profile fields, one row per writer."""
+
+    def __init__(self, columns, names=None):
+        self.user_ids = np.asarray(columns['user_id'], dtype=np.int64)
+        self.size = len(self.user_ids)
+        for column in PROFILE_COLUMNS[1:]:
+            values = columns[column]
+            if column in BOOLEAN_COLUMNS:
+                array = np.asarray(values, dtype=bool)
+            elif column == 'rating':
+                array = np.asarray(values, dtype=np.float64)
+            else:
+                array = np.asarray(values, dtype=np.int64)
+            if array.shape != (self.size,):
+                raise ValueError(f'Column {column} has {array.shape[0]} rows, expected {self.size}')
+            setattr(self, column, array)
+        self.names = names or {}
+
+    @classmethod
+    def from_rows(cls, rows, names=None):
+        """Build from dicts/objects exposing ``PROFILE_COLUMNS`` (``None`` counts as 0)."""
+        columns = {column: [] for column in PROFILE_COLUMNS}
+        for row in rows:
+            get = row.get if isinstance(row, dict) else row.__dict__.get
+            for column in PROFILE_COLUMNS:
+                columns[column].append(get(column) or 0)
+        return cls(columns, names)
+
+    @classmethod
+    def load(cls, using='default'):
+        """Available profiles of active writers: two queries, no model instances."""
+        from accounts.models import CustomUser
+        from allocator.models import WriterProfile
+
+        names = {
+            user_id: f"{first_name} {last_name}".strip() or email
+            for user_id, first_name, last_name, email in CustomUser.objects.using(using).filter(
+                role='writer', is_active=True
+            ).values_list('id', 'first_name', 'last_name', 'email')
+        }
+        rows = [
+            row for row in WriterProfile.objects.using(using).filter(is_available=True).values(*PROFILE_COLUMNS)
+            if row['user_id'] in names
+        ]
+        return cls.from_rows(rows, names)
+
+
+def _hours_until(deadline, now):
+    if not deadline:
+        return None
+    if timezone.is_naive(deadline):
+        deadline = timezone.make_aware(deadline)
+    return max((deadline - now).total_seconds() / 3600.0, 0.0)
+
+
+def score_writers(matrix, job_category, word_count, deadline=None, weights=DEFAULT_WEIGHTS, now=None):
+    """
+    Score every writer in ``matrix`` for one job. Returns
+    ``(scores, eligible, reason_codes, features)`` where ``reason_codes`` is
+    -1 for eligible writers, else an index into ``INELIGIBLE_REASONS``, and
+    ``features`` maps each weight name to its per-writer values in ``[0, 1]``.
+    """
+    word_count = max(int(word_count or 0), 0)
+    max_jobs = np.maximum(matrix.max_jobs, 1)
+    max_words = matrix.max_words
+    words_after = matrix.current_words + word_count
+
+    failures = np.stack([
+        ~matrix.is_available | matrix.is_sunday_off | matrix.is_on_holiday | matrix.is_overloaded,
+        matrix.current_jobs >= matrix.max_jobs,
+        words_after > max_words,
+        (job_category == 'IT') & ~matrix.is_it_writer,
+    ])
+    eligible = ~failures.any(axis=0)
+    reason_codes = np.where(eligible, -1, failures.argmax(axis=0))
+
+    flag = CATEGORY_FLAGS.get(job_category)
+    hours = _hours_until(deadline, now or timezone.now())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = {
+            'capacity': np.clip(1.0 - matrix.current_jobs / max_jobs, 0.0, 1.0),
+            'words': np.where(max_words > 0, np.clip(1.0 - words_after / np.maximum(max_words, 1), 0.0, 1.0), 0.0),
+            'specialism': getattr(matrix, flag).astype(np.float64) if flag else np.ones(matrix.size),
+            'rating': np.clip(matrix.rating / MAX_RATING, 0.0, 1.0),
+            'reliability': np.where(
+                matrix.total_jobs_assigned > 0,
+                np.clip(matrix.total_jobs_completed / np.maximum(matrix.total_jobs_assigned, 1), 0.0, 1.0),
+                0.5,
+            ),
+            'deadline': (
+                np.ones(matrix.size) if hours is None
+                else np.clip(hours * WORDS_PER_HOUR / np.maximum(words_after, 1), 0.0, 1.0)
+            ),
+        }
+
+    scores = np.zeros(matrix.size)
+    for name, weight in weights._asdict().items():
+        scores += weight * features[name]
+    return scores, eligible, reason_codes, features
+
+
+def rank_writers(job, matrix=None, top_k=10, weights=DEFAULT_WEIGHTS, now=None):
+    """
+    Top ``top_k`` writers for ``job`` (eligible first, then by score), each as
+    ``{'user_id', 'name', 'score', 'eligible', 'reason', 'explanation'}``.
+    ``top_k=None`` ranks everyone.
+    """
+    matrix = matrix if matrix is not None else WriterMatrix.load()
+    if not matrix.size:
+        return []
+    scores, eligible, reason_codes, features = score_writers(
+        matrix, job.job_category, job.word_count, getattr(job, 'deadline', None), weights, now,
+    )
+
+    # Eligible writers always sort ahead of ineligible ones.
+    keys = scores + eligible * (sum(weights) + 1.0)
+    if top_k is None or top_k >= matrix.size:
+        order = np.argsort(-keys, kind='stable')
+    else:
+        top_k = max(int(top_k), 0)
+        candidates = np.argpartition(-keys, top_k - 1)[:top_k] if top_k else np.array([], dtype=np.int64)
+        order = candidates[np.argsort(-keys[candidates], kind='stable')]
+
+    weight_map = weights._asdict()
+    ranked = []
+    for index in order.tolist():
+        user_id = int(matrix.user_ids[index])
+        code = int(reason_codes[index])
+        ranked.append({
+            'user_id': user_id,
+            'name': matrix.names.get(user_id, ''),
+            'score': round(float(scores[index]), 4),
+            'eligible': bool(eligible[index]),
+            'reason': None if code < 0 else INELIGIBLE_REASONS[code][1].format(
+                max_jobs=int(matrix.max_jobs[index]),
+            ),
+            'explanation': {
+                name: round(float(weight * features[name][index]), 4)
+                for name, weight in weight_map.items()
+            },
+        })
+    return ranked
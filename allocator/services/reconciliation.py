@@ -0,0 +1,156 @@
+"""
+Reconcile profile load counters with the allocations they summarise.
+
+``WriterProfile.current_jobs``/``current_words`` and
+``ProcessTeamProfile.current_jobs`` are kept up to date incrementally, but
+anything that changes an allocation without going through the load API
+(admin edits, old code paths, failed requests) leaves them wrong for good.
+This module recomputes the true open load with one aggregation over
+``task_allocations`` joined to ``jobs`` and writes back only the profiles
+that drifted.
+
+Open load means:
+
+* writers - ``content_creation`` allocations not marked completed, on jobs
+  still with the writer (not completed, cancelled or in decoration);
+* process team - ``ai_plag`` allocations not marked completed, on jobs that
+  are not completed or cancelled.
+
+Corrections are compare-and-set on the values that were read, so a profile
+changed by a concurrent allocation in between is left alone and reported as
+skipped; the next run picks it up.
+"""
+
+import logging
+from collections import namedtuple
+
+from django.utils import timezone
+
+from allocator.models import Job, ProcessTeamProfile, TaskAllocation, WriterProfile
+from common.mongo import get_collection
+
+from .capacity import rebuild_writer_capacity
+
+logger = logging.getLogger('allocator')
+
+WRITER_CLOSED_JOB_STATUSES = ['completed', 'cancelled', 'decoration']
+PROCESS_CLOSED_JOB_STATUSES = ['completed', 'cancelled']
+
+LoadDrift = namedtuple('LoadDrift', ['role', 'user_id', 'stored', 'actual', 'corrected'])
+
+
+def _column(model, name):
+    return model._meta.get_field(name).column
+
+
+def open_loads_pipeline():
+    task_type = '$' + _column(TaskAllocation, 'task_type')
+    job_status = '$job.' + _column(Job, 'status')
+    return [
+        {'$match': {
+            _column(TaskAllocation, 'task_type'): {'$in': ['content_creation', 'ai_plag']},
+            _column(TaskAllocation, 'status'): {'$ne': 'completed'},
+            _column(TaskAllocation, 'allocated_to'): {'$ne': None},
+        }},
+        {'$lookup': {
+            'from': Job._meta.db_table,
+            'localField': _column(TaskAllocation, 'job'),
+            'foreignField': Job._meta.pk.column,
+            'as': 'job',
+        }},
+        {'$unwind': '$job'},
+        {'$match': {'$expr': {'$cond': [
+            {'$eq': [task_type, 'content_creation']},
+            {'$not': [{'$in': [job_status, WRITER_CLOSED_JOB_STATUSES]}]},
+            {'$not': [{'$in': [job_status, PROCESS_CLOSED_JOB_STATUSES]}]},
+        ]}}},
+        {'$group': {
+            '_id': {'user_id': '$' + _column(TaskAllocation, 'allocated_to'), 'task_type': task_type},
+            'jobs': {'$sum': 1},
+            'words': {'$sum': {'$ifNull': ['$job.' + _column(Job, 'word_count'), 0]}},
+        }},
+    ]
+
+
+def compute_open_loads(using='default'):
+    """
+    Return ``(writer_loads, process_loads)``: ``{user_id: (jobs, words)}`` and
+    ``{user_id: jobs}`` from one aggregation.
+    """
+    writer_loads, process_loads = {}, {}
+    for row in get_collection(TaskAllocation, using).aggregate(open_loads_pipeline(), allowDiskUse=True):
+        user_id = row['_id']['user_id']
+        if row['_id']['task_type'] == 'content_creation':
+            writer_loads[user_id] = (row['jobs'], row['words'])
+        else:
+            process_loads[user_id] = row['jobs']
+    return writer_loads, process_loads
+
+
+def reconcile_profile_loads(dry_run=False, using='default'):
+    """
+    Compare every profile's load counters with the open allocations and
+    correct the ones that drifted (unless ``dry_run``). Returns a list of
+    ``LoadDrift``.
+    """
+    from pymongo import UpdateOne
+
+    writer_loads, process_loads = compute_open_loads(using)
+    now = timezone.now()
+    drifts = []
+
+    writer_ops = []
+    owner = _column(WriterProfile, 'user')
+    for user_id, current_jobs, current_words in WriterProfile.objects.using(using).values_list(
+        'user_id', 'current_jobs', 'current_words',
+    ):
+        stored = (current_jobs or 0, current_words or 0)
+        actual = writer_loads.get(user_id, (0, 0))
+        if stored == actual:
+            continue
+        drifts.append(LoadDrift('writer', user_id, stored, actual, False))
+        writer_ops.append(UpdateOne(
+            {owner: user_id, 'current_jobs': current_jobs, 'current_words': current_words},
+            {'$set': {'current_jobs': actual[0], 'current_words': actual[1], 'updated_at': now}},
+        ))
+
+    process_ops = []
+    owner = _column(ProcessTeamProfile, 'user')
+    for user_id, current_jobs in ProcessTeamProfile.objects.using(using).values_list('user_id', 'current_jobs'):
+        actual = process_loads.get(user_id, 0)
+        if (current_jobs or 0) == actual:
+            continue
+        drifts.append(LoadDrift('process', user_id, current_jobs or 0, actual, False))
+        process_ops.append(UpdateOne(
+            {owner: user_id, 'current_jobs': current_jobs},
+            {'$set': {'current_jobs': actual}},
+        ))
+
+    if dry_run or not drifts:
+        return drifts
+
+    corrected = set()
+    for role, model, operations, columns in [
+        ('writer', WriterProfile, writer_ops, ('current_jobs', 'current_words')),
+        ('process', ProcessTeamProfile, process_ops, ('current_jobs',)),
+    ]:
+        if not operations:
+            continue
+        get_collection(model, using).bulk_write(operations, ordered=False)
+        # A compare-and-set that matched nothing lost to a concurrent change;
+        # read back which profiles now hold the computed values.
+        expected = {drift.user_id: drift.actual for drift in drifts if drift.role == role}
+        for user_id, *values in model.objects.using(using).filter(
+            user_id__in=list(expected),
+        ).values_list('user_id', *columns):
+            stored = tuple(values) if len(values) > 1 else values[0]
+            if stored == expected[user_id]:
+                corrected.add((role, user_id))
+
+    if writer_ops:
+        rebuild_writer_capacity(using=using)
+    drifts = [drift._replace(corrected=(drift.role, drift.user_id) in corrected) for drift in drifts]
+    logger.info(
+        f"Reconciled profile loads: {len(corrected)} corrected, {len(drifts) - len(corrected)} skipped"
+    )
+    return drifts
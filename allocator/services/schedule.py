@@ -0,0 +1,320 @@
+"""
+Per-user interval index of open task allocations.
+
+``TaskAllocation.start_date_time``/``end_date_time`` describe when a member
+is busy. Checking a candidate for double-booking by scanning allocations is
+linear per candidate; the allocation page needs the answer for every
+candidate writer at once. ``AllocationIntervalIndex`` keeps each user's open
+allocations and, on demand, a flat view of them:
+
+* ``starts`` - every interval's start, sorted within each user's segment;
+* ``ends``   - every interval's end, sorted independently within the segment.
+
+Keys are ``segment * SPAN + epoch_seconds`` so one ``searchsorted`` call over
+the whole array answers all users at once. Intervals are half-open
+``[start, end)``; an interval overlaps ``[s, e)`` when ``start < e`` and
+``end > s``, and since every interval ending by ``s`` also starts before
+``e``::
+
+    overlaps(u, s, e) = #{start < e} - #{end <= s}
+
+which is two binary searches per user. Listing the overlapping intervals or
+the free windows only walks the user's intervals that start before ``e``.
+
+The index is updated one allocation at a time from ``TaskAllocation`` and
+``Job`` signals; the flat view is rebuilt lazily on the next query after a
+change. ``allocation_index()`` returns the process-wide instance, rebuilt
+from the database when older than ``INDEX_MAX_AGE`` so changes made by other
+processes are picked up.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+logger = logging.getLogger('allocator')
+
+CLOSED_JOB_STATUSES = ('completed', 'cancelled')
+INDEX_MAX_AGE = 300
+SPAN = 1 << 34  # seconds; larger than any epoch timestamp we store
+
+Interval = namedtuple('Interval', ['allocation_id', 'job_id', 'task_type', 'start', 'end'])
+
+
+def _seconds(value):
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return max(int(value.timestamp()), 0)
+
+
+def _datetime(seconds):
+    return datetime.fromtimestamp(int(seconds), tz=timezone.utc)
+
+
+class AllocationIntervalIndex:
+    """Open allocations per user, answering overlap and free-window queries."""
+
+    def __init__(self):
+        self._users = {}  # user_id -> {allocation_id: (start, end, job_id, task_type)}
+        self._owners = {}  # allocation_id -> user_id
+        self._jobs = {}  # job_id -> {allocation_id}
+        self._flat = None
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._owners)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from ``(allocation_id, user_id, job_id, task_type, start, end)`` rows."""
+        index = cls()
+        for row in rows:
+            index.add(*row)
+        return index
+
+    @classmethod
+    def load(cls, user_ids=None, using='default'):
+        """Open allocations ending in the future, optionally for ``user_ids`` only."""
+        return cls.from_rows(_open_allocation_rows(user_ids, using))
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def add(self, allocation_id, user_id, job_id, task_type, start, end):
+        self.remove(allocation_id)
+        if user_id is None or start is None or end is None:
+            return
+        start = _seconds(start)
+        end = max(_seconds(end), start)
+        self._users.setdefault(user_id, {})[allocation_id] = (start, end, job_id, task_type)
+        self._owners[allocation_id] = user_id
+        self._jobs.setdefault(job_id, set()).add(allocation_id)
+        self._flat = None
+
+    def remove(self, allocation_id):
+        user_id = self._owners.pop(allocation_id, None)
+        if user_id is None:
+            return
+        intervals = self._users[user_id]
+        job_id = intervals.pop(allocation_id)[2]
+        if not intervals:
+            del self._users[user_id]
+        job_allocations = self._jobs[job_id]
+        job_allocations.discard(allocation_id)
+        if not job_allocations:
+            del self._jobs[job_id]
+        self._flat = None
+
+    def remove_job(self, job_id):
+        for allocation_id in list(self._jobs.get(job_id, ())):
+            self.remove(allocation_id)
+
+    def replace_users(self, user_ids, rows):
+        """Swap the intervals of ``user_ids`` for freshly loaded ``rows``."""
+        for user_id in user_ids:
+            for allocation_id in list(self._users.get(user_id, ())):
+                self.remove(allocation_id)
+        for row in rows:
+            self.add(*row)
+
+    def refresh_users(self, user_ids, using='default'):
+        """Reload the given users from the database (one query)."""
+        user_ids = list(user_ids)
+        self.replace_users(user_ids, _open_allocation_rows(user_ids, using))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _arrays(self):
+        if self._flat is not None:
+            return self._flat
+        user_ids = sorted(self._users)
+        offsets = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        starts, ends, allocation_ids = [], [], []
+        for position, user_id in enumerate(user_ids):
+            intervals = sorted(self._users[user_id].items(), key=lambda item: item[1][0])
+            base = position * SPAN
+            starts.extend(base + interval[0] for _, interval in intervals)
+            ends.extend(sorted(base + interval[1] for _, interval in intervals))
+            allocation_ids.extend(allocation_id for allocation_id, _ in intervals)
+            offsets[position + 1] = offsets[position] + len(intervals)
+        self._flat = {
+            'positions': {user_id: position for position, user_id in enumerate(user_ids)},
+            'offsets': offsets,
+            'starts': np.asarray(starts, dtype=np.int64),
+            'ends': np.asarray(ends, dtype=np.int64),
+            'allocation_ids': allocation_ids,
+        }
+        return self._flat
+
+    def _segments(self, user_ids):
+        flat = self._arrays()
+        positions = np.asarray([flat['positions'].get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+        return flat, positions
+
+    def overlap_counts(self, user_ids, start, end, exclude_job=None):
+        """
+        Number of each user's intervals overlapping ``[start, end)``, as an
+        array aligned with ``user_ids``. Intervals of ``exclude_job`` (the job
+        being allocated) are not counted.
+        """
+        user_ids = list(user_ids)
+        flat, positions = self._segments(user_ids)
+        counts = np.zeros(len(positions), dtype=np.int64)
+        known = positions >= 0
+        if not known.any():
+            return counts
+        lower, upper = _seconds(start), _seconds(end)
+        base = positions[known] * SPAN
+        started = np.searchsorted(flat['starts'], base + upper, side='left')
+        finished = np.searchsorted(flat['ends'], base + lower, side='right')
+        # Both searches land inside the user's segment, so the segment
+        # offset cancels out.
+        counts[known] = started - finished
+
+        rows = {user_id: row for row, user_id in enumerate(user_ids)}
+        for allocation_id in self._jobs.get(exclude_job, ()):
+            user_id = self._owners[allocation_id]
+            interval_start, interval_end = self._users[user_id][allocation_id][:2]
+            if user_id in rows and interval_start < upper and interval_end > lower:
+                counts[rows[user_id]] -= 1
+        return np.maximum(counts, 0)
+
+    def overlapping(self, user_id, start, end, exclude_job=None):
+        """The user's intervals overlapping ``[start, end)``, ordered by start."""
+        flat = self._arrays()
+        position = flat['positions'].get(user_id)
+        if position is None:
+            return []
+        base = position * SPAN
+        stop = int(np.searchsorted(flat['starts'], base + _seconds(end), side='left'))
+        lower = _seconds(start)
+        intervals = self._users[user_id]
+        found = []
+        for allocation_id in flat['allocation_ids'][flat['offsets'][position]:stop]:
+            interval_start, interval_end, job_id, task_type = intervals[allocation_id]
+            if interval_end > lower and job_id != exclude_job:
+                found.append(Interval(
+                    allocation_id, job_id, task_type, _datetime(interval_start), _datetime(interval_end),
+                ))
+        return found
+
+    def free_windows(self, user_ids, start, end, min_length=None, exclude_job=None):
+        """
+        ``{user_id: [(window_start, window_end), ...]}``: the gaps in
+        ``[start, end)`` not covered by any of the user's intervals (other
+        than those of ``exclude_job``), keeping those at least ``min_length``
+        long.
+        """
+        lower, upper = _seconds(start), _seconds(end)
+        shortest = int(min_length.total_seconds()) if min_length else 1
+        flat = self._arrays()
+        windows = {}
+        for user_id in user_ids:
+            busy = []
+            position = flat['positions'].get(user_id)
+            if position is not None:
+                stop = int(np.searchsorted(flat['starts'], position * SPAN + upper, side='left'))
+                intervals = self._users[user_id]
+                busy = [
+                    intervals[allocation_id][:2]
+                    for allocation_id in flat['allocation_ids'][flat['offsets'][position]:stop]
+                    if intervals[allocation_id][2] != exclude_job
+                ]
+            gaps, cursor = [], lower
+            for interval_start, interval_end in busy:
+                if interval_start - cursor >= shortest:
+                    gaps.append((_datetime(cursor), _datetime(interval_start)))
+                cursor = max(cursor, interval_end)
+            if upper - cursor >= shortest:
+                gaps.append((_datetime(cursor), _datetime(upper)))
+            windows[user_id] = gaps
+        return windows
+
+
+def _open_allocation_rows(user_ids=None, using='default'):
+    TaskAllocation = apps.get_model('allocator', 'TaskAllocation')
+    Job = apps.get_model('allocator', 'Job')
+
+    allocations = TaskAllocation.objects.using(using).filter(
+        allocated_to__isnull=False, end_date_time__gt=timezone.now(),
+    ).exclude(status='completed')
+    if user_ids is not None:
+        allocations = allocations.filter(allocated_to_id__in=list(user_ids))
+    rows = list(allocations.values_list(
+        'id', 'allocated_to_id', 'job_id', 'task_type', 'start_date_time', 'end_date_time',
+    ))
+    closed = set(Job.objects.using(using).filter(
+        id__in={row[2] for row in rows}, status__in=CLOSED_JOB_STATUSES,
+    ).values_list('id', flat=True))
+    return [row for row in rows if row[2] not in closed]
+
+
+# ----------------------------------------------------------------------
+# Process-wide index
+# ----------------------------------------------------------------------
+_lock = threading.Lock()
+_shared = {'index': None}
+
+
+def allocation_index(using='default'):
+    """The shared index, loaded on first use and reloaded every ``INDEX_MAX_AGE`` seconds."""
+    with _lock:
+        index = _shared['index']
+        if index is None or time.monotonic() - index.built_at > INDEX_MAX_AGE:
+            index = _shared['index'] = AllocationIntervalIndex.load(using=using)
+        return index
+
+
+def discard_allocation_index():
+    """Drop the shared index, e.g. after bulk writes that skip signals."""
+    with _lock:
+        _shared['index'] = None
+
+
+def _update_shared(update):
+    with _lock:
+        index = _shared['index']
+        if index is not None:
+            try:
+                update(index)
+            except Exception as exc:
+                logger.warning(f"Allocation index update failed, discarding it: {exc}")
+                _shared['index'] = None
+
+
+def _allocation_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.status == 'completed':
+        _update_shared(lambda index: index.remove(instance.pk))
+    else:
+        _update_shared(lambda index: index.add(
+            instance.pk, instance.allocated_to_id, instance.job_id, instance.task_type,
+            instance.start_date_time, instance.end_date_time,
+        ))
+
+
+def _allocation_deleted(sender, instance, **kwargs):
+    _update_shared(lambda index: index.remove(instance.pk))
+
+
+def _job_saved(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status in CLOSED_JOB_STATUSES:
+        _update_shared(lambda index: index.remove_job(instance.pk))
+
+
+def connect_allocation_index():
+    """Wire the signal handlers; called from AllocatorConfig.ready()."""
+    uid = 'allocation_index'
+    allocation_model = apps.get_model('allocator', 'TaskAllocation')
+    post_save.connect(_allocation_saved, sender=allocation_model, dispatch_uid=uid)
+    post_delete.connect(_allocation_deleted, sender=allocation_model, dispatch_uid=uid)
+    post_save.connect(_job_saved, sender=apps.get_model('allocator', 'Job'), dispatch_uid=uid)
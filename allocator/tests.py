@@ -1,3 +1,743 @@
-from django.test import TestCase
+import itertools
+import random
+import threading
+from datetime import date, datetime, timedelta
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.apps import apps
+from django.db import connection, connections
+from django.db.models.query import QuerySet
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from allocator.models import AllocationPlan, Job, ProcessTeamProfile, TaskAllocation, WriterProfile
+from allocator.services import (
+    AllocationIntervalIndex,
+    AvailabilityMatrix,
+    ClaimLost,
+    JobClaimed,
+    adjust_process_load,
+    adjust_writer_load,
+    claim_job,
+    consume_claim,
+    rank_board,
+)
+from allocator.services.auto_allocation import (
+    PlanNotApplicable,
+    _writer_assignment,
+    apply_allocation_plan,
+    solve_assignment,
+)
+from allocator.services.availability import _documents
+from allocator.services.dashboard import DASHBOARD_STATS_CACHE_KEY, compute_dashboard_stats, get_dashboard_stats
+from allocator.services.job_claims import _explain_failure
+from allocator.services.leaderboard import _board_document, metric_ranks, percentiles
+from allocator.services.profile_load import _clamped_pipeline
+from allocator.services.reconciliation import compute_open_loads, reconcile_profile_loads
+from allocator.services.recommendation import PROFILE_COLUMNS, WriterMatrix, rank_writers, score_writers
+from allocator.views import _claim_error, _leaderboard_entries
+from common.caching import invalidate
+from common.tests import fake_timeline_db
+from common.timeline import SCOPE_ALLOCATOR, delete_timeline, get_timeline
+
+THREADS = 8
+ROUNDS = 25
+
+
+def hammer(worker, threads=THREADS):
+    """Run ``worker(index)`` on several threads at once and re-raise the first failure."""
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def run(index):
+        try:
+            barrier.wait()
+            worker(index)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    pool = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+class AllocatorConfigTests(SimpleTestCase):
+    def test_ready_wires_capacity_handlers(self):
+        # INSTALLED_APPS lists plain 'allocator'; default_app_config picks the config.
+        self.assertEqual(type(apps.get_app_config('allocator')).__name__, 'AllocatorConfig')
+        self.assertTrue(post_save.has_listeners(WriterProfile))
+        uids = [key[0] for key, _ in post_save.receivers]
+        self.assertIn('writer_capacity', uids)
+
+
+class ClampedPipelineTests(SimpleTestCase):
+    def test_counters_are_clamped_at_zero(self):
+        pipeline = _clamped_pipeline({'current_jobs': -1})
+        self.assertEqual(pipeline, [{'$set': {
+            'current_jobs': {'$max': [0, {'$add': [{'$ifNull': ['$current_jobs', 0]}, -1]}]},
+        }}])
+
+
+class AllocationIntervalIndexTests(SimpleTestCase):
+    origin = datetime(2026, 1, 5, 9, tzinfo=timezone.utc)
+
+    def _at(self, hours):
+        return self.origin + timedelta(hours=hours)
+
+    def test_overlap_counts_match_a_linear_scan(self):
+        rng = random.Random(7)
+        rows = []
+        for allocation_id in range(400):
+            start = rng.randrange(0, 200)
+            rows.append((allocation_id, rng.randrange(1, 30), allocation_id // 3, 'content_creation',
+                         self._at(start), self._at(start + rng.randrange(0, 24))))
+        index = AllocationIntervalIndex.from_rows(rows)
+        users = list(range(0, 32))
+        for _ in range(50):
+            lower = rng.randrange(0, 220)
+            upper = lower + rng.randrange(1, 30)
+            expected = [
+                sum(1 for row in rows if row[1] == user and row[4] < self._at(upper) and row[5] > self._at(lower))
+                for user in users
+            ]
+            counts = index.overlap_counts(users, self._at(lower), self._at(upper))
+            self.assertEqual(counts.tolist(), expected)
+
+    def test_updates_and_excluded_job(self):
+        index = AllocationIntervalIndex()
+        index.add(1, 10, 100, 'content_creation', self._at(0), self._at(4))
+        index.add(2, 10, 101, 'content_creation', self._at(6), self._at(8))
+        self.assertEqual(index.overlap_counts([10], self._at(3), self._at(7)).tolist(), [2])
+        self.assertEqual(index.overlap_counts([10], self._at(3), self._at(7), exclude_job=100).tolist(), [1])
+        self.assertEqual([i.job_id for i in index.overlapping(10, self._at(3), self._at(7))], [100, 101])
+
+        index.add(2, 10, 101, 'content_creation', self._at(9), self._at(10))
+        self.assertEqual(index.overlap_counts([10], self._at(4), self._at(9)).tolist(), [0])
+        index.remove_job(100)
+        self.assertEqual(len(index), 1)
+
+    def test_free_windows(self):
+        index = AllocationIntervalIndex.from_rows([
+            (1, 10, 100, 'content_creation', self._at(1), self._at(3)),
+            (2, 10, 101, 'content_creation', self._at(2), self._at(5)),
+            (3, 10, 102, 'content_creation', self._at(5), self._at(5.5)),
+        ])
+        windows = index.free_windows([10, 11], self._at(0), self._at(8), min_length=timedelta(hours=1))
+        self.assertEqual(windows[10], [(self._at(0), self._at(1)), (self._at(5.5), self._at(8))])
+        self.assertEqual(windows[11], [(self._at(0), self._at(8))])
+
+
+class AvailabilityMatrixTests(SimpleTestCase):
+    def test_packed_rows_round_trip_and_capacity_query(self):
+        profiles = [
+            {'user_id': 1, 'is_it_writer': False, 'is_nonit_writer': False, 'is_finance_writer': True},
+            {'user_id': 2, 'is_it_writer': False, 'is_nonit_writer': True, 'is_finance_writer': True},
+            {'user_id': 3, 'is_it_writer': True, 'is_nonit_writer': False, 'is_finance_writer': False},
+        ]
+        available = np.ones((3, 10), dtype=bool)
+        available[1, 3] = False
+        free_words = np.full((3, 10), 5000, dtype=np.int32)
+        free_words[0, 2] = 1500
+        free_words[2] = 9000
+        first_day = date(2026, 1, 5)
+        documents = list(_documents(profiles, available, free_words, first_day, None))
+        matrix = AvailabilityMatrix.from_documents(first_day, 10, documents)
+
+        np.testing.assert_array_equal(matrix.available, available)
+        np.testing.assert_array_equal(matrix.free_words, free_words)
+        self.assertEqual(matrix.writers_with_capacity('Finance', 2000, days=2, working_days_only=False), [1, 2])
+        self.assertEqual(matrix.writers_with_capacity('Finance', 2000, days=5, working_days_only=False), [])
+        self.assertEqual(matrix.writers_with_capacity(None, 1000, days=3, working_days_only=False), [3, 2, 1])
+        self.assertEqual(matrix.row(2)[3], (date(2026, 1, 8), False, 5000))
+
+
+class LeaderboardRankingTests(SimpleTestCase):
+    def test_percentiles_share_ties(self):
+        self.assertEqual(percentiles(np.array([3.0, 1.0, 3.0, 2.0])).tolist(), [5 / 6, 0.0, 5 / 6, 1 / 3])
+
+    def test_metric_ranks(self):
+        values = np.array([0.5, 0.9, 0.5, 0.1])
+        self.assertEqual(metric_ranks(values).tolist(), [2, 1, 2, 4])
+        self.assertEqual(metric_ranks(values, lower_is_better=True).tolist(), [2, 4, 2, 1])
+
+    def test_low_churn_breaks_otherwise_equal_writers(self):
+        metrics = {
+            'on_time_rate': np.array([0.9, 0.9, 0.5]),
+            'words': np.array([10000.0, 10000.0, 2000.0]),
+            'rating': np.array([4.0, 4.0, 3.0]),
+            'churn': np.array([0.3, 0.0, 0.0]),
+        }
+        order, scores, ranks = rank_board(metrics)
+        self.assertEqual(order.tolist(), [1, 0, 2])
+        self.assertTrue(0 <= scores.min() and scores.max() <= 1)
+        self.assertEqual(ranks['churn'].tolist(), [3, 1, 1])
+
+    def test_metric_sorts_keep_their_own_top_writers(self):
+        metrics = {
+            'on_time_rate': np.array([0.9, 0.8, 0.7, 0.1]),
+            'words': np.array([10.0, 20.0, 30.0, 90000.0]),
+            'rating': np.array([5.0, 4.5, 4.0, 1.0]),
+            'churn': np.array([0.0, 0.1, 0.2, 0.9]),
+        }
+        raw = {'on_time_rate': metrics['on_time_rate'], 'completed': np.array([10, 10, 10, 10])}
+        with mock.patch('allocator.services.leaderboard.LEADERBOARD_SIZE', 2):
+            document = _board_document('overall', np.array([1, 2, 3, 4]), list('abcd'), metrics, raw, None)
+
+        self.assertEqual(document['tops']['score'], [1, 2])
+        self.assertEqual(document['tops']['words'], [4, 3])
+        by_words = _leaderboard_entries(document, 'words')
+        self.assertEqual([(entry['user_id'], entry['position'], entry['rank']) for entry in by_words],
+                         [(4, 1, 4), (3, 2, 3)])
+        self.assertEqual([entry['position'] for entry in _leaderboard_entries(document, 'score')], [1, 2])
+
+
+@skipUnless(connection.vendor == 'djongo', 'profile load updates run as MongoDB update pipelines')
+class ProfileLoadConcurrencyTests(TransactionTestCase):
+    def _writer(self, name, **profile):
+        user = CustomUser.objects.create_user(username=name, email=f'{name}@example.com', password='x', role='writer')
+        WriterProfile.objects.create(user=user, max_jobs=1000, max_words=10 ** 7, **profile)
+        return user
+
+    def test_concurrent_allocations_lose_no_updates(self):
+        writer = self._writer('writer-a')
+
+        def allocate(_):
+            for _ in range(ROUNDS):
+                adjust_writer_load(writer.id, jobs=1, words=100, assigned=1)
+
+        hammer(allocate)
+        profile = WriterProfile.objects.get(user=writer)
+        self.assertEqual(profile.current_jobs, THREADS * ROUNDS)
+        self.assertEqual(profile.current_words, THREADS * ROUNDS * 100)
+        self.assertEqual(profile.total_jobs_assigned, THREADS * ROUNDS)
+
+    def test_concurrent_switches_move_the_whole_load(self):
+        old_writer = self._writer('writer-old', current_jobs=THREADS * ROUNDS, current_words=THREADS * ROUNDS * 50)
+        new_writer = self._writer('writer-new')
+
+        def switch(_):
+            for _ in range(ROUNDS):
+                adjust_writer_load(old_writer.id, jobs=-1, words=-50)
+                adjust_writer_load(new_writer.id, jobs=1, words=50, assigned=1)
+
+        hammer(switch)
+        old_profile = WriterProfile.objects.get(user=old_writer)
+        new_profile = WriterProfile.objects.get(user=new_writer)
+        self.assertEqual((old_profile.current_jobs, old_profile.current_words), (0, 0))
+        self.assertEqual(new_profile.current_jobs, THREADS * ROUNDS)
+        self.assertEqual(new_profile.current_words, THREADS * ROUNDS * 50)
+
+    def test_concurrent_releases_never_go_negative(self):
+        writer = self._writer('writer-busy', current_jobs=5, current_words=500)
+
+        def cancel(_):
+            for _ in range(ROUNDS):
+                adjust_writer_load(writer.id, jobs=-1, words=-100)
+
+        hammer(cancel)
+        profile = WriterProfile.objects.get(user=writer)
+        self.assertEqual((profile.current_jobs, profile.current_words), (0, 0))
+
+    def test_concurrent_process_assignments(self):
+        member = CustomUser.objects.create_user(
+            username='process-a', email='process-a@example.com', password='x', role='process',
+        )
+        ProcessTeamProfile.objects.create(user=member, max_jobs=1000)
+
+        def assign_and_complete(index):
+            for _ in range(ROUNDS):
+                adjust_process_load(member.id, jobs=1)
+                if index % 2:
+                    adjust_process_load(member.id, jobs=-1, completed=1)
+
+        hammer(assign_and_complete)
+        profile = ProcessTeamProfile.objects.get(user=member)
+        completed = (THREADS // 2) * ROUNDS
+        self.assertEqual(profile.current_jobs, THREADS * ROUNDS - completed)
+        self.assertEqual(profile.total_jobs_completed, completed)
+
+    def test_missing_profile_is_reported(self):
+        self.assertIsNone(adjust_writer_load(10 ** 9, jobs=1))
+
+
+class SolveAssignmentTests(SimpleTestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        for _ in range(200):
+            rows = int(rng.integers(1, 5))
+            cost = rng.integers(-20, 20, size=(rows, int(rng.integers(rows, 7)))).astype(float)
+            assignment = solve_assignment(cost).tolist()
+            self.assertEqual(len(set(assignment)), rows)
+            best = min(
+                sum(cost[row, column] for row, column in enumerate(columns))
+                for columns in itertools.permutations(range(cost.shape[1]), rows)
+            )
+            self.assertEqual(sum(cost[row, column] for row, column in enumerate(assignment)), best)
+
+    def test_needs_a_column_per_row(self):
+        with self.assertRaises(ValueError):
+            solve_assignment(np.zeros((3, 2)))
+
+
+def writer_row(user_id, **values):
+    row = {column: 0 for column in PROFILE_COLUMNS}
+    row.update(user_id=user_id, is_nonit_writer=True, is_available=True, max_jobs=5, max_words=10000)
+    row.update(values)
+    return row
+
+
+class WriterRecommendationTests(SimpleTestCase):
+    def setUp(self):
+        rows = [
+            writer_row(1, rating=4.0),
+            writer_row(2, is_available=False),
+            writer_row(3, is_on_holiday=True, current_jobs=5),
+            writer_row(4, max_jobs=2, current_jobs=2),
+            writer_row(5, current_words=9500),
+            writer_row(6, is_it_writer=False, rating=5.0),
+            writer_row(7, is_it_writer=True, rating=2.0),
+            writer_row(8, is_overloaded=True, rating=4.8),
+            writer_row(9, is_it_writer=True, rating=4.5, total_jobs_assigned=10, total_jobs_completed=9),
+        ]
+        self.profiles = [WriterProfile(**row) for row in rows]
+        self.matrix = WriterMatrix.from_rows(rows)
+        self.deadline = timezone.now() + timedelta(days=2)
+
+    def test_masks_and_reasons_match_can_accept_job(self):
+        for category in ('IT', 'NONIT'):
+            job = SimpleNamespace(job_category=category, word_count=1000, deadline=self.deadline)
+            _, eligible, _, _ = score_writers(self.matrix, category, 1000, self.deadline)
+            reasons = {entry['user_id']: entry['reason'] for entry in rank_writers(job, self.matrix, top_k=None)}
+            for index, profile in enumerate(self.profiles):
+                accepted, reason = profile.can_accept_job(job)
+                self.assertEqual(bool(eligible[index]), accepted, (category, profile.user_id))
+                self.assertEqual(reasons[profile.user_id], None if accepted else reason, (category, profile.user_id))
+
+    def test_top_k_ranks_eligible_writers_first(self):
+        job = SimpleNamespace(job_category='IT', word_count=1000, deadline=self.deadline)
+        everyone = rank_writers(job, self.matrix, top_k=None)
+        self.assertEqual([entry['user_id'] for entry in everyone[:2]], [9, 7])
+        self.assertTrue(all(entry['eligible'] for entry in everyone[:2]))
+        self.assertFalse(any(entry['eligible'] for entry in everyone[2:]))
+        scores = [entry['score'] for entry in everyone[2:]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        top = rank_writers(job, self.matrix, top_k=3)
+        self.assertEqual(top, everyone[:3])
+        self.assertEqual(rank_writers(job, self.matrix, top_k=0), [])
+
+
+class WriterAssignmentTests(SimpleTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        deadline = self.now + timedelta(days=5)
+        self.jobs = [
+            {'id': 1, 'job_category': 'NONIT', 'word_count': 1000, 'deadline': deadline},
+            {'id': 2, 'job_category': 'NONIT', 'word_count': 1000, 'deadline': deadline},
+        ]
+
+    def test_word_limit_moves_the_lower_value_job(self):
+        # Both jobs prefer the top-rated writer, whose free words only fit one.
+        matrix = WriterMatrix.from_rows([
+            writer_row(1, rating=5.0, max_jobs=2, max_words=1500),
+            writer_row(2, rating=1.0),
+        ])
+        chosen, candidates = _writer_assignment(self.jobs, [3.0, 1.0], matrix, self.now)
+        self.assertEqual(chosen, {0: 0, 1: 1})
+        self.assertEqual(set(candidates[1]), {0, 1})
+
+    def test_job_without_room_anywhere_stays_unassigned(self):
+        matrix = WriterMatrix.from_rows([writer_row(1, rating=5.0, max_jobs=2, max_words=1500)])
+        chosen, _ = _writer_assignment(self.jobs, [3.0, 1.0], matrix, self.now)
+        self.assertEqual(chosen, {0: 0})
+
+
+class ApplyAllocationPlanTests(TestCase):
+    def setUp(self):
+        fake_timeline_db(self)
+        self.module = import_module('allocator.services.auto_allocation')
+        self.loads = {}
+        for name in ('apply_deltas', 'adjust_writer_loads', 'adjust_process_load', 'refresh_writer_availability'):
+            patcher = mock.patch.object(self.module, name)
+            self.loads[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('common.counters.apply_deltas')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.allocator = self._user('allocator')
+        self.other_allocator = self._user('allocator-2', role='allocator')
+        self.writer = self._user('writer')
+        self.busy_writer = self._user('busy-writer', role='writer')
+        self.process = self._user('process')
+        WriterProfile.objects.create(user=self.writer, max_jobs=5, max_words=10000)
+        WriterProfile.objects.create(user=self.busy_writer, max_jobs=5, max_words=10000, is_available=False)
+
+    def _user(self, name, role=None):
+        return CustomUser.objects.create(email=f'{name}@example.com', username=name, role=role or name)
+
+    def _job(self, masking_id, **values):
+        return Job.objects.create(
+            masking_id=masking_id, title='t', topic='t', client_name='c', job_category='NONIT',
+            word_count=1000, max_word_limit=1100, description='d', created_by=self.allocator,
+            deadline=timezone.now() + timedelta(days=3), **values,
+        )
+
+    def _entry(self, job, writer=None):
+        writer = writer or self.writer
+        start, end = timezone.now(), timezone.now() + timedelta(days=1)
+        return {
+            'job_id': job.pk, 'masking_id': job.masking_id, 'word_count': job.word_count,
+            'writer_id': writer.pk, 'process_id': self.process.pk,
+            'tasks': {
+                task_type: {
+                    'user_id': writer.pk if task_type == 'content_creation' else self.process.pk,
+                    'start': start.isoformat(), 'end': end.isoformat(),
+                }
+                for task_type in ('content_creation', 'ai_plag', 'decoration')
+            },
+        }
+
+    def _plan(self, *entries):
+        return AllocationPlan.objects.create(created_by=self.allocator, proposal={'assignments': list(entries)})
+
+    def test_skip_reasons(self):
+        ready = self._job('AP-1')
+        held = self._job('AP-2', status='hold')
+        claimed = self._job('AP-3', claimed_by=self.other_allocator,
+                            claim_expires_at=timezone.now() + timedelta(minutes=5))
+        no_room = self._job('AP-4')
+        plan = self._plan(
+            self._entry(ready), self._entry(held), self._entry(claimed), self._entry(no_room, self.busy_writer),
+        )
+
+        summary = apply_allocation_plan(plan, self.allocator)
+        self.assertEqual(summary['applied'], [ready.pk])
+        self.assertEqual({item['masking_id']: item['reason'] for item in summary['skipped']}, {
+            'AP-2': 'Job is no longer pending',
+            'AP-3': 'Job is being allocated by another allocator',
+            'AP-4': 'Writer no longer has capacity',
+        })
+        self.assertEqual(TaskAllocation.objects.filter(job=ready).count(), 3)
+        self.assertEqual(Job.objects.get(pk=ready.pk).status, 'allocated')
+        self.loads['adjust_writer_loads'].assert_called_once_with(
+            {self.writer.pk: {'jobs': 1, 'words': 1000, 'assigned': 1}}, using='default',
+        )
+        with self.assertRaises(PlanNotApplicable):
+            apply_allocation_plan(plan, self.allocator)
+
+    def test_jobs_taken_during_the_apply_are_not_counted(self):
+        kept, taken = self._job('AP-5'), self._job('AP-6')
+        plan = self._plan(self._entry(kept), self._entry(taken))
+        bulk_create = QuerySet.bulk_create
+
+        def create_then_lose_a_job(queryset, objs, *args, **kwargs):
+            # Another allocator puts the job on hold once the checks have passed.
+            Job.objects.filter(pk=taken.pk).update(status='hold')
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', autospec=True, side_effect=create_then_lose_a_job):
+            summary = apply_allocation_plan(plan, self.allocator)
+
+        self.assertEqual(summary['applied'], [kept.pk])
+        self.assertEqual(summary['skipped'], [
+            {'job_id': taken.pk, 'masking_id': 'AP-6', 'reason': 'Job is no longer pending'},
+        ])
+        self.assertFalse(TaskAllocation.objects.filter(job=taken).exists())
+        self.loads['adjust_writer_loads'].assert_called_once_with(
+            {self.writer.pk: {'jobs': 1, 'words': 1000, 'assigned': 1}}, using='default',
+        )
+        self.loads['adjust_process_load'].assert_called_once_with(self.process.pk, jobs=1, using='default')
+
+
+class ReconcileProfileLoadsTests(TestCase):
+    """The aggregation needs MongoDB; it is stubbed and the writes replayed through the ORM."""
+
+    def setUp(self):
+        self.module = import_module('allocator.services.reconciliation')
+        self.concurrent = None
+        collection = mock.Mock()
+        collection.bulk_write.side_effect = self._bulk_write
+        self.collection = collection
+        for name, value in (('get_collection', collection), ('rebuild_writer_capacity', None)):
+            patcher = mock.patch.object(self.module, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.writers = [self._user(f'writer-{n}', 'writer') for n in range(3)]
+        self.member = self._user('process-0', 'process')
+        WriterProfile.objects.create(user=self.writers[0], current_jobs=2, current_words=3000)
+        WriterProfile.objects.create(user=self.writers[1], current_jobs=5, current_words=9000)
+        WriterProfile.objects.create(user=self.writers[2], current_jobs=1, current_words=500)
+        ProcessTeamProfile.objects.create(user=self.member, current_jobs=0)
+
+    def _user(self, name, role):
+        return CustomUser.objects.create(email=f'{name}@example.com', username=name, role=role)
+
+    def _bulk_write(self, operations, ordered=True):
+        if self.concurrent:
+            self.concurrent()
+        model = WriterProfile if 'current_words' in operations[0]._doc['$set'] else ProcessTeamProfile
+        for operation in operations:
+            model.objects.filter(**operation._filter).update(**operation._doc['$set'])
+
+    def _reconcile(self, **kwargs):
+        loads = (
+            {self.writers[0].pk: (2, 3000), self.writers[1].pk: (1, 1500)},
+            {self.member.pk: 2},
+        )
+        with mock.patch.object(self.module, 'compute_open_loads', return_value=loads):
+            return {(drift.role, drift.user_id): drift for drift in reconcile_profile_loads(**kwargs)}
+
+    def test_drifted_profiles_are_corrected(self):
+        drifts = self._reconcile()
+        self.assertEqual(set(drifts), {
+            ('writer', self.writers[1].pk), ('writer', self.writers[2].pk), ('process', self.member.pk),
+        })
+        self.assertEqual(drifts['writer', self.writers[1].pk].stored, (5, 9000))
+        self.assertEqual(drifts['writer', self.writers[2].pk].actual, (0, 0))
+        self.assertTrue(all(drift.corrected for drift in drifts.values()))
+        self.assertEqual(
+            list(WriterProfile.objects.order_by('user_id').values_list('current_jobs', 'current_words')),
+            [(2, 3000), (1, 1500), (0, 0)],
+        )
+        self.assertEqual(ProcessTeamProfile.objects.get().current_jobs, 2)
+        self.module.rebuild_writer_capacity.assert_called_once_with(using='default')
+
+    def test_profile_changed_meanwhile_is_skipped(self):
+        def allocate():
+            WriterProfile.objects.filter(user=self.writers[1]).update(current_jobs=6, current_words=10000)
+            self.concurrent = None
+
+        self.concurrent = allocate
+        drifts = self._reconcile()
+        self.assertFalse(drifts['writer', self.writers[1].pk].corrected)
+        self.assertTrue(drifts['writer', self.writers[2].pk].corrected)
+        self.assertEqual(WriterProfile.objects.get(user=self.writers[1]).current_jobs, 6)
+
+    def test_dry_run_only_reports(self):
+        drifts = self._reconcile(dry_run=True)
+        self.assertEqual(len(drifts), 3)
+        self.assertFalse(any(drift.corrected for drift in drifts.values()))
+        self.collection.bulk_write.assert_not_called()
+        self.assertEqual(WriterProfile.objects.get(user=self.writers[1]).current_jobs, 5)
+
+    def test_open_loads_are_split_by_task_type(self):
+        self.collection.aggregate.return_value = [
+            {'_id': {'user_id': 4, 'task_type': 'content_creation'}, 'jobs': 2, 'words': 2500},
+            {'_id': {'user_id': 9, 'task_type': 'ai_plag'}, 'jobs': 3, 'words': 7000},
+        ]
+        self.assertEqual(compute_open_loads(), ({4: (2, 2500)}, {9: 3}))
+
+
+@skipUnless(connection.vendor == 'djongo', 'open loads are computed with a MongoDB aggregation')
+class OpenLoadsAggregationTests(TransactionTestCase):
+    def test_only_open_allocations_on_open_jobs_count(self):
+        marketer = CustomUser.objects.create_user(username='m', email='m@example.com', password='x', role='marketing')
+        writer = CustomUser.objects.create_user(username='w', email='w@example.com', password='x', role='writer')
+        member = CustomUser.objects.create_user(username='p', email='p@example.com', password='x', role='process')
+        now = timezone.now()
+
+        def job(masking_id, status, words):
+            return Job.objects.create(
+                masking_id=masking_id, title='t', topic='t', client_name='c', job_category='NONIT',
+                word_count=words, max_word_limit=words, description='d', created_by=marketer,
+                deadline=now + timedelta(days=3), status=status,
+            )
+
+        def allocate(target, task_type, user, status='pending'):
+            TaskAllocation.objects.create(
+                job=target, task_type=task_type, allocated_to=user, status=status,
+                start_date_time=now, end_date_time=now + timedelta(days=1),
+            )
+
+        for target in (job('L-1', 'allocated', 1000), job('L-2', 'decoration', 2000), job('L-3', 'completed', 4000)):
+            allocate(target, 'content_creation', writer)
+            allocate(target, 'ai_plag', member)
+        allocate(job('L-4', 'allocated', 8000), 'content_creation', writer, status='completed')
+
+        self.assertEqual(compute_open_loads(), ({writer.pk: (1, 1000)}, {member.pk: 2}))
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'allocator-tests-dashboard',
+}})
+class DashboardStatsTests(SimpleTestCase):
+    """The aggregation needs MongoDB; its result document is stubbed."""
+
+    def setUp(self):
+        from django.core.cache import caches
+
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        patcher = mock.patch('allocator.services.dashboard.get_collection')
+        self.collection = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_result_document_maps_to_template_stats(self):
+        self.collection.aggregate.return_value = [{
+            'jobs': [{'_id': None, 'total_jobs': 9, 'new_jobs': 2, 'pending_allocation': 3, 'in_progress': 4,
+                      'cancelled': 0, 'hold': 1, 'completed': 1}],
+            'allocations': [{'_id': 'content_creation', 'n': 5}, {'_id': 'ai_plag', 'n': 2}],
+            'team': [{'_id': 'writer', 'n': 12}],
+        }]
+        self.assertEqual(compute_dashboard_stats(), {
+            'total_jobs': 9, 'new_jobs': 2, 'pending_allocation': 3, 'in_progress': 4, 'cancelled': 0,
+            'hold': 1, 'completed': 1, 'assigned_jobs': 7, 'process_jobs': 2,
+            'total_writers': 12, 'total_process_team': 0,
+        })
+
+    def test_empty_collections_give_zeros(self):
+        self.collection.aggregate.return_value = [{'jobs': [], 'allocations': [], 'team': []}]
+        self.assertEqual(set(compute_dashboard_stats().values()), {0})
+
+    def test_stats_are_cached_until_invalidated(self):
+        self.collection.aggregate.return_value = []
+        get_dashboard_stats()
+        get_dashboard_stats()
+        self.assertEqual(self.collection.aggregate.call_count, 1)
+        invalidate(DASHBOARD_STATS_CACHE_KEY)
+        get_dashboard_stats()
+        self.assertEqual(self.collection.aggregate.call_count, 2)
+
+
+@skipUnless(connection.vendor == 'djongo', 'dashboard stats are computed with a MongoDB aggregation')
+class DashboardStatsAggregationTests(TransactionTestCase):
+    def test_counts_match_the_rows(self):
+        marketer = CustomUser.objects.create_user(username='m', email='m@example.com', password='x', role='marketing')
+        writer = CustomUser.objects.create_user(username='w', email='w@example.com', password='x', role='writer')
+        CustomUser.objects.create_user(username='x', email='x@example.com', password='x', role='writer', is_active=False)
+        now = timezone.now()
+        jobs = []
+        for number, status in enumerate(['pending', 'pending', 'in_progress', 'completed']):
+            jobs.append(Job.objects.create(
+                masking_id=f'D-{number}', title='t', topic='t', client_name='c', job_category='NONIT',
+                word_count=1000, max_word_limit=1100, description='d', created_by=marketer,
+                deadline=now + timedelta(days=3), status=status,
+            ))
+        for task_type, status in (('content_creation', 'in_progress'), ('ai_plag', 'in_progress'),
+                                  ('ai_plag', 'completed')):
+            TaskAllocation.objects.create(
+                job=jobs[2], task_type=task_type, allocated_to=writer, status=status,
+                start_date_time=now, end_date_time=now + timedelta(days=1),
+            )
+
+        stats = compute_dashboard_stats()
+        self.assertEqual(
+            (stats['total_jobs'], stats['new_jobs'], stats['pending_allocation'], stats['in_progress']),
+            (4, 4, 2, 1),
+        )
+        self.assertEqual((stats['assigned_jobs'], stats['process_jobs']), (2, 1))
+        self.assertEqual((stats['total_writers'], stats['total_process_team']), (1, 0))
+
+
+class ClaimMessageTests(SimpleTestCase):
+    def test_claimed_message_shows_the_local_expiry(self):
+        expires_at = datetime(2026, 3, 2, 9, 45)
+        collection = mock.Mock()
+        collection.find_one.return_value = {'_id': 1, 'status': 'pending', 'claimed_by': 5, 'expires_at': expires_at}
+        columns = {'id': '_id', 'status': 'status', 'claimed_by': 'claimed_by', 'expires_at': 'expires_at'}
+        exc = _explain_failure(collection, columns, 1)
+        self.assertIsInstance(exc, JobClaimed)
+        self.assertEqual(exc.expires_at, timezone.make_aware(expires_at, timezone.utc))
+
+        with mock.patch.object(JobClaimed, 'holder_name', return_value='Ana P'):
+            message = _claim_error(SimpleNamespace(masking_id='CLAIM-1'), exc)
+        until = timezone.localtime(exc.expires_at).strftime('%H:%M')
+        self.assertEqual(message, f'Job CLAIM-1 is already being allocated by Ana P (until {until}).')
+
+
+@skipUnless(connection.vendor == 'djongo', 'job claims run as MongoDB findAndModify calls')
+class JobClaimConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.allocators = [
+            CustomUser.objects.create_user(
+                username=f'allocator-{index}', email=f'allocator-{index}@example.com', password='x', role='allocator',
+            )
+            for index in range(THREADS)
+        ]
+        marketer = CustomUser.objects.create_user(
+            username='marketer', email='marketer@example.com', password='x', role='marketing',
+        )
+        self.job = Job.objects.create(
+            masking_id='CLAIM-1', title='t', topic='t', client_name='c', job_category='NONIT',
+            word_count=1000, max_word_limit=1100, description='d', created_by=marketer,
+            deadline=timezone.now() + timedelta(days=3),
+        )
+
+    def test_only_one_allocator_claims(self):
+        tokens = {}
+
+        def claim(index):
+            try:
+                tokens[index] = claim_job(self.job.id, self.allocators[index])
+            except JobClaimed:
+                pass
+
+        hammer(claim)
+        self.assertEqual(len(tokens), 1)
+        winner = next(iter(tokens))
+        self.assertEqual(Job.objects.get(pk=self.job.pk).claimed_by_id, self.allocators[winner].id)
+
+    def test_token_is_consumed_once(self):
+        allocator = self.allocators[0]
+        token = claim_job(self.job.id, allocator)
+        consumed = []
+
+        def submit(_):
+            try:
+                consume_claim(self.job.id, allocator, token)
+                consumed.append(True)
+            except ClaimLost:
+                pass
+
+        hammer(submit)
+        self.assertEqual(len(consumed), 1)
+
+    def test_expired_claim_can_be_taken_over(self):
+        first, second = self.allocators[:2]
+        stale = claim_job(self.job.id, first, lease=timedelta(seconds=-1))
+        claim_job(self.job.id, second)
+        with self.assertRaises(JobClaimed):
+            consume_claim(self.job.id, first, stale)
+
+
+class JobTimelineEndpointTests(TestCase):
+    def setUp(self):
+        fake_timeline_db(self)
+        marketer = CustomUser.objects.create(
+            email='marketer@example.com', username='marketer', first_name='Mia', last_name='K', role='marketing',
+        )
+        allocator = CustomUser.objects.create(
+            email='allocator@example.com', username='allocator', role='allocator', is_approved=True,
+        )
+        self.job = Job.objects.create(
+            masking_id='TL-1', title='t', topic='t', client_name='c', job_category='NONIT',
+            word_count=1000, max_word_limit=1100, description='d', created_by=marketer,
+            deadline=timezone.now() + timedelta(days=3),
+        )
+        self.client.force_login(allocator)
+
+    def test_missing_timeline_is_seeded_from_the_job(self):
+        delete_timeline(SCOPE_ALLOCATOR, self.job.pk)
+        payload = self.client.get(reverse('allocator_job_timeline', args=[self.job.pk])).json()
+        self.assertEqual([event['title'] for event in payload['events']], ['Job Created'])
+        self.assertEqual(payload['events'][0]['description'], 'Masking ID: TL-1')
+        self.assertEqual(payload['events'][0]['actor'], 'Mia K')
+        self.assertTrue(get_timeline(SCOPE_ALLOCATOR, self.job.pk)['seeded'])
+
+    def test_unknown_job_is_not_found(self):
+        response = self.client.get(reverse('allocator_job_timeline', args=[self.job.pk + 1]))
+        self.assertEqual(response.status_code, 404)
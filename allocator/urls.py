@@ -7,7 +7,11 @@ urlpatterns = [
     
     # Job Allocation Management
     path('pending/', views.pending_allocation, name='pending_allocation'),
+    path('pending/auto/', views.auto_allocation, name='auto_allocation'),
+    path('pending/auto/<int:plan_id>/apply/', views.apply_auto_allocation, name='apply_auto_allocation'),
     path('allocate/<int:job_id>/', views.allocate_job, name='allocate_job'),
+    path('allocate/<int:job_id>/recommendations/', views.writer_recommendations, name='writer_recommendations'),
+    path('allocate/<int:job_id>/conflicts/', views.allocation_conflicts, name='allocation_conflicts'),
     path('assigned/', views.assigned_jobs, name='assigned_jobs'),
     path('in-progress/', views.in_progress_jobs, name='in_progress_jobs'),
     path('cancel/', views.cancel_jobs, name='cancel_jobs'),
@@ -19,10 +23,15 @@ urlpatterns = [
     
     # Team Management
     path('writers/', views.all_writers, name='all_writers'),
+    path('writers/availability/', views.writer_availability, name='writer_availability'),
+    path('writers/availability/api/', views.writer_availability_api, name='writer_availability_api'),
+    path('writers/leaderboard/', views.writer_leaderboard, name='writer_leaderboard'),
+    path('writers/leaderboard/api/', views.writer_leaderboard_api, name='writer_leaderboard_api'),
     path('process-team/', views.all_process_team, name='all_process_team'),
     
     # Actions
     path('switch-writer/<int:allocation_id>/', views.switch_writer, name='switch_writer'),
     path('job/<int:job_id>/', views.view_job_details, name='view_job_details'),
+    path('job/<int:job_id>/timeline/', views.job_timeline, name='allocator_job_timeline'),
     path('approve-comment/<int:job_id>/', views.approve_comment, name='approve_comment'),
 ]
@@ -4,21 +4,61 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
-from django.db.models import Q, Count, Sum
+from django.db.models import Count, Sum
 from django.core.paginator import Paginator
+from common.business_calendar import working_hours_between
+from common.pagination import COUNT_ESTIMATED, CursorPaginator
+from common.search import order_by_rank, search_ranked_ids
+from common.timeline import (
+    SCOPE_ALLOCATOR,
+    ensure_timeline,
+    get_archived_events,
+    get_timeline,
+    serialize_timeline,
+)
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from accounts.models import CustomUser
+from .services import (
+    AVAILABILITY_DAYS,
+    CLAIM_LEASE,
+    DEFAULT_WEIGHTS,
+    ClaimLost,
+    JobClaimed,
+    JobNotClaimable,
+    LEADERBOARD_BOARDS,
+    LEADERBOARD_METRICS,
+    PlanNotApplicable,
+    WriterMatrix,
+    adjust_process_load,
+    adjust_writer_load,
+    allocation_index,
+    apply_allocation_plan,
+    claim_job,
+    consume_claim,
+    create_allocation_plan,
+    get_availability_matrix,
+    get_dashboard_stats,
+    get_leaderboard,
+    get_writer_capacity,
+    rank_writers,
+    task_windows,
+)
 from .models import (
     Job, TaskAllocation, WriterProfile, ProcessTeamProfile,
-    JobQuery, AllocationHistory, CountryBankingResource
+    JobQuery, AllocationHistory, AllocationPlan, CountryBankingResource
 )
 from marketing.models import Job as MarketingJob
 import logging
+import re
 from datetime import datetime, timedelta
 
 logger = logging.getLogger('allocator')
 
+RECOMMENDED_WRITERS = 3
+FREE_WINDOW_MIN = timedelta(hours=1)
+FREE_WINDOWS_SHOWN = 3
+
 
 def role_required(allowed_roles):
     """Decorator to restrict access based on user role"""
@@ -39,7 +79,6 @@ def allocator_dashboard(request):
 
     user = request.user
     now = timezone.now()
-    week_ago = now - timedelta(days=7)
     tz = timezone.get_current_timezone()
 
     def normalize_datetime(value):
@@ -49,36 +88,7 @@ def allocator_dashboard(request):
             return timezone.make_aware(value, tz)
         return value
 
-    jobs_all = list(Job.objects.only(
-        'id', 'masking_id', 'topic', 'word_count', 'status', 'created_at', 'priority', 'job_category', 'deadline'
-    ))
-    allocations_raw = list(TaskAllocation.objects.values('id', 'job_id', 'task_type', 'status'))
-    jobs_by_id = {job.id: job for job in jobs_all}
-    allocations_by_id = {entry['id']: entry for entry in allocations_raw}
-
-    role_counts = {'writer': 0, 'process': 0}
-    for role, is_active in CustomUser.objects.filter(
-        role__in=role_counts.keys()
-    ).values_list('role', 'is_active'):
-        if is_active:
-            role_counts[role] += 1
-
-    stats = {
-        'total_jobs': len(jobs_all),
-        'pending_allocation': sum(1 for job in jobs_all if job.status == 'pending'),
-        'assigned_jobs': sum(1 for alloc in allocations_raw if alloc['status'] == 'in_progress'),
-        'new_jobs': sum(1 for job in jobs_all if normalize_datetime(job.created_at) >= week_ago),
-        'in_progress': sum(1 for job in jobs_all if job.status == 'in_progress'),
-        'cancelled': sum(1 for job in jobs_all if job.status == 'cancelled'),
-        'hold': sum(1 for job in jobs_all if job.status == 'hold'),
-        'process_jobs': sum(
-            1 for alloc in allocations_raw
-            if alloc['task_type'] == 'ai_plag' and alloc['status'] == 'in_progress'
-        ),
-        'completed': sum(1 for job in jobs_all if job.status == 'completed'),
-        'total_writers': role_counts['writer'],
-        'total_process_team': role_counts['process'],
-    }
+    stats = get_dashboard_stats()
 
     # Recent marketing jobs (24h, status unallocated/pending)
     recent_cutoff = now - timedelta(hours=24)
@@ -125,6 +135,15 @@ def allocator_dashboard(request):
         ).order_by('-timestamp')[:5]
     )
 
+    allocation_jobs = dict(
+        TaskAllocation.objects.filter(
+            id__in={entry['task_allocation_id'] for entry in raw_activities}
+        ).values_list('id', 'job_id')
+    )
+    masking_ids = dict(
+        Job.objects.filter(id__in=set(allocation_jobs.values())).values_list('id', 'masking_id')
+    )
+
     user_ids = {
         entry['changed_by_id']
         for entry in raw_activities
@@ -143,15 +162,14 @@ def allocator_dashboard(request):
     action_labels = dict(AllocationHistory.ACTION_CHOICES)
     recent_activities = []
     for entry in raw_activities:
-        allocation = allocations_by_id.get(entry['task_allocation_id'])
-        job = jobs_by_id.get(allocation['job_id']) if allocation else None
+        job_pk = allocation_jobs.get(entry['task_allocation_id'])
 
         changed_by = users_lookup.get(entry['changed_by_id'])
         new_user = users_lookup.get(entry['new_user_id'])
 
         recent_activities.append({
             'action_label': action_labels.get(entry['action'], entry['action'].replace('_', ' ').title()),
-            'job_masking_id': getattr(job, 'masking_id', 'N/A'),
+            'job_masking_id': masking_ids.get(job_pk) or 'N/A',
             'timestamp': normalize_datetime(entry['timestamp']),
             'changed_by_name': changed_by.get_full_name() if changed_by else 'System',
             'new_user_name': new_user.get_full_name() if new_user else None,
@@ -240,19 +258,18 @@ def all_projects(request):
     }
 
     jobs_qs = MarketingJob.objects.select_related('created_by').all().order_by('-created_at')
-
-    if search:
-        jobs_qs = jobs_qs.filter(
-            Q(system_id__icontains=search)
-            | Q(job_id__icontains=search)
-            | Q(topic__icontains=search)
-        )
+    # The same filters in raw form, so the capped search applies them first.
+    search_filters = {}
+    status_column = MarketingJob._meta.get_field('status').column
+    created_column = MarketingJob._meta.get_field('created_at').column
 
     if status_filter:
         if status_filter in status_buckets:
             jobs_qs = jobs_qs.filter(status__in=status_buckets[status_filter])
+            search_filters[status_column] = {'$in': status_buckets[status_filter]}
         else:
             jobs_qs = jobs_qs.filter(status__iexact=status_filter)
+            search_filters[status_column] = {'$regex': f'^{re.escape(status_filter)}$', '$options': 'i'}
 
     def parse_date(date_str):
         try:
@@ -260,16 +277,37 @@ def all_projects(request):
         except Exception:
             return None
 
+    def day_start(day):
+        return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
     start_dt = parse_date(start_date)
     end_dt = parse_date(end_date)
+    created_bounds = {}
     if start_dt:
         jobs_qs = jobs_qs.filter(created_at__date__gte=start_dt)
+        created_bounds['$gte'] = day_start(start_dt)
     if end_dt:
         jobs_qs = jobs_qs.filter(created_at__date__lte=end_dt)
+        created_bounds['$lt'] = day_start(end_dt + timedelta(days=1))
+    if created_bounds:
+        search_filters[created_column] = created_bounds
 
-    paginator = Paginator(jobs_qs, 25)
-    page_number = request.GET.get('page')
-    jobs_page = paginator.get_page(page_number)
+    ranked_ids = []
+    if search:
+        ranked_ids = search_ranked_ids(MarketingJob, search, filters=search_filters)
+        jobs_qs = jobs_qs.filter(pk__in=ranked_ids)
+
+    if search:
+        # Search results are capped and ranked by relevance, not date.
+        paginator = Paginator(order_by_rank(jobs_qs, ranked_ids), 25)
+        jobs_page = paginator.get_page(request.GET.get('page'))
+        total_jobs = paginator.count
+    else:
+        # Keyset pagination; the unfiltered list spans every job ever created, so
+        # fall back to an estimated count instead of scanning the collection.
+        paginator = CursorPaginator(jobs_qs, 25, count_mode=COUNT_ESTIMATED)
+        jobs_page = paginator.get_page(request.GET.get('page'))
+        total_jobs = paginator.count_display
 
     status_options = [
         ('', 'All Statuses'),
@@ -294,7 +332,7 @@ def all_projects(request):
         'start_date': start_date,
         'end_date': end_date,
         'status_options': status_options,
-        'total_jobs': jobs_qs.count(),
+        'total_jobs': total_jobs,
     }
     return render(request, 'allocator/all_projects.html', context)
 
@@ -324,6 +362,252 @@ def all_project_detail(request, system_id):
     return render(request, 'allocator/all_project_detail.html', context)
 
 
+@login_required
+@role_required(['allocator'])
+def auto_allocation(request):
+    """Review the batch allocation plan for the pending queue; POST proposes a new one"""
+    
+    if request.method == 'POST':
+        try:
+            plan = create_allocation_plan(request.user)
+            summary = plan.proposal['summary']
+            messages.success(request, f"Proposed writers for {summary['assigned']} of {summary['jobs']} pending jobs.")
+            logger.info(f"Allocation plan {plan.id} proposed by {request.user.email}")
+        except Exception as e:
+            logger.error(f"Error building allocation plan: {str(e)}")
+            messages.error(request, f'Error building allocation plan: {str(e)}')
+        return redirect('auto_allocation')
+    
+    plan = AllocationPlan.objects.select_related('created_by').filter(status='proposed').first()
+    proposal = plan.proposal if plan else {}
+    assignments = []
+    for entry in proposal.get('assignments', []):
+        assignments.append(dict(
+            entry,
+            deadline_at=parse_datetime(entry['deadline']) if entry.get('deadline') else None,
+            content_due=parse_datetime(entry['tasks']['content_creation']['end']),
+        ))
+    
+    context = {
+        'user': request.user,
+        'plan': plan,
+        'summary': proposal.get('summary', {}),
+        'assignments': assignments,
+        'unassigned': proposal.get('unassigned', []),
+    }
+    return render(request, 'allocator/auto_allocation.html', context)
+
+
+def _availability_query(params):
+    """Parse ``category``/``words``/``days`` filters; returns (filters, error)."""
+    category = params.get('category') or None
+    if category and category not in dict(Job.CATEGORY_CHOICES):
+        return None, 'Unknown category'
+    try:
+        min_words = max(int(params.get('words') or 0), 0)
+        days = min(max(int(params.get('days') or 5), 1), AVAILABILITY_DAYS)
+    except ValueError:
+        return None, 'words and days must be integers'
+    return {'category': category, 'min_words': min_words, 'days': days}, None
+
+
+def _availability_rows(matrix, filters):
+    columns = matrix.working_days(filters['days'])
+    user_ids = matrix.writers_with_capacity(filters['category'], filters['min_words'], filters['days'])
+    names = {
+        user.id: user.get_full_name() or user.email
+        for user in CustomUser.objects.filter(id__in=user_ids).only('id', 'first_name', 'last_name', 'email')
+    }
+    rows = []
+    for user_id in user_ids:
+        days = matrix.row(user_id)
+        rows.append({
+            'user_id': user_id,
+            'name': names.get(user_id, ''),
+            'days': [
+                {'date': days[column][0], 'free_words': days[column][2]}
+                for column in columns
+            ],
+        })
+    return [matrix.first_day + timedelta(days=column) for column in columns], rows
+
+
+@login_required
+@role_required(['allocator'])
+def writer_availability(request):
+    """Writers with free word capacity on each of the next working days"""
+    filters, error = _availability_query(request.GET)
+    if error:
+        messages.error(request, error)
+        filters = {'category': None, 'min_words': 0, 'days': 5}
+    try:
+        dates, rows = _availability_rows(get_availability_matrix(), filters)
+    except Exception as e:
+        logger.error(f"Error loading writer availability: {str(e)}")
+        messages.error(request, 'Writer availability is not available right now.')
+        dates, rows = [], []
+
+    context = {
+        'user': request.user,
+        'filters': filters,
+        'categories': Job.CATEGORY_CHOICES,
+        'dates': dates,
+        'writers': rows,
+    }
+    return render(request, 'allocator/writer_availability.html', context)
+
+
+@login_required
+@role_required(['allocator'])
+def writer_availability_api(request):
+    """JSON form of ``writer_availability``: ``?category=Finance&words=2000&days=5``"""
+    filters, error = _availability_query(request.GET)
+    if error:
+        return JsonResponse({'success': False, 'error': error}, status=400)
+    dates, rows = _availability_rows(get_availability_matrix(), filters)
+    return JsonResponse({
+        'success': True,
+        'filters': filters,
+        'dates': [day.isoformat() for day in dates],
+        'writers': [
+            dict(row, days=[dict(day, date=day['date'].isoformat()) for day in row['days']])
+            for row in rows
+        ],
+    })
+
+
+def _leaderboard_query(params):
+    """Parse ``board``/``sort`` parameters; returns (filters, error)."""
+    board = params.get('board') or 'overall'
+    sort = params.get('sort') or 'score'
+    if board not in LEADERBOARD_BOARDS:
+        return None, 'Unknown leaderboard'
+    if sort != 'score' and sort not in LEADERBOARD_METRICS:
+        return None, 'Unknown metric'
+    return {'board': board, 'sort': sort}, None
+
+
+def _leaderboard_entries(document, sort):
+    """The board's top writers by ``sort``, each with its ``position`` on that metric."""
+    document = document or {}
+    entries = {entry['user_id']: entry for entry in document.get('entries') or []}
+    top = (document.get('tops') or {}).get(sort)
+    if top is None:
+        # Stored before per-metric tops existed: re-sort what is there.
+        top = [entry['user_id'] for entry in sorted(
+            entries.values(),
+            key=lambda entry: (entry['rank'] if sort == 'score' else entry['ranks'][sort], entry['rank']),
+        )]
+    return [
+        dict(entries[user_id], position=entries[user_id]['rank'] if sort == 'score' else entries[user_id]['ranks'][sort])
+        for user_id in top
+        if user_id in entries
+    ]
+
+
+@login_required
+@role_required(['allocator', 'superadmin'])
+def writer_leaderboard(request):
+    """Writers ranked overall or per category (precomputed)"""
+    filters, error = _leaderboard_query(request.GET)
+    if error:
+        messages.error(request, error)
+        filters = {'board': 'overall', 'sort': 'score'}
+    try:
+        document = get_leaderboard(filters['board'])
+    except Exception as e:
+        logger.error(f"Error loading writer leaderboard: {str(e)}")
+        messages.error(request, 'The writer leaderboard is not available right now.')
+        document = None
+
+    context = {
+        'user': request.user,
+        'filters': filters,
+        'boards': [('overall', 'Overall')] + list(Job.CATEGORY_CHOICES),
+        'metrics': LEADERBOARD_METRICS,
+        'entries': _leaderboard_entries(document, filters['sort']),
+        'writers': (document or {}).get('writers', 0),
+        'updated_at': (document or {}).get('updated_at'),
+    }
+    return render(request, 'allocator/writer_leaderboard.html', context)
+
+
+@login_required
+@role_required(['allocator', 'superadmin'])
+def writer_leaderboard_api(request):
+    """JSON form of ``writer_leaderboard``: ``?board=Finance&sort=on_time_rate``"""
+    filters, error = _leaderboard_query(request.GET)
+    if error:
+        return JsonResponse({'success': False, 'error': error}, status=400)
+    document = get_leaderboard(filters['board']) or {}
+    updated_at = document.get('updated_at')
+    return JsonResponse({
+        'success': True,
+        'filters': filters,
+        'writers': document.get('writers', 0),
+        'updated_at': updated_at.isoformat() if updated_at else None,
+        'entries': _leaderboard_entries(document, filters['sort']),
+    })
+
+
+@login_required
+@role_required(['allocator'])
+@require_http_methods(["POST"])
+def apply_auto_allocation(request, plan_id):
+    """Apply the selected assignments of an allocation plan"""
+    
+    plan = get_object_or_404(AllocationPlan, id=plan_id)
+    job_ids = {int(value) for value in request.POST.getlist('job_ids') if value.isdigit()}
+    if not job_ids:
+        messages.error(request, 'Select at least one job to allocate.')
+        return redirect('auto_allocation')
+    
+    try:
+        summary = apply_allocation_plan(plan, request.user, job_ids)
+    except PlanNotApplicable:
+        messages.error(request, 'This plan has already been applied or replaced.')
+        return redirect('auto_allocation')
+    except Exception as e:
+        logger.error(f"Error applying allocation plan {plan_id}: {str(e)}")
+        messages.error(request, f'Error applying allocation plan: {str(e)}')
+        return redirect('auto_allocation')
+    
+    messages.success(request, f"Allocated {len(summary['applied'])} jobs.")
+    if summary['skipped']:
+        messages.warning(
+            request,
+            f"{len(summary['skipped'])} jobs were skipped because they or their writer changed since the plan was made.",
+        )
+    return redirect('pending_allocation')
+
+
+def _booking_conflicts(job, member_id, start_dt, end_dt):
+    """Masking ids of the member's other open jobs overlapping the window."""
+    if not (member_id and start_dt and end_dt):
+        return []
+    index = allocation_index()
+    index.refresh_users([member_id])
+    job_ids = {interval.job_id for interval in index.overlapping(member_id, start_dt, end_dt, exclude_job=job.id)}
+    if not job_ids:
+        return []
+    return sorted(Job.objects.filter(id__in=job_ids).values_list('masking_id', flat=True))
+
+
+def _claim_error(job, exc):
+    if isinstance(exc, JobClaimed):
+        until = timezone.localtime(exc.expires_at).strftime('%H:%M') if exc.expires_at else 'later'
+        return f'Job {job.masking_id} is already being allocated by {exc.holder_name()} (until {until}).'
+    if isinstance(exc, JobNotClaimable):
+        return f'Job {job.masking_id} can no longer be allocated.'
+    return f'Your allocation form for job {job.masking_id} expired or was reopened elsewhere; please open it again.'
+
+
+def _task_window(task, default):
+    if task and task['start'] and task['end']:
+        return task['start'], task['end']
+    return default
+
+
 @login_required
 @role_required(['allocator'])
 def allocate_job(request, job_id):
@@ -354,6 +638,7 @@ def allocate_job(request, job_id):
             }
         )
 
+        previous_id = None if created else allocation.allocated_to_id
         if created:
             AllocationHistory.objects.create(
                 task_allocation=allocation,
@@ -377,10 +662,18 @@ def allocate_job(request, job_id):
         allocation.start_date_time = start_dt
         allocation.end_date_time = end_dt
         allocation.save()
-        return allocation
+        return allocation, previous_id
 
     if request.method == 'POST':
-        # Handle allocation
+        # Handle allocation; the claim taken when the form was opened is
+        # consumed first so only one submission per claim gets through.
+        try:
+            consume_claim(job.id, request.user, request.POST.get('claim_token'))
+        except (JobClaimed, ClaimLost, JobNotClaimable) as exc:
+            messages.error(request, _claim_error(job, exc))
+            return redirect('pending_allocation')
+
+        conflicts = []
         try:
             # Get form data
             content_writer_id = request.POST.get('content_writer')
@@ -404,7 +697,10 @@ def allocate_job(request, job_id):
             # Allocate Content Creation
             if content_writer_id:
                 content_writer = CustomUser.objects.get(id=content_writer_id, role='writer')
-                content_allocation = _assign_allocation(
+                overlapping = _booking_conflicts(job, content_writer.id, content_start_dt, content_end_dt)
+                if overlapping:
+                    conflicts.append((content_writer, overlapping))
+                _, previous_writer_id = _assign_allocation(
                     'content_creation',
                     content_writer,
                     content_start_dt,
@@ -412,23 +708,29 @@ def allocate_job(request, job_id):
                     'Content Creation'
                 )
 
-                # Update writer profile
-                writer_profile = WriterProfile.objects.get(user=content_writer)
-                writer_profile.current_jobs += 1
-                writer_profile.current_words += job.word_count
-                writer_profile.total_jobs_assigned += 1
-                writer_profile.save()
+                # Update writer load (atomic, releases a replaced writer)
+                if previous_writer_id != content_writer.id:
+                    adjust_writer_load(content_writer.id, jobs=1, words=job.word_count, assigned=1)
+                    if previous_writer_id:
+                        adjust_writer_load(previous_writer_id, jobs=-1, words=-job.word_count)
             
             # Allocate AI & Plag Check
             if ai_plag_member_id:
                 ai_member = CustomUser.objects.get(id=ai_plag_member_id, role='process')
-                _assign_allocation(
+                overlapping = _booking_conflicts(job, ai_member.id, ai_start_dt, ai_end_dt)
+                if overlapping:
+                    conflicts.append((ai_member, overlapping))
+                _, previous_member_id = _assign_allocation(
                     'ai_plag',
                     ai_member,
                     ai_start_dt,
                     ai_end_dt,
                     'AI & Plagiarism'
                 )
+                if previous_member_id != ai_member.id:
+                    adjust_process_load(ai_member.id, jobs=1)
+                    if previous_member_id:
+                        adjust_process_load(previous_member_id, jobs=-1)
             
             # Allocate Decoration
             if decoration_member_id:
@@ -451,9 +753,17 @@ def allocate_job(request, job_id):
                 job.allocator_comment = allocator_comment
             job.allocated_by = request.user
             job.allocated_at = timezone.now()
-            job.save()
+            job.save(update_fields=[
+                'status', 'marketing_comment_status', 'allocator_comment',
+                'allocated_by', 'allocated_at', 'updated_at',
+            ])
             
             messages.success(request, f'Job {job.masking_id} allocated successfully!')
+            for member, overlapping in conflicts:
+                messages.warning(
+                    request,
+                    f"{member.get_full_name()} is also booked on {', '.join(overlapping)} during this window.",
+                )
             logger.info(f"Job {job.masking_id} allocated by {request.user.email}")
             return redirect('pending_allocation')
             
@@ -461,6 +771,12 @@ def allocate_job(request, job_id):
             logger.error(f"Error allocating job {job_id}: {str(e)}")
             messages.error(request, f'Error allocating job: {str(e)}')
     
+    try:
+        claim_token = claim_job(job.id, request.user)
+    except (JobClaimed, JobNotClaimable) as exc:
+        messages.error(request, _claim_error(job, exc))
+        return redirect('pending_allocation')
+
     writer_profiles = list(WriterProfile.objects.filter(is_available=True))
     writer_user_ids = [profile.user_id for profile in writer_profiles]
     writer_users = {}
@@ -471,24 +787,25 @@ def allocate_job(request, job_id):
         if user.is_active:
             writer_users[user.id] = user
 
-    writer_details = []
-    for profile in writer_profiles:
-        user = writer_users.get(profile.user_id)
-        if not user:
-            continue
-
-        if job.job_category == 'IT' and not profile.is_it_writer:
-            continue
-
-        can_accept, reason = profile.can_accept_job(job)
-        engagement = profile.get_engagement_status()
+    candidate_profiles = {
+        profile.user_id: profile
+        for profile in writer_profiles
+        if profile.user_id in writer_users
+        and not (job.job_category == 'IT' and not profile.is_it_writer)
+    }
+    ranking = rank_writers(job, WriterMatrix.from_rows(candidate_profiles.values()), top_k=None)
 
+    writer_details = []
+    for position, entry in enumerate(ranking):
+        profile = candidate_profiles[entry['user_id']]
         writer_details.append({
-            'user': user,
+            'user': writer_users[entry['user_id']],
             'profile': profile,
-            'can_accept': can_accept,
-            'reason': reason,
-            'engagement': engagement,
+            'can_accept': entry['eligible'],
+            'reason': entry['reason'] or 'Can accept job',
+            'engagement': profile.get_engagement_status(),
+            'score': entry['score'],
+            'recommended': entry['eligible'] and position < RECOMMENDED_WRITERS,
         })
 
     process_profiles = list(ProcessTeamProfile.objects.filter(is_available=True))
@@ -511,73 +828,7 @@ def allocate_job(request, job_id):
             'profile': profile,
         })
 
-    CATEGORY_CONFIG = [
-        {'label': 'IT', 'flag': 'is_it_writer', 'color': '#2196F3'},
-        {'label': 'Non-IT', 'flag': 'is_nonit_writer', 'color': '#9C27B0'},
-        {'label': 'Finance', 'flag': 'is_finance_writer', 'color': '#4CAF50'},
-    ]
-    capacity_lookup = {}
-    writer_capacity = []
-    for cfg in CATEGORY_CONFIG:
-        stats = {
-            'label': cfg['label'],
-            'color': cfg['color'],
-            'total': 0,
-            'available': 0,
-            'engaged': 0,
-            'overloaded': 0,
-            'sunday_off': 0,
-            'holiday': 0,
-            'current_jobs': 0,
-            'job_capacity': 0,
-            'current_words': 0,
-            'word_capacity': 0,
-        }
-        writer_capacity.append(stats)
-        capacity_lookup[cfg['flag']] = stats
-
-    for profile in writer_profiles:
-        availability_flag = profile.is_available and not (
-            profile.is_sunday_off or profile.is_on_holiday or profile.is_overloaded
-        )
-        current_jobs = getattr(profile, 'current_jobs', 0) or 0
-        max_jobs = getattr(profile, 'max_jobs', 0) or 1
-        current_words = getattr(profile, 'current_words', 0) or 0
-        max_words = getattr(profile, 'max_words', 0) or max(job.word_count, 1)
-
-        writer_categories = [
-            ('is_it_writer', profile.is_it_writer),
-            ('is_nonit_writer', profile.is_nonit_writer),
-            ('is_finance_writer', profile.is_finance_writer),
-        ]
-
-        for flag, is_member in writer_categories:
-            if not is_member:
-                continue
-            stats = capacity_lookup.get(flag)
-            if not stats:
-                continue
-            stats['total'] += 1
-            stats['current_jobs'] += current_jobs
-            stats['job_capacity'] += max_jobs
-            stats['current_words'] += current_words
-            stats['word_capacity'] += max_words
-            if availability_flag:
-                stats['available'] += 1
-            if current_jobs > 0:
-                stats['engaged'] += 1
-            if profile.is_overloaded:
-                stats['overloaded'] += 1
-            if profile.is_sunday_off:
-                stats['sunday_off'] += 1
-            if profile.is_on_holiday:
-                stats['holiday'] += 1
-
-    for stats in writer_capacity:
-        job_cap = stats['job_capacity'] or 1
-        word_cap = stats['word_capacity'] or 1
-        stats['job_load_pct'] = min(100, int(round((stats['current_jobs'] / job_cap) * 100)))
-        stats['word_load_pct'] = min(100, int(round((stats['current_words'] / word_cap) * 100)))
+    writer_capacity = get_writer_capacity(job.word_count)
 
     existing_allocations = list(
         TaskAllocation.objects.filter(
@@ -629,6 +880,28 @@ def allocate_job(request, job_id):
                 })
                 process_ids.add(task['assigned_id'])
 
+    # Double-booking flags for the current (or suggested) task windows and
+    # free time before the deadline, for every candidate at once.
+    now = timezone.now()
+    default_windows = task_windows(job.deadline, now)
+    working_hours_left = working_hours_between(now, max(job.deadline, now))
+    content_window = _task_window(task_info.get('content_creation'), default_windows['content_creation'])
+    ai_window = _task_window(task_info.get('ai_plag'), default_windows['ai_plag'])
+    schedule = allocation_index()
+    writer_ids = [item['user'].id for item in writer_details]
+    free_windows = schedule.free_windows(
+        writer_ids, now, max(job.deadline, now), FREE_WINDOW_MIN, exclude_job=job.id,
+    )
+    writer_conflicts = schedule.overlap_counts(writer_ids, *content_window, exclude_job=job.id)
+    for item, count in zip(writer_details, writer_conflicts.tolist()):
+        item['conflicts'] = count
+        item['free_windows'] = free_windows[item['user'].id][:FREE_WINDOWS_SHOWN]
+    process_conflicts = schedule.overlap_counts(
+        [member['user'].id for member in available_process_team], *ai_window, exclude_job=job.id,
+    )
+    for member, count in zip(available_process_team, process_conflicts.tolist()):
+        member['conflicts'] = count
+
     has_available_content = any(item['can_accept'] for item in writer_details)
     has_available_process = any(member['profile'].is_available for member in available_process_team)
     has_available_decoration = has_available_content or has_available_process
@@ -636,10 +909,13 @@ def allocate_job(request, job_id):
     context = {
         'user': request.user,
         'job': job,
+        'claim_token': claim_token,
+        'claim_lease_minutes': int(CLAIM_LEASE.total_seconds() // 60),
         'writer_details': writer_details,
         'available_process_team': available_process_team,
         'can_have_query': job.can_have_query(),
         'writer_capacity': writer_capacity,
+        'working_hours_left': working_hours_left,
         'task_content': task_info.get('content_creation'),
         'task_ai': task_info.get('ai_plag'),
         'task_decoration': task_info.get('decoration'),
@@ -727,13 +1003,15 @@ def cancel_jobs(request):
             job.allocator_comment = reason
             job.save()
             
-            # Free up writer resources
-            for allocation in job.task_allocations.filter(task_type='content_creation'):
-                if allocation.allocated_to:
-                    writer_profile = allocation.allocated_to.writer_profile
-                    writer_profile.current_jobs = max(0, writer_profile.current_jobs - 1)
-                    writer_profile.current_words = max(0, writer_profile.current_words - job.word_count)
-                    writer_profile.save()
+            # Free up writer and process team resources
+            for task_type, member_id, status in job.task_allocations.filter(
+                task_type__in=['content_creation', 'ai_plag'],
+                allocated_to__isnull=False,
+            ).values_list('task_type', 'allocated_to_id', 'status'):
+                if task_type == 'content_creation':
+                    adjust_writer_load(member_id, jobs=-1, words=-job.word_count)
+                elif status != 'completed':
+                    adjust_process_load(member_id, jobs=-1)
             
             messages.success(request, f'Job {job.masking_id} cancelled successfully!')
             logger.info(f"Job {job.masking_id} cancelled by {request.user.email}")
@@ -846,6 +1124,8 @@ def process_jobs(request):
             if not task.temperature_matched:
                 messages.error(request, 'Temperature score below threshold. Cannot mark complete.')
                 return redirect('process_jobs')
+            if task.status != 'completed' and task.allocated_to_id:
+                adjust_process_load(task.allocated_to_id, jobs=-1, completed=1)
             task.status = 'completed'
             task.completed_at = timezone.now()
             task.job.status = 'decoration'
@@ -1008,19 +1288,11 @@ def switch_writer(request, allocation_id):
             old_writer = allocation.allocated_to
             new_writer = CustomUser.objects.get(id=new_writer_id, role='writer')
             
-            # Update old writer profile
+            # Move the load from the old writer to the new one
+            word_count = allocation.job.word_count
             if old_writer and old_writer.role == 'writer':
-                old_profile = old_writer.writer_profile
-                old_profile.current_jobs = max(0, old_profile.current_jobs - 1)
-                old_profile.current_words = max(0, old_profile.current_words - allocation.job.word_count)
-                old_profile.save()
-            
-            # Update new writer profile
-            new_profile = new_writer.writer_profile
-            new_profile.current_jobs += 1
-            new_profile.current_words += allocation.job.word_count
-            new_profile.total_jobs_assigned += 1
-            new_profile.save()
+                adjust_writer_load(old_writer.id, jobs=-1, words=-word_count)
+            adjust_writer_load(new_writer.id, jobs=1, words=word_count, assigned=1)
             
             # Update allocation
             allocation.allocated_to = new_writer
@@ -1097,6 +1369,84 @@ def view_job_details(request, job_id):
     return render(request, 'allocator/view_job_details.html', context)
 
 
+@login_required
+@role_required(['allocator'])
+@require_http_methods(["GET"])
+def job_timeline(request, job_id):
+    """Materialised job timeline as JSON; ``?archive=1`` adds archived events"""
+    document = get_timeline(SCOPE_ALLOCATOR, job_id)
+    if not document or not document.get('seeded'):
+        job = get_object_or_404(Job.objects.select_related('created_by'), id=job_id)
+        document = ensure_timeline(SCOPE_ALLOCATOR, job)
+    
+    archived_events = None
+    if request.GET.get('archive') == '1':
+        archived_events = get_archived_events(SCOPE_ALLOCATOR, job_id) if document.get('archived') else []
+    return JsonResponse(serialize_timeline(document, archived_events))
+
+
+@login_required
+@role_required(['allocator'])
+@require_http_methods(["GET"])
+def writer_recommendations(request, job_id):
+    """Top writers for a job as JSON; ``?top=N`` (default 10, max 100)"""
+    job = get_object_or_404(Job.objects.only('id', 'job_category', 'word_count', 'deadline'), id=job_id)
+    try:
+        top_k = min(max(int(request.GET.get('top', 10)), 1), 100)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'top must be an integer'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'job_id': job.id,
+        'weights': DEFAULT_WEIGHTS._asdict(),
+        'writers': rank_writers(job, top_k=top_k),
+    })
+
+
+@login_required
+@role_required(['allocator'])
+def allocation_conflicts(request, job_id):
+    """
+    Overlapping allocations and free windows for every available writer
+    (``?role=writer``, default) or process member (``?role=process``) in the
+    window ``?start=...&end=...`` (ISO datetimes)
+    """
+    job = get_object_or_404(Job.objects.only('id', 'deadline'), id=job_id)
+    start_dt = parse_datetime(request.GET.get('start', ''))
+    end_dt = parse_datetime(request.GET.get('end', ''))
+    if not start_dt or not end_dt or end_dt <= start_dt:
+        return JsonResponse({'success': False, 'error': 'start and end must be ISO datetimes with start < end'}, status=400)
+    if timezone.is_naive(start_dt):
+        start_dt = timezone.make_aware(start_dt)
+    if timezone.is_naive(end_dt):
+        end_dt = timezone.make_aware(end_dt)
+
+    profile_model = ProcessTeamProfile if request.GET.get('role') == 'process' else WriterProfile
+    user_ids = list(profile_model.objects.filter(is_available=True).values_list('user_id', flat=True))
+    now = timezone.now()
+    schedule = allocation_index()
+    counts = schedule.overlap_counts(user_ids, start_dt, end_dt, exclude_job=job.id)
+    free_windows = schedule.free_windows(
+        user_ids, now, max(job.deadline, now), FREE_WINDOW_MIN, exclude_job=job.id,
+    )
+    return JsonResponse({
+        'success': True,
+        'job_id': job.id,
+        'users': [
+            {
+                'user_id': user_id,
+                'conflicts': count,
+                'free_windows': [
+                    {'start': window_start.isoformat(), 'end': window_end.isoformat()}
+                    for window_start, window_end in free_windows[user_id][:FREE_WINDOWS_SHOWN]
+                ],
+            }
+            for user_id, count in zip(user_ids, counts.tolist())
+        ],
+    })
+
+
 @login_required
 @role_required(['allocator'])
 @require_http_methods(["POST"])
@@ -1,3 +1,19 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ArchivedMedia, IdempotencyKey
+
+
+@admin.register(ArchivedMedia)
+class ArchivedMediaAdmin(admin.ModelAdmin):
+    list_display = ['name', 'codec', 'original_size', 'stored_size', 'archived_at', 'rehydrate_count']
+    list_filter = ['codec', 'archived_at']
+    search_fields = ['name']
+    readonly_fields = ['archived_at', 'rehydrated_at', 'rehydrate_count']
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['key', 'scope', 'created_at']
+    list_filter = ['scope']
+    search_fields = ['key']
+    readonly_fields = ['key', 'scope', 'result', 'created_at']
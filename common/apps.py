@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'common'
+
+    def ready(self):
+        from .business_calendar import connect_business_calendar
+        from .counters import connect_status_counters
+        from .timeline import connect_job_timelines
+        connect_business_calendar()
+        connect_status_counters()
+        connect_job_timelines()
@@ -0,0 +1,77 @@
+"""
+Compact Bloom filter for membership fast paths.
+
+A negative answer is definite; a positive answer means "maybe" and must be
+confirmed against the database. Sizing follows the usual formulas::
+
+    bits   m = -n * ln(p) / ln(2)^2
+    hashes k = m / n * ln(2)
+
+so one million keys at a 1% false-positive rate need ~9.6 bits per key,
+about 1.2 MB.
+"""
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, num_bits, num_hashes):
+        self.num_bits = max(8, int(num_bits))
+        self.num_hashes = max(1, int(num_hashes))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self.capacity = None
+        self.error_rate = None
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=0.01):
+        """Size a filter for ``capacity`` keys at the given false-positive rate."""
+        capacity = max(1, int(capacity))
+        num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        num_hashes = round(num_bits / capacity * math.log(2))
+        bloom = cls(num_bits, num_hashes)
+        bloom.capacity = capacity
+        bloom.error_rate = error_rate
+        return bloom
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for index in range(self.num_hashes):
+            yield (first + index * second) % self.num_bits
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def memory_bytes(self):
+        """Size of the bit array (the only allocation that grows with capacity)."""
+        return len(self._bits)
+
+    @property
+    def expected_error_rate(self):
+        """False-positive probability at the current fill level."""
+        if not self.count:
+            return 0.0
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    @property
+    def is_saturated(self):
+        return self.capacity is not None and self.count > self.capacity
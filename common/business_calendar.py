@@ -0,0 +1,326 @@
+"""
+Business-time calendar built from the Holiday Master.
+
+Working time is precomputed as a bitmap of ``SLOT_MINUTES`` slots over a
+rolling horizon (``PAST_DAYS`` back, ``FUTURE_DAYS`` ahead of today, local
+time). A slot is working when it falls inside ``settings.BUSINESS_HOURS``
+(``(start_hour, end_hour)``, default the whole day) and the day is not a
+holiday. Full-day holidays clear the whole day; half-day holidays clear the
+second half of the working day. Calendars for users with ``is_sunday_off``
+also clear Sundays, and ``is_on_holiday`` clears the rest of today (the flag
+only describes the present).
+
+With ``cum[k]`` the number of working slots up to and including ``k``:
+
+* ``working_seconds(a, b)`` is a difference of two cumulative values, O(1);
+* ``add_working_hours(a, n)`` finds the slot where the count reaches the
+  target with one ``searchsorted``, O(log n).
+
+Calendars are cached per process, keyed by the holiday version: the
+number of Holiday rows and their latest ``updated_at``, read with one
+``$group`` at most every ``HOLIDAY_VERSION_TTL`` seconds. Every process
+derives the same version from the same rows, so a holiday edit in one
+worker reaches the others within that delay (immediately in the worker
+that made it).
+
+Only the rolling horizon is cached. A lookup covering moments outside it
+gets a one-off calendar widened just enough, never beyond
+``MAX_PAST_DAYS``/``MAX_FUTURE_DAYS`` of today; moments further out are
+clamped to that window (``within_calendar_range`` lets callers reject them
+up front).
+"""
+
+import logging
+import math
+import threading
+import time as clock
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+logger = logging.getLogger('common')
+
+SLOT_MINUTES = 15
+SLOT_SECONDS = SLOT_MINUTES * 60
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+PAST_DAYS = 60
+FUTURE_DAYS = 400
+MAX_PAST_DAYS = 5 * 365
+MAX_FUTURE_DAYS = 10 * 365
+HOLIDAY_VERSION_TTL = 10
+SUNDAY = 6
+
+
+def business_hours():
+    start_hour, end_hour = getattr(settings, 'BUSINESS_HOURS', (0, 24))
+    return int(start_hour * 60 // SLOT_MINUTES), int(end_hour * 60 // SLOT_MINUTES)
+
+
+def holiday_days(holidays):
+    """``{date: holiday_type}`` for the given Holiday rows; full days win over half days."""
+    days = {}
+    for holiday in holidays:
+        if getattr(holiday, 'is_deleted', False):
+            continue
+        if holiday.date_type == 'consecutive' and holiday.from_date and holiday.to_date:
+            first, last = holiday.from_date, holiday.to_date
+        elif holiday.date:
+            first = last = holiday.date
+        else:
+            continue
+        day = first
+        while day <= last:
+            if days.get(day) != 'full_day':
+                days[day] = holiday.holiday_type
+            day += timedelta(days=1)
+    return days
+
+
+class BusinessCalendar:
+    """Working-time bitmap over ``[first_day, first_day + days)`` in local time."""
+
+    def __init__(self, first_day, days, holidays=None, sunday_off=False, off_days=()):
+        self.first_day = first_day
+        self.days = days
+        self.holidays = dict(holidays or {})
+        self.origin = timezone.make_aware(datetime.combine(first_day, time()))
+
+        start_slot, end_slot = business_hours()
+        workday = np.zeros(SLOTS_PER_DAY, dtype=bool)
+        workday[start_slot:end_slot] = True
+        half_day = workday.copy()
+        half_day[start_slot + (end_slot - start_slot) // 2:] = False
+
+        mask = np.tile(workday, (days, 1))
+        weekdays = (first_day.weekday() + np.arange(days)) % 7
+        if sunday_off:
+            mask[weekdays == SUNDAY] = False
+        for day, holiday_type in self.holidays.items():
+            offset = (day - first_day).days
+            if 0 <= offset < days:
+                mask[offset] = half_day if holiday_type == 'half_day' else False
+        for day, from_slot in off_days:
+            offset = (day - first_day).days
+            if 0 <= offset < days:
+                mask[offset, from_slot:] = False
+
+        self.mask = mask
+        self.flat = mask.ravel()
+        self.cumulative = np.cumsum(self.flat, dtype=np.int64)
+
+    @property
+    def last_instant(self):
+        return self.origin + timedelta(days=self.days)
+
+    def covers(self, *moments):
+        return all(self.origin <= moment <= self.last_instant for moment in moments)
+
+    def _position(self, moment):
+        """(slot index, seconds into the slot), clamped to the horizon."""
+        seconds = (moment - self.origin).total_seconds()
+        seconds = min(max(seconds, 0.0), float(len(self.flat) * SLOT_SECONDS))
+        slot = min(int(seconds // SLOT_SECONDS), len(self.flat) - 1)
+        return slot, seconds - slot * SLOT_SECONDS
+
+    def _worked_before(self, moment):
+        """Working seconds from the start of the horizon up to ``moment``."""
+        slot, into = self._position(moment)
+        before = int(self.cumulative[slot]) - int(self.flat[slot])
+        return before * SLOT_SECONDS + (into if self.flat[slot] else 0.0)
+
+    def working_seconds(self, start, end):
+        if end <= start:
+            return 0.0
+        return self._worked_before(end) - self._worked_before(start)
+
+    def working_hours(self, start, end):
+        return self.working_seconds(start, end) / 3600.0
+
+    def add_working_seconds(self, start, seconds):
+        """
+        The instant ``seconds`` of working time after ``start``, or None when
+        that lies beyond the horizon.
+        """
+        if seconds <= 0:
+            return start
+        target = self._worked_before(start) + seconds
+        slots_needed = math.ceil(target / SLOT_SECONDS)
+        slot = int(np.searchsorted(self.cumulative, slots_needed, side='left'))
+        if slot >= len(self.flat):
+            return None
+        into = target - (slots_needed - 1) * SLOT_SECONDS
+        return self.origin + timedelta(seconds=slot * SLOT_SECONDS + into)
+
+    def add_working_hours(self, start, hours):
+        return self.add_working_seconds(start, hours * 3600.0)
+
+    def is_working_time(self, moment):
+        slot, _ = self._position(moment)
+        return self.covers(moment) and bool(self.flat[slot])
+
+    def is_working_day(self, day):
+        offset = (day - self.first_day).days
+        return 0 <= offset < self.days and bool(self.mask[offset].any())
+
+    def working_hours_on(self, day):
+        offset = (day - self.first_day).days
+        if not 0 <= offset < self.days:
+            return 0.0
+        return int(self.mask[offset].sum()) * SLOT_SECONDS / 3600.0
+
+    def holiday_on(self, day):
+        return self.holidays.get(day)
+
+
+# ----------------------------------------------------------------------
+# Process-wide calendars
+# ----------------------------------------------------------------------
+_lock = threading.Lock()
+_calendars = {}
+
+
+_holiday_version = (None, 0.0)
+
+
+def _read_holiday_version():
+    from common.mongo import get_collection
+
+    Holiday = apps.get_model('superadminpanel', 'Holiday')
+    column = Holiday._meta.get_field('updated_at').column
+    rows = list(get_collection(Holiday).aggregate([
+        {'$group': {'_id': None, 'n': {'$sum': 1}, 'latest': {'$max': f'${column}'}}},
+    ]))
+    if not rows:
+        return '0:'
+    latest = rows[0].get('latest')
+    return f"{rows[0]['n']}:{latest.isoformat() if latest else ''}"
+
+
+def holiday_version():
+    """Identifies the Holiday Master contents; equal in every process for the same rows."""
+    global _holiday_version
+    version, read_at = _holiday_version
+    now = clock.monotonic()
+    if version is None or now - read_at >= HOLIDAY_VERSION_TTL:
+        version = _read_holiday_version()
+        _holiday_version = (version, now)
+    return version
+
+
+def _load_holidays():
+    Holiday = apps.get_model('superadminpanel', 'Holiday')
+    return holiday_days(Holiday.objects.only(
+        'holiday_type', 'date_type', 'date', 'from_date', 'to_date', 'is_deleted',
+    ))
+
+
+def calendar_range(today=None):
+    """``(first_day, last_day)`` any calendar may span around ``today``."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=MAX_PAST_DAYS), today + timedelta(days=MAX_FUTURE_DAYS)
+
+
+def _local_day(moment):
+    try:
+        return timezone.localtime(moment).date()
+    except (OverflowError, ValueError):
+        # Within a day of datetime.min/max; only the side matters.
+        return date.min if moment.year < 5000 else date.max
+
+
+def within_calendar_range(*moments):
+    """True when every moment falls inside ``calendar_range()``."""
+    first_day, last_day = calendar_range()
+    return all(first_day <= _local_day(moment) <= last_day for moment in moments)
+
+
+def get_business_calendar(sunday_off=False, on_holiday=False, covering=()):
+    """
+    The shared calendar for the given profile flags, rebuilt when holidays
+    change or the day changes. When a datetime in ``covering`` falls outside
+    its horizon, an uncached calendar widened to cover it (within
+    ``calendar_range()``) is returned instead.
+    """
+    today = timezone.localdate()
+    version = holiday_version()
+    key = (sunday_off, on_holiday)
+    with _lock:
+        cached = _calendars.get(key)
+        if cached is None or cached[0] != version or cached[1] != today:
+            holidays = cached[2].holidays if cached is not None and cached[0] == version else _load_holidays()
+            first_day = today - timedelta(days=PAST_DAYS)
+            cached = (version, today, _build_calendar(
+                first_day, PAST_DAYS + FUTURE_DAYS, holidays, sunday_off, on_holiday, today,
+            ))
+            _calendars[key] = cached
+    calendar = cached[2]
+    if calendar.covers(*covering):
+        return calendar
+
+    # Widen an uncached copy; moments beyond calendar_range() are clamped to it.
+    lowest, highest = calendar_range(today)
+    first_day = calendar.first_day
+    last_day = calendar.first_day + timedelta(days=calendar.days)
+    for moment in covering:
+        moment_day = min(max(_local_day(moment), lowest + timedelta(days=1)), highest - timedelta(days=1))
+        first_day = min(first_day, moment_day - timedelta(days=1))
+        last_day = max(last_day, moment_day + timedelta(days=1))
+    return _build_calendar(
+        first_day, (last_day - first_day).days, calendar.holidays, sunday_off, on_holiday, today,
+    )
+
+
+def _build_calendar(first_day, days, holidays, sunday_off, on_holiday, today):
+    off_days = []
+    if on_holiday:
+        now = timezone.localtime()
+        off_days.append((today, (now.hour * 60 + now.minute) // SLOT_MINUTES))
+    return BusinessCalendar(first_day, days, holidays, sunday_off=sunday_off, off_days=off_days)
+
+
+def calendar_for_profile(profile, covering=()):
+    """Calendar for a writer or process team profile, honouring its Sunday and holiday flags."""
+    return get_business_calendar(
+        sunday_off=bool(getattr(profile, 'is_sunday_off', False)),
+        on_holiday=bool(getattr(profile, 'is_on_holiday', False)),
+        covering=covering,
+    )
+
+
+def working_hours_between(start, end, sunday_off=False, on_holiday=False):
+    """Working hours in ``[start, end)`` on the shared calendar."""
+    calendar = get_business_calendar(sunday_off, on_holiday, covering=(start, end))
+    return calendar.working_hours(start, end)
+
+
+def add_working_hours(start, hours, sunday_off=False, on_holiday=False):
+    """
+    ``start`` plus ``hours`` of working time, extending the horizon as far
+    as ``calendar_range()`` allows; None when the result lies beyond it.
+    """
+    calendar = get_business_calendar(sunday_off, on_holiday, covering=(start,))
+    result = calendar.add_working_hours(start, hours)
+    if result is None and within_calendar_range(start):
+        # The working time runs past the horizon; widen it to the limit once.
+        limit = timezone.make_aware(datetime.combine(calendar_range()[1], time()))
+        calendar = get_business_calendar(sunday_off, on_holiday, covering=(start, limit))
+        result = calendar.add_working_hours(start, hours)
+    return result
+
+
+def invalidate_business_calendars(**kwargs):
+    """Re-read the holiday version on the next lookup; other processes follow within the TTL."""
+    global _holiday_version
+    _holiday_version = (None, 0.0)
+
+
+def connect_business_calendar():
+    """Wire the signal handlers; called from CommonConfig.ready()."""
+    model = apps.get_model('superadminpanel', 'Holiday')
+    uid = 'business_calendar'
+    post_save.connect(invalidate_business_calendars, sender=model, dispatch_uid=uid)
+    post_delete.connect(invalidate_business_calendars, sender=model, dispatch_uid=uid)
@@ -0,0 +1,69 @@
+"""
+Stale-while-revalidate caching on top of the Django cache.
+
+Each entry stores the value together with the time it stops being fresh.
+Fresh entries are returned as-is. Once stale, the first worker to win a
+``cache.add`` lock recomputes while everyone else keeps getting the stale
+value, so an expensive computation never runs in more than one worker at a
+time. Entries are dropped ``stale_for`` seconds after going stale.
+
+Both guarantees only hold across workers when CACHES points at a shared
+backend; with the per-process LocMemCache default each worker refreshes
+on its own and :func:`invalidate` only affects the calling process.
+"""
+
+import logging
+import time
+
+from django.core.cache import caches
+
+logger = logging.getLogger('common')
+
+LOCK_SUFFIX = ':refresh'
+
+
+def get_or_revalidate(key, compute, fresh_for=30, stale_for=600, lock_for=60,
+                      cold_wait=2.0, cache_alias='default'):
+    """
+    Return the cached value of ``key``, calling ``compute()`` to (re)build it
+    when missing or stale. On a cold cache, workers that lose the lock wait
+    up to ``cold_wait`` seconds for the winner before computing themselves.
+    """
+    cache = caches[cache_alias]
+    entry = cache.get(key)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return entry['value']
+
+    lock_key = key + LOCK_SUFFIX
+    if cache.add(lock_key, 1, lock_for):
+        try:
+            return _refresh(cache, key, compute, fresh_for, stale_for)
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry['value']
+
+    deadline = time.time() + cold_wait
+    while time.time() < deadline:
+        time.sleep(0.1)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value']
+    logger.info(f"Cache {key} still cold after {cold_wait}s; computing without the lock")
+    return compute()
+
+
+def _refresh(cache, key, compute, fresh_for, stale_for):
+    value = compute()
+    cache.set(key, {'value': value, 'fresh_until': time.time() + fresh_for}, fresh_for + stale_for)
+    return value
+
+
+def invalidate(key, cache_alias='default'):
+    """Mark ``key`` stale so the next read triggers a refresh."""
+    cache = caches[cache_alias]
+    entry = cache.get(key)
+    if entry is not None:
+        entry['fresh_until'] = 0
+        cache.set(key, entry)
@@ -0,0 +1,253 @@
+"""
+Precomputed job status counters.
+
+One small document per (scope, user) in the ``status_counters`` collection::
+
+    {'scope': 'marketing', 'user_id': 12, 'counts': {'pending': 3, 'hold': 1}, 'updated_at': ...}
+
+Counts are adjusted with ``$inc`` from model signals whenever a counted
+model's status or owner changes (or a row is created/deleted), so dashboards
+read one document instead of issuing a ``count()`` per status. Scopes
+without an owner column keep a single global document with ``user_id`` 0.
+``repair_status_counters`` (also run by the migration that introduces the
+collection) recomputes everything from the source collections.
+"""
+
+import logging
+from collections import namedtuple
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.utils import timezone
+
+logger = logging.getLogger('common')
+
+COUNTER_COLLECTION = 'status_counters'
+COUNTER_INDEX = 'status_counters_scope_user_uniq'
+GLOBAL_USER_ID = 0
+
+CounterSpec = namedtuple('CounterSpec', ['scope', 'model_label', 'owner_field'])
+
+COUNTER_SPECS = [
+    CounterSpec('marketing', 'marketing.Job', 'created_by'),
+    CounterSpec('allocator', 'allocator.Job', None),
+    CounterSpec('writer', 'writer.WriterProject', 'writer'),
+    CounterSpec('process', 'process.Job', 'process_member'),
+]
+
+_SNAPSHOT_ATTR = '_status_counter_keys'
+
+
+def counter_collection(using='default'):
+    from django.db import connections
+
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection.connection[COUNTER_COLLECTION]
+
+
+def _specs_for(model):
+    return [spec for spec in COUNTER_SPECS if spec.model_label == model._meta.label]
+
+
+def _owner_attname(model, spec):
+    if not spec.owner_field:
+        return None
+    return model._meta.get_field(spec.owner_field).attname
+
+
+def _keys_for(instance, specs):
+    """
+    (scope, user_id, status) tuples the instance currently counts towards, or
+    None when status/owner were deferred and are not known without a query.
+    """
+    values = instance.__dict__
+    if 'status' not in values:
+        return None
+    keys = []
+    for spec in specs:
+        owner_attname = _owner_attname(type(instance), spec)
+        if owner_attname is None:
+            keys.append((spec.scope, GLOBAL_USER_ID, values['status']))
+            continue
+        if owner_attname not in values:
+            return None
+        owner_id = values[owner_attname]
+        if owner_id is not None:
+            keys.append((spec.scope, owner_id, values['status']))
+    return keys
+
+
+def _stored_keys(instance, specs):
+    """Keys of the row as it is in the database (one query, only when needed)."""
+    model = type(instance)
+    columns = ['status'] + [
+        attname for attname in (_owner_attname(model, spec) for spec in specs) if attname
+    ]
+    row = model._default_manager.filter(pk=instance.pk).values(*columns).first()
+    if row is None:
+        return []
+    stored = model(**row)
+    return _keys_for(stored, specs) or []
+
+
+def apply_deltas(deltas, using='default'):
+    """``deltas``: {(scope, user_id, status): +/-n}. Applied with one bulk_write."""
+    from pymongo import UpdateOne
+
+    now = timezone.now()
+    operations = []
+    by_document = {}
+    for (scope, user_id, status), delta in deltas.items():
+        if delta and status:
+            by_document.setdefault((scope, user_id), {})[f'counts.{status}'] = delta
+    for (scope, user_id), increments in by_document.items():
+        operations.append(UpdateOne(
+            {'scope': scope, 'user_id': user_id},
+            {'$inc': increments, '$set': {'updated_at': now}},
+            upsert=True,
+        ))
+    if operations:
+        counter_collection(using).bulk_write(operations, ordered=False)
+
+
+def _diff(old_keys, new_keys):
+    deltas = {}
+    for key in old_keys:
+        deltas[key] = deltas.get(key, 0) - 1
+    for key in new_keys:
+        deltas[key] = deltas.get(key, 0) + 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+# ----------------------------------------------------------------------
+# Signal handlers
+# ----------------------------------------------------------------------
+def _remember_keys(sender, instance, **kwargs):
+    setattr(instance, _SNAPSHOT_ATTR, _keys_for(instance, _specs_for(sender)) if instance.pk else [])
+
+
+def _capture_previous(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    specs = _specs_for(sender)
+    tracked = {'status'} | {spec.owner_field for spec in specs if spec.owner_field}
+    tracked |= {sender._meta.get_field(name).attname for name in tracked}
+    if update_fields is not None and not (set(update_fields) & tracked):
+        instance._status_counter_previous = False
+        return
+    previous = getattr(instance, _SNAPSHOT_ATTR, [])
+    if previous is None and instance.pk is not None:
+        previous = _stored_keys(instance, specs)
+    instance._status_counter_previous = previous or []
+
+
+def _apply_save(sender, instance, created, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_status_counter_previous', [])
+    if previous is False:
+        return
+    specs = _specs_for(sender)
+    current = _keys_for(instance, specs)
+    if current is None:
+        # Partially loaded instance: read back what was actually stored.
+        current = _stored_keys(instance, specs)
+    deltas = _diff([] if created else previous, current)
+    try:
+        apply_deltas(deltas, using=using)
+    except Exception as exc:
+        logger.warning(f"Status counter update failed for {sender._meta.label} {instance.pk}: {exc}")
+    setattr(instance, _SNAPSHOT_ATTR, current)
+
+
+def _apply_delete(sender, instance, using='default', **kwargs):
+    keys = getattr(instance, _SNAPSHOT_ATTR, None)
+    if keys is None:
+        keys = _keys_for(instance, _specs_for(sender)) or []
+    try:
+        apply_deltas(_diff(keys, []), using=using)
+    except Exception as exc:
+        logger.warning(f"Status counter update failed for deleted {sender._meta.label} {instance.pk}: {exc}")
+
+
+def connect_status_counters():
+    """Wire the signal handlers; called from CommonConfig.ready()."""
+    for spec in COUNTER_SPECS:
+        model = apps.get_model(spec.model_label)
+        uid = f'status_counters:{spec.model_label}'
+        post_init.connect(_remember_keys, sender=model, dispatch_uid=uid)
+        pre_save.connect(_capture_previous, sender=model, dispatch_uid=uid)
+        post_save.connect(_apply_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_apply_delete, sender=model, dispatch_uid=uid)
+
+
+# ----------------------------------------------------------------------
+# Reading and repair
+# ----------------------------------------------------------------------
+def get_status_counts(scope, user=None, using='default'):
+    """Return ``{status: count}`` for ``scope``/``user`` (global scopes ignore ``user``)."""
+    user_id = getattr(user, 'pk', user) if user is not None else GLOBAL_USER_ID
+    document = counter_collection(using).find_one(
+        {'scope': scope, 'user_id': user_id}, {'counts': 1}
+    )
+    counts = (document or {}).get('counts') or {}
+    return {status: count for status, count in counts.items() if count}
+
+
+def compute_status_counts(app_registry=None, using='default'):
+    """Recount every scope from the source collections with one $group each."""
+    from django.db import connections
+
+    registry = app_registry or apps
+    connection = connections[using]
+    connection.ensure_connection()
+    db = connection.connection
+
+    documents = {}
+    for spec in COUNTER_SPECS:
+        model = registry.get_model(spec.model_label)
+        owner_column = model._meta.get_field(spec.owner_field).column if spec.owner_field else None
+        group_id = {'status': '$status', 'user_id': f'${owner_column}' if owner_column else None}
+        pipeline = [{'$group': {'_id': group_id, 'n': {'$sum': 1}}}]
+        for row in db[model._meta.db_table].aggregate(pipeline, allowDiskUse=True):
+            user_id = row['_id'].get('user_id')
+            status = row['_id'].get('status')
+            if owner_column is None:
+                user_id = GLOBAL_USER_ID
+            if user_id is None or not status:
+                continue
+            documents.setdefault((spec.scope, user_id), {})[status] = row['n']
+    return documents
+
+
+def rebuild_status_counters(app_registry=None, using='default', dry_run=False):
+    """
+    Replace all counter documents with freshly computed counts. Returns
+    ``(documents_written, documents_removed)``.
+    """
+    from pymongo import ReplaceOne
+
+    documents = compute_status_counts(app_registry, using)
+    collection = counter_collection(using)
+    collection.create_index([('scope', 1), ('user_id', 1)], name=COUNTER_INDEX, unique=True)
+
+    existing = {(doc['scope'], doc['user_id']) for doc in collection.find({}, {'scope': 1, 'user_id': 1})}
+    stale = existing - set(documents)
+    if dry_run:
+        return len(documents), len(stale)
+
+    now = timezone.now()
+    operations = [
+        ReplaceOne(
+            {'scope': scope, 'user_id': user_id},
+            {'scope': scope, 'user_id': user_id, 'counts': counts, 'updated_at': now},
+            upsert=True,
+        )
+        for (scope, user_id), counts in documents.items()
+    ]
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    for scope, user_id in stale:
+        collection.delete_one({'scope': scope, 'user_id': user_id})
+    return len(documents), len(stale)
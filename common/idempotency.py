@@ -0,0 +1,68 @@
+"""
+At-most-once execution for form submissions.
+
+A client sends an opaque token with a request that creates something (one
+token per rendered form). The first request to claim ``(scope, user, token)``
+stores the result it is about to produce; a repeated submission - a
+double-click, a retried fetch - finds the claim and replays that result
+instead of creating a duplicate. Claims expire through a TTL index after
+``IDEMPOTENCY_TTL``.
+"""
+
+import hashlib
+from datetime import timedelta
+
+from django.db import DatabaseError, transaction
+
+from common.mongo import is_duplicate_key_error
+
+IDEMPOTENCY_TTL = timedelta(hours=24)
+IDEMPOTENCY_TTL_INDEX = 'idempotency_keys_ttl'
+
+
+def idempotency_digest(scope, *parts):
+    """Fixed-length key for ``scope`` and the identifying ``parts``."""
+    raw = '\x1f'.join([scope] + [str(part) for part in parts])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def ensure_idempotency_ttl_index(collection):
+    collection.create_index(
+        [('created_at', 1)],
+        name=IDEMPOTENCY_TTL_INDEX,
+        expireAfterSeconds=int(IDEMPOTENCY_TTL.total_seconds()),
+    )
+
+
+def claim_idempotency_key(key, scope, result):
+    """
+    Try to claim ``key`` with ``result``. Returns ``(True, result)`` for the
+    first caller and ``(False, stored_result)`` for every repeat.
+    """
+    from common.models import IdempotencyKey
+
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, scope=scope, result=result)
+        return True, result
+    except DatabaseError as exc:
+        if not is_duplicate_key_error(exc):
+            raise
+    stored = IdempotencyKey.objects.filter(key=key).values_list('result', flat=True).first()
+    if stored is None:
+        # Released between our insert and the read: let the caller proceed.
+        return claim_idempotency_key(key, scope, result)
+    return False, stored
+
+
+def update_idempotency_result(key, result):
+    from common.models import IdempotencyKey
+
+    IdempotencyKey.objects.filter(key=key).update(result=result)
+
+
+def release_idempotency_key(key):
+    """Drop a claim whose request failed so the client can retry it."""
+    from common.models import IdempotencyKey
+
+    IdempotencyKey.objects.filter(key=key).delete()
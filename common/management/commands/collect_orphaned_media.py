@@ -0,0 +1,108 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from common.services import MediaReferenceIndex, iter_file_fields, iter_orphan_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Find files under MEDIA_ROOT that no FileField references any more "
+        "(deleted attachments, replaced profile images, cascaded submissions) "
+        "and report or delete them in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report orphaned files, do not delete anything.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of orphaned files handled per batch (default: 500).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched per database round trip while indexing references (default: 2000).',
+        )
+        parser.add_argument(
+            '--min-age-hours',
+            type=float,
+            default=24,
+            help='Ignore files modified more recently than this (default: 24).',
+        )
+        parser.add_argument(
+            '--prune-empty-dirs',
+            action='store_true',
+            help='Remove directories left empty after deleting orphans.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = max(1, options['batch_size'])
+        min_age_seconds = max(0, int(options['min_age_hours'] * 3600))
+        media_root = os.path.abspath(str(settings.MEDIA_ROOT))
+
+        fields = [f"{model._meta.label}.{field.name}" for model, field in iter_file_fields()]
+        self.stdout.write(f"Indexing references from {len(fields)} file fields: {', '.join(fields)}")
+        index = MediaReferenceIndex.build(chunk_size=options['chunk_size'])
+        self.stdout.write(f"Indexed {len(index)} live file references.")
+
+        orphan_count = 0
+        orphan_bytes = 0
+        deleted_count = 0
+        touched_dirs = set()
+
+        for batch_number, batch in enumerate(
+            iter_orphan_batches(index, batch_size=batch_size, min_age_seconds=min_age_seconds),
+            start=1,
+        ):
+            batch_bytes = 0
+            for name in batch:
+                path = os.path.join(media_root, name)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                batch_bytes += size
+                if dry_run:
+                    self.stdout.write(f"  orphan: {name} ({size} bytes)")
+                    continue
+                try:
+                    os.remove(path)
+                except OSError as exc:
+                    self.stderr.write(f"  failed to delete {name}: {exc}")
+                    continue
+                deleted_count += 1
+                touched_dirs.add(os.path.dirname(path))
+
+            orphan_count += len(batch)
+            orphan_bytes += batch_bytes
+            verb = 'Found' if dry_run else 'Processed'
+            self.stdout.write(f"Batch {batch_number}: {verb} {len(batch)} orphans ({batch_bytes} bytes)")
+
+        if options['prune_empty_dirs'] and not dry_run:
+            self._prune_empty_dirs(touched_dirs, media_root)
+
+        summary = f"{orphan_count} orphaned files, {orphan_bytes / (1024 * 1024):.2f} MB"
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"Dry run: {summary} would be deleted."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted_count} of {summary}."))
+
+    def _prune_empty_dirs(self, directories, media_root):
+        """Remove empty directories bottom-up, never touching MEDIA_ROOT itself."""
+        for directory in sorted(directories, key=len, reverse=True):
+            current = directory
+            while current.startswith(media_root) and current != media_root:
+                try:
+                    os.rmdir(current)
+                except OSError:
+                    break
+                current = os.path.dirname(current)
@@ -0,0 +1,49 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from common.timeline import SCOPE_ALLOCATOR, SCOPE_MARKETING, rebuild_timeline
+
+SCOPE_MODELS = {
+    SCOPE_MARKETING: 'marketing.Job',
+    SCOPE_ALLOCATOR: 'allocator.Job',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialised job timelines from the job rows, their "
+        "action logs and summary versions (marketing) or AllocationHistory "
+        "and JobQuery (allocator). Timelines are also seeded lazily "
+        "on first view, so this is only needed for repairs or warm-up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scope',
+            choices=sorted(SCOPE_MODELS),
+            action='append',
+            help='Only rebuild this scope (repeatable). Defaults to all.',
+        )
+        parser.add_argument(
+            '--job',
+            action='append',
+            default=[],
+            help='Only rebuild these jobs (marketing system_id or allocator job id).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for scope in options['scope'] or sorted(SCOPE_MODELS):
+            model = apps.get_model(SCOPE_MODELS[scope])
+            queryset = model.objects.all()
+            if options['job']:
+                lookup = 'system_id__in' if scope == SCOPE_MARKETING else 'pk__in'
+                queryset = queryset.filter(**{lookup: options['job']})
+            rebuilt = 0
+            for job in queryset.iterator(chunk_size=options['chunk_size']):
+                try:
+                    rebuild_timeline(scope, job)
+                    rebuilt += 1
+                except Exception as exc:
+                    self.stderr.write(f"  {scope} job {job.pk}: {exc}")
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} {scope} timelines."))
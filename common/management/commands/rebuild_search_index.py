@@ -0,0 +1,51 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from common.mongo import get_collection
+from common.search import (
+    SEARCH_TEXT_INDEX,
+    SearchIndexedModel,
+    backfill_search_keys,
+    ensure_search_indexes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the search_keys and weighted text indexes for every searchable "
+        "model and recompute search_keys for existing documents."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recreate',
+            action='store_true',
+            help='Drop the text index first (needed after changing SEARCH_TEXT_WEIGHTS).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Documents rewritten per bulk_write (default: 500).',
+        )
+
+    def handle(self, *args, **options):
+        for model in apps.get_models():
+            if not issubclass(model, SearchIndexedModel):
+                continue
+            collection = get_collection(model)
+            if options['recreate']:
+                try:
+                    collection.drop_index(SEARCH_TEXT_INDEX)
+                except Exception:
+                    pass
+            id_columns = [model._meta.get_field(name).column for name in model.SEARCH_ID_FIELDS]
+            weights = {
+                model._meta.get_field(name).column: weight
+                for name, weight in model.SEARCH_TEXT_WEIGHTS.items()
+            }
+            updated = backfill_search_keys(collection, id_columns, batch_size=max(1, options['batch_size']))
+            ensure_search_indexes(collection, weights)
+            self.stdout.write(f"{model._meta.label}: indexes ensured, {updated} documents re-keyed")
+
+        self.stdout.write(self.style.SUCCESS('Search indexes are up to date.'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from common.counters import (
+    COUNTER_COLLECTION,
+    compute_status_counts,
+    counter_collection,
+    rebuild_status_counters,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-user job status counters from the source "
+        "collections, replacing whatever the $inc updates have accumulated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report counters that have drifted from the source collections.',
+        )
+
+    def handle(self, *args, **options):
+        expected = compute_status_counts()
+        stored = {
+            (document['scope'], document['user_id']): {
+                status: n for status, n in (document.get('counts') or {}).items() if n
+            }
+            for document in counter_collection().find({}, {'scope': 1, 'user_id': 1, 'counts': 1})
+        }
+        drifted = 0
+        for key in sorted(set(stored) | set(expected), key=str):
+            if stored.get(key, {}) != expected.get(key, {}):
+                drifted += 1
+                self.stdout.write(
+                    f"  drift {key[0]}/{key[1]}: stored {stored.get(key, {})} != actual {expected.get(key, {})}"
+                )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run: {drifted} counter documents have drifted."))
+            return
+
+        written, removed = rebuild_status_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} documents in {COUNTER_COLLECTION} ({drifted} had drifted, {removed} stale removed)."
+        ))
@@ -0,0 +1,128 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from common.mongo import get_collection
+from common.services import MediaReferenceIndex, iter_file_fields
+from common.uploads import is_sharded, to_legacy, to_sharded
+
+
+class Command(BaseCommand):
+    help = (
+        "Move existing uploads into the sharded xx/yy/ layout and rewrite the "
+        "FileField paths in bulk. The new file is hard-linked next to the old "
+        "one so legacy URLs keep working until --remove-legacy is run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would move without touching files or documents.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Documents rewritten per bulk_write (default: 500).',
+        )
+        parser.add_argument(
+            '--remove-legacy',
+            action='store_true',
+            help='Delete pre-migration copies of files that are already sharded.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = max(1, options['batch_size'])
+
+        if options['remove_legacy']:
+            self._remove_legacy(dry_run)
+            return
+
+        total_moved = 0
+        total_missing = 0
+        for model, field in iter_file_fields():
+            prefix = getattr(field.upload_to, 'shard_prefix', None)
+            if not prefix:
+                continue
+            moved, missing = self._shard_field(model, field, prefix, batch_size, dry_run)
+            total_moved += moved
+            total_missing += missing
+            if moved or missing:
+                self.stdout.write(
+                    f"{model._meta.label}.{field.name}: {moved} sharded, {missing} missing on disk"
+                )
+
+        verb = 'Would shard' if dry_run else 'Sharded'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {total_moved} files ({total_missing} referenced files were missing)."
+        ))
+
+    def _shard_field(self, model, field, prefix, batch_size, dry_run):
+        storage = field.storage
+        collection = None if dry_run else get_collection(model)
+        pk_column = model._meta.pk.column
+        pending = []
+        moved = 0
+        missing = 0
+
+        rows = model._default_manager.values_list('pk', field.attname)
+        for pk, name in rows.iterator(chunk_size=batch_size):
+            if not name or is_sharded(name, prefix):
+                continue
+            target = to_sharded(name, prefix)
+            if target == name:
+                continue
+            source_path = storage.path(name)
+            if not os.path.exists(source_path):
+                missing += 1
+                continue
+            moved += 1
+            if dry_run:
+                continue
+
+            target_path = storage.path(target)
+            if not os.path.exists(target_path):
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                try:
+                    os.link(source_path, target_path)
+                except OSError:
+                    shutil.copy2(source_path, target_path)
+
+            pending.append(UpdateOne({pk_column: pk}, {'$set': {field.column: target}}))
+            if len(pending) >= batch_size:
+                collection.bulk_write(pending, ordered=False)
+                pending = []
+
+        if pending:
+            collection.bulk_write(pending, ordered=False)
+        return moved, missing
+
+    def _remove_legacy(self, dry_run):
+        """Delete legacy copies whose name is no longer referenced anywhere."""
+        index = MediaReferenceIndex.build()
+        removed = 0
+        for model, field in iter_file_fields():
+            prefix = getattr(field.upload_to, 'shard_prefix', None)
+            if not prefix:
+                continue
+            storage = field.storage
+            names = model._default_manager.values_list(field.attname, flat=True)
+            for name in names.iterator(chunk_size=2000):
+                if not name or not is_sharded(name, prefix):
+                    continue
+                legacy = to_legacy(name, prefix)
+                if legacy in index:
+                    continue
+                legacy_path = storage.path(legacy)
+                if not os.path.exists(legacy_path):
+                    continue
+                removed += 1
+                if not dry_run:
+                    os.remove(legacy_path)
+
+        verb = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} legacy files."))
@@ -0,0 +1,168 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from common.models import ArchivedMedia
+
+CLOSED_STATUSES = ['completed', 'cancelled']
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move attachments and process submissions of jobs closed for more "
+        "than N days from MEDIA_ROOT to MEDIA_ARCHIVE_ROOT, compressing "
+        "documents where it pays off. Files are rehydrated on next access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Only tier jobs closed (last updated) more than this many days ago (default: 90).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the files that would be archived without moving them.',
+        )
+        parser.add_argument(
+            '--min-savings',
+            type=float,
+            default=0.05,
+            help='Store uncompressed unless compression saves at least this fraction (default: 0.05).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Job ids per lookup query (default: 500).',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Only print archive tier statistics.',
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'archive'):
+            raise CommandError('DEFAULT_FILE_STORAGE must be common.storage.TieredFileSystemStorage')
+
+        if options['stats']:
+            self._print_stats()
+            return
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        chunk_size = max(1, options['chunk_size'])
+        dry_run = options['dry_run']
+
+        archived = 0
+        skipped = 0
+        original_bytes = 0
+        stored_bytes = 0
+        records = []
+
+        for name in self._iter_closed_job_files(cutoff, chunk_size):
+            if not default_storage.is_hot(name):
+                skipped += 1
+                continue
+            if dry_run:
+                size = default_storage.size(name)
+                archived += 1
+                original_bytes += size
+                self.stdout.write(f"  would archive: {name} ({size} bytes)")
+                continue
+
+            try:
+                codec, original_size, stored_size = default_storage.archive(
+                    name, min_savings=options['min_savings']
+                )
+            except OSError as exc:
+                self.stderr.write(f"  failed to archive {name}: {exc}")
+                continue
+            archived += 1
+            original_bytes += original_size
+            stored_bytes += stored_size
+            records.append(ArchivedMedia(
+                name=name, codec=codec, original_size=original_size, stored_size=stored_size,
+            ))
+            if len(records) >= chunk_size:
+                self._save_records(records)
+                records = []
+
+        if records:
+            self._save_records(records)
+
+        mb = 1024 * 1024
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"Dry run: {archived} files ({original_bytes / mb:.2f} MB) would be archived, "
+                f"{skipped} already cold or missing."
+            ))
+            return
+
+        saved = original_bytes - stored_bytes
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} files: {original_bytes / mb:.2f} MB -> {stored_bytes / mb:.2f} MB "
+            f"({saved / mb:.2f} MB saved), {skipped} already cold or missing."
+        ))
+
+    def _iter_closed_job_files(self, cutoff, chunk_size):
+        from marketing.models import Job as MarketingJob, JobAttachment
+        from process.models import Job as ProcessJob, JobComment, ProcessSubmission
+
+        marketing_ids = list(
+            MarketingJob.objects.filter(status__in=CLOSED_STATUSES, updated_at__lt=cutoff)
+            .values_list('pk', flat=True)
+        )
+        for ids in _chunks(marketing_ids, chunk_size):
+            yield from self._names(JobAttachment.objects.filter(job_id__in=ids), ['file'])
+
+        closed_process_jobs = ProcessJob.objects.filter(status__in=CLOSED_STATUSES, updated_at__lt=cutoff)
+        yield from self._names(closed_process_jobs, ['writer_final_file'])
+
+        process_ids = list(closed_process_jobs.values_list('pk', flat=True))
+        submission_fields = ['ai_file', 'plag_file', 'final_file', 'grammarly_report', 'other_files']
+        for ids in _chunks(process_ids, chunk_size):
+            yield from self._names(ProcessSubmission.objects.filter(job_id__in=ids), submission_fields)
+            yield from self._names(JobComment.objects.filter(job_id__in=ids), ['attachment'])
+
+    def _names(self, queryset, fields):
+        for row in queryset.values_list(*fields).iterator(chunk_size=2000):
+            for name in row:
+                if name:
+                    yield name
+
+    def _save_records(self, records):
+        names = [record.name for record in records]
+        existing = set(ArchivedMedia.objects.filter(name__in=names).values_list('name', flat=True))
+        ArchivedMedia.objects.bulk_create([r for r in records if r.name not in existing])
+
+    def _print_stats(self):
+        count = 0
+        original_bytes = 0
+        stored_bytes = 0
+        rehydrations = 0
+        by_codec = {}
+        rows = ArchivedMedia.objects.values_list('codec', 'original_size', 'stored_size', 'rehydrate_count')
+        for codec, original_size, stored_size, rehydrate_count in rows.iterator(chunk_size=2000):
+            count += 1
+            original_bytes += original_size
+            stored_bytes += stored_size
+            rehydrations += rehydrate_count
+            by_codec[codec] = by_codec.get(codec, 0) + 1
+
+        mb = 1024 * 1024
+        ratio = (stored_bytes / original_bytes) if original_bytes else 1
+        self.stdout.write(f"Archived files: {count} ({', '.join(f'{k}: {v}' for k, v in sorted(by_codec.items()))})")
+        self.stdout.write(f"Original size:  {original_bytes / mb:.2f} MB")
+        self.stdout.write(f"Stored size:    {stored_bytes / mb:.2f} MB (ratio {ratio:.2f})")
+        self.stdout.write(f"Rehydrations:   {rehydrations}")
+        self.stdout.write(self.style.SUCCESS(f"Bytes saved:    {original_bytes - stored_bytes}"))
@@ -0,0 +1,33 @@
+# Generated by Django 3.1.12 on 2026-10-19 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMedia',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=500, unique=True)),
+                ('codec', models.CharField(choices=[('zstd', 'Zstandard'), ('gzip', 'Gzip'), ('none', 'Uncompressed')], max_length=10)),
+                ('original_size', models.BigIntegerField(default=0)),
+                ('stored_size', models.BigIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('rehydrated_at', models.DateTimeField(blank=True, null=True)),
+                ('rehydrate_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Archived Media',
+                'verbose_name_plural': 'Archived Media',
+                'db_table': 'archived_media',
+                'ordering': ['-archived_at'],
+            },
+        ),
+    ]
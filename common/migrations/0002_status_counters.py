@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from common.counters import COUNTER_COLLECTION, rebuild_status_counters
+
+
+def build_counters(apps, schema_editor):
+    rebuild_status_counters(app_registry=apps, using=schema_editor.connection.alias)
+
+
+def drop_counters(apps, schema_editor):
+    schema_editor.connection.connection[COUNTER_COLLECTION].drop()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+        ('marketing', '0006_job_search_keys'),
+        ('allocator', '0005_auto_20261019_0609'),
+        ('writer', '0003_writerproject_search_keys'),
+        ('process', '0002_auto_20261019_0609'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_counters, drop_counters),
+    ]
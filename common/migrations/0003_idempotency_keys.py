@@ -0,0 +1,43 @@
+# Generated by Django 3.1.12 on 2026-10-19 00:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+from common.idempotency import IDEMPOTENCY_TTL_INDEX, ensure_idempotency_ttl_index
+
+
+def _get_collection(model, schema_editor):
+    return schema_editor.connection.connection[model._meta.db_table]
+
+
+def create_ttl_index(apps, schema_editor):
+    ensure_idempotency_ttl_index(_get_collection(apps.get_model('common', 'IdempotencyKey'), schema_editor))
+
+
+def drop_ttl_index(apps, schema_editor):
+    _get_collection(apps.get_model('common', 'IdempotencyKey'), schema_editor).drop_index(IDEMPOTENCY_TTL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_status_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('scope', models.CharField(max_length=64)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'idempotency_keys',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(create_ttl_index, drop_ttl_index),
+    ]
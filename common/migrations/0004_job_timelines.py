@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from common.timeline import TIMELINE_ARCHIVE_COLLECTION, TIMELINE_COLLECTION, ensure_timeline_indexes
+
+
+def create_indexes(apps, schema_editor):
+    ensure_timeline_indexes(schema_editor.connection.connection)
+
+
+def drop_timelines(apps, schema_editor):
+    db = schema_editor.connection.connection
+    db[TIMELINE_COLLECTION].drop()
+    db[TIMELINE_ARCHIVE_COLLECTION].drop()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_idempotency_keys'),
+        ('accounts', '0011_customuser_profile_image_digest'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_timelines),
+    ]
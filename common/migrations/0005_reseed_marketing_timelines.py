@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from common.timeline import SCOPE_MARKETING, TIMELINE_ARCHIVE_COLLECTION, TIMELINE_COLLECTION
+
+# Created by earlier builds of 0004; ActivityLog.metadata is stored as a JSON
+# string, so an index on one of its keys never matches anything.
+ACTIVITY_JOB_INDEX = 'activity_logs_job_system_id'
+
+
+def reseed_marketing_timelines(apps, schema_editor):
+    db = schema_editor.connection.connection
+    if ACTIVITY_JOB_INDEX in db['activity_logs'].index_information():
+        db['activity_logs'].drop_index(ACTIVITY_JOB_INDEX)
+    # Seeded from that index, these came out empty; drop them so the next
+    # read seeds them again from the job's own rows.
+    prefix = {'$regex': f'^{SCOPE_MARKETING}:'}
+    db[TIMELINE_COLLECTION].delete_many({'_id': prefix})
+    db[TIMELINE_ARCHIVE_COLLECTION].delete_many({'timeline_id': prefix})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_job_timelines'),
+    ]
+
+    operations = [
+        migrations.RunPython(reseed_marketing_timelines, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,52 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class ArchivedMedia(models.Model):
+    """Bookkeeping for files moved to the cold tier by tier_closed_job_media."""
+
+    CODEC_CHOICES = [
+        ('zstd', 'Zstandard'),
+        ('gzip', 'Gzip'),
+        ('none', 'Uncompressed'),
+    ]
+
+    name = models.CharField(max_length=500, unique=True)
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES)
+    original_size = models.BigIntegerField(default=0)
+    stored_size = models.BigIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    rehydrated_at = models.DateTimeField(null=True, blank=True)
+    rehydrate_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'archived_media'
+        ordering = ['-archived_at']
+        verbose_name = 'Archived Media'
+        verbose_name_plural = 'Archived Media'
+
+    def __str__(self):
+        return f"{self.name} ({self.codec})"
+
+    @property
+    def bytes_saved(self):
+        return max(0, self.original_size - self.stored_size)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a request that must be applied at most once, keyed by a
+    client-supplied token (see ``common.idempotency``). Expired by a TTL index.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    scope = models.CharField(max_length=64)
+    result = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.scope} {self.key[:12]}"
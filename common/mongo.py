@@ -0,0 +1,41 @@
+"""Direct pymongo access for operations djongo cannot express."""
+
+from django.db import connections
+
+
+def get_collection(model, using='default'):
+    """Return the raw pymongo collection backing ``model``."""
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection.connection[model._meta.db_table]
+
+
+DUPLICATE_KEY_CODES = {11000, 11001, 12582}
+
+
+def _duplicate_key_failure(exc):
+    from pymongo.errors import BulkWriteError, OperationFailure
+
+    if isinstance(exc, BulkWriteError):
+        write_errors = (exc.details or {}).get('writeErrors') or []
+        return any(error.get('code') in DUPLICATE_KEY_CODES for error in write_errors)
+    return isinstance(exc, OperationFailure) and exc.code in DUPLICATE_KEY_CODES
+
+
+def is_duplicate_key_error(exc):
+    """
+    True when ``exc`` comes from a unique index violation. djongo inserts
+    with ``insert_many``, so the violation surfaces as pymongo's
+    ``BulkWriteError`` (code 11000 in its ``writeErrors``) wrapped in
+    ``SQLDecodeError`` and two generic ``DatabaseError`` layers; the cause
+    chain is walked down to it.
+    """
+    from django.db import IntegrityError
+
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, IntegrityError) or _duplicate_key_failure(exc):
+            return True
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return False
@@ -0,0 +1,283 @@
+"""
+Keyset (cursor) pagination.
+
+``CursorPaginator`` pages through a queryset by remembering the sort key of
+the last row shown instead of an OFFSET, so page 500 costs the same as page 1.
+Page tokens are opaque signed strings; the page object mimics
+``django.core.paginator.Page`` closely enough that the existing list templates
+(``?page={{ jobs.next_page_number }}`` etc.) keep working unchanged:
+
+* ``next_page_number``/``previous_page_number`` return cursor tokens;
+* ``?page=1`` is the first page and ``?page=<num_pages>`` the last page;
+* any other plain number falls back to OFFSET paging so old bookmarks work.
+"""
+
+import math
+from datetime import date, datetime
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
+
+try:
+    from bson import ObjectId
+except ImportError:  # pragma: no cover
+    ObjectId = None
+
+CURSOR_SALT = 'common.pagination.cursor'
+
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATED = 'estimated'
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if ObjectId is not None and isinstance(value, ObjectId):
+        return ['oid', str(value)]
+    return ['v', value]
+
+
+def _decode_value(encoded):
+    kind, value = encoded
+    if kind == 'dt':
+        return parse_datetime(value)
+    if kind == 'd':
+        return parse_date(value)
+    if kind == 'oid':
+        return ObjectId(value)
+    return value
+
+
+def _keyset_filter(fields, values, reverse=False):
+    """
+    Rows strictly after ``values`` in ``fields`` order, e.g. for
+    (-created_at, -pk): created_at < v0 OR (created_at = v0 AND pk < v1).
+    """
+    condition = Q()
+    for position, (name, descending) in enumerate(fields):
+        if descending != reverse:
+            lookup = f'{name}__lt'
+        else:
+            lookup = f'{name}__gt'
+        branch = Q(**{lookup: values[position]})
+        for prev_position in range(position):
+            branch &= Q(**{fields[prev_position][0]: values[prev_position]})
+        condition |= branch
+    return condition
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over ``queryset``. The sort order comes from
+    ``ordering`` or the queryset's own ``order_by``; the primary key is always
+    appended as a tie-breaker.
+
+    ``count_mode='estimated'`` avoids a full count on large collections: an
+    unfiltered queryset uses the collection's metadata count, a filtered one
+    counts at most ``estimate_cap`` rows.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None, count_mode=COUNT_EXACT, estimate_cap=1000):
+        self.per_page = int(per_page)
+        self.count_mode = count_mode
+        self.estimate_cap = estimate_cap
+        self.fields = self._normalize_ordering(ordering or queryset.query.order_by or ['-pk'])
+        self.queryset = queryset.order_by(*self._order_by())
+        self.count_is_estimate = False
+
+    @staticmethod
+    def _normalize_ordering(ordering):
+        fields = []
+        for item in ordering:
+            item = str(item)
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            if name in ('pk', 'id', '_id'):
+                continue
+            fields.append((name, descending))
+        tie_descending = fields[0][1] if fields else True
+        fields.append(('pk', tie_descending))
+        return fields
+
+    def _order_by(self, reverse=False):
+        return [
+            f"{'-' if descending != reverse else ''}{name}"
+            for name, descending in self.fields
+        ]
+
+    # ------------------------------------------------------------------
+    # Counting
+    # ------------------------------------------------------------------
+    @cached_property
+    def count(self):
+        if self.count_mode == COUNT_ESTIMATED:
+            return self._estimated_count()
+        return self.queryset.count()
+
+    def _estimated_count(self):
+        if not self.queryset.query.where:
+            try:
+                from common.mongo import get_collection
+                self.count_is_estimate = True
+                return get_collection(self.queryset.model).estimated_document_count()
+            except Exception:
+                self.count_is_estimate = False
+        # A sliced .count() becomes a COUNT over a subquery, which djongo
+        # does not translate reliably; a capped primary-key fetch is a plain
+        # find().limit().
+        capped = len(self.queryset.order_by().values_list('pk', flat=True)[:self.estimate_cap + 1])
+        if capped > self.estimate_cap:
+            self.count_is_estimate = True
+            return self.estimate_cap
+        return capped
+
+    @property
+    def count_display(self):
+        """``count`` formatted for templates, e.g. ``1000+`` when capped."""
+        count = self.count
+        return f"{count}+" if self.count_is_estimate else count
+
+    @cached_property
+    def num_pages(self):
+        if not self.count:
+            return 1
+        return max(1, math.ceil(self.count / self.per_page))
+
+    # ------------------------------------------------------------------
+    # Tokens
+    # ------------------------------------------------------------------
+    def _row_key(self, row):
+        return [_encode_value(getattr(row, name)) for name, _ in self.fields]
+
+    def make_token(self, direction, row, number):
+        return signing.dumps(
+            {'d': direction, 'k': self._row_key(row), 'n': number},
+            salt=CURSOR_SALT,
+            compress=True,
+        )
+
+    def _read_token(self, token):
+        try:
+            payload = signing.loads(token, salt=CURSOR_SALT)
+            values = [_decode_value(item) for item in payload['k']]
+            if len(values) != len(self.fields) or payload['d'] not in ('n', 'p'):
+                return None
+            return payload['d'], values, max(1, int(payload['n']))
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+    def get_page(self, token=None):
+        """Return a page for ``token``; invalid tokens yield the first page."""
+        token = (token or '').strip()
+        if not token or token == '1':
+            return self._first_page()
+        if token.isdigit():
+            number = int(token)
+            if number >= self.num_pages:
+                return self._last_page()
+            return self._offset_page(number)
+
+        parsed = self._read_token(token)
+        if parsed is None:
+            return self._first_page()
+        direction, values, number = parsed
+        if direction == 'n':
+            rows = list(
+                self.queryset.filter(_keyset_filter(self.fields, values))[:self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            return CursorPage(rows[:self.per_page], number, self, has_previous=True, has_next=has_more)
+
+        rows = list(
+            self.queryset.order_by(*self._order_by(reverse=True))
+            .filter(_keyset_filter(self.fields, values, reverse=True))[:self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = list(reversed(rows[:self.per_page]))
+        if not has_more:
+            number = 1
+        return CursorPage(rows, number, self, has_previous=has_more, has_next=True)
+
+    def _first_page(self):
+        rows = list(self.queryset[:self.per_page + 1])
+        return CursorPage(rows[:self.per_page], 1, self, has_previous=False,
+                          has_next=len(rows) > self.per_page)
+
+    def _last_page(self):
+        count = self.count
+        size = count % self.per_page if not self.count_is_estimate else 0
+        size = size or self.per_page
+        rows = list(self.queryset.order_by(*self._order_by(reverse=True))[:size + 1])
+        has_previous = len(rows) > size
+        rows = list(reversed(rows[:size]))
+        number = self.num_pages if has_previous else 1
+        return CursorPage(rows, number, self, has_previous=has_previous, has_next=False)
+
+    def _offset_page(self, number):
+        start = (number - 1) * self.per_page
+        rows = list(self.queryset[start:start + self.per_page + 1])
+        if not rows:
+            return self._first_page()
+        return CursorPage(rows[:self.per_page], number, self, has_previous=number > 1,
+                          has_next=len(rows) > self.per_page)
+
+
+class CursorPage:
+    """Template-compatible stand-in for ``django.core.paginator.Page``."""
+
+    def __init__(self, object_list, number, paginator, has_previous, has_next):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next and bool(object_list)
+
+    def __repr__(self):
+        return f"<CursorPage {self.number}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def next_page_number(self):
+        """Opaque token for the following page (used as ``?page=``)."""
+        if not self._has_next:
+            return None
+        return self.paginator.make_token('n', self.object_list[-1], self.number + 1)
+
+    def previous_page_number(self):
+        """Opaque token for the preceding page (used as ``?page=``)."""
+        if not self._has_previous:
+            return None
+        if self.number <= 2:
+            return '1'
+        return self.paginator.make_token('p', self.object_list[0], self.number - 1)
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
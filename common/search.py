@@ -0,0 +1,165 @@
+"""
+Indexed search for job collections.
+
+Two MongoDB indexes back every searchable model:
+
+* a multikey index on ``search_keys`` - lower-cased identifiers (and their
+  punctuation-free form) kept up to date in ``save()``; anchored regexes on it
+  give index-bounded *prefix* matching for system/job IDs;
+* a weighted ``$text`` index over the ID and free-text fields, giving
+  stemmed word matching with relevance scores.
+
+``search_ranked_ids`` merges both into one ranked list of primary keys, so
+views filter with ``pk__in`` instead of unanchored ``icontains`` regexes that
+scan the whole collection.
+"""
+
+import logging
+import re
+
+from django.db import models
+
+logger = logging.getLogger('common')
+
+SEARCH_KEYS_INDEX = 'search_keys_idx'
+SEARCH_TEXT_INDEX = 'search_text_idx'
+
+# Score bonuses on top of $text relevance (which is typically 0.5 - 15).
+EXACT_ID_SCORE = 1000.0
+PREFIX_ID_SCORE = 100.0
+
+NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def build_search_keys(*identifiers):
+    """``'CH-A3K9M2'`` -> ``['ch-a3k9m2', 'cha3k9m2']`` (deduplicated, order kept)."""
+    keys = []
+    for identifier in identifiers:
+        if not identifier:
+            continue
+        lowered = str(identifier).strip().lower()
+        for key in (lowered, NON_ALNUM.sub('', lowered)):
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+def ensure_search_indexes(collection, text_weights):
+    """Create the search_keys and weighted text indexes on ``collection``."""
+    collection.create_index([('search_keys', 1)], name=SEARCH_KEYS_INDEX)
+    collection.create_index(
+        [(field, 'text') for field in text_weights],
+        name=SEARCH_TEXT_INDEX,
+        weights=text_weights,
+        default_language='english',
+    )
+
+
+def backfill_search_keys(collection, id_columns, batch_size=500):
+    """Recompute ``search_keys`` for every document; returns the number updated."""
+    from pymongo import UpdateOne
+
+    projection = {column: 1 for column in id_columns}
+    pending = []
+    updated = 0
+    for document in collection.find({}, projection, batch_size=batch_size):
+        keys = build_search_keys(*(document.get(column) for column in id_columns))
+        pending.append(UpdateOne({'_id': document['_id']}, {'$set': {'search_keys': keys}}))
+        if len(pending) >= batch_size:
+            updated += collection.bulk_write(pending, ordered=False).modified_count
+            pending = []
+    if pending:
+        updated += collection.bulk_write(pending, ordered=False).modified_count
+    return updated
+
+
+def search_ranked_ids(model, query, filters=None, limit=200):
+    """
+    Return up to ``limit`` primary keys of ``model`` matching ``query``, best
+    first. Exact ID matches rank above ID prefix matches, which rank above
+    pure text matches. ``filters`` is a raw Mongo filter ANDed to every phase;
+    callers that narrow the results further must pass their filters here, or
+    the cap applies before them and drops matches.
+    """
+    from common.mongo import get_collection
+
+    query = (query or '').strip()
+    if not query:
+        return []
+
+    collection = get_collection(model)
+    pk_column = model._meta.pk.column
+    base = dict(filters or {})
+    scores = {}
+
+    needles = build_search_keys(query)
+    if needles:
+        for document in collection.find(
+            {**base, 'search_keys': {'$in': needles}}, {pk_column: 1},
+        ).limit(limit):
+            scores[document[pk_column]] = EXACT_ID_SCORE
+        # One anchored, case-sensitive regex per key so each gets tight index
+        # bounds; newest first so the cap keeps a deterministic slice.
+        prefixes = [re.compile('^' + re.escape(needle)) for needle in needles]
+        cursor = collection.find(
+            {**base, 'search_keys': {'$in': prefixes}}, {pk_column: 1},
+        ).sort(pk_column, -1).limit(limit)
+        for document in cursor:
+            scores.setdefault(document[pk_column], PREFIX_ID_SCORE)
+
+    try:
+        cursor = collection.find(
+            {**base, '$text': {'$search': query}},
+            {pk_column: 1, 'score': {'$meta': 'textScore'}},
+        ).sort([('score', {'$meta': 'textScore'})]).limit(limit)
+        for document in cursor:
+            pk = document[pk_column]
+            scores[pk] = scores.get(pk, 0.0) + float(document.get('score', 0.0))
+    except Exception as exc:
+        # Missing text index (rebuild_search_index not run yet): ID matches still work.
+        logger.warning(f"Text search on {model._meta.db_table} failed: {exc}")
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [pk for pk, _ in ranked[:limit]]
+
+
+def order_by_rank(objects, ranked_ids):
+    """Sort model instances in the order of ``ranked_ids``."""
+    position = {pk: index for index, pk in enumerate(ranked_ids)}
+    return sorted(objects, key=lambda obj: position.get(obj.pk, len(position)))
+
+
+class SearchKeysField(models.JSONField):
+    """
+    JSONField stored as a native array under djongo. Django's JSONField
+    serialises to a string before djongo sees it, which hides the keys
+    from the multikey index and from ``$in``/regex matching.
+    """
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if connection.vendor == 'djongo':
+            return list(value or [])
+        return super().get_db_prep_value(value, connection, prepared)
+
+
+class SearchIndexedModel(models.Model):
+    """
+    Abstract base keeping ``search_keys`` in sync with ``SEARCH_ID_FIELDS`` on
+    every save. Subclasses also declare ``SEARCH_TEXT_WEIGHTS`` for the text
+    index built by ``rebuild_search_index``.
+    """
+
+    SEARCH_ID_FIELDS = ()
+    SEARCH_TEXT_WEIGHTS = {}
+
+    search_keys = SearchKeysField(default=list, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.search_keys = build_search_keys(*(getattr(self, name) for name in self.SEARCH_ID_FIELDS))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.SEARCH_ID_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | {'search_keys'}
+        super().save(*args, **kwargs)
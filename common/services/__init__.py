@@ -0,0 +1,13 @@
+from .media_references import (
+    MediaReferenceIndex,
+    iter_file_fields,
+    iter_media_files,
+    iter_orphan_batches,
+)
+
+__all__ = [
+    'MediaReferenceIndex',
+    'iter_file_fields',
+    'iter_media_files',
+    'iter_orphan_batches',
+]
@@ -0,0 +1,122 @@
+"""Helpers for reconciling files under MEDIA_ROOT with FileField references."""
+
+import hashlib
+import os
+import time
+from array import array
+from bisect import bisect_left
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+
+def _path_hash(name):
+    """Return a stable 64-bit fingerprint for a storage-relative file name."""
+    normalized = name.replace('\\', '/').lstrip('/')
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def iter_file_fields():
+    """
+    Yield (model, field) for every concrete FileField/ImageField in the project
+    whose storage writes under MEDIA_ROOT.
+    """
+    media_root = os.path.abspath(str(settings.MEDIA_ROOT))
+    for model in apps.get_models():
+        if model._meta.proxy or not model._meta.managed:
+            continue
+        for field in model._meta.concrete_fields:
+            if not isinstance(field, models.FileField):
+                continue
+            location = getattr(field.storage, 'location', None)
+            if location and os.path.abspath(str(location)) != media_root:
+                continue
+            yield model, field
+
+
+def iter_variant_providers():
+    """
+    Yield ``iter_media_variants(chunk_size)`` classmethods of models that keep
+    derived files (thumbnails etc.) which no FileField points at directly.
+    """
+    for model in apps.get_models():
+        provider = getattr(model, 'iter_media_variants', None)
+        if callable(provider):
+            yield provider
+
+
+class MediaReferenceIndex:
+    """
+    Sorted array of 64-bit fingerprints for every file name referenced from the
+    database. Memory stays at ~8 bytes per reference regardless of path length.
+    A fingerprint collision can only ever keep an orphan alive, never delete a
+    live file.
+    """
+
+    def __init__(self, fingerprints=None):
+        self._fingerprints = array('Q', sorted(fingerprints or ()))
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def __contains__(self, name):
+        value = _path_hash(name)
+        pos = bisect_left(self._fingerprints, value)
+        return pos < len(self._fingerprints) and self._fingerprints[pos] == value
+
+    @classmethod
+    def build(cls, chunk_size=2000):
+        """Stream every FileField value from the database into a new index."""
+        fingerprints = array('Q')
+        for model, field in iter_file_fields():
+            values = model._default_manager.values_list(field.attname, flat=True)
+            for name in values.iterator(chunk_size=chunk_size):
+                if name:
+                    fingerprints.append(_path_hash(str(name)))
+        for provider in iter_variant_providers():
+            for name in provider(chunk_size=chunk_size):
+                fingerprints.append(_path_hash(name))
+        return cls(fingerprints)
+
+
+def iter_media_files(root=None, min_age_seconds=0):
+    """
+    Walk MEDIA_ROOT lazily and yield storage-relative names ('a/b/c.pdf').
+    Files modified within ``min_age_seconds`` are skipped so uploads whose row
+    has not been committed yet are never reported.
+    """
+    root = os.path.abspath(str(root or settings.MEDIA_ROOT))
+    cutoff = time.time() - min_age_seconds
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if min_age_seconds and entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                    continue
+                yield os.path.relpath(entry.path, root).replace(os.sep, '/')
+
+
+def iter_orphan_batches(index, batch_size=500, root=None, min_age_seconds=0):
+    """Yield lists of at most ``batch_size`` media files missing from ``index``."""
+    batch = []
+    for name in iter_media_files(root=root, min_age_seconds=min_age_seconds):
+        if name in index:
+            continue
+        batch.append(name)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
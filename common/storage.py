@@ -0,0 +1,204 @@
+"""
+Two-tier filesystem storage.
+
+Hot files live under MEDIA_ROOT as usual. Files moved to the cold tier by
+``tier_closed_job_media`` live under MEDIA_ARCHIVE_ROOT with the same relative
+name plus a codec suffix (``.zst``, ``.gz`` or none). Any access through the
+storage API (open/size/exists/url) sees archived files transparently and
+rehydrates them into the hot tier on first read.
+"""
+
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils import timezone
+from django.utils._os import safe_join
+from django.utils.functional import cached_property
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger('common')
+
+CODEC_ZSTD = 'zstd'
+CODEC_GZIP = 'gzip'
+CODEC_NONE = 'none'
+
+CODEC_SUFFIXES = {
+    CODEC_ZSTD: '.zst',
+    CODEC_GZIP: '.gz',
+    CODEC_NONE: '',
+}
+
+# Already-compressed image formats are never worth recompressing.
+COMPRESSIBLE_EXTENSIONS = {'.pdf', '.docx', '.doc', '.txt', '.csv', '.rtf', '.xlsx', '.pptx'}
+
+
+def preferred_codec():
+    """zstd when the optional ``zstandard`` package is installed, gzip otherwise."""
+    return CODEC_ZSTD if zstandard else CODEC_GZIP
+
+
+def _compress(source, target, codec):
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        if codec == CODEC_ZSTD:
+            zstandard.ZstdCompressor(level=10).copy_stream(src, dst)
+        else:
+            with gzip.GzipFile(fileobj=dst, mode='wb', compresslevel=6) as gz:
+                shutil.copyfileobj(src, gz)
+
+
+def _decompress(source, target, codec):
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        if codec == CODEC_ZSTD:
+            if not zstandard:
+                raise RuntimeError('zstandard is required to rehydrate .zst archives')
+            zstandard.ZstdDecompressor().copy_stream(src, dst)
+        elif codec == CODEC_GZIP:
+            with gzip.GzipFile(fileobj=src, mode='rb') as gz:
+                shutil.copyfileobj(gz, dst)
+        else:
+            shutil.copyfileobj(src, dst)
+
+
+class TieredFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage that can park files in a compressed cold tier."""
+
+    def __init__(self, archive_location=None, **kwargs):
+        super().__init__(**kwargs)
+        self._archive_location = archive_location
+
+    @cached_property
+    def archive_location(self):
+        return os.path.abspath(str(self._archive_location or settings.MEDIA_ARCHIVE_ROOT))
+
+    def archive_path(self, name, codec):
+        return safe_join(self.archive_location, name + CODEC_SUFFIXES[codec])
+
+    def is_hot(self, name):
+        return os.path.exists(self.path(name))
+
+    def find_archived(self, name):
+        """Return (codec, path) of the archived copy of ``name`` or (None, None)."""
+        for codec in CODEC_SUFFIXES:
+            path = self.archive_path(name, codec)
+            if os.path.exists(path):
+                return codec, path
+        return None, None
+
+    def is_archived(self, name):
+        return not self.is_hot(name) and self.find_archived(name)[0] is not None
+
+    # ------------------------------------------------------------------
+    # Tier transitions
+    # ------------------------------------------------------------------
+    def archive(self, name, min_savings=0.05):
+        """
+        Move ``name`` to the cold tier, compressing it when that saves at
+        least ``min_savings`` of the original size. Returns
+        ``(codec, original_size, stored_size)``.
+        """
+        source = self.path(name)
+        original_size = os.path.getsize(source)
+
+        # A rehydrated file still has its archived copy; drop the hot one.
+        existing_codec, existing = self.find_archived(name)
+        if existing_codec:
+            os.remove(source)
+            return existing_codec, original_size, os.path.getsize(existing)
+
+        codec = CODEC_NONE
+        target = None
+
+        if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and original_size:
+            codec = preferred_codec()
+            target = self.archive_path(name, codec)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_target = target + '.tmp'
+            _compress(source, tmp_target, codec)
+            if os.path.getsize(tmp_target) > original_size * (1 - min_savings):
+                os.remove(tmp_target)
+                codec = CODEC_NONE
+            else:
+                os.replace(tmp_target, target)
+
+        if codec == CODEC_NONE:
+            target = self.archive_path(name, CODEC_NONE)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+
+        stored_size = os.path.getsize(target)
+        os.remove(source)
+        return codec, original_size, stored_size
+
+    def rehydrate(self, name):
+        """Restore an archived file into the hot tier; no-op if already hot."""
+        if self.is_hot(name):
+            return False
+        codec, archived = self.find_archived(name)
+        if not codec:
+            return False
+
+        target = self.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # A unique temp file per request: concurrent reads of the same
+        # archived file each decompress their own copy, and the last
+        # os.replace wins with identical content.
+        fd, tmp_target = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.rehydrating')
+        os.close(fd)
+        try:
+            _decompress(archived, tmp_target, codec)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_target, self.file_permissions_mode)
+            os.replace(tmp_target, target)
+        except BaseException:
+            if os.path.exists(tmp_target):
+                os.remove(tmp_target)
+            raise
+        self._record_rehydration(name)
+        logger.info(f"Rehydrated archived media file {name} ({codec})")
+        return True
+
+    def _record_rehydration(self, name):
+        try:
+            from common.models import ArchivedMedia
+            from common.mongo import get_collection
+
+            get_collection(ArchivedMedia).update_one(
+                {'name': name},
+                {'$set': {'rehydrated_at': timezone.now()}, '$inc': {'rehydrate_count': 1}},
+            )
+        except Exception as exc:
+            logger.warning(f"Could not record rehydration of {name}: {exc}")
+
+    # ------------------------------------------------------------------
+    # Storage API
+    # ------------------------------------------------------------------
+    def ensure_local(self, name):
+        """Make sure ``name`` is on the hot tier and return its filesystem path."""
+        self.rehydrate(name)
+        return self.path(name)
+
+    def _open(self, name, mode='rb'):
+        self.rehydrate(name)
+        return super()._open(name, mode)
+
+    def exists(self, name):
+        return super().exists(name) or self.find_archived(name)[0] is not None
+
+    def size(self, name):
+        self.rehydrate(name)
+        return super().size(name)
+
+    def url(self, name):
+        if name and self.is_archived(name):
+            return reverse('rehydrate_media', args=[name])
+        return super().url(name)
@@ -1,3 +1,1033 @@
-from django.test import TestCase
+import copy
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from common.bloom import BloomFilter
+from common.business_calendar import (
+    MAX_FUTURE_DAYS,
+    MAX_PAST_DAYS,
+    BusinessCalendar,
+    add_working_hours,
+    get_business_calendar,
+    holiday_days,
+    holiday_version,
+    invalidate_business_calendars,
+    within_calendar_range,
+)
+from common.caching import LOCK_SUFFIX, get_or_revalidate, invalidate
+from common.counters import GLOBAL_USER_ID, apply_deltas, get_status_counts
+from common.idempotency import claim_idempotency_key
+from common.models import ArchivedMedia
+from common.mongo import is_duplicate_key_error
+from common.pagination import COUNT_ESTIMATED, CursorPaginator
+from common.search import search_ranked_ids
+from common.services import MediaReferenceIndex, iter_media_files, iter_orphan_batches
+from common.storage import CODEC_GZIP, CODEC_NONE, TieredFileSystemStorage
+from common.timeline import (
+    ACTION_LOG_EVENTS,
+    SCOPE_ALLOCATOR,
+    SCOPE_MARKETING,
+    TIMELINE_ARCHIVE_COLLECTION,
+    TIMELINE_CAP,
+    TIMELINE_SPILL,
+    append_events,
+    ensure_timeline,
+    get_archived_events,
+    get_timeline,
+    make_event,
+    serialize_timeline,
+    spill_timeline,
+)
+from common.uploads import ShardedUploadTo, is_sharded, shard_for, sharded_upload, to_legacy, to_sharded
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter.for_capacity(20_000, 0.01)
+        keys = [f"JOB-{i:06d}" for i in range(20_000)]
+        bloom.update(keys)
+        self.assertEqual(len(bloom), 20_000)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_false_positive_rate_close_to_target(self):
+        bloom = BloomFilter.for_capacity(20_000, 0.01)
+        bloom.update(f"JOB-{i:06d}" for i in range(20_000))
+        probes = 50_000
+        false_positives = sum(f"OTHER-{i}" in bloom for i in range(probes))
+        self.assertLess(false_positives / probes, 0.02)
+        self.assertAlmostEqual(bloom.expected_error_rate, 0.01, delta=0.005)
+
+    def test_memory_for_one_million_keys(self):
+        bloom = BloomFilter.for_capacity(1_000_000, 0.01)
+        # ~9.6 bits per key at 1% -> ~1.2 MB for the whole filter
+        self.assertLess(bloom.memory_bytes, 1_250_000)
+        self.assertAlmostEqual(bloom.num_bits / 1_000_000, 9.59, places=1)
+        self.assertEqual(bloom.num_hashes, 7)
+
+    def test_saturation(self):
+        bloom = BloomFilter.for_capacity(10, 0.01)
+        bloom.update(str(i) for i in range(10))
+        self.assertFalse(bloom.is_saturated)
+        bloom.add('one-more')
+        self.assertTrue(bloom.is_saturated)
+
+
+@override_settings(BUSINESS_HOURS=(9, 17))
+class BusinessCalendarTests(SimpleTestCase):
+    # Monday 2026-01-05 to Sunday 2026-01-18; Wednesday 7th is a holiday and
+    # Friday 9th a half day.
+    holidays = holiday_days([
+        SimpleNamespace(date_type='single', date=date(2026, 1, 7), from_date=None, to_date=None,
+                        holiday_type='full_day'),
+        SimpleNamespace(date_type='consecutive', date=None, from_date=date(2026, 1, 9), to_date=date(2026, 1, 9),
+                        holiday_type='half_day'),
+    ])
+
+    def _at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime(2026, 1, day, hour, minute))
+
+    def _calendar(self, **kwargs):
+        return BusinessCalendar(date(2026, 1, 5), 14, self.holidays, **kwargs)
+
+    def test_working_hours_skip_holidays(self):
+        calendar = self._calendar()
+        self.assertEqual(calendar.working_hours(self._at(5, 9), self._at(5, 17)), 8)
+        self.assertEqual(calendar.working_hours(self._at(6, 16), self._at(8, 10)), 2)
+        self.assertEqual(calendar.working_hours(self._at(9, 0), self._at(10, 0)), 4)
+        self.assertEqual(calendar.working_hours(self._at(5, 12, 7), self._at(5, 12, 52)), 0.75)
+
+    def test_add_working_hours_inverts_working_hours(self):
+        calendar = self._calendar()
+        self.assertEqual(calendar.add_working_hours(self._at(6, 15), 3), self._at(8, 10))
+        self.assertEqual(calendar.add_working_hours(self._at(9, 11), 2), self._at(9, 13))
+        self.assertEqual(calendar.add_working_hours(self._at(9, 11), 3), self._at(10, 10))
+        start = self._at(5, 10, 20)
+        for hours in (0.1, 1, 7.5, 13, 40):
+            end = calendar.add_working_hours(start, hours)
+            self.assertAlmostEqual(calendar.working_hours(start, end), hours)
+        self.assertIsNone(calendar.add_working_hours(start, 1000))
+
+    def test_sunday_off(self):
+        everyone, sunday_off = self._calendar(), self._calendar(sunday_off=True)
+        self.assertEqual(everyone.working_hours_on(date(2026, 1, 11)), 8)
+        self.assertEqual(sunday_off.working_hours_on(date(2026, 1, 11)), 0)
+        self.assertFalse(sunday_off.is_working_time(self._at(11, 10)))
+        self.assertFalse(everyone.is_working_time(self._at(7, 10)))
+        self.assertTrue(everyone.is_working_time(self._at(9, 10)))
+        self.assertFalse(everyone.is_working_time(self._at(9, 14)))
+
+
+class HolidayVersionTests(SimpleTestCase):
+    def setUp(self):
+        invalidate_business_calendars()
+        self.addCleanup(invalidate_business_calendars)
+
+    def test_version_is_read_from_the_rows_and_reused_within_the_ttl(self):
+        with mock.patch('common.business_calendar._read_holiday_version', side_effect=['3:a', '4:b']) as read:
+            self.assertEqual(holiday_version(), '3:a')
+            self.assertEqual(holiday_version(), '3:a')
+            self.assertEqual(read.call_count, 1)
+            # A holiday save in this process re-reads on the next lookup.
+            invalidate_business_calendars()
+            self.assertEqual(holiday_version(), '4:b')
+
+    def test_version_is_the_row_count_and_latest_update(self):
+        latest = datetime(2026, 3, 2, 9, 30)
+        collection = mock.Mock()
+        collection.aggregate.return_value = [{'_id': None, 'n': 7, 'latest': latest}]
+        with mock.patch('common.mongo.get_collection', return_value=collection):
+            self.assertEqual(holiday_version(), f'7:{latest.isoformat()}')
+
+
+class SharedCalendarHorizonTests(SimpleTestCase):
+    def setUp(self):
+        for name, value in (('_load_holidays', {}), ('_read_holiday_version', '0:')):
+            patcher = mock.patch(f'common.business_calendar.{name}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        calendars = mock.patch('common.business_calendar._calendars', {})
+        self.calendars = calendars.start()
+        self.addCleanup(calendars.stop)
+
+    def _aware(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def test_extreme_deadlines_are_out_of_range(self):
+        self.assertFalse(within_calendar_range(self._aware(1, 1, 1, 10)))
+        self.assertFalse(within_calendar_range(self._aware(9999, 12, 31, 23)))
+        self.assertTrue(within_calendar_range(timezone.now() + timedelta(days=30)))
+
+    def test_outlier_lookups_are_clamped_and_not_cached(self):
+        shared = get_business_calendar()
+        for moment in (self._aware(1, 1, 1, 10), self._aware(2400, 1, 1), self._aware(9999, 12, 31, 23)):
+            calendar = get_business_calendar(covering=(timezone.now(), moment))
+            self.assertLessEqual(calendar.days, MAX_PAST_DAYS + MAX_FUTURE_DAYS)
+            self.assertIs(self.calendars[(False, False)][2], shared)
+
+    def test_add_working_hours_stops_at_the_range_limit(self):
+        start = timezone.now()
+        self.assertIsNone(add_working_hours(start, 24 * 365 * 20))
+        self.assertIsNotNone(add_working_hours(start, 24 * 365 * 2))
+
+
+class EstimatedCountTests(TestCase):
+    def setUp(self):
+        from accounts.models import CustomUser
+
+        for n in range(3):
+            CustomUser.objects.create(email=f'writer{n}@example.com', username=f'writer{n}', role='writer')
+        self.queryset = CustomUser.objects.filter(role='writer').order_by('-date_joined')
+
+    def _count(self, cap):
+        paginator = CursorPaginator(self.queryset, 25, count_mode=COUNT_ESTIMATED, estimate_cap=cap)
+        with CaptureQueriesContext(connection) as queries:
+            count = paginator.count
+        return paginator, count, queries
+
+    def test_filtered_count_is_capped_without_a_subquery_count(self):
+        paginator, count, queries = self._count(cap=2)
+        self.assertEqual(count, 2)
+        self.assertEqual(paginator.count_display, '2+')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+
+    def test_count_under_the_cap_is_exact(self):
+        paginator, count, _ = self._count(cap=10)
+        self.assertEqual(count, 3)
+        self.assertFalse(paginator.count_is_estimate)
+
+
+class RecordingCursor:
+    def __init__(self, documents):
+        self.documents = documents
+        self.sorted = None
+        self.limited = None
+
+    def sort(self, *args):
+        self.sorted = args
+        return self
+
+    def limit(self, n):
+        self.limited = n
+        return self
+
+    def __iter__(self):
+        return iter(self.documents[:self.limited])
+
+
+class SearchRankedIdsTests(SimpleTestCase):
+    def setUp(self):
+        self.cursors = []
+        self.queries = []
+        collection = mock.Mock()
+        collection.find.side_effect = self._find
+        patcher = mock.patch('common.mongo.get_collection', return_value=collection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.model = SimpleNamespace(_meta=SimpleNamespace(pk=SimpleNamespace(column='id'), db_table='jobs'))
+
+    def _find(self, query, projection):
+        self.queries.append(query)
+        if 'search_keys' in query and isinstance(query['search_keys']['$in'][0], str):
+            documents = [{'id': 1}]
+        elif 'search_keys' in query:
+            documents = [{'id': 3}, {'id': 2}, {'id': 1}]
+        else:
+            documents = [{'id': 2, 'score': 1.5}]
+        cursor = RecordingCursor(documents)
+        self.cursors.append(cursor)
+        return cursor
+
+    def test_filters_apply_to_every_phase_before_the_cap(self):
+        search_ranked_ids(self.model, 'CH-1', filters={'status': {'$in': ['pending']}}, limit=2)
+        self.assertEqual(len(self.queries), 3)
+        for query in self.queries:
+            self.assertEqual(query['status'], {'$in': ['pending']})
+        self.assertEqual(self.cursors[1].sorted, ('id', -1))
+
+    def test_exact_matches_rank_first(self):
+        ranked = search_ranked_ids(self.model, 'CH-1', limit=3)
+        self.assertEqual(ranked[0], 1)
+        self.assertEqual(set(ranked), {1, 2, 3})
+
+
+def djongo_insert_error(code=11000):
+    """
+    The exception djongo raises when ``insert_many`` hits a unique index:
+    BulkWriteError -> SQLDecodeError -> djongo DatabaseError -> Django
+    DatabaseError.
+    """
+    from django.db.utils import DatabaseErrorWrapper
+    from djongo import database as djongo_database
+    from djongo.exceptions import SQLDecodeError
+    from pymongo.errors import BulkWriteError
+
+    failure = BulkWriteError({
+        'writeErrors': [{'index': 0, 'code': code, 'errmsg': 'E11000 duplicate key error'}],
+        'nInserted': 0,
+    })
+    wrapper = SimpleNamespace(Database=djongo_database, errors_occurred=False)
+    try:
+        with DatabaseErrorWrapper(wrapper):
+            try:
+                try:
+                    raise failure
+                except Exception as exc:
+                    raise SQLDecodeError(err_sql='INSERT INTO "idempotency_keys" ...') from exc
+            except Exception as exc:
+                raise djongo_database.DatabaseError() from exc
+    except Exception as exc:
+        return exc
+
+
+class DuplicateKeyErrorTests(SimpleTestCase):
+    def test_djongo_insert_chain_is_a_duplicate_key(self):
+        exc = djongo_insert_error()
+        self.assertEqual(type(exc).__module__, 'django.db.utils')
+        self.assertTrue(is_duplicate_key_error(exc))
+
+    def test_other_write_errors_are_not(self):
+        self.assertFalse(is_duplicate_key_error(djongo_insert_error(code=121)))
+        self.assertFalse(is_duplicate_key_error(ValueError('no')))
+
+    def test_operation_failure_with_duplicate_code(self):
+        from pymongo.errors import OperationFailure
+
+        self.assertTrue(is_duplicate_key_error(OperationFailure('E11000', code=11000)))
+
+    def test_repeated_claim_replays_stored_result(self):
+        from common.models import IdempotencyKey
+
+        stored = {'system_id': 'CH-FIRST1'}
+        with mock.patch.object(IdempotencyKey.objects, 'create', side_effect=djongo_insert_error()), \
+                mock.patch.object(IdempotencyKey.objects, 'filter') as rows, \
+                mock.patch('common.idempotency.transaction'):
+            rows.return_value.values_list.return_value.first.return_value = stored
+            self.assertEqual(claim_idempotency_key('k', 'scope', {'system_id': 'CH-NEW'}), (False, stored))
+
+
+class FakeCollection:
+    """The handful of pymongo calls the timeline module makes, over a dict."""
+
+    def __init__(self):
+        self.documents = {}
+
+    def _matches(self, document, query):
+        return all(
+            re.match(value['$regex'], document.get(key, '')) if isinstance(value, dict) else document.get(key) == value
+            for key, value in query.items()
+        )
+
+    def find_one(self, query, projection=None):
+        document = self.documents.get(query['_id'])
+        return copy.deepcopy(document) if document is not None else None
+
+    def find(self, query):
+        documents = [copy.deepcopy(d) for d in self.documents.values() if self._matches(d, query)]
+        return SortingCursor(documents)
+
+    def find_one_and_update(self, query, update, upsert=False, projection=None, return_document=None):
+        document = self.documents.get(query['_id'])
+        if document is None:
+            document = self.documents[query['_id']] = {'_id': query['_id'], **update.get('$setOnInsert', {})}
+        self._apply(document, update)
+        return copy.deepcopy(document)
+
+    def update_one(self, query, update):
+        document = self.documents.get(query['_id'])
+        if document is not None:
+            self._apply(document, update)
+
+    def _apply(self, document, update):
+        for key, value in update.get('$push', {}).items():
+            document.setdefault(key, []).extend(value['$each'])
+        for key, value in update.get('$pull', {}).items():
+            removed = set(value['eid']['$in'])
+            document[key] = [item for item in document.get(key, []) if item['eid'] not in removed]
+        for key, value in update.get('$inc', {}).items():
+            document[key] = document.get(key, 0) + value
+        document.update(update.get('$set', {}))
+
+    def insert_one(self, document):
+        from pymongo.errors import DuplicateKeyError
+
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError('E11000')
+        self.documents[document['_id']] = copy.deepcopy(document)
+
+    def replace_one(self, query, document, upsert=False):
+        self.documents[query['_id']] = copy.deepcopy(document)
+
+    def delete_one(self, query):
+        self.documents.pop(query['_id'], None)
+
+    def delete_many(self, query):
+        for key in [key for key, document in self.documents.items() if self._matches(document, query)]:
+            del self.documents[key]
+
+
+class SortingCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents.sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+def fake_timeline_db(test):
+    """Patch the timeline module onto in-memory collections for ``test``."""
+    collections = defaultdict(FakeCollection)
+    patcher = mock.patch('common.timeline._db', return_value=collections)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return collections
+
+
+class TimelineCapTests(SimpleTestCase):
+    def setUp(self):
+        self.db = fake_timeline_db(self)
+
+    def _events(self, count, offset=0):
+        start = timezone.now() - timedelta(days=1)
+        return [
+            make_event('job.updated', start + timedelta(minutes=offset + n), f'Event {offset + n}')
+            for n in range(count)
+        ]
+
+    def test_spills_the_oldest_events_past_the_cap(self):
+        append_events(SCOPE_ALLOCATOR, 7, self._events(TIMELINE_CAP + TIMELINE_SPILL), seeded=True)
+        self.assertEqual(self.db[TIMELINE_ARCHIVE_COLLECTION].documents, {})
+
+        append_events(SCOPE_ALLOCATOR, 7, self._events(1, offset=TIMELINE_CAP + TIMELINE_SPILL))
+        document = get_timeline(SCOPE_ALLOCATOR, 7)
+        self.assertEqual(document['size'], TIMELINE_CAP)
+        self.assertEqual(len(document['events']), TIMELINE_CAP)
+        self.assertEqual(document['archived'], TIMELINE_SPILL + 1)
+        self.assertEqual(document['events'][0]['title'], f'Event {TIMELINE_SPILL + 1}')
+
+        archived = get_archived_events(SCOPE_ALLOCATOR, 7)
+        self.assertEqual([event['title'] for event in archived], [f'Event {n}' for n in range(TIMELINE_SPILL + 1)])
+        payload = serialize_timeline(document, archived)
+        self.assertEqual(len(payload['events']), TIMELINE_CAP + TIMELINE_SPILL + 1)
+        self.assertEqual(payload['events'][0]['title'], 'Event 0')
+
+    def test_concurrent_spill_of_the_same_events_is_skipped(self):
+        append_events(SCOPE_ALLOCATOR, 8, self._events(TIMELINE_CAP + 5), seeded=True)
+        first_eid = get_timeline(SCOPE_ALLOCATOR, 8)['events'][0]['eid']
+        # Another worker already archived this overflow under the same bucket id.
+        self.db[TIMELINE_ARCHIVE_COLLECTION].insert_one({'_id': f'allocator:8:{first_eid}', 'timeline_id': 'x'})
+        self.assertEqual(spill_timeline(SCOPE_ALLOCATOR, 8), 0)
+        self.assertEqual(get_timeline(SCOPE_ALLOCATOR, 8)['size'], TIMELINE_CAP + 5)
+
+
+class TimelineSeedingTests(SimpleTestCase):
+    def setUp(self):
+        self.db = fake_timeline_db(self)
+        self.user = SimpleNamespace(pk=3, get_full_name=lambda: 'Mia K', email='mia@example.com')
+        created = timezone.now() - timedelta(days=2)
+        self.job = mock.Mock(
+            system_id='CH-SEED01', job_id='ACME-7', status='draft', created_by=self.user, created_by_id=3,
+            created_at=created,
+            job_name_validated_at=created + timedelta(minutes=1),
+            initial_form_submitted_at=created + timedelta(minutes=2),
+            ai_summary_requested_at=created + timedelta(minutes=3),
+            ai_summary_accepted_at=created + timedelta(minutes=6),
+            ai_summary_version=1,
+            final_form_opened_at=None,
+            final_form_submitted_at=None,
+            masking_id_generated_at=None,
+        )
+        self.job.attachments.count.return_value = 2
+        self.job.summary_versions.all.return_value = [SimpleNamespace(
+            version_number=1, degree=2, generated_at=created + timedelta(minutes=4), performed_by='system',
+        )]
+        # Only actions without a Job timestamp of their own are read from the log.
+        self.job.action_logs.filter.return_value.select_related.return_value = [SimpleNamespace(
+            action='initial_form_saved', performed_by=self.user, performed_by_id=3, performed_by_type='user',
+            details={}, timestamp=created + timedelta(minutes=1, seconds=30),
+        )]
+
+    def test_marketing_events_come_from_the_job_rows(self):
+        document = ensure_timeline(SCOPE_MARKETING, self.job)
+        self.assertTrue(document['seeded'])
+        self.assertEqual(document['owner_id'], self.user.pk)
+        self.assertEqual(
+            [event['title'] for event in serialize_timeline(document)['events']],
+            ['Job Created', 'Job ID Validated', 'Initial Form Saved', 'Initial Form Submitted',
+             'AI Summary Requested', 'AI Summary Generated', 'AI Summary Accepted'],
+        )
+        events = {event['kind']: event for event in document['events']}
+        self.assertEqual(events['job.ai_summary.generated']['description'], 'Version 1 | Degree: 2')
+        self.assertEqual(events['job.initial_form.submitted']['description'], 'Instruction and 2 attachment(s)')
+        self.job.action_logs.filter.assert_called_once_with(action__in=list(ACTION_LOG_EVENTS))
+        self.assertEqual(events['job.initial_form.saved']['actor'], 'Mia K')
+
+    def test_unseeded_document_is_rebuilt_once(self):
+        append_events(SCOPE_MARKETING, self.job.system_id, [make_event('job.updated', timezone.now(), 'Job Updated')])
+        first = ensure_timeline(SCOPE_MARKETING, self.job)
+        self.assertEqual(first['size'], 7)
+        with mock.patch('common.timeline.rebuild_timeline') as rebuild:
+            ensure_timeline(SCOPE_MARKETING, self.job)
+        rebuild.assert_not_called()
+
+
+class TieredStorageMixin:
+    def setUp(self):
+        super().setUp()
+        hot = tempfile.TemporaryDirectory()
+        cold = tempfile.TemporaryDirectory()
+        self.addCleanup(hot.cleanup)
+        self.addCleanup(cold.cleanup)
+        self.storage = TieredFileSystemStorage(location=hot.name, archive_location=cold.name)
+        self.document = b'closed job instructions\n' * 200
+
+    def write(self, name, content):
+        path = self.storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+
+
+@mock.patch('common.storage.zstandard', None)
+@mock.patch('common.mongo.get_collection')
+class TieredStorageTests(TieredStorageMixin, SimpleTestCase):
+    def test_documents_are_compressed_into_the_cold_tier(self, get_collection):
+        self.write('job_attachments/brief.txt', self.document)
+        codec, original_size, stored_size = self.storage.archive('job_attachments/brief.txt')
+        self.assertEqual(codec, CODEC_GZIP)
+        self.assertEqual(original_size, len(self.document))
+        self.assertLess(stored_size, original_size)
+        self.assertTrue(self.storage.is_archived('job_attachments/brief.txt'))
+        self.assertTrue(self.storage.exists('job_attachments/brief.txt'))
+        archived = self.storage.archive_path('job_attachments/brief.txt', CODEC_GZIP)
+        self.assertEqual(os.listdir(os.path.dirname(archived)), ['brief.txt.gz'])
+
+    def test_images_are_archived_uncompressed(self, get_collection):
+        self.write('job_attachments/scan.png', b'\x89PNG' + bytes(range(256)))
+        codec, original_size, stored_size = self.storage.archive('job_attachments/scan.png')
+        self.assertEqual(codec, CODEC_NONE)
+        self.assertEqual(original_size, stored_size)
+
+    def test_open_rehydrates_and_records_it(self, get_collection):
+        self.write('job_attachments/brief.txt', self.document)
+        self.storage.archive('job_attachments/brief.txt')
+        with self.storage.open('job_attachments/brief.txt') as handle:
+            self.assertEqual(handle.read(), self.document)
+        self.assertTrue(self.storage.is_hot('job_attachments/brief.txt'))
+        get_collection.return_value.update_one.assert_called_once()
+        self.assertFalse(self.storage.rehydrate('job_attachments/brief.txt'))
+        self.assertEqual(os.listdir(self.storage.path('job_attachments')), ['brief.txt'])
+
+    def test_rehydration_uses_a_unique_temp_file(self, get_collection):
+        self.write('job_attachments/brief.txt', self.document)
+        self.storage.archive('job_attachments/brief.txt')
+        # A stale temp file from a crashed request must not be reused or clobbered.
+        self.write('job_attachments/brief.txt.rehydrating', b'partial')
+        temp_names = []
+        real_mkstemp = tempfile.mkstemp
+
+        def mkstemp(**kwargs):
+            fd, path = real_mkstemp(**kwargs)
+            temp_names.append(path)
+            return fd, path
+
+        with mock.patch('common.storage.tempfile.mkstemp', side_effect=mkstemp):
+            self.assertTrue(self.storage.rehydrate('job_attachments/brief.txt'))
+        self.assertEqual(len(temp_names), 1)
+        self.assertNotEqual(temp_names[0], self.storage.path('job_attachments/brief.txt.rehydrating'))
+        self.assertEqual(os.path.dirname(temp_names[0]), self.storage.path('job_attachments'))
+        self.assertFalse(os.path.exists(temp_names[0]))
+        with open(self.storage.path('job_attachments/brief.txt.rehydrating'), 'rb') as handle:
+            self.assertEqual(handle.read(), b'partial')
+
+    def test_failed_rehydration_leaves_no_partial_file(self, get_collection):
+        self.write('job_attachments/brief.txt', self.document)
+        self.storage.archive('job_attachments/brief.txt')
+        with mock.patch('common.storage._decompress', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.storage.rehydrate('job_attachments/brief.txt')
+        self.assertEqual(os.listdir(self.storage.path('job_attachments')), [])
+        self.assertTrue(self.storage.is_archived('job_attachments/brief.txt'))
+
+    def test_archiving_a_rehydrated_file_drops_the_hot_copy(self, get_collection):
+        self.write('job_attachments/brief.txt', self.document)
+        self.storage.archive('job_attachments/brief.txt')
+        self.storage.rehydrate('job_attachments/brief.txt')
+        codec, _, _ = self.storage.archive('job_attachments/brief.txt')
+        self.assertEqual(codec, CODEC_GZIP)
+        self.assertFalse(self.storage.is_hot('job_attachments/brief.txt'))
+
+
+class MediaRootTestMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write_media(self, name, content=b'data', age_hours=48):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+        mtime = time.time() - age_hours * 3600
+        os.utime(path, (mtime, mtime))
+        return path
+
+
+@mock.patch('common.storage.zstandard', None)
+class TierClosedJobMediaTests(TieredStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write('job_attachments/ab/cd/CH-1/brief.txt', self.document)
+        self.write('job_attachments/ab/cd/CH-1/scan.png', b'\x89PNG' + bytes(range(256)))
+        for target, value in (
+            ('common.management.commands.tier_closed_job_media.default_storage', self.storage),
+            ('common.views.default_storage', self.storage),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # The closed-job lookups read marketing/process jobs, which need MongoDB.
+        patcher = mock.patch(
+            'common.management.commands.tier_closed_job_media.Command._iter_closed_job_files',
+            return_value=['job_attachments/ab/cd/CH-1/brief.txt', 'job_attachments/ab/cd/CH-1/scan.png',
+                          'job_attachments/ab/cd/CH-2/missing.pdf'],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tier(self, *args):
+        out = StringIO()
+        call_command('tier_closed_job_media', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_dry_run_moves_nothing(self):
+        self.assertIn('Dry run: 2 files', self.tier('--dry-run'))
+        self.assertTrue(self.storage.is_hot('job_attachments/ab/cd/CH-1/brief.txt'))
+        self.assertFalse(ArchivedMedia.objects.exists())
+
+    def test_closed_job_files_are_archived_and_recorded(self):
+        self.assertIn('1 already cold or missing', self.tier())
+        self.assertEqual(
+            dict(ArchivedMedia.objects.values_list('name', 'codec')),
+            {'job_attachments/ab/cd/CH-1/brief.txt': CODEC_GZIP, 'job_attachments/ab/cd/CH-1/scan.png': CODEC_NONE},
+        )
+        self.assertTrue(self.storage.is_archived('job_attachments/ab/cd/CH-1/brief.txt'))
+
+        # Re-running after a rehydration archives again without a duplicate record.
+        self.storage.rehydrate('job_attachments/ab/cd/CH-1/brief.txt')
+        self.tier()
+        self.assertEqual(ArchivedMedia.objects.count(), 2)
+        self.assertIn('Archived files: 2 (gzip: 1, none: 1)', self.tier('--stats'))
+
+    def test_archive_url_rehydrates_on_request(self):
+        from accounts.models import CustomUser
+
+        self.tier()
+        name = 'job_attachments/ab/cd/CH-1/brief.txt'
+        self.assertEqual(self.storage.url(name), f'/media-archive/{name}')
+        user = CustomUser.objects.create(username='reader', email='reader@example.com', is_approved=True)
+        self.client.force_login(user)
+        response = self.client.get(f'/media-archive/{name}')
+        self.assertRedirects(response, f'/media/{name}', fetch_redirect_response=False)
+        self.assertTrue(self.storage.is_hot(name))
+        self.assertEqual(self.client.get('/media-archive/job_attachments/nope.pdf').status_code, 404)
+
+
+def media_index(names):
+    """A MediaReferenceIndex of ``names`` built without touching the database."""
+    with mock.patch('common.services.media_references.iter_file_fields', return_value=[]), \
+            mock.patch('common.services.media_references.iter_variant_providers',
+                       return_value=[lambda chunk_size: iter(names)]):
+        return MediaReferenceIndex.build()
+
+
+class OrphanedMediaTests(MediaRootTestMixin, SimpleTestCase):
+
+    def test_index_matches_normalized_names(self):
+        index = media_index(['profile_images/thumbs/ab/cd/1_64.jpg'])
+        self.assertEqual(len(index), 1)
+        self.assertIn('profile_images/thumbs/ab/cd/1_64.jpg', index)
+        self.assertIn('/profile_images/thumbs/ab/cd/1_64.jpg', index)
+        self.assertNotIn('profile_images/thumbs/ab/cd/1_128.jpg', index)
+
+    def test_recent_files_are_never_reported(self):
+        self.write_media('job_attachments/old.pdf')
+        self.write_media('job_attachments/fresh.pdf', age_hours=1)
+        self.assertEqual(list(iter_media_files(min_age_seconds=24 * 3600)), ['job_attachments/old.pdf'])
+        self.assertEqual(len(list(iter_media_files())), 2)
+
+    def test_orphans_are_batched(self):
+        for number in range(5):
+            self.write_media(f'job_attachments/{number}.pdf')
+        batches = list(iter_orphan_batches(media_index(['job_attachments/2.pdf']), batch_size=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2])
+        self.assertEqual(
+            sorted(name for batch in batches for name in batch),
+            ['job_attachments/0.pdf', 'job_attachments/1.pdf', 'job_attachments/3.pdf', 'job_attachments/4.pdf'],
+        )
+
+    def run_command(self, referenced, *args):
+        out = StringIO()
+        with mock.patch('common.management.commands.collect_orphaned_media.MediaReferenceIndex.build',
+                        return_value=media_index(referenced)):
+            call_command('collect_orphaned_media', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_dry_run_reports_without_deleting(self):
+        orphan = self.write_media('job_attachments/ab/cd/CH-1/old.pdf')
+        live = self.write_media('job_attachments/ab/cd/CH-2/live.pdf')
+        output = self.run_command(['job_attachments/ab/cd/CH-2/live.pdf'], '--dry-run')
+        self.assertIn('orphan: job_attachments/ab/cd/CH-1/old.pdf', output)
+        self.assertNotIn('live.pdf', output)
+        self.assertTrue(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(live))
+
+    def test_orphans_are_deleted_and_empty_dirs_pruned(self):
+        orphan = self.write_media('job_attachments/ab/cd/CH-1/old.pdf')
+        live = self.write_media('job_attachments/ab/ef/CH-2/live.pdf')
+        fresh = self.write_media('job_attachments/ab/cd/CH-3/upload.pdf', age_hours=1)
+        output = self.run_command(['job_attachments/ab/ef/CH-2/live.pdf'], '--prune-empty-dirs')
+        self.assertIn('Deleted 1 of 1 orphaned files', output)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(os.path.exists(os.path.dirname(orphan)))
+        self.assertTrue(os.path.exists(live))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertTrue(os.path.isdir(self.media_root))
+
+
+class ShardedUploadTests(SimpleTestCase):
+    def test_upload_to_shards_by_first_component(self):
+        upload_to = ShardedUploadTo('job_attachments/')
+        first, second = shard_for('CH-A3K9M2')
+        self.assertEqual(
+            upload_to(None, 'CH-A3K9M2/brief.pdf'),
+            f'job_attachments/{first}/{second}/CH-A3K9M2/brief.pdf',
+        )
+        # Every file of one job lands in the same shard.
+        self.assertEqual(
+            upload_to(None, 'CH-A3K9M2/notes.docx').rsplit('/', 1)[0],
+            upload_to(None, 'CH-A3K9M2/brief.pdf').rsplit('/', 1)[0],
+        )
+        self.assertEqual(upload_to, ShardedUploadTo('job_attachments'))
+        self.assertEqual(upload_to.deconstruct(), ('common.uploads.ShardedUploadTo', ('job_attachments/',), {}))
+
+    def test_sharded_upload_decorator(self):
+        @sharded_upload('profile/')
+        def upload_path(instance, filename):
+            return f'EMP1_{filename}'
+
+        name = upload_path(None, 'me.jpg')
+        self.assertTrue(is_sharded(name, 'profile'))
+        self.assertTrue(name.endswith('/EMP1_me.jpg'))
+        self.assertEqual(upload_path.shard_prefix, 'profile')
+
+    def test_legacy_names_round_trip(self):
+        cases = [
+            ('process/ai_files', 'process/ai_files/report.pdf'),
+            ('job_attachments', 'job_attachments/CH-1/brief.pdf'),
+            # A two-hex-character job folder is not mistaken for a shard.
+            ('process/ai_files', 'process/ai_files/ab/report.pdf'),
+        ]
+        for prefix, legacy in cases:
+            sharded = to_sharded(legacy, prefix)
+            self.assertNotEqual(sharded, legacy)
+            self.assertTrue(is_sharded(sharded, prefix))
+            self.assertEqual(to_legacy(sharded, prefix), legacy)
+            self.assertEqual(to_sharded(sharded, prefix), sharded)
+
+    def test_names_outside_the_prefix_are_untouched(self):
+        self.assertEqual(to_sharded('other/report.pdf', 'process/ai_files'), 'other/report.pdf')
+        self.assertEqual(to_legacy('process/ai_files/report.pdf', 'process/ai_files'), 'process/ai_files/report.pdf')
+        self.assertFalse(is_sharded('process/ai_files/ab/report.pdf', 'process/ai_files'))
+        self.assertFalse(is_sharded('process/ai_files/AB/CD/report.pdf', 'process/ai_files'))
+
+
+class ShardMediaCommandTests(MediaRootTestMixin, TestCase):
+    """bulk_write needs MongoDB; the UpdateOne operations are replayed through the ORM."""
+
+    def setUp(self):
+        super().setUp()
+        from accounts.models import CustomUser
+
+        self.model = CustomUser
+        field = CustomUser._meta.get_field('profile_image')
+        collection = mock.Mock()
+        collection.bulk_write.side_effect = self._bulk_write
+        self.collection = collection
+        for target, value in (
+            ('common.management.commands.shard_media.iter_file_fields', [(CustomUser, field)]),
+            ('common.management.commands.shard_media.get_collection', collection),
+        ):
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.legacy = CustomUser.objects.create(username='legacy', email='legacy@example.com')
+        CustomUser.objects.filter(pk=self.legacy.pk).update(profile_image='profile/EMP1_mia.jpg')
+        self.missing = CustomUser.objects.create(username='missing', email='missing@example.com')
+        CustomUser.objects.filter(pk=self.missing.pk).update(profile_image='profile/EMP2_gone.jpg')
+        self.write_media('profile/EMP1_mia.jpg', b'jpeg')
+        self.sharded_name = to_sharded('profile/EMP1_mia.jpg', 'profile')
+
+    def _bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.model.objects.filter(**operation._filter).update(**operation._doc['$set'])
+
+    def shard(self, *args):
+        out = StringIO()
+        call_command('shard_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_changes_nothing(self):
+        output = self.shard('--dry-run')
+        self.assertIn('Would shard 1 files (1 referenced files were missing)', output)
+        self.collection.bulk_write.assert_not_called()
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.sharded_name)))
+
+    def test_files_are_linked_and_paths_rewritten(self):
+        self.shard('--batch-size', '1')
+        self.legacy.refresh_from_db()
+        self.assertEqual(self.legacy.profile_image.name, self.sharded_name)
+        self.missing.refresh_from_db()
+        self.assertEqual(self.missing.profile_image.name, 'profile/EMP2_gone.jpg')
+        # The legacy copy stays until --remove-legacy so cached URLs keep working.
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, 'profile/EMP1_mia.jpg')))
+        with open(os.path.join(self.media_root, self.sharded_name), 'rb') as handle:
+            self.assertEqual(handle.read(), b'jpeg')
+
+        # A second run finds nothing left to move.
+        self.collection.bulk_write.reset_mock()
+        self.assertIn('Sharded 0 files', self.shard())
+        self.collection.bulk_write.assert_not_called()
+
+    def remove_legacy(self, referenced):
+        with mock.patch('common.management.commands.shard_media.MediaReferenceIndex.build',
+                        return_value=media_index(referenced)):
+            return self.shard('--remove-legacy')
+
+    def test_remove_legacy_keeps_referenced_files(self):
+        self.shard()
+        # Still referenced by another row (e.g. a clone): kept.
+        self.assertIn('Removed 0 legacy files', self.remove_legacy(['profile/EMP1_mia.jpg']))
+        self.assertIn('Removed 1 legacy files', self.remove_legacy([]))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'profile/EMP1_mia.jpg')))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, self.sharded_name)))
+
+
+class CounterCollection:
+    """Counter documents keyed by (scope, user_id); replays UpdateOne/ReplaceOne."""
+
+    def __init__(self, documents=None):
+        self.documents = {(d['scope'], d['user_id']): d for d in documents or []}
+        self.writes = []
+
+    def find_one(self, query, projection=None):
+        return copy.deepcopy(self.documents.get((query['scope'], query['user_id'])))
+
+    def find(self, query, projection=None):
+        return [copy.deepcopy(document) for document in self.documents.values()]
+
+    def bulk_write(self, operations, ordered=True):
+        self.writes.append(operations)
+        for operation in operations:
+            key = (operation._filter['scope'], operation._filter['user_id'])
+            if '$inc' in operation._doc:
+                document = self.documents.setdefault(key, {'scope': key[0], 'user_id': key[1], 'counts': {}})
+                for path, delta in operation._doc['$inc'].items():
+                    status = path.split('.', 1)[1]
+                    document['counts'][status] = document['counts'].get(status, 0) + delta
+                document.update(operation._doc['$set'])
+            else:
+                self.documents[key] = copy.deepcopy(operation._doc)
+
+    def delete_one(self, query):
+        self.documents.pop((query['scope'], query['user_id']), None)
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+
+class StatusCounterTests(TestCase):
+    def setUp(self):
+        from accounts.models import CustomUser
+
+        self.counters = CounterCollection()
+        for target, value in (
+            ('common.counters.counter_collection', mock.Mock(return_value=self.counters)),
+            ('writer.statistics.apply_statistics_deltas', mock.Mock()),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.mia = CustomUser.objects.create(username='mia', email='mia@example.com', role='writer')
+        self.raj = CustomUser.objects.create(username='raj', email='raj@example.com', role='writer')
+
+    def project(self, job_id, writer, status='pending'):
+        from writer.models import WriterProject
+
+        return WriterProject.objects.create(
+            job_id=job_id, topic='t', word_count=1000, deadline=timezone.now() + timedelta(days=2),
+            referencing='apa', writer=writer, status=status,
+        )
+
+    def counts(self, user):
+        return get_status_counts('writer', user)
+
+    def test_create_status_change_and_delete(self):
+        project = self.project('W-1', self.mia)
+        self.project('W-2', self.mia, status='in_progress')
+        self.assertEqual(self.counts(self.mia), {'pending': 1, 'in_progress': 1})
+
+        project.status = 'in_progress'
+        project.save()
+        self.assertEqual(self.counts(self.mia), {'in_progress': 2})
+
+        project.delete()
+        self.assertEqual(self.counts(self.mia), {'in_progress': 1})
+
+    def test_reassignment_moves_the_count_between_owners(self):
+        project = self.project('W-1', self.mia)
+        project.writer = self.raj
+        project.save(update_fields=['writer'])
+        self.assertEqual(self.counts(self.mia), {})
+        self.assertEqual(self.counts(self.raj), {'pending': 1})
+
+    def test_untracked_saves_write_nothing(self):
+        project = self.project('W-1', self.mia)
+        writes = len(self.counters.writes)
+        project.topic = 'new topic'
+        project.save(update_fields=['topic'])
+        project.save()
+        self.assertEqual(len(self.counters.writes), writes)
+
+    def test_deferred_status_is_read_back_from_the_database(self):
+        from writer.models import WriterProject
+
+        self.project('W-1', self.mia)
+        project = WriterProject.objects.only('pk', 'topic').get(job_id='W-1')
+        project.status = 'completed'
+        with CaptureQueriesContext(connection) as queries:
+            project.save()
+        self.assertTrue(any('"status"' in query['sql'] and 'SELECT' in query['sql'] for query in queries))
+        self.assertEqual(self.counts(self.mia), {'completed': 1})
+
+    def test_deltas_are_grouped_per_document(self):
+        apply_deltas({
+            ('writer', 1, 'pending'): -1, ('writer', 1, 'completed'): 1,
+            ('writer', 2, 'pending'): 0, ('allocator', GLOBAL_USER_ID, 'pending'): 2,
+        })
+        operations = self.counters.writes[-1]
+        self.assertEqual(len(operations), 2)
+        self.assertEqual(operations[0]._doc['$inc'], {'counts.pending': -1, 'counts.completed': 1})
+        self.assertEqual(get_status_counts('allocator'), {'pending': 2})
+
+    def test_repair_replaces_drifted_and_stale_documents(self):
+        self.counters.documents = {
+            ('writer', 1): {'scope': 'writer', 'user_id': 1, 'counts': {'pending': 5}},
+            ('writer', 9): {'scope': 'writer', 'user_id': 9, 'counts': {'pending': 1}},
+        }
+        actual = {('writer', 1): {'pending': 2}, ('marketing', 3): {'draft': 1}}
+        out = StringIO()
+        with mock.patch('common.counters.compute_status_counts', return_value=actual), \
+                mock.patch('common.management.commands.repair_status_counters.compute_status_counts',
+                           return_value=actual):
+            call_command('repair_status_counters', '--dry-run', stdout=out)
+            self.assertIn('Dry run: 3 counter documents have drifted', out.getvalue())
+            self.assertEqual(self.counters.documents[('writer', 1)]['counts'], {'pending': 5})
+
+            call_command('repair_status_counters', stdout=out)
+        self.assertIn('Rebuilt 2 documents in status_counters (3 had drifted, 1 stale removed)', out.getvalue())
+        self.assertEqual(
+            {key: document['counts'] for key, document in self.counters.documents.items()},
+            actual,
+        )
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'common-tests-swr',
+}})
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import caches
+
+        self.cache = caches['default']
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+        self.now = 1000.0
+        patcher = mock.patch('common.caching.time')
+        clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        clock.time.side_effect = lambda: self.now
+        clock.sleep.side_effect = self._sleep
+        self.during_sleep = None
+        self.compute = mock.Mock(side_effect=lambda: self.compute.call_count)
+
+    def _sleep(self, seconds):
+        self.now += seconds
+        if self.during_sleep:
+            self.during_sleep()
+
+    def get(self, **kwargs):
+        return get_or_revalidate('stats', self.compute, fresh_for=30, **kwargs)
+
+    def test_fresh_entries_are_served_from_the_cache(self):
+        self.assertEqual(self.get(), 1)
+        self.now += 29
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertIsNone(self.cache.get('stats' + LOCK_SUFFIX))
+
+    def test_stale_entry_is_refreshed_by_the_lock_holder(self):
+        self.get()
+        self.now += 31
+        self.assertEqual(self.get(), 2)
+        self.now += 1
+        self.assertEqual(self.get(), 2)
+
+    def test_others_serve_stale_while_one_worker_refreshes(self):
+        self.get()
+        self.now += 31
+        self.cache.add('stats' + LOCK_SUFFIX, 1)
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_cold_cache_waits_for_the_lock_holder(self):
+        self.cache.add('stats' + LOCK_SUFFIX, 1)
+        self.during_sleep = lambda: self.cache.set('stats', {'value': 'theirs', 'fresh_until': self.now + 30})
+        self.assertEqual(self.get(), 'theirs')
+        self.compute.assert_not_called()
+
+    def test_cold_cache_computes_after_waiting(self):
+        self.cache.add('stats' + LOCK_SUFFIX, 1)
+        with self.assertLogs('common', 'INFO'):
+            self.assertEqual(self.get(cold_wait=0.5), 1)
+        self.assertAlmostEqual(self.now, 1000.5)
+
+    def test_invalidate_forces_the_next_refresh(self):
+        self.get()
+        invalidate('stats')
+        self.assertEqual(self.get(), 2)
+        invalidate('missing')
+        self.assertIsNone(self.cache.get('missing'))
@@ -0,0 +1,558 @@
+"""
+Materialised per-job timelines.
+
+Instead of stitching ActivityLog (filtered on an unindexed metadata key),
+AllocationHistory and JobQuery on every detail page, each job has one
+document in ``job_timelines``::
+
+    {'_id': 'marketing:CH-A3K9M2', 'owner_id': 12, 'seeded': True, 'size': 14,
+     'archived': 0, 'events': [{'eid', 'at', 'kind', 'title', ...}, ...]}
+
+Events are ``$push``-ed as they are logged (model signals, plus an explicit
+call for bulk-inserted activity logs). The hot list is capped: once it grows
+``TIMELINE_SPILL`` past ``TIMELINE_CAP`` the oldest events move, in one
+bucket document, to ``job_timeline_archive``. Reading a timeline is a single
+``_id`` lookup.
+
+Marketing timelines are fed by the job's ActivityLog events (JobActionLog
+and JobSummaryVersion rows mirror them); allocator timelines by job creation,
+AllocationHistory and JobQuery. Jobs that predate this module - or whose
+document was started by a later event - are seeded on first read
+(``ensure_timeline``) or by ``rebuild_job_timelines``: marketing jobs from
+their timestamp fields, JobSummaryVersion and JobActionLog rows, allocator
+jobs from the sources above.
+"""
+
+import logging
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+try:
+    from bson import ObjectId
+except ImportError:  # pragma: no cover
+    ObjectId = None
+
+logger = logging.getLogger('common')
+
+TIMELINE_COLLECTION = 'job_timelines'
+TIMELINE_ARCHIVE_COLLECTION = 'job_timeline_archive'
+TIMELINE_ARCHIVE_INDEX = 'job_timeline_archive_timeline_at'
+
+TIMELINE_CAP = 100
+TIMELINE_SPILL = 50
+
+SCOPE_MARKETING = 'marketing'
+SCOPE_ALLOCATOR = 'allocator'
+
+# ActivityLog event key -> (title, icon, color); keys missing here are not shown.
+MARKETING_EVENTS = {
+    'job.created': ('Job Created', 'plus-circle', 'blue'),
+    'job.cloned': ('Job Cloned', 'plus-circle', 'blue'),
+    'job.job_id.validated': ('Job ID Validated', 'check-circle', 'green'),
+    'job.initial_form.saved': ('Initial Form Saved', 'file-text', 'gray'),
+    'job.initial_form.submitted': ('Initial Form Submitted', 'file-text', 'blue'),
+    'job.ai_summary.requested': ('AI Summary Requested', 'cpu', 'purple'),
+    'job.ai_summary.generated': ('AI Summary Generated', 'zap', 'yellow'),
+    'job.ai_summary.accepted': ('AI Summary Accepted', 'check', 'green'),
+    'job.ai_summary.auto_accepted': ('AI Summary Auto-Accepted', 'check', 'green'),
+    'job.final_form_opened_at': ('Final Form Opened', 'eye', 'gray'),
+    'job.final_form_submitted_at': ('Final Form Submitted', 'send', 'blue'),
+    'job.masking_id_generated_at': ('Masking ID Generated', 'hash', 'purple'),
+    'job.status.changed': ('Status Changed', 'send', 'gray'),
+    'job.allocated': ('Job Allocated', 'send', 'green'),
+    'job.updated': ('Job Updated', 'file-text', 'gray'),
+    'job.attachment.uploaded': ('Attachment Uploaded', 'file-text', 'gray'),
+    'job.attachment.deleted': ('Attachment Removed', 'file-text', 'gray'),
+}
+CREATION_EVENTS = {'job.created', 'job.cloned'}
+
+ALLOCATION_TITLES = {
+    'allocated': 'Task Allocated',
+    'reallocated': 'Task Reallocated',
+    'switched': 'Writer Switched',
+    'edited': 'Allocation Edited',
+    'cancelled': 'Allocation Cancelled',
+}
+
+_QUERY_STATUS_ATTR = '_timeline_query_status'
+
+
+def _db(using='default'):
+    from django.db import connections
+
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection.connection
+
+
+def timeline_id(scope, ref):
+    return f"{scope}:{ref}"
+
+
+def _new_eid():
+    return str(ObjectId()) if ObjectId is not None else timezone.now().strftime('%Y%m%d%H%M%S%f')
+
+
+def make_event(kind, at, title, description='', icon='file-text', color='gray', actor=None):
+    return {
+        'eid': _new_eid(),
+        'at': at or timezone.now(),
+        'kind': kind,
+        'title': title,
+        'description': description,
+        'icon': icon,
+        'color': color,
+        'actor': actor,
+    }
+
+
+def _user_label(user):
+    if user is None:
+        return None
+    return user.get_full_name() or user.email
+
+
+# ----------------------------------------------------------------------
+# Event builders
+# ----------------------------------------------------------------------
+def _marketing_description(event_key, metadata):
+    if event_key in CREATION_EVENTS:
+        description = f"System ID: {metadata.get('job_system_id')} | Job ID: {metadata.get('job_id')}"
+        if metadata.get('cloned_from'):
+            description += f" | Cloned from {metadata['cloned_from']}"
+        return description
+    if event_key == 'job.ai_summary.generated':
+        parts = []
+        if metadata.get('version') is not None:
+            parts.append(f"Version {metadata['version']}")
+        if metadata.get('degree') is not None:
+            parts.append(f"Degree: {metadata['degree']}")
+        return ' | '.join(parts)
+    if event_key == 'job.masking_id_generated_at':
+        return f"ID: {metadata.get('masking_id')}"
+    if event_key == 'job.final_form_submitted_at':
+        return f"Status changed to {str(metadata.get('status') or '').title()}"
+    if event_key == 'job.status.changed':
+        old, new = metadata.get('old_status'), metadata.get('new_status') or metadata.get('status')
+        return f"{old} → {new}" if old else (new or '')
+    if 'attachments_count' in metadata:
+        return f"{metadata['attachments_count']} attachment(s)"
+    return ''
+
+
+def _activity_event(event_key, created_at, metadata, actor):
+    spec = MARKETING_EVENTS.get(event_key)
+    if spec is None:
+        return None
+    title, icon, color = spec
+    metadata = metadata or {}
+    return make_event(
+        event_key, created_at, title,
+        _marketing_description(event_key, metadata), icon, color,
+        actor or metadata.get('performed_by'),
+    )
+
+
+def event_from_activity_log(log):
+    """Timeline event for a marketing ActivityLog row, or None if not shown."""
+    actor = _user_label(log.performed_by) if log.performed_by_id else None
+    return _activity_event(log.event_key, log.created_at, log.metadata, actor)
+
+
+def event_from_allocation_history(history):
+    previous = _user_label(history.previous_user) if history.previous_user_id else None
+    new = _user_label(history.new_user) if history.new_user_id else None
+    task = history.task_allocation.get_task_type_display()
+    if previous and new:
+        description = f"{task}: {previous} → {new}"
+    else:
+        description = f"{task}: {new or previous or 'unassigned'}"
+    if history.reason:
+        description += f" ({history.reason})"
+    color = 'gray' if history.action == 'cancelled' else 'green'
+    return make_event(
+        f'allocation.{history.action}', history.timestamp,
+        ALLOCATION_TITLES.get(history.action, history.get_action_display()),
+        description, 'send', color, _user_label(history.changed_by),
+    )
+
+
+def event_from_query(query, resolved=False):
+    if resolved:
+        return make_event(
+            'query.resolved', query.resolved_at, 'Query Resolved',
+            (query.response_text or '')[:200], 'check', 'green',
+            _user_label(query.resolved_by) if query.resolved_by_id else None,
+        )
+    return make_event(
+        'query.raised', query.created_at, 'Query Raised',
+        (query.query_text or '')[:200], 'eye', 'yellow', _user_label(query.raised_by),
+    )
+
+
+def allocator_created_event(job):
+    return make_event(
+        'job.created', job.created_at, 'Job Created',
+        f"Masking ID: {job.masking_id}", 'plus-circle', 'blue',
+        _user_label(job.created_by) if job.created_by_id else None,
+    )
+
+
+# ----------------------------------------------------------------------
+# Writing
+# ----------------------------------------------------------------------
+def append_events(scope, ref, events, owner_id=None, seeded=False, using='default'):
+    """
+    Push ``events`` onto the timeline of ``scope``/``ref``. ``seeded`` marks a
+    document created by this call as complete (the job's first event).
+    """
+    from pymongo import ReturnDocument
+
+    events = [event for event in events if event]
+    if not events:
+        return
+    on_insert = {'seeded': seeded, 'archived': 0}
+    if owner_id is not None:
+        on_insert['owner_id'] = owner_id
+    document = _db(using)[TIMELINE_COLLECTION].find_one_and_update(
+        {'_id': timeline_id(scope, ref)},
+        {
+            '$push': {'events': {'$each': events}},
+            '$inc': {'size': len(events)},
+            '$set': {'updated_at': timezone.now()},
+            '$setOnInsert': on_insert,
+        },
+        upsert=True,
+        projection={'size': 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if document and document.get('size', 0) > TIMELINE_CAP + TIMELINE_SPILL:
+        spill_timeline(scope, ref, using=using)
+
+
+def spill_timeline(scope, ref, using='default'):
+    """Move the events beyond ``TIMELINE_CAP`` (oldest first) to one archive bucket."""
+    from pymongo.errors import DuplicateKeyError
+
+    db = _db(using)
+    key = timeline_id(scope, ref)
+    document = db[TIMELINE_COLLECTION].find_one({'_id': key}, {'events': 1})
+    events = sorted((document or {}).get('events') or [], key=lambda event: _as_aware(event['at']))
+    overflow = events[:max(0, len(events) - TIMELINE_CAP)]
+    if not overflow:
+        return 0
+    try:
+        db[TIMELINE_ARCHIVE_COLLECTION].insert_one({
+            # Keyed on the first event so two concurrent spills cannot duplicate a bucket.
+            '_id': f"{key}:{overflow[0]['eid']}",
+            'timeline_id': key,
+            'first_at': overflow[0]['at'],
+            'last_at': overflow[-1]['at'],
+            'events': overflow,
+        })
+    except DuplicateKeyError:
+        return 0
+    # $pull by eid rather than $slice so events appended meanwhile are kept.
+    db[TIMELINE_COLLECTION].update_one(
+        {'_id': key},
+        {
+            '$pull': {'events': {'eid': {'$in': [event['eid'] for event in overflow]}}},
+            '$inc': {'size': -len(overflow), 'archived': len(overflow)},
+        },
+    )
+    return len(overflow)
+
+
+def delete_timeline(scope, ref, using='default'):
+    key = timeline_id(scope, ref)
+    db = _db(using)
+    db[TIMELINE_COLLECTION].delete_one({'_id': key})
+    db[TIMELINE_ARCHIVE_COLLECTION].delete_many({'timeline_id': key})
+
+
+# ----------------------------------------------------------------------
+# Seeding from the source collections
+# ----------------------------------------------------------------------
+def _marketing_event(event_key, at, description='', actor=None):
+    title, icon, color = MARKETING_EVENTS[event_key]
+    return make_event(event_key, at, title, description, icon, color, actor)
+
+
+# JobActionLog actions without a Job timestamp of their own -> ActivityLog key.
+ACTION_LOG_EVENTS = {
+    'initial_form_saved': 'job.initial_form.saved',
+    'status_changed': 'job.status.changed',
+    'allocated': 'job.allocated',
+    'updated': 'job.updated',
+}
+
+
+def marketing_source_events(job):
+    """
+    Events of a marketing job rebuilt from its timestamp fields, summary
+    versions and action logs (ActivityLog metadata is stored as a JSON
+    string, so it cannot be queried by job).
+    """
+    creator = _user_label(job.created_by) if job.created_by_id else None
+    events = [_marketing_event(
+        'job.created', job.created_at, f"System ID: {job.system_id} | Job ID: {job.job_id}", creator,
+    )]
+    if job.job_name_validated_at:
+        events.append(_marketing_event('job.job_id.validated', job.job_name_validated_at, 'Job ID uniqueness confirmed'))
+    if job.initial_form_submitted_at:
+        events.append(_marketing_event(
+            'job.initial_form.submitted', job.initial_form_submitted_at,
+            f"Instruction and {job.attachments.count()} attachment(s)",
+        ))
+    if job.ai_summary_requested_at:
+        events.append(_marketing_event('job.ai_summary.requested', job.ai_summary_requested_at, 'Summary generation initiated'))
+    for version in job.summary_versions.all():
+        events.append(_marketing_event(
+            'job.ai_summary.generated', version.generated_at,
+            f"Version {version.version_number} | Degree: {version.degree}", version.performed_by,
+        ))
+    if job.ai_summary_accepted_at:
+        events.append(_marketing_event(
+            'job.ai_summary.accepted', job.ai_summary_accepted_at, f"Version {job.ai_summary_version} accepted",
+        ))
+    if job.final_form_opened_at:
+        events.append(_marketing_event('job.final_form_opened_at', job.final_form_opened_at, 'Marketing user accessed final form'))
+    if job.final_form_submitted_at:
+        events.append(_marketing_event(
+            'job.final_form_submitted_at', job.final_form_submitted_at,
+            f"Status changed to {job.get_status_display()} | System ID: {job.system_id}", creator,
+        ))
+    job_template = getattr(job, 'job_template', None) if job.masking_id_generated_at else None
+    if job_template is not None:
+        events.append(_marketing_event(
+            'job.masking_id_generated_at', job.masking_id_generated_at, f"ID: {job_template.masking_id}", 'system',
+        ))
+    action_logs = job.action_logs.filter(action__in=list(ACTION_LOG_EVENTS)).select_related('performed_by')
+    for log in action_logs:
+        event_key = ACTION_LOG_EVENTS[log.action]
+        actor = _user_label(log.performed_by) if log.performed_by_id else log.performed_by_type
+        events.append(_marketing_event(
+            event_key, log.timestamp, _marketing_description(event_key, log.details or {}), actor,
+        ))
+    return events
+
+
+def source_events(scope, job):
+    """All events for ``job`` recomputed from the source collections."""
+    if scope == SCOPE_MARKETING:
+        return marketing_source_events(job)
+
+    AllocationHistory = apps.get_model('allocator', 'AllocationHistory')
+    JobQuery = apps.get_model('allocator', 'JobQuery')
+    events = [allocator_created_event(job)]
+    history = AllocationHistory.objects.filter(task_allocation__job=job).select_related(
+        'task_allocation', 'previous_user', 'new_user', 'changed_by'
+    )
+    events.extend(event_from_allocation_history(entry) for entry in history)
+    for query in JobQuery.objects.filter(job=job).select_related('raised_by', 'resolved_by'):
+        events.append(event_from_query(query))
+        if query.status == 'resolved' and query.resolved_at:
+            events.append(event_from_query(query, resolved=True))
+    return events
+
+
+def _ref(scope, job):
+    return job.system_id if scope == SCOPE_MARKETING else job.pk
+
+
+def rebuild_timeline(scope, job, using='default'):
+    """Replace the timeline of ``job`` with one recomputed from its sources."""
+    events = sorted(source_events(scope, job), key=lambda event: _as_aware(event['at']))
+    key = timeline_id(scope, _ref(scope, job))
+    db = _db(using)
+    db[TIMELINE_ARCHIVE_COLLECTION].delete_many({'timeline_id': key})
+    db[TIMELINE_COLLECTION].replace_one(
+        {'_id': key},
+        {
+            '_id': key,
+            'owner_id': job.created_by_id,
+            'seeded': True,
+            'size': len(events),
+            'archived': 0,
+            'events': events,
+            'updated_at': timezone.now(),
+        },
+        upsert=True,
+    )
+    if len(events) > TIMELINE_CAP:
+        spill_timeline(scope, _ref(scope, job), using=using)
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+def get_timeline(scope, ref, using='default'):
+    """The timeline document (one ``_id`` read), or None."""
+    return _db(using)[TIMELINE_COLLECTION].find_one({'_id': timeline_id(scope, ref)})
+
+
+def ensure_timeline(scope, job, using='default'):
+    """Timeline document of ``job``, seeding it from the sources if needed."""
+    document = get_timeline(scope, _ref(scope, job), using=using)
+    if document is None or not document.get('seeded'):
+        rebuild_timeline(scope, job, using=using)
+        document = get_timeline(scope, _ref(scope, job), using=using)
+    return document
+
+
+def get_archived_events(scope, ref, using='default'):
+    key = timeline_id(scope, ref)
+    events = []
+    for bucket in _db(using)[TIMELINE_ARCHIVE_COLLECTION].find({'timeline_id': key}).sort('first_at', 1):
+        events.extend(bucket.get('events') or [])
+    return events
+
+
+def _as_aware(value):
+    # pymongo hands back naive UTC datetimes.
+    return value if timezone.is_aware(value) else timezone.make_aware(value, timezone.utc)
+
+
+def serialize_timeline(document, archived_events=None):
+    """JSON-ready payload for the timeline endpoints."""
+    events = list(archived_events or []) + list((document or {}).get('events') or [])
+    events.sort(key=lambda event: _as_aware(event['at']))
+    return {
+        'events': [
+            {
+                'id': event['eid'],
+                'timestamp': _as_aware(event['at']).isoformat(),
+                'kind': event.get('kind'),
+                'title': event.get('title'),
+                'description': event.get('description') or '',
+                'icon': event.get('icon'),
+                'color': event.get('color'),
+                'actor': event.get('actor'),
+            }
+            for event in events
+        ],
+        'archived_count': (document or {}).get('archived', 0),
+        'includes_archive': archived_events is not None,
+    }
+
+
+# ----------------------------------------------------------------------
+# Signal handlers
+# ----------------------------------------------------------------------
+def append_activity_logs(logs, using='default'):
+    """Add marketing job events for ActivityLog rows (used for bulk inserts too)."""
+    by_job = {}
+    for log in logs:
+        system_id = (log.metadata or {}).get('job_system_id')
+        if not system_id:
+            continue
+        event = event_from_activity_log(log)
+        if event:
+            by_job.setdefault(system_id, []).append((log, event))
+    for system_id, items in by_job.items():
+        first_log = items[0][0]
+        creation = first_log.event_key in CREATION_EVENTS
+        try:
+            append_events(
+                SCOPE_MARKETING, system_id, [event for _, event in items],
+                owner_id=first_log.subject_user_id if creation else None,
+                seeded=creation,
+                using=using,
+            )
+        except Exception as exc:
+            logger.warning(f"Timeline update failed for {system_id}: {exc}")
+
+
+def _activity_saved(sender, instance, created, raw=False, using='default', **kwargs):
+    if created and not raw:
+        append_activity_logs([instance], using=using)
+
+
+def _allocator_job_saved(sender, instance, created, raw=False, using='default', **kwargs):
+    if not created or raw:
+        return
+    try:
+        append_events(SCOPE_ALLOCATOR, instance.pk, [allocator_created_event(instance)],
+                      owner_id=instance.created_by_id, seeded=True, using=using)
+    except Exception as exc:
+        logger.warning(f"Timeline update failed for allocator job {instance.pk}: {exc}")
+
+
+def append_allocation_histories(histories, using='default'):
+    """Add allocator job events for AllocationHistory rows (used for bulk inserts too)."""
+    by_job = {}
+    for history in histories:
+        try:
+            event = event_from_allocation_history(history)
+        except Exception as exc:
+            logger.warning(f"Timeline event failed for allocation history {history.pk}: {exc}")
+            continue
+        by_job.setdefault(history.task_allocation.job_id, []).append(event)
+    for job_id, events in by_job.items():
+        try:
+            append_events(SCOPE_ALLOCATOR, job_id, events, using=using)
+        except Exception as exc:
+            logger.warning(f"Timeline update failed for allocator job {job_id}: {exc}")
+
+
+def _allocation_history_saved(sender, instance, created, raw=False, using='default', **kwargs):
+    if created and not raw:
+        append_allocation_histories([instance], using=using)
+
+
+def _remember_query_status(sender, instance, **kwargs):
+    setattr(instance, _QUERY_STATUS_ATTR, instance.__dict__.get('status') if instance.pk else None)
+
+
+def _query_saved(sender, instance, created, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, _QUERY_STATUS_ATTR, None)
+    setattr(instance, _QUERY_STATUS_ATTR, instance.status)
+    if created:
+        event = event_from_query(instance)
+    elif instance.status == 'resolved' and previous != 'resolved' and instance.resolved_at:
+        event = event_from_query(instance, resolved=True)
+    else:
+        return
+    try:
+        append_events(SCOPE_ALLOCATOR, instance.job_id, [event], using=using)
+    except Exception as exc:
+        logger.warning(f"Timeline update failed for query {instance.pk}: {exc}")
+
+
+def _marketing_job_deleted(sender, instance, using='default', **kwargs):
+    try:
+        delete_timeline(SCOPE_MARKETING, instance.system_id, using=using)
+    except Exception as exc:
+        logger.warning(f"Timeline cleanup failed for {instance.system_id}: {exc}")
+
+
+def _allocator_job_deleted(sender, instance, using='default', **kwargs):
+    try:
+        delete_timeline(SCOPE_ALLOCATOR, instance.pk, using=using)
+    except Exception as exc:
+        logger.warning(f"Timeline cleanup failed for allocator job {instance.pk}: {exc}")
+
+
+def connect_job_timelines():
+    """Wire the signal handlers; called from CommonConfig.ready()."""
+    uid = 'job_timelines'
+    post_save.connect(_activity_saved, sender=apps.get_model('accounts', 'ActivityLog'), dispatch_uid=uid)
+    post_save.connect(_allocator_job_saved, sender=apps.get_model('allocator', 'Job'), dispatch_uid=uid)
+    post_save.connect(
+        _allocation_history_saved, sender=apps.get_model('allocator', 'AllocationHistory'), dispatch_uid=uid
+    )
+    query_model = apps.get_model('allocator', 'JobQuery')
+    post_init.connect(_remember_query_status, sender=query_model, dispatch_uid=uid)
+    post_save.connect(_query_saved, sender=query_model, dispatch_uid=uid)
+    post_delete.connect(_marketing_job_deleted, sender=apps.get_model('marketing', 'Job'), dispatch_uid=uid)
+    post_delete.connect(_allocator_job_deleted, sender=apps.get_model('allocator', 'Job'), dispatch_uid=uid)
+
+
+def ensure_timeline_indexes(db):
+    db[TIMELINE_ARCHIVE_COLLECTION].create_index(
+        [('timeline_id', 1), ('first_at', 1)], name=TIMELINE_ARCHIVE_INDEX
+    )
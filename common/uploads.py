@@ -0,0 +1,90 @@
+"""
+Sharded upload layout.
+
+New uploads are spread over a two-level hex prefix derived from the first
+path component after the upload prefix, e.g.::
+
+    job_attachments/CH-A3K9M2/brief.pdf  ->  job_attachments/5e/0b/CH-A3K9M2/brief.pdf
+    process/ai_files/report.pdf          ->  process/ai_files/9c/41/report.pdf
+
+so no single directory grows with the total number of files.
+"""
+
+import functools
+import hashlib
+import re
+
+from django.utils.deconstruct import deconstructible
+
+SHARD_SEGMENT = re.compile(r'^[0-9a-f]{2}$')
+
+
+def shard_for(key):
+    """Return the two hex directory levels used for ``key``."""
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return digest[:2], digest[2:4]
+
+
+def shard_path(prefix, relative_name):
+    """Insert the shard directories between ``prefix`` and ``relative_name``."""
+    relative_name = relative_name.lstrip('/')
+    first, second = shard_for(relative_name.split('/', 1)[0])
+    return f"{prefix.rstrip('/')}/{first}/{second}/{relative_name}"
+
+
+def is_sharded(name, prefix):
+    """True when ``name`` already lives under ``prefix/xx/yy/``."""
+    head = prefix.rstrip('/') + '/'
+    if not name.startswith(head):
+        return False
+    parts = name[len(head):].split('/')
+    return len(parts) >= 3 and bool(SHARD_SEGMENT.match(parts[0])) and bool(SHARD_SEGMENT.match(parts[1]))
+
+
+def to_sharded(name, prefix):
+    """Map a legacy flat name to its sharded location (unchanged if not under ``prefix``)."""
+    head = prefix.rstrip('/') + '/'
+    if not name.startswith(head) or is_sharded(name, prefix):
+        return name
+    return shard_path(prefix, name[len(head):])
+
+
+def to_legacy(name, prefix):
+    """Inverse of :func:`to_sharded`; used to clean up pre-migration copies."""
+    if not is_sharded(name, prefix):
+        return name
+    head = prefix.rstrip('/') + '/'
+    parts = name[len(head):].split('/')
+    return head + '/'.join(parts[2:])
+
+
+@deconstructible
+class ShardedUploadTo:
+    """``upload_to`` replacement for plain directory prefixes."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix.rstrip('/')
+
+    @property
+    def shard_prefix(self):
+        return self.prefix
+
+    def __call__(self, instance, filename):
+        return shard_path(self.prefix, filename)
+
+    def __eq__(self, other):
+        return isinstance(other, ShardedUploadTo) and other.prefix == self.prefix
+
+
+def sharded_upload(prefix):
+    """
+    Decorator for ``upload_to`` callables that return a name relative to
+    ``prefix``; the decorated function returns the full sharded path.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(instance, filename):
+            return shard_path(prefix, func(instance, filename))
+        wrapper.shard_prefix = prefix.rstrip('/')
+        return wrapper
+    return decorator
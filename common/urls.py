@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('dashboard/', views.home_dashboard, name='home_dashboard'),
+    path('media-archive/<path:path>', views.rehydrate_media, name='rehydrate_media'),
 ]
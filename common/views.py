@@ -1,5 +1,7 @@
-from django.shortcuts import render
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
+from django.http import Http404
 from django.utils import timezone
 
 def home(request):
@@ -15,3 +17,12 @@ def home_dashboard(request):
         'today_date': timezone.localdate(),
     }
     return render(request, 'common/home_dashboard.html', context)
+
+
+@login_required
+def rehydrate_media(request, path):
+    """Bring an archived attachment back to the hot tier and redirect to it"""
+    if not hasattr(default_storage, 'ensure_local') or not default_storage.exists(path):
+        raise Http404("File not found")
+    default_storage.ensure_local(path)
+    return redirect(default_storage.url(path))
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.12 on 2026-10-19 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0006_job_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['updated_at'], name='marketing_j_updated_0e54cc_idx'),
+        ),
+    ]
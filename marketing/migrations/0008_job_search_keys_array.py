@@ -0,0 +1,30 @@
+# Generated by Django 3.1.12 on 2026-10-19 02:04
+
+import common.search
+from django.db import migrations
+
+from common.search import backfill_search_keys
+
+SEARCH_ID_COLUMNS = ['system_id', 'job_id']
+
+
+def rewrite_search_keys(apps, schema_editor):
+    # Rows saved since the field was added hold the keys as a JSON string.
+    model = apps.get_model('marketing', 'Job')
+    backfill_search_keys(schema_editor.connection.connection[model._meta.db_table], SEARCH_ID_COLUMNS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0007_job_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='search_keys',
+            field=common.search.SearchKeysField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(rewrite_search_keys, migrations.RunPython.noop),
+    ]
@@ -7,10 +7,14 @@ import os
 import random
 import string
 import time
+from common.search import SearchIndexedModel
+from common.uploads import sharded_upload
 
+
+@sharded_upload('job_attachments')
 def job_attachment_path(instance, filename):
-    """Generate file path for job attachments"""
-    return f'job_attachments/{instance.job.system_id}/{filename}'
+    """Generate file path for job attachments (sharded on the job's system ID)"""
+    return f'{instance.job.system_id}/{filename}'
 
 
 # class Job(models.Model):
@@ -155,9 +159,13 @@ def job_attachment_path(instance, filename):
 
 
 
-class Job(models.Model):
+class Job(SearchIndexedModel):
     """Main Job model with comprehensive tracking"""
 
+    # Indexed search (see common.search / rebuild_search_index)
+    SEARCH_ID_FIELDS = ('system_id', 'job_id')
+    SEARCH_TEXT_WEIGHTS = {'system_id': 10, 'job_id': 10, 'topic': 5, 'job_summary': 2, 'instruction': 1}
+
     # Use Mongo ObjectId as primary key to match stored documents
     id = djongo_models.ObjectIdField(primary_key=True, db_column='_id')
     CATEGORY_CHOICES = [
@@ -313,25 +321,31 @@ class Job(models.Model):
             models.Index(fields=['job_id']),
             models.Index(fields=['status']),
             models.Index(fields=['created_by']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
         return f"{self.system_id} - {self.job_id}"
     
     @staticmethod
-    def generate_system_id():
+    def random_system_id():
         """
-        Generate unique system ID: CH-XXXXXX
+        Candidate system ID: CH-XXXXXX
         Where XXXXXX is 6 random alphanumeric characters (A-Z, 0-9)
         Example: CH-A3K9M2, CH-7B4XP1
+        Uniqueness is left to the unique index on system_id.
         """
+        random_part = ''.join(random.choices(
+            string.ascii_uppercase + string.digits, 
+            k=6
+        ))
+        return f"CH-{random_part}"
+
+    @staticmethod
+    def generate_system_id():
+        """Generate a system ID that is not used yet (one query per attempt)."""
         while True:
-            # Generate 6 random alphanumeric characters
-            random_part = ''.join(random.choices(
-                string.ascii_uppercase + string.digits, 
-                k=6
-            ))
-            system_id = f"CH-{random_part}"
+            system_id = Job.random_system_id()
             
             # Check if it already exists
             if not Job.objects.filter(system_id=system_id).exists():
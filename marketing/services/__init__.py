@@ -0,0 +1,16 @@
+from .cloning import clone_job, next_clone_job_id
+from .finalisation import FinalFormSubmission, PrefixesExhausted, finalise_job
+from .job_creation import JobIdTaken, create_draft_job
+from .job_id_index import job_id_exists, job_id_index
+
+__all__ = [
+    'FinalFormSubmission',
+    'JobIdTaken',
+    'PrefixesExhausted',
+    'clone_job',
+    'create_draft_job',
+    'finalise_job',
+    'job_id_exists',
+    'job_id_index',
+    'next_clone_job_id',
+]
@@ -0,0 +1,130 @@
+"""Copy-on-write cloning of marketing jobs for repeat clients."""
+
+import logging
+import os
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from marketing.models import Job, JobAttachment, JobActionLog, JobSummaryVersion
+
+logger = logging.getLogger('marketing')
+
+SUMMARY_FIELDS = [
+    'category', 'topic', 'word_count', 'referencing_style', 'writing_style',
+    'job_summary', 'level', 'software', 'ai_summary_version', 'ai_summary_generated_at',
+    'job_card_degree',
+]
+
+
+def next_clone_job_id(job_id):
+    """``ABC`` -> ``ABC-COPY``, then ``ABC-COPY2``... until unused."""
+    base = f"{job_id}-COPY"
+    candidate = base
+    suffix = 2
+    while Job.objects.filter(job_id=candidate).exists():
+        candidate = f"{base}{suffix}"
+        suffix += 1
+    return candidate
+
+
+def _link_attachment_file(source_name, target_name):
+    """
+    Hard-link ``source_name`` to a free name derived from ``target_name``.
+    Falls back to sharing the source name when linking is not possible
+    (different filesystems); the bytes are never copied.
+    """
+    storage = default_storage
+    if hasattr(storage, 'ensure_local'):
+        source_path = storage.ensure_local(source_name)
+    else:
+        source_path = storage.path(source_name)
+
+    target_name = storage.get_available_name(target_name)
+    target_path = storage.path(target_name)
+    try:
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.link(source_path, target_path)
+    except OSError as exc:
+        logger.info(f"Hard link failed for {source_name}, sharing stored file instead: {exc}")
+        return source_name
+    return target_name
+
+
+def clone_job(source, user, job_id=None, carry_summary=False):
+    """
+    Create a new draft from ``source`` with a fresh system_id. Attachments
+    reference the same bytes on disk; with ``carry_summary`` the AI summary
+    fields and versions are copied so no extraction or generation is repeated.
+    Acceptance is not: the draft opens on the carried summary to be accepted.
+    """
+    now = timezone.now()
+    job_id = (job_id or '').strip() or next_clone_job_id(source.job_id)
+
+    with transaction.atomic():
+        clone = Job(
+            system_id=Job.generate_system_id(),
+            job_id=job_id,
+            instruction=source.instruction,
+            created_by=user,
+            status='draft',
+            created_at=now,
+            initial_form_last_saved_at=now,
+            job_name_validated_at=now,
+        )
+        if carry_summary:
+            for field in SUMMARY_FIELDS:
+                setattr(clone, field, getattr(source, field))
+            clone.ai_summary_generated_at = list(source.ai_summary_generated_at or [])
+        clone.save()
+
+        attachments = []
+        for attachment in source.attachments.all():
+            if not attachment.file or not default_storage.exists(attachment.file.name):
+                logger.warning(f"Skipping missing attachment {attachment.file.name} while cloning {source.system_id}")
+                continue
+            placeholder = JobAttachment(job=clone, original_filename=attachment.original_filename)
+            target_name = attachment.file.field.generate_filename(
+                placeholder, os.path.basename(attachment.file.name)
+            )
+            attachments.append(JobAttachment(
+                job=clone,
+                file=_link_attachment_file(attachment.file.name, target_name),
+                original_filename=attachment.original_filename,
+                file_size=attachment.file_size,
+                uploaded_at=now,
+                uploaded_by=user,
+            ))
+        for attachment in attachments:
+            attachment.save()
+
+        if carry_summary:
+            for version in source.summary_versions.all():
+                JobSummaryVersion.objects.create(
+                    job=clone,
+                    version_number=version.version_number,
+                    topic=version.topic,
+                    word_count=version.word_count,
+                    referencing_style=version.referencing_style,
+                    writing_style=version.writing_style,
+                    job_summary=version.job_summary,
+                    degree=version.degree,
+                    generated_at=version.generated_at,
+                    performed_by=version.performed_by,
+                    ai_model_used=version.ai_model_used,
+                )
+
+        JobActionLog.objects.create(
+            job=clone,
+            action='created',
+            performed_by=user,
+            performed_by_type='user',
+            details={
+                'cloned_from': source.system_id,
+                'attachments_count': len(attachments),
+                'summary_carried_over': bool(carry_summary),
+            },
+        )
+
+    return clone
@@ -0,0 +1,251 @@
+"""
+Finalisation pipeline for the final job form.
+
+The view validates the submission once and hands a ``FinalFormSubmission``
+to ``finalise_job``, which runs the write stages in an order that is safe to
+re-run after a crash:
+
+1. job template - reused when the job already has one, so a retry never
+   creates a second ``JobTemplate`` (the one-to-one index also guards races);
+2. tasks - only the task codes still missing are inserted, in one bulk insert;
+3. attachments - files already attached to the job under the same name and
+   size are skipped, so a resubmission does not attach them twice;
+4. logs - activity events in one batch, plus the job action log;
+5. the job itself - a single save that flips the status to ``unallocated``.
+
+Until the last stage the job stays in ``draft``/``pending``, so the form can
+simply be submitted again and the pipeline picks up where it stopped.
+
+IDs are generated without ``exists()`` loops: the project prefix is drawn from
+the prefixes still free for the group (one query), and masking/task IDs rely
+on their unique indexes, retrying on the rare collision.
+"""
+
+import logging
+import random
+import string
+from collections import namedtuple
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from accounts.services import build_activity_event, log_activity_events
+from common.mongo import is_duplicate_key_error
+from marketing.models import JobActionLog, JobAttachment
+from superadminpanel.models import JobTask, JobTemplate
+
+logger = logging.getLogger('marketing')
+
+ID_ALPHABET = string.ascii_uppercase + string.digits
+ID_ATTEMPTS = 5
+
+FinalFormSubmission = namedtuple('FinalFormSubmission', [
+    'topic', 'category', 'level', 'word_count', 'referencing_style', 'writing_style',
+    'instruction', 'template', 'project_group', 'expected_deadline', 'strict_deadline',
+    'software', 'amount', 'system_expected_amount', 'attachments',
+])
+
+
+class PrefixesExhausted(Exception):
+    """Every project prefix of a project group is already in use."""
+
+
+def pick_project_prefix(project_group, exclude=()):
+    """Random unused ``<group prefix><2 chars>``, chosen from one query of used ones."""
+    base = project_group.project_group_prefix
+    used = set(
+        JobTemplate.objects.filter(project_prefix__startswith=base)
+        .values_list('project_prefix', flat=True)
+    )
+    used.update(exclude)
+    free = [
+        f"{base}{first}{second}"
+        for first in ID_ALPHABET
+        for second in ID_ALPHABET
+        if f"{base}{first}{second}" not in used
+    ]
+    if not free:
+        raise PrefixesExhausted(base)
+    return random.choice(free)
+
+
+def _ensure_job_template(job, user, submission, now):
+    """Return ``(job_template, resumed)``; never creates a second template for ``job``."""
+    existing = JobTemplate.objects.filter(job=job).first()
+    if existing:
+        return existing, True
+
+    job_template = JobTemplate(
+        job=job,
+        template=submission.template,
+        project_group=submission.project_group,
+        project_prefix=pick_project_prefix(submission.project_group),
+        masking_id=JobTemplate.random_masking_id(submission.category),
+        created_by=user,
+        masking_id_generated_at=now,
+    )
+    for _ in range(ID_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                job_template.save(force_insert=True)
+            return job_template, False
+        except DatabaseError as exc:
+            if not is_duplicate_key_error(exc):
+                raise
+            existing = JobTemplate.objects.filter(job=job).first()
+            if existing:
+                # Another worker finalising the same job won the race.
+                return existing, True
+            job_template.masking_id = JobTemplate.random_masking_id(submission.category)
+    raise RuntimeError(f'Could not allocate a unique masking ID for {job.system_id}')
+
+
+def _build_tasks(job_template, task_configs, word_count, skip_codes=()):
+    return [
+        JobTask(
+            job_template=job_template,
+            task_id=JobTask.generate_task_id(job_template.project_prefix, config['task_code']),
+            task_number=config['task_number'],
+            task_name=config['task_name'],
+            task_code=config['task_code'],
+            assignable_roles=config['assignable_roles'],
+            status='pending',
+            word_count=word_count if config['task_number'] == 1 else None,
+        )
+        for config in task_configs
+        if config['task_code'] not in skip_codes
+    ]
+
+
+def _ensure_tasks(job_template, submission, resumed):
+    """Bulk-insert the template's default tasks that do not exist yet."""
+    task_configs = job_template.template.default_tasks or []
+    existing_codes = set()
+    if resumed:
+        existing_codes = set(job_template.tasks.values_list('task_code', flat=True))
+    tasks = _build_tasks(job_template, task_configs, submission.word_count, existing_codes)
+    if not tasks:
+        return 0
+
+    tried_prefixes = {job_template.project_prefix}
+    for _ in range(ID_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                JobTask.objects.bulk_create(tasks)
+            return len(tasks)
+        except DatabaseError as exc:
+            # A task_id collision means the prefix was taken concurrently
+            # (or by a group sharing the same base); only a fresh template
+            # without tasks can move to another prefix.
+            if not is_duplicate_key_error(exc) or existing_codes:
+                raise
+            JobTask.objects.filter(job_template=job_template).delete()
+            job_template.project_prefix = pick_project_prefix(job_template.project_group, tried_prefixes)
+            tried_prefixes.add(job_template.project_prefix)
+            job_template.save(update_fields=['project_prefix'])
+            tasks = _build_tasks(job_template, task_configs, submission.word_count)
+    raise RuntimeError(f'Could not allocate unique task IDs for {job_template.masking_id}')
+
+
+def _unattached_files(job, files):
+    """``files`` minus those already attached to ``job`` (same name and size)."""
+    if not files:
+        return []
+    attached = set(JobAttachment.objects.filter(job=job).values_list('original_filename', 'file_size'))
+    new_files = []
+    for file in files:
+        key = (file.name, file.size)
+        if key not in attached:
+            attached.add(key)
+            new_files.append(file)
+    return new_files
+
+
+def finalise_job(job, user, submission):
+    """
+    Apply a validated final form to ``job``. Safe to call again for the same
+    job after a partial failure. Returns the job's ``JobTemplate``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job_template, resumed = _ensure_job_template(job, user, submission, now)
+        created_tasks = _ensure_tasks(job_template, submission, resumed)
+
+        new_files = _unattached_files(job, submission.attachments)
+        if new_files:
+            JobAttachment.objects.bulk_create([
+                JobAttachment(
+                    job=job,
+                    file=file,
+                    original_filename=file.name,
+                    file_size=file.size,
+                    uploaded_at=now,
+                    uploaded_by=user,
+                )
+                for file in new_files
+            ])
+
+        already_logged = resumed and JobActionLog.objects.filter(
+            job=job, action='final_form_submitted'
+        ).exists()
+        if not already_logged:
+            masking_id = job_template.masking_id
+            log_activity_events([
+                build_activity_event(
+                    'job.final_form_submitted_at',
+                    subject_user=user,
+                    performed_by=user,
+                    metadata={
+                        'job_system_id': job.system_id,
+                        'job_id': job.job_id,
+                        'masking_id': masking_id,
+                        'status': 'unallocated',
+                    },
+                ),
+                build_activity_event(
+                    'job.masking_id_generated_at',
+                    metadata={
+                        'job_system_id': job.system_id,
+                        'masking_id': masking_id,
+                        'performed_by': 'system',
+                    },
+                ),
+            ])
+            JobActionLog.objects.create(
+                job=job,
+                action='final_form_submitted',
+                performed_by=user,
+                performed_by_type='user',
+                details={
+                    'system_id': job.system_id,
+                    'template': submission.template.template_name,
+                    'project_group': submission.project_group.project_group_name,
+                    'category': submission.category,
+                    'level': submission.level,
+                    'tasks_created': created_tasks,
+                    'resumed': resumed,
+                },
+            )
+
+        job.topic = submission.topic
+        job.category = submission.category
+        job.level = submission.level
+        job.word_count = submission.word_count
+        job.referencing_style = submission.referencing_style or None
+        job.writing_style = submission.writing_style or None
+        job.instruction = submission.instruction
+        job.template = submission.template
+        job.project_group = submission.project_group
+        job.expected_deadline = submission.expected_deadline
+        job.strict_deadline = submission.strict_deadline
+        job.software = submission.software or None
+        job.amount = submission.amount
+        job.system_expected_amount = submission.system_expected_amount
+        job.final_form_submitted_at = now
+        job.masking_id_generated_at = job_template.masking_id_generated_at or now
+        job.status = 'unallocated'
+        job.save()
+
+    if resumed:
+        logger.info(f"Resumed finalisation of {job.system_id} ({created_tasks} missing tasks created)")
+    return job_template
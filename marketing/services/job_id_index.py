@@ -0,0 +1,164 @@
+"""
+Per-process Bloom filter of existing ``Job.job_id`` values.
+
+``check_job_id_unique`` is hit on every keystroke of the create-job form.
+Most typed prefixes do not exist, so the filter answers those without a
+query; only possible matches are confirmed with ``exists()``.
+
+The filter is kept warm by a cheap delta load of jobs saved since the
+newest ``updated_at`` seen (indexed), at most every ``delta_interval``
+seconds. Timestamps are taken before the write lands and other workers
+commit out of order, so each delta re-reads an overlap of
+``delta_overlap`` seconds; re-adding a key is harmless. Because
+``updated_at`` moves on every save, renamed drafts are picked up the same
+way. A periodic full rebuild in a background thread clears keys of deleted
+or renamed jobs; the unique index on ``job_id`` still rejects any save the
+filter lets through.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from common.bloom import BloomFilter
+from marketing.models import Job
+
+logger = logging.getLogger('marketing')
+
+
+class JobIdIndex:
+    def __init__(self, error_rate=0.01, delta_interval=5, delta_overlap=60, rebuild_interval=900,
+                 headroom=2.0, min_capacity=100_000, chunk_size=5000):
+        self.error_rate = error_rate
+        self.delta_interval = delta_interval
+        self.delta_overlap = timedelta(seconds=delta_overlap)
+        self.rebuild_interval = rebuild_interval
+        self.headroom = headroom
+        self.min_capacity = min_capacity
+        self.chunk_size = chunk_size
+
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._last_seen = None
+        self._loaded_at = 0.0
+        self._built_at = 0.0
+        self._rebuilding = False
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _rows_since(self, since=None):
+        """``(updated_at, job_id)`` of jobs saved at or after ``since`` (all when None)."""
+        rows = Job.objects.order_by().values_list('updated_at', 'job_id')
+        if since is not None:
+            rows = rows.filter(updated_at__gte=since)
+        return rows.iterator(chunk_size=self.chunk_size)
+
+    def _build(self):
+        """Stream every job_id into a fresh filter; returns (bloom, last_seen)."""
+        expected = Job.objects.count()
+        bloom = BloomFilter.for_capacity(max(self.min_capacity, int(expected * self.headroom)), self.error_rate)
+        last_seen = None
+        for updated_at, job_id in self._rows_since():
+            if job_id:
+                bloom.add(job_id)
+            if updated_at is not None and (last_seen is None or updated_at > last_seen):
+                last_seen = updated_at
+        return bloom, last_seen
+
+    def _install(self, bloom, last_seen):
+        now = time.monotonic()
+        with self._lock:
+            self._bloom = bloom
+            self._last_seen = last_seen
+            self._built_at = now
+            self._loaded_at = now
+        # Catch up with jobs saved while the full scan was running.
+        self._load_delta()
+
+    def _rebuild_in_background(self):
+        def run():
+            try:
+                self._install(*self._build())
+                logger.info(f"Rebuilt job_id filter: {self.stats()}")
+            except Exception as exc:
+                logger.warning(f"Job ID filter rebuild failed: {exc}")
+            finally:
+                self._rebuilding = False
+
+        self._rebuilding = True
+        threading.Thread(target=run, name='job-id-index-rebuild', daemon=True).start()
+
+    def _load_delta(self):
+        with self._lock:
+            last_seen = self._last_seen
+        since = last_seen - self.delta_overlap if last_seen is not None else None
+        newest = last_seen
+        added = []
+        for updated_at, job_id in self._rows_since(since):
+            if job_id:
+                added.append(job_id)
+            if updated_at is not None and (newest is None or updated_at > newest):
+                newest = updated_at
+        with self._lock:
+            self._bloom.update(added)
+            self._last_seen = newest
+            self._loaded_at = time.monotonic()
+
+    def refresh(self, force=False):
+        """Build on first use, then apply deltas / schedule rebuilds as they fall due."""
+        if self._bloom is None or force:
+            self._install(*self._build())
+            return
+        now = time.monotonic()
+        rebuild_due = now - self._built_at >= self.rebuild_interval or self._bloom.is_saturated
+        if rebuild_due and not self._rebuilding:
+            self._rebuild_in_background()
+        if now - self._loaded_at >= self.delta_interval:
+            self._load_delta()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def add(self, job_id):
+        """Record a job_id saved by this process so it is visible immediately."""
+        if not job_id or self._bloom is None:
+            return
+        with self._lock:
+            self._bloom.add(job_id)
+
+    def might_exist(self, job_id):
+        """False means the job_id is definitely unused (as of the last load)."""
+        try:
+            self.refresh()
+        except Exception as exc:
+            logger.warning(f"Job ID filter unavailable, falling back to the database: {exc}")
+            return True
+        return job_id in self._bloom
+
+    def stats(self):
+        bloom = self._bloom
+        if bloom is None:
+            return {'loaded': False}
+        return {
+            'loaded': True,
+            'keys': len(bloom),
+            'capacity': bloom.capacity,
+            'memory_bytes': bloom.memory_bytes,
+            'hashes': bloom.num_hashes,
+            'expected_error_rate': round(bloom.expected_error_rate, 6),
+        }
+
+
+job_id_index = JobIdIndex()
+
+
+def job_id_exists(job_id, exclude_system_id=None):
+    """Database-confirmed existence check with a Bloom filter fast path for misses."""
+    if not job_id_index.might_exist(job_id):
+        return False
+    query = Job.objects.filter(job_id=job_id)
+    if exclude_system_id:
+        query = query.exclude(system_id=exclude_system_id)
+    return query.exists()
@@ -1,3 +1,426 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import datetime, timedelta
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from bson import ObjectId
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.http import Http404
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import ActivityLog, CustomUser
+from common.bloom import BloomFilter
+from common.models import IdempotencyKey
+from common.mongo import get_collection
+from common.search import search_ranked_ids
+from common.storage import TieredFileSystemStorage
+from common.tests import djongo_insert_error, fake_timeline_db
+from common.timeline import (
+    SCOPE_MARKETING,
+    TIMELINE_ARCHIVE_COLLECTION,
+    TIMELINE_COLLECTION,
+    append_events,
+    make_event,
+)
+from marketing.models import Job, JobActionLog, JobAttachment
+from marketing.services.job_id_index import JobIdIndex
+
+# The package re-exports the ``job_id_index`` singleton under the module's name.
+job_id_index_module = import_module('marketing.services.job_id_index')
+job_creation_module = import_module('marketing.services.job_creation')
+finalisation_module = import_module('marketing.services.finalisation')
+cloning_module = import_module('marketing.services.cloning')
+
+T0 = timezone.make_aware(datetime(2026, 3, 2, 9, 0))
+
+
+def at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+class InMemoryJobIdIndex(JobIdIndex):
+    """JobIdIndex fed from a list of (updated_at, job_id) rows instead of the database."""
+
+    def __init__(self, rows, **kwargs):
+        super().__init__(min_capacity=1000, **kwargs)
+        self.rows = rows
+        self.builds = 0
+        self.delta_loads = 0
+
+    def _rows_since(self, since=None):
+        if since is None:
+            return list(self.rows)
+        self.delta_loads += 1
+        return [(updated_at, job_id) for updated_at, job_id in self.rows if updated_at >= since]
+
+    def _build(self):
+        self.builds += 1
+        bloom = BloomFilter.for_capacity(self.min_capacity, self.error_rate)
+        bloom.update(job_id for _, job_id in self.rows)
+        return bloom, max((updated_at for updated_at, _ in self.rows), default=None)
+
+
+class JobIdIndexTests(SimpleTestCase):
+    def test_existing_ids_are_possible_matches(self):
+        index = InMemoryJobIdIndex([(at(1), 'ABC-1'), (at(2), 'ABC-2')])
+        self.assertTrue(index.might_exist('ABC-1'))
+        self.assertTrue(index.might_exist('ABC-2'))
+        self.assertFalse(index.might_exist('ABC-3'))
+        self.assertEqual(index.builds, 1)
+
+    def test_delta_load_picks_up_new_jobs(self):
+        rows = [(at(1), 'ABC-1')]
+        index = InMemoryJobIdIndex(rows, delta_interval=0)
+        self.assertFalse(index.might_exist('ABC-2'))
+        rows.append((at(2), 'ABC-2'))
+        self.assertTrue(index.might_exist('ABC-2'))
+        self.assertEqual(index.builds, 1)
+
+    def test_delta_load_rereads_an_overlap_for_late_commits(self):
+        rows = [(at(30), 'ABC-1')]
+        index = InMemoryJobIdIndex(rows, delta_interval=0, delta_overlap=60)
+        index.refresh()
+        # Another worker commits a job stamped before the newest one seen.
+        rows.append((at(5), 'LATE-1'))
+        self.assertTrue(index.might_exist('LATE-1'))
+
+    def test_local_add_is_visible_immediately(self):
+        index = InMemoryJobIdIndex([(at(1), 'ABC-1')], delta_interval=3600)
+        index.refresh()
+        index.add('RENAMED-7')
+        self.assertTrue(index.might_exist('RENAMED-7'))
+
+    def test_definite_miss_skips_database(self):
+        index = InMemoryJobIdIndex([(at(1), 'ABC-1')])
+        with mock.patch.object(job_id_index_module, 'job_id_index', index), \
+                mock.patch.object(job_id_index_module.Job, 'objects') as objects:
+            self.assertFalse(job_id_index_module.job_id_exists('NEW-1'))
+            objects.filter.assert_not_called()
+
+            objects.filter.return_value.exists.return_value = True
+            self.assertTrue(job_id_index_module.job_id_exists('ABC-1'))
+            objects.filter.assert_called_once_with(job_id='ABC-1')
+
+    def test_unavailable_filter_falls_back_to_database(self):
+        index = InMemoryJobIdIndex([])
+        with mock.patch.object(index, '_build', side_effect=RuntimeError('db down')):
+            self.assertTrue(index.might_exist('ANY'))
+
+
+def statements(queries):
+    """Captured SQL minus transaction bookkeeping (savepoints are free on MongoDB)."""
+    return [
+        query['sql'] for query in queries
+        if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))
+    ]
+
+
+class InsertRecorder:
+    """Stands in for ``QuerySet._insert``: records one round trip per INSERT."""
+
+    def __init__(self):
+        self.inserts = []
+        self._next_id = 0
+
+    def __call__(self, queryset, objs, fields, returning_fields=None, **kwargs):
+        self.inserts.append((queryset.model, len(objs)))
+        if not returning_fields:
+            return None
+        self._next_id += 1
+        return [[
+            ObjectId() if field.get_internal_type() == 'ObjectIdField' else self._next_id
+            for field in returning_fields
+        ]]
+
+    @property
+    def models(self):
+        return [model for model, _ in self.inserts]
+
+
+class CreateDraftJobRoundTripTests(TestCase):
+    """The old view needed 7 + N statements for N attachments; the service needs a constant 5."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            email='marketer@example.com', username='marketer', first_name='M', last_name='K', role='marketing'
+        )
+        self.recorder = InsertRecorder()
+        patches = [
+            mock.patch.object(QuerySet, '_insert', autospec=True, side_effect=self.recorder),
+            mock.patch('common.counters.apply_deltas'),
+            mock.patch.object(job_creation_module, 'job_id_index'),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _files(self, count):
+        return [SimpleUploadedFile(f'brief-{n}.pdf', b'%PDF-1.4 brief', 'application/pdf') for n in range(count)]
+
+    def _create(self, files, key='form-token'):
+        with CaptureQueriesContext(connection) as queries:
+            result = job_creation_module.create_draft_job(
+                self.user, 'ACME-42', 'x' * 60, files, idempotency_key=key
+            )
+        return result, queries
+
+    def test_round_trips_do_not_grow_with_attachments(self):
+        for count in (1, 10):
+            self.recorder.inserts.clear()
+            (result, created), queries = self._create(self._files(count), key=f'token-{count}')
+            self.assertTrue(created)
+            self.assertTrue(result['system_id'].startswith('CH-'))
+            self.assertEqual(
+                self.recorder.models,
+                [IdempotencyKey, Job, JobAttachment, JobActionLog, ActivityLog],
+            )
+            self.assertEqual(dict(self.recorder.inserts)[JobAttachment], count)
+            # No exists() probes, refreshes or follow-up saves.
+            self.assertEqual(statements(queries), [])
+
+    def test_without_key_skips_the_claim(self):
+        self._create(self._files(2), key=None)
+        self.assertEqual(self.recorder.models, [Job, JobAttachment, JobActionLog, ActivityLog])
+
+    def test_repeated_submission_replays_first_result(self):
+        stored = {'system_id': 'CH-FIRST1', 'job_id': 'ACME-42'}
+        with mock.patch.object(job_creation_module, 'claim_idempotency_key', return_value=(False, stored)):
+            (result, created), _ = self._create(self._files(3))
+        self.assertFalse(created)
+        self.assertEqual(result, stored)
+        self.assertEqual(self.recorder.inserts, [])
+
+
+class FinalisationRetryTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(finalisation_module, 'transaction')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.submission = mock.Mock(category='IT')
+        self.job = mock.Mock(system_id='CH-ABC123')
+
+    def _ensure_template(self, saves, existing):
+        with mock.patch.object(finalisation_module, 'pick_project_prefix', return_value='PRJAB'), \
+                mock.patch.object(finalisation_module, 'JobTemplate') as JobTemplate:
+            JobTemplate.objects.filter.return_value.first.side_effect = existing
+            JobTemplate.random_masking_id.side_effect = ['JOB-FIRST-IT', 'JOB-SECOND-IT']
+            JobTemplate.return_value.save.side_effect = saves
+            template, resumed = finalisation_module._ensure_job_template(
+                self.job, mock.Mock(), self.submission, timezone.now()
+            )
+        return template, resumed
+
+    def test_masking_id_collision_draws_a_new_id(self):
+        template, resumed = self._ensure_template([djongo_insert_error(), None], [None, None])
+        self.assertFalse(resumed)
+        self.assertEqual(template.masking_id, 'JOB-SECOND-IT')
+
+    def test_concurrent_finalisation_reuses_the_winners_template(self):
+        winner = mock.Mock()
+        template, resumed = self._ensure_template([djongo_insert_error()], [None, winner])
+        self.assertTrue(resumed)
+        self.assertIs(template, winner)
+
+    def test_resubmission_skips_attachments_already_on_the_job(self):
+        files = [
+            SimpleUploadedFile('brief.pdf', b'%PDF-1.4 brief'),
+            SimpleUploadedFile('rubric.pdf', b'%PDF-1.4 rubric'),
+        ]
+        with mock.patch.object(finalisation_module, 'JobAttachment') as JobAttachment:
+            JobAttachment.objects.filter.return_value.values_list.return_value = [('brief.pdf', files[0].size)]
+            new_files = finalisation_module._unattached_files(self.job, files)
+        self.assertEqual([file.name for file in new_files], ['rubric.pdf'])
+
+
+class JobTimelineEndpointTests(TestCase):
+    def setUp(self):
+        self.db = fake_timeline_db(self)
+        self.user = CustomUser.objects.create(
+            email='marketer@example.com', username='marketer', role='marketing', is_approved=True,
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('job_timeline', args=['CH-TL0001'])
+
+    def _store(self, owner_id, archived=0):
+        append_events(
+            SCOPE_MARKETING, 'CH-TL0001',
+            [make_event('job.created', at(0), 'Job Created'), make_event('job.updated', at(60), 'Job Updated')],
+            owner_id=owner_id, seeded=True,
+        )
+        if archived:
+            self.db[TIMELINE_COLLECTION].update_one({'_id': 'marketing:CH-TL0001'}, {'$inc': {'archived': archived}})
+            self.db[TIMELINE_ARCHIVE_COLLECTION].insert_one({
+                '_id': 'marketing:CH-TL0001:old', 'timeline_id': 'marketing:CH-TL0001', 'first_at': at(-60),
+                'events': [make_event('job.job_id.validated', at(-60), 'Job ID Validated')],
+            })
+
+    def test_seeded_timeline_is_served_from_one_document(self):
+        self._store(self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            payload = self.client.get(self.url).json()
+        self.assertEqual([event['title'] for event in payload['events']], ['Job Created', 'Job Updated'])
+        self.assertEqual(payload['events'][0]['timestamp'], at(0).isoformat())
+        self.assertFalse(payload['includes_archive'])
+        self.assertFalse([query for query in queries if 'jobs' in query['sql']])
+
+    def test_archive_flag_merges_archived_events(self):
+        self._store(self.user.pk, archived=1)
+        payload = self.client.get(self.url, {'archive': '1'}).json()
+        self.assertTrue(payload['includes_archive'])
+        self.assertEqual(payload['archived_count'], 1)
+        self.assertEqual(payload['events'][0]['title'], 'Job ID Validated')
+
+    def test_other_users_timeline_is_not_found(self):
+        self._store(owner_id=self.user.pk + 1)
+        with mock.patch('marketing.views.get_object_or_404', side_effect=Http404) as lookup:
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+        lookup.assert_called_once_with(Job, system_id='CH-TL0001', created_by=self.user)
+
+
+class SearchKeysStorageTests(SimpleTestCase):
+    def test_keys_reach_djongo_as_an_array(self):
+        field = Job._meta.get_field('search_keys')
+        keys = ['ch-a3k9m2', 'cha3k9m2']
+        self.assertEqual(field.get_db_prep_save(keys, SimpleNamespace(vendor='djongo')), keys)
+        self.assertEqual(field.get_db_prep_save(keys, connection), '["ch-a3k9m2", "cha3k9m2"]')
+
+
+@skipUnless(connection.vendor == 'djongo', 'search_keys are matched with raw MongoDB queries')
+class JobSearchTests(TransactionTestCase):
+    def test_job_saved_through_the_orm_is_found_by_id(self):
+        user = CustomUser.objects.create(email='marketer@example.com', username='marketer', role='marketing')
+        job = Job.objects.create(system_id='CH-Z7Q4W1', job_id='ACME-9051', instruction='x' * 60, created_by=user)
+        job.job_id = 'ACME-9052'
+        job.save(update_fields=['job_id'])
+
+        stored = get_collection(Job).find_one({'_id': job.pk}, {'search_keys': 1})
+        self.assertEqual(stored['search_keys'], ['ch-z7q4w1', 'chz7q4w1', 'acme-9052', 'acme9052'])
+        self.assertEqual(search_ranked_ids(Job, 'ch-z7q4w1')[:1], [job.pk])
+        self.assertIn(job.pk, search_ranked_ids(Job, 'ACME-905'))
+
+
+def recorded(**values):
+    return SimpleNamespace(save=mock.Mock(), **values)
+
+
+def job_attachment_path_for(system_id, filename):
+    return JobAttachment._meta.get_field('file').generate_filename(
+        SimpleNamespace(job=SimpleNamespace(system_id=system_id)), filename,
+    )
+
+
+class CloneJobTests(SimpleTestCase):
+    """Job rows need MongoDB; the models are stubbed and the stored files are real."""
+
+    def setUp(self):
+        hot = tempfile.TemporaryDirectory()
+        cold = tempfile.TemporaryDirectory()
+        self.addCleanup(hot.cleanup)
+        self.addCleanup(cold.cleanup)
+        self.storage = TieredFileSystemStorage(location=hot.name, archive_location=cold.name)
+
+        self.models = {}
+        for name in ('Job', 'JobAttachment', 'JobActionLog', 'JobSummaryVersion'):
+            patcher = mock.patch.object(cloning_module, name)
+            self.models[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+        self.models['Job'].side_effect = recorded
+        self.models['Job'].generate_system_id.return_value = 'CH-CL0NE1'
+        self.models['Job'].objects.filter.return_value.exists.return_value = False
+        self.models['JobAttachment'].side_effect = recorded
+        for target, value in (('default_storage', self.storage), ('transaction', mock.MagicMock())):
+            patcher = mock.patch.object(cloning_module, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.storage._record_rehydration = mock.Mock()
+
+        self.user = SimpleNamespace(pk=7)
+        self.brief = self._attachment('job_attachments/aa/bb/CH-SRC001/brief.pdf', b'%PDF brief')
+        self.source = SimpleNamespace(
+            job_id='ACME-9051', system_id='CH-SRC001', instruction='Write the report' * 4,
+            category='IT', topic='Cloud costs', word_count=2000, referencing_style='apa',
+            writing_style='report', job_summary='Summary', level='masters', software='',
+            ai_summary_version=2, ai_summary_generated_at=[T0.isoformat()], job_card_degree=3,
+        )
+        self.source.attachments = mock.Mock(**{'all.return_value': [self.brief]})
+        self.source.summary_versions = mock.Mock(**{'all.return_value': [SimpleNamespace(
+            version_number=2, topic='Cloud costs', word_count=2000, referencing_style='apa',
+            writing_style='report', job_summary='Summary', degree=3, generated_at=T0,
+            performed_by='system', ai_model_used='model',
+        )]})
+
+    def _attachment(self, name, content):
+        path = self.storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+        field = JobAttachment._meta.get_field('file')
+        return SimpleNamespace(
+            file=SimpleNamespace(name=name, field=field), original_filename=os.path.basename(name),
+            file_size=len(content),
+        )
+
+    def assertShared(self, name):
+        self.assertTrue(os.path.samefile(self.storage.path(name), self.storage.path(self.brief.file.name)))
+
+    def _clone(self, **kwargs):
+        clone = cloning_module.clone_job(self.source, self.user, **kwargs)
+        attachments = [call.kwargs for call in self.models['JobAttachment'].call_args_list if 'file' in call.kwargs]
+        return clone, attachments
+
+    def test_attachments_are_hard_linked_into_the_clone_shard(self):
+        clone, attachments = self._clone()
+        self.assertEqual(clone.job_id, 'ACME-9051-COPY')
+        self.assertEqual(clone.system_id, 'CH-CL0NE1')
+        self.assertEqual(len(attachments), 1)
+        name = attachments[0]['file']
+        self.assertEqual(name, job_attachment_path_for('CH-CL0NE1', 'brief.pdf'))
+        self.assertShared(name)
+        self.assertIs(attachments[0]['job'], clone)
+        self.assertEqual(attachments[0]['file_size'], self.brief.file_size)
+        self.assertEqual(self.models['JobActionLog'].objects.create.call_args.kwargs['details'], {
+            'cloned_from': 'CH-SRC001', 'attachments_count': 1, 'summary_carried_over': False,
+        })
+        self.assertFalse(hasattr(clone, 'job_summary'))
+        self.models['JobSummaryVersion'].objects.create.assert_not_called()
+
+    def test_name_collisions_get_a_free_name(self):
+        taken = job_attachment_path_for('CH-CL0NE1', 'brief.pdf')
+        os.makedirs(os.path.dirname(self.storage.path(taken)), exist_ok=True)
+        open(self.storage.path(taken), 'wb').close()
+        _, attachments = self._clone()
+        self.assertNotEqual(attachments[0]['file'], taken)
+        self.assertShared(attachments[0]['file'])
+
+    def test_archived_attachments_are_rehydrated_then_linked(self):
+        self.storage.archive(self.brief.file.name)
+        _, attachments = self._clone()
+        self.assertTrue(self.storage.is_hot(self.brief.file.name))
+        self.assertShared(attachments[0]['file'])
+
+    def test_missing_files_are_skipped_and_link_failures_share_the_file(self):
+        missing = SimpleNamespace(file=SimpleNamespace(name='job_attachments/aa/bb/CH-SRC001/gone.pdf'))
+        self.source.attachments.all.return_value = [missing, self.brief]
+        with mock.patch('marketing.services.cloning.os.link', side_effect=OSError('cross-device link')), \
+                self.assertLogs('marketing', 'WARNING'):
+            _, attachments = self._clone()
+        self.assertEqual([attachment['file'] for attachment in attachments], [self.brief.file.name])
+
+    def test_carry_summary_copies_fields_and_versions_but_not_acceptance(self):
+        clone, _ = self._clone(job_id=' ACME-9060 ', carry_summary=True)
+        self.assertEqual(clone.job_id, 'ACME-9060')
+        self.assertEqual((clone.topic, clone.word_count, clone.ai_summary_version), ('Cloud costs', 2000, 2))
+        self.assertIsNot(clone.ai_summary_generated_at, self.source.ai_summary_generated_at)
+        self.assertFalse(hasattr(clone, 'ai_summary_accepted_at'))
+        self.assertEqual(self.models['JobSummaryVersion'].objects.create.call_args.kwargs['version_number'], 2)
+
+    def test_next_clone_job_id_skips_used_ids(self):
+        self.models['Job'].objects.filter.return_value.exists.side_effect = [True, True, False]
+        self.assertEqual(cloning_module.next_clone_job_id('ACME-9051'), 'ACME-9051-COPY3')
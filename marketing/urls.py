@@ -29,4 +29,6 @@ urlpatterns = [
     
     # Job View
     path('jobs/<str:system_id>/view/', views.view_job_details, name='view_job_details'),
+    path('jobs/<str:system_id>/clone/', views.clone_job, name='clone_job'),
+    path('jobs/<str:system_id>/timeline/', views.job_timeline, name='job_timeline'),
 ]
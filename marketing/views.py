@@ -6,12 +6,22 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.core.paginator import Paginator
+from common.business_calendar import get_business_calendar, within_calendar_range
+from common.counters import get_status_counts
+from common.pagination import CursorPaginator
+from common.timeline import (
+    SCOPE_MARKETING,
+    ensure_timeline,
+    get_archived_events,
+    get_timeline,
+    serialize_timeline,
+)
 from django.urls import reverse
 from contextlib import contextmanager
 from django.conf import settings
 import json
 import time
+import uuid
 import os
 from openai import OpenAI
 try:
@@ -21,14 +31,22 @@ except ImportError:
 from .models import Job, JobAttachment, JobSummaryVersion, JobActionLog, log_job_activity
 from accounts.models import ActivityLog, CustomUser
 from accounts.services import log_activity_event
+from .services import (
+    FinalFormSubmission,
+    JobIdTaken,
+    PrefixesExhausted,
+    clone_job as clone_marketing_job,
+    create_draft_job,
+    finalise_job,
+    job_id_exists,
+    job_id_index,
+)
 import logging
 
 from superadminpanel.models import (
     TemplateMaster, ProjectGroupMaster, PriceMaster,
     ReferencingMaster, AcademicWritingMaster,
-    JobTemplate, JobTask
 )
-from datetime import timedelta
 
 logger = logging.getLogger('marketing')
 
@@ -143,14 +161,15 @@ def marketing_dashboard(request):
     # Get all jobs created by this marketing user
     all_jobs = Job.objects.filter(created_by=user)
     
-    # Get statistics
+    # Get statistics from the precomputed per-user status counters
+    status_counts = get_status_counts('marketing', user)
     stats = {
-        'total_jobs': all_jobs.count(),
-        'pending_jobs': all_jobs.filter(status='pending').count(),
-        'allocated_jobs': all_jobs.filter(status='allocated').count(),
-        'completed_jobs': all_jobs.filter(status='completed').count(),
-        'hold_jobs': all_jobs.filter(status='hold').count(),
-        'query_jobs': all_jobs.filter(status='query').count(),
+        'total_jobs': sum(status_counts.values()),
+        'pending_jobs': status_counts.get('pending', 0),
+        'allocated_jobs': status_counts.get('allocated', 0),
+        'completed_jobs': status_counts.get('completed', 0),
+        'hold_jobs': status_counts.get('hold', 0),
+        'query_jobs': status_counts.get('query', 0),
     }
     
     # Get draft jobs (not yet finalized)
@@ -181,6 +200,7 @@ JOB_EVENTS = {
     'summary_generated': 'job.ai_summary.generated',
     'summary_accepted': 'job.ai_summary.accepted',
     'status_changed': 'job.status.changed',
+    'cloned': 'job.cloned',
 }
 
 
@@ -219,15 +239,14 @@ def openai_client():
 def _render_job_list(request, queryset, page_title, filter_description=None,
                      empty_title=None, empty_description=None, template_name='marketing/job_list.html'):
     """Shared renderer for marketing job list pages"""
-    paginator = Paginator(queryset, 25)
-    page_number = request.GET.get('page')
-    jobs_page = paginator.get_page(page_number)
+    paginator = CursorPaginator(queryset, 25)
+    jobs_page = paginator.get_page(request.GET.get('page'))
     
     context = {
         'jobs': jobs_page,
         'page_title': page_title,
         'filter_description': filter_description,
-        'total_jobs': queryset.count(),
+        'total_jobs': paginator.count,
         'empty_state': {
             'title': empty_title or 'No jobs found',
             'description': empty_description or 'Try adjusting the filters or create a new job to get started.',
@@ -270,7 +289,26 @@ def create_job(request):
     context = {
         'user': request.user,
         'job': job,
+        # One token per rendered form: repeated submissions replay the first one.
+        'idempotency_key': uuid.uuid4().hex,
     }
+
+    # A draft cloned with its summary opens on that summary, ready to accept.
+    if job and job.ai_summary_version and not job.ai_summary_accepted_at:
+        context['carried_summary'] = {
+            'topic': job.topic,
+            'word_count': job.word_count,
+            'referencing_style': job.referencing_style,
+            'writing_style': job.writing_style,
+            'job_summary': job.job_summary,
+            'category': job.category,
+            'level': job.level,
+            'software': job.software,
+            'version': job.ai_summary_version,
+            'degree': job.job_card_degree,
+            'auto_accepted': False,
+            'can_regenerate': job.can_regenerate_summary(),
+        }
     
     return render(request, 'marketing/create_job.html', context)
 
@@ -288,12 +326,9 @@ def check_job_id_unique(request):
         if not job_id:
             return JsonResponse({'unique': False, 'message': 'Job ID is required'})
         
-        # Check if job_id exists (excluding current job if editing)
-        query = Job.objects.filter(job_id=job_id)
-        if current_system_id:
-            query = query.exclude(system_id=current_system_id)
-        
-        exists = query.exists()
+        # Check if job_id exists (excluding current job if editing); the
+        # in-memory filter answers definite misses without a query
+        exists = job_id_exists(job_id, exclude_system_id=current_system_id)
         
         if exists:
             return JsonResponse({'unique': False, 'message': 'Job ID already exists'})
@@ -355,56 +390,59 @@ def save_initial_form(request):
         if total_after > 10:
             return JsonResponse({'success': False, 'message': 'Maximum 10 attachments allowed including existing and new.'}, status=400)
         
-        with transaction.atomic():
-            # Create or update job
-            if system_id:
-                job = Job.objects.filter(system_id=system_id, created_by=request.user).order_by('-created_at').first()
-                if not job:
-                    return JsonResponse({'success': False, 'message': 'Job not found'}, status=404)
-                job.job_id = job_id
-                job.instruction = instruction
-                job.initial_form_last_saved_at = timezone.now()
-                
-                # Delete old attachments if replacing
-                if replace_flag:
-                    job.attachments.all().delete()
-                else:
-                    if remove_ids:
-                        job.attachments.filter(id__in=remove_ids).delete()                
-                log_action = 'initial_form_saved'
-                event_key = JOB_EVENTS['initial_saved']
-            else:
-                # Create new job
-                system_id = Job.generate_system_id()
-                job = Job.objects.create(
-                    system_id=system_id,
-                    job_id=job_id,
-                    instruction=instruction,
-                    created_by=request.user,
-                    status='draft',
-                    job_name_validated_at=timezone.now()
+        if not system_id:
+            try:
+                result, created = create_draft_job(
+                    request.user,
+                    job_id,
+                    instruction,
+                    files,
+                    idempotency_key=request.POST.get('idempotency_key', '').strip(),
+                    event_key=JOB_EVENTS['created'],
                 )
-                log_action = 'created'
-                event_key = JOB_EVENTS['created']
+            except JobIdTaken:
+                return JsonResponse({'success': False, 'message': 'This Job ID already exists'}, status=400)
+            return JsonResponse({
+                'success': True,
+                'message': 'Initial form saved successfully',
+                'system_id': result['system_id'],
+                'job_id': result['job_id'],
+                'replayed': not created,
+            })
+
+        with transaction.atomic():
+            job = Job.objects.filter(system_id=system_id, created_by=request.user).order_by('-created_at').first()
+            if not job:
+                return JsonResponse({'success': False, 'message': 'Job not found'}, status=404)
+            job.job_id = job_id
+            job.instruction = instruction
+            job.initial_form_last_saved_at = timezone.now()
             
-            # Ensure the job is saved before related objects
+            # Delete old attachments if replacing
+            if replace_flag:
+                job.attachments.all().delete()
+            else:
+                if remove_ids:
+                    job.attachments.filter(id__in=remove_ids).delete()                
             job.save()
-            job.refresh_from_db()
             
             # Save attachments
-            for file in files:
-                JobAttachment.objects.create(
-                    job=job,
-                    file=file,
-                    original_filename=file.name,
-                    file_size=file.size,
-                    uploaded_by=request.user
-                )
+            if files:
+                JobAttachment.objects.bulk_create([
+                    JobAttachment(
+                        job=job,
+                        file=file,
+                        original_filename=file.name,
+                        file_size=file.size,
+                        uploaded_by=request.user
+                    )
+                    for file in files
+                ])
             
             # Log to JobActionLog
             JobActionLog.objects.create(
                 job=job,
-                action=log_action,
+                action='initial_form_saved',
                 performed_by=request.user,
                 performed_by_type='user',
                 details={
@@ -416,7 +454,7 @@ def save_initial_form(request):
             
             # Log to ActivityLog (your system-wide log)
             ActivityLog.objects.create(
-                event_key=event_key,
+                event_key=JOB_EVENTS['initial_saved'],
                 category='job_management',
                 subject_user=request.user,
                 performed_by=request.user,
@@ -429,7 +467,7 @@ def save_initial_form(request):
                 }
             )
             
-            job.save()
+            job_id_index.add(job_id)
             
             return JsonResponse({
                 'success': True,
@@ -477,7 +515,12 @@ def generate_ai_summary(request):
         for attachment in job.attachments.all():
             try:
                 ext = attachment.get_file_extension().lower()
-                file_path = attachment.file.path
+                storage = attachment.file.storage
+                if hasattr(storage, 'ensure_local'):
+                    # Archived attachments are rehydrated before extraction.
+                    file_path = storage.ensure_local(attachment.file.name)
+                else:
+                    file_path = attachment.file.path
                 file_name = attachment.original_filename
 			 # -------- PDF Extraction --------
                 if ext == ".pdf":
@@ -1264,16 +1307,24 @@ def _process_final_form_submission(request, job):
                 if timezone.is_naive(strict_dt):
                     strict_dt = timezone.make_aware(strict_dt)
                 
-                # Strict deadline must be at least 24 hours from now
-                min_strict = timezone.now() + timedelta(hours=24)
-                if strict_dt < min_strict:
-                    errors.append('Strict deadline must be at least 24 hours from now.')
+                if not within_calendar_range(expected_dt, strict_dt):
+                    errors.append('Deadlines must fall within the supported date range.')
+                else:
+                    # Strict deadline must leave at least 24 working hours
+                    # (holidays excluded) from now
+                    now = timezone.now()
+                    calendar = get_business_calendar(covering=(now, expected_dt, strict_dt))
+                    if calendar.working_hours(now, strict_dt) < 24:
+                        errors.append('Strict deadline must be at least 24 working hours from now (holidays excluded).')
+                    for label, deadline_dt in (('Expected', expected_dt), ('Strict', strict_dt)):
+                        if not calendar.is_working_time(deadline_dt):
+                            errors.append(f'{label} deadline falls on a holiday or outside business hours.')
                 
-                # Expected should be before strict
-                if expected_dt >= strict_dt:
-                    errors.append('Expected deadline should be before strict deadline.')
+                    # Expected should be before strict
+                    if expected_dt >= strict_dt:
+                        errors.append('Expected deadline should be before strict deadline.')
                 
-            except ValueError:
+            except (ValueError, OverflowError):
                 errors.append('Invalid deadline format.')
         
         if errors:
@@ -1314,122 +1365,29 @@ def _process_final_form_submission(request, job):
         system_expected = price_per_word * float(word_count)
         normalized_level = _normalize_level(level)
         
-        with transaction.atomic():
-            # Update job with final form data
-            job.topic = topic
-            job.category = category
-            job.level = normalized_level
-            job.word_count = word_count
-            job.referencing_style = referencing_style or None
-            job.writing_style = writing_style or None
-            job.instruction = instruction
-            job.template = template
-            job.project_group = project_group
-            job.expected_deadline = expected_dt
-            job.strict_deadline = strict_dt
-            job.software = software or None
-            job.amount = amount
-            job.system_expected_amount = system_expected
-            
-            # Update timestamps
-            job.final_form_submitted_at = timezone.now()
-            
-            # Change status to unallocated
-            job.status = 'unallocated'
-            
-            job.save()
-            
-            # Handle additional attachments
-            new_files = request.FILES.getlist('other_attachments')
-            for file in new_files:
-                is_valid, msg = validate_file(file)
-                if is_valid:
-                    JobAttachment.objects.create(
-                        job=job,
-                        file=file,
-                        original_filename=file.name,
-                        file_size=file.size,
-                        uploaded_by=request.user
-                    )
-            
-            # Generate project prefix
-            project_prefix = JobTemplate.generate_project_prefix(project_group)
-            
-            # Generate masking ID
-            masking_id = JobTemplate.generate_masking_id(category, project_prefix)
-            masking_generated_at = timezone.now()
-            
-            # Create JobTemplate instance
-            job_template = JobTemplate.objects.create(
-                job=job,    
-                template=template,
-                masking_id=masking_id,
-                project_group=project_group,
-                project_prefix=project_prefix,
-                created_by=request.user,
-                masking_id_generated_at=masking_generated_at
-            )
-            
-            # Update job with masking timestamp
-            job.masking_id_generated_at = masking_generated_at
-            job.save(update_fields=['masking_id_generated_at'])
-            
-            # Create default tasks
-            task_configs = template.default_tasks
-            for task_config in task_configs:
-                task_id = JobTask.generate_task_id(
-                    project_prefix,
-                    task_config['task_code']
-                )
-                
-                JobTask.objects.create(
-                    job_template=job_template,
-                    task_id=task_id,
-                    task_number=task_config['task_number'],
-                    task_name=task_config['task_name'],
-                    task_code=task_config['task_code'],
-                    assignable_roles=task_config['assignable_roles'],
-                    status='pending',
-                    word_count=word_count if task_config['task_number'] == 1 else None
-                )
-            
-            # Log activities
-            log_activity_event(
-                'job.final_form_submitted_at',
-                subject_user=request.user,
-                performed_by=request.user,
-                metadata={
-                    'job_system_id': job.system_id,
-                    'job_id': job.job_id,
-                    'masking_id': masking_id,
-                    'status': 'unallocated',
-                },
-            )
-            
-            log_activity_event(
-                'job.masking_id_generated_at',
-                subject_user=None,
-                performed_by=None,
-                metadata={
-                    'job_system_id': job.system_id,
-                    'masking_id': masking_id,
-                    'performed_by': 'system',
-                },
-            )
-            
-            JobActionLog.objects.create(
-                job=job,
-                action='final_form_submitted',
-                performed_by=request.user,
-                performed_by_type='user',
-                details={
-                    'system_id': job.system_id,
-                    'template': template.template_name,
-                    'project_group': project_group.project_group_name,
-                    'category': category,
-                    'level': normalized_level,
-                }
-            )
+        # Invalid extra attachments are skipped, as before
+        new_files = [
+            file for file in request.FILES.getlist('other_attachments')
+            if validate_file(file)[0]
+        ]
+        
+        finalise_job(job, request.user, FinalFormSubmission(
+            topic=topic,
+            category=category,
+            level=normalized_level,
+            word_count=word_count,
+            referencing_style=referencing_style,
+            writing_style=writing_style,
+            instruction=instruction,
+            template=template,
+            project_group=project_group,
+            expected_deadline=expected_dt,
+            strict_deadline=strict_dt,
+            software=software,
+            amount=amount,
+            system_expected_amount=system_expected,
+            attachments=new_files,
+        ))
         
         messages.success(
             request,
@@ -1438,6 +1396,9 @@ def _process_final_form_submission(request, job):
         )
         return redirect('marketing_dashboard')
         
+    except PrefixesExhausted:
+        messages.error(request, 'No project codes are left for the selected project group.')
+        return redirect('final_job_form', system_id=job.system_id)
     except Exception as e:
         logger.exception(f"Error processing final form: {str(e)}")
         messages.error(request, 'An error occurred while submitting the form.')
@@ -1518,6 +1479,45 @@ def copy_summary_to_final(request):
 
 
 
+@login_required
+@role_required(['marketing'])
+@require_http_methods(["POST"])
+def clone_job(request, system_id):
+    """Create a new draft from an existing job, reusing its stored attachments"""
+    source = get_object_or_404(Job, system_id=system_id, created_by=request.user)
+    new_job_id = request.POST.get('job_id', '').strip()
+    carry_summary = request.POST.get('carry_summary') == 'true'
+
+    if new_job_id and Job.objects.filter(job_id=new_job_id).exists():
+        messages.error(request, f'Job ID {new_job_id} already exists.')
+        return redirect('view_job_details', system_id=system_id)
+
+    try:
+        clone = clone_marketing_job(source, request.user, job_id=new_job_id, carry_summary=carry_summary)
+    except Exception as e:
+        logger.error(f"Error cloning job {system_id}: {str(e)}")
+        messages.error(request, 'Could not clone this job. Please try again.')
+        return redirect('view_job_details', system_id=system_id)
+
+    ActivityLog.objects.create(
+        event_key=JOB_EVENTS['cloned'],
+        category='job_management',
+        subject_user=request.user,
+        performed_by=request.user,
+        metadata={
+            'job_system_id': clone.system_id,
+            'job_id': clone.job_id,
+            'cloned_from': source.system_id,
+            'summary_carried_over': carry_summary,
+            'status': 'draft'
+        }
+    )
+
+    job_id_index.add(clone.job_id)
+    messages.success(request, f'Job cloned as draft {clone.system_id} ({clone.job_id}).')
+    return redirect(f"{reverse('create_job')}?job_id={clone.system_id}")
+
+
 @login_required
 @role_required(['marketing'])
 def view_job_details(request, system_id):
@@ -1555,112 +1555,7 @@ def view_job_details(request, system_id):
     # Get all summary versions
     summary_versions = job.summary_versions.all().order_by('version_number')
     
-    # Get action logs for timeline
-    action_logs = job.action_logs.all().order_by('timestamp')
-    
-    # Build timeline events
-    timeline_events = []
-    
-    # Job Created
-    if job.created_at:
-        timeline_events.append({
-            'timestamp': job.created_at,
-            'title': 'Job Created',
-            'description': f'System ID: {job.system_id} | Job ID: {job.job_id}',
-            'icon': 'plus-circle',
-            'color': 'blue'
-        })
-    
-    # Job Name Validated
-    if job.job_name_validated_at:
-        timeline_events.append({
-            'timestamp': job.job_name_validated_at,
-            'title': 'Job ID Validated',
-            'description': 'Job ID uniqueness confirmed',
-            'icon': 'check-circle',
-            'color': 'green'
-        })
-    
-    # Initial Form Submitted
-    if job.initial_form_submitted_at:
-        timeline_events.append({
-            'timestamp': job.initial_form_submitted_at,
-            'title': 'Initial Form Submitted',
-            'description': f'Instruction and {attachments.count()} attachment(s)',
-            'icon': 'file-text',
-            'color': 'blue'
-        })
-    
-    # AI Summary Requested
-    if job.ai_summary_requested_at:
-        timeline_events.append({
-            'timestamp': job.ai_summary_requested_at,
-            'title': 'AI Summary Requested',
-            'description': 'Summary generation initiated',
-            'icon': 'cpu',
-            'color': 'purple'
-        })
-    
-    # AI Summary Generated (all versions)
-    if job.ai_summary_generated_at:
-        for idx, timestamp_str in enumerate(job.ai_summary_generated_at, 1):
-            try:
-                timestamp = timezone.datetime.fromisoformat(timestamp_str)
-                if timezone.is_naive(timestamp):
-                    timestamp = timezone.make_aware(timestamp)
-                
-                timeline_events.append({
-                    'timestamp': timestamp,
-                    'title': f'AI Summary Generated (v{idx})',
-                    'description': f'Degree: {summary_versions[idx-1].degree if idx <= summary_versions.count() else "N/A"}',
-                    'icon': 'zap',
-                    'color': 'yellow'
-                })
-            except Exception as e:
-                logger.error(f"Error parsing timestamp: {e}")
-    
-    # AI Summary Accepted
-    if job.ai_summary_accepted_at:
-        timeline_events.append({
-            'timestamp': job.ai_summary_accepted_at,
-            'title': 'AI Summary Accepted',
-            'description': f'Version {job.ai_summary_version} accepted',
-            'icon': 'check',
-            'color': 'green'
-        })
-    
-    # Final Form Opened
-    if job.final_form_opened_at:
-        timeline_events.append({
-            'timestamp': job.final_form_opened_at,
-            'title': 'Final Form Opened',
-            'description': 'Marketing user accessed final form',
-            'icon': 'eye',
-            'color': 'gray'
-        })
-    
-    # Final Form Submitted
-    if job.final_form_submitted_at:
-        timeline_events.append({
-            'timestamp': job.final_form_submitted_at,
-            'title': 'Final Form Submitted',
-             'description': f'Status changed to {job.get_status_display()} | System ID: {job.system_id}',
-            'icon': 'send',
-            'color': 'blue'
-        })
-    
-    # Masking ID Generated
-    if job.masking_id_generated_at and job_template:
-        timeline_events.append({
-            'timestamp': job.masking_id_generated_at,
-            'title': 'Masking ID Generated',
-            'description': f'ID: {job_template.masking_id}',
-            'icon': 'hash',
-            'color': 'purple'
-        })
-    
-    # Sort timeline by timestamp
-    timeline_events.sort(key=lambda x: x['timestamp'])
+    # Timeline events are loaded from job_timeline (materialised per job)
 
     def _format_currency(value):
         amount = _decimal_to_float(value)
@@ -1675,9 +1570,24 @@ def view_job_details(request, system_id):
         'attachments': attachments,
         'attachments_display': attachments_display,
         'summary_versions': summary_versions,
-        'timeline_events': timeline_events,
         'job_amount_display': _format_currency(job.amount),
         'job_system_amount_display': _format_currency(job.system_expected_amount),
     }
     
     return render(request, 'marketing/view_job_details.html', context)
+
+
+@login_required
+@role_required(['marketing'])
+@require_http_methods(["GET"])
+def job_timeline(request, system_id):
+    """Materialised job timeline as JSON; ``?archive=1`` adds archived events"""
+    document = get_timeline(SCOPE_MARKETING, system_id)
+    if not document or not document.get('seeded') or document.get('owner_id') != request.user.pk:
+        job = get_object_or_404(Job, system_id=system_id, created_by=request.user)
+        document = ensure_timeline(SCOPE_MARKETING, job)
+    
+    archived_events = None
+    if request.GET.get('archive') == '1':
+        archived_events = get_archived_events(SCOPE_MARKETING, system_id) if document.get('archived') else []
+    return JsonResponse(serialize_timeline(document, archived_events))
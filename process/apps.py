@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProcessConfig(AppConfig):
     default_auto_field = 'django.db.models.AutoField'
     name = 'process'
+
+    def ready(self):
+        from .work_queue import connect_work_queue
+        connect_work_queue()
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from process.work_queue import QUEUE_COLLECTION, expire_leases, rebuild_work_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Return process work queue items with lapsed leases to the queue and, "
+        "with --rebuild, re-sync the queue from the process jobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Re-sync every queue item from the process jobs first (keeps live claims).',
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running and expire leases every SECONDS (for a supervised worker process).',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            items, removed = rebuild_work_queue()
+            self.stdout.write(self.style.SUCCESS(
+                f"Synced {items} items in {QUEUE_COLLECTION} ({removed} stale removed)."
+            ))
+        while True:
+            expired = expire_leases()
+            self.stdout.write(f"Returned {expired} items with lapsed leases to the queue.")
+            if options['every'] <= 0:
+                return
+            time.sleep(options['every'])
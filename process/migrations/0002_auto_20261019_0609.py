@@ -0,0 +1,69 @@
+# Generated by Django 3.1.12 on 2026-10-19 00:39
+
+import common.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('process', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='decorationtask',
+            name='ai_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('decoration/ai_files')),
+        ),
+        migrations.AlterField(
+            model_name='decorationtask',
+            name='final_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('decoration/final_files')),
+        ),
+        migrations.AlterField(
+            model_name='decorationtask',
+            name='other_files',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('decoration/other_files')),
+        ),
+        migrations.AlterField(
+            model_name='decorationtask',
+            name='plag_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('decoration/plag_files')),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='writer_final_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('jobs/writer_files')),
+        ),
+        migrations.AlterField(
+            model_name='jobcomment',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('job_comments/attachments')),
+        ),
+        migrations.AlterField(
+            model_name='processsubmission',
+            name='ai_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('process/ai_files')),
+        ),
+        migrations.AlterField(
+            model_name='processsubmission',
+            name='final_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('process/final_files')),
+        ),
+        migrations.AlterField(
+            model_name='processsubmission',
+            name='grammarly_report',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('process/grammarly')),
+        ),
+        migrations.AlterField(
+            model_name='processsubmission',
+            name='other_files',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('process/other_files')),
+        ),
+        migrations.AlterField(
+            model_name='processsubmission',
+            name='plag_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('process/plag_files')),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from process.work_queue import QUEUE_COLLECTION, rebuild_work_queue
+
+
+def build_queue(apps, schema_editor):
+    rebuild_work_queue(app_registry=apps, using=schema_editor.connection.alias)
+
+
+def drop_queue(apps, schema_editor):
+    schema_editor.connection.connection[QUEUE_COLLECTION].drop()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('process', '0002_auto_20261019_0609'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_queue, drop_queue),
+    ]
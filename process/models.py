@@ -2,6 +2,7 @@
 from django.db import models
 from django.utils import timezone
 from accounts.models import CustomUser
+from common.uploads import ShardedUploadTo
 
 class Job(models.Model):
     """Main Job Model"""
@@ -62,7 +63,7 @@ class Job(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
     # Files from Writer
-    writer_final_file = models.FileField(upload_to='jobs/writer_files/', null=True, blank=True)
+    writer_final_file = models.FileField(upload_to=ShardedUploadTo('jobs/writer_files'), null=True, blank=True)
     writer_uploaded_at = models.DateTimeField(null=True, blank=True)
     
     # Timestamps
@@ -101,13 +102,13 @@ class ProcessSubmission(models.Model):
     stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
     
     # Check Stage Files
-    ai_file = models.FileField(upload_to='process/ai_files/', null=True, blank=True)
-    plag_file = models.FileField(upload_to='process/plag_files/', null=True, blank=True)
+    ai_file = models.FileField(upload_to=ShardedUploadTo('process/ai_files'), null=True, blank=True)
+    plag_file = models.FileField(upload_to=ShardedUploadTo('process/plag_files'), null=True, blank=True)
     
     # Final Stage Files
-    final_file = models.FileField(upload_to='process/final_files/', null=True, blank=True)
-    grammarly_report = models.FileField(upload_to='process/grammarly/', null=True, blank=True)
-    other_files = models.FileField(upload_to='process/other_files/', null=True, blank=True)
+    final_file = models.FileField(upload_to=ShardedUploadTo('process/final_files'), null=True, blank=True)
+    grammarly_report = models.FileField(upload_to=ShardedUploadTo('process/grammarly'), null=True, blank=True)
+    other_files = models.FileField(upload_to=ShardedUploadTo('process/other_files'), null=True, blank=True)
     
     # Timestamps
     submitted_at = models.DateTimeField(auto_now_add=True)
@@ -133,7 +134,7 @@ class JobComment(models.Model):
     text = models.TextField()
     
     # Attachments
-    attachment = models.FileField(upload_to='job_comments/attachments/', null=True, blank=True)
+    attachment = models.FileField(upload_to=ShardedUploadTo('job_comments/attachments'), null=True, blank=True)
     link = models.URLField(max_length=500, null=True, blank=True)
     
     # Timestamps
@@ -168,10 +169,10 @@ class DecorationTask(models.Model):
     )
     
     # Files
-    final_file = models.FileField(upload_to='decoration/final_files/', null=True, blank=True)
-    ai_file = models.FileField(upload_to='decoration/ai_files/', null=True, blank=True)
-    plag_file = models.FileField(upload_to='decoration/plag_files/', null=True, blank=True)
-    other_files = models.FileField(upload_to='decoration/other_files/', null=True, blank=True)
+    final_file = models.FileField(upload_to=ShardedUploadTo('decoration/final_files'), null=True, blank=True)
+    ai_file = models.FileField(upload_to=ShardedUploadTo('decoration/ai_files'), null=True, blank=True)
+    plag_file = models.FileField(upload_to=ShardedUploadTo('decoration/plag_files'), null=True, blank=True)
+    other_files = models.FileField(upload_to=ShardedUploadTo('decoration/other_files'), null=True, blank=True)
     
     # Status
     is_completed = models.BooleanField(default=False)
@@ -1,3 +1,27 @@
-from django.test import TestCase
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from process.work_queue import DONE, QUEUED, _claimable, _desired_state
+
+
+def job(status, writer_final_file='final.docx'):
+    return SimpleNamespace(status=status, writer_final_file=writer_final_file)
+
+
+class WorkQueueStateTests(SimpleTestCase):
+    def test_jobs_enter_once_the_writer_file_is_uploaded(self):
+        self.assertIsNone(_desired_state(job('allocated', writer_final_file='')))
+        self.assertEqual(_desired_state(job('allocated')), QUEUED)
+        self.assertEqual(_desired_state(job('in_progress')), QUEUED)
+
+    def test_submitted_jobs_are_done_and_others_leave(self):
+        self.assertEqual(_desired_state(job('submitted')), DONE)
+        self.assertIsNone(_desired_state(job('completed')))
+        self.assertIsNone(_desired_state(job('cancelled')))
+
+    def test_claimable_covers_own_and_unassigned_items(self):
+        query = _claimable(5, 'now')
+        self.assertEqual(query['member_id'], {'$in': [5, None]})
+        self.assertNotIn({'state': 'claimed', 'claimed_by': 5}, query['$or'])
+        self.assertIn({'state': 'claimed', 'claimed_by': 5}, _claimable(5, 'now', include_own=True)['$or'])
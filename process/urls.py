@@ -13,7 +13,9 @@ urlpatterns = [
     # =====================================
     path('my-jobs/', views.my_jobs, name='process_my_jobs'),
     path('closed-jobs/', views.all_closed_jobs, name='process_closed_jobs'),
+    path('queue/claim/', views.claim_next_job, name='process_claim_next'),
     path('job/<str:job_id>/', views.view_job, name='view_job'),
+    path('job/<str:job_id>/release/', views.release_job, name='process_release_job'),
     
     # =====================================
     # SUBMISSIONS - CHECK, FINAL, DECORATION
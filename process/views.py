@@ -3,9 +3,21 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
-from django.core.paginator import Paginator
+from common.pagination import CursorPaginator
 from django.utils import timezone
 from .models import Job, ProcessSubmission, JobComment, DecorationTask
+from .work_queue import (
+    CLAIMED,
+    DONE,
+    claim_item,
+    claim_next,
+    get_item,
+    held_items,
+    open_queue_size,
+    queued_items,
+    release_item,
+    renew_lease,
+)
 from accounts.models import CustomUser
 import logging
 
@@ -22,28 +34,58 @@ def process_required(view_func):
     return wrapper
 
 
+def _aware(value):
+    # pymongo hands back naive UTC datetimes.
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def _queue_jobs(member, states):
+    """
+    The member's jobs from the work queue (held in ``states`` plus those
+    waiting for them), earliest deadline first, and the queue items by job pk.
+    """
+    items = {item['_id']: item for item in held_items(member, states)}
+    items.update({item['_id']: item for item in queued_items(member)})
+    return Job.objects.filter(pk__in=list(items)).order_by('deadline'), items
+
+
+def _with_queue_state(page, items):
+    now = timezone.now()
+    for job in page:
+        item = items.get(job.pk) or {}
+        job.queue_state = item.get('state')
+        job.lease_expires_at = _aware(item.get('lease_expires_at'))
+        job.lease_expired = bool(job.lease_expires_at and job.lease_expires_at <= now)
+    return page
+
+
 @login_required
 @process_required
 def process_dashboard(request):
     """Process Team Dashboard"""
     
-    # Get jobs allocated to this process member where writer has uploaded final file
-    my_jobs = Job.objects.filter(
-        process_member=request.user,
-        writer_final_file__isnull=False,  # Writer has uploaded file
-        status__in=['allocated', 'in_progress', 'submitted']
-    ).exclude(
-        status='cancelled'  # Exclude cancelled jobs
-    ).order_by('-deadline')
+    # Claimed, submitted and waiting jobs of this member, from the work queue
+    try:
+        my_jobs, items = _queue_jobs(request.user, (CLAIMED, DONE))
+        waiting = open_queue_size(request.user)
+    except Exception as e:
+        logger.warning(f"Work queue unavailable for {request.user.email}: {str(e)}")
+        my_jobs, items, waiting = Job.objects.filter(
+            process_member=request.user,
+            writer_final_file__isnull=False,
+            status__in=['allocated', 'in_progress', 'submitted']
+        ).order_by('deadline'), {}, None
     
     # Pagination
-    paginator = Paginator(my_jobs, 25)
-    page_number = request.GET.get('page')
-    jobs = paginator.get_page(page_number)
+    paginator = CursorPaginator(my_jobs, 25)
+    jobs = _with_queue_state(paginator.get_page(request.GET.get('page')), items)
     
     context = {
         'jobs': jobs,
-        'total_jobs': my_jobs.count(),
+        'total_jobs': paginator.count,
+        'queue_waiting': waiting,
         'process_member_name': request.user.get_full_name(),
     }
     
@@ -55,15 +97,18 @@ def process_dashboard(request):
 def my_jobs(request):
     """My Jobs - Active jobs assigned to me"""
     
-    jobs = Job.objects.filter(
-        process_member=request.user,
-        writer_final_file__isnull=False,
-        status__in=['allocated', 'in_progress']
-    ).exclude(status='cancelled').order_by('-deadline')
+    try:
+        jobs, items = _queue_jobs(request.user, (CLAIMED,))
+    except Exception as e:
+        logger.warning(f"Work queue unavailable for {request.user.email}: {str(e)}")
+        jobs, items = Job.objects.filter(
+            process_member=request.user,
+            writer_final_file__isnull=False,
+            status__in=['allocated', 'in_progress']
+        ).order_by('deadline'), {}
     
-    paginator = Paginator(jobs, 25)
-    page_number = request.GET.get('page')
-    jobs_page = paginator.get_page(page_number)
+    paginator = CursorPaginator(jobs, 25)
+    jobs_page = _with_queue_state(paginator.get_page(request.GET.get('page')), items)
     
     context = {
         'jobs': jobs_page,
@@ -73,6 +118,40 @@ def my_jobs(request):
     return render(request, 'process/my_jobs.html', context)
 
 
+@login_required
+@process_required
+def claim_next_job(request):
+    """Claim the earliest-deadline job waiting in the work queue"""
+    
+    if request.method != 'POST':
+        return redirect('process_dashboard')
+    
+    item = claim_next(request.user)
+    if item is None:
+        messages.info(request, 'No jobs are waiting in the queue.')
+        return redirect('process_dashboard')
+    
+    logger.info(f"Process member {request.user.email} claimed job {item['job_id']} from the queue")
+    messages.success(request, f"Job {item['job_id']} is yours until {timezone.localtime(_aware(item['lease_expires_at'])):%H:%M}.")
+    return redirect('view_job', job_id=item['job_id'])
+
+
+@login_required
+@process_required
+def release_job(request, job_id):
+    """Hand a claimed job back to the work queue"""
+    
+    if request.method != 'POST':
+        return redirect('view_job', job_id=job_id)
+    
+    job = get_object_or_404(Job, job_id=job_id, process_member=request.user)
+    if release_item(job.pk, request.user):
+        messages.success(request, f'Job {job.get_masked_job_id()} returned to the queue.')
+    else:
+        messages.warning(request, 'You do not hold a claim on this job.')
+    return redirect('process_dashboard')
+
+
 @login_required
 @process_required
 def all_closed_jobs(request):
@@ -84,17 +163,13 @@ def all_closed_jobs(request):
         status__in=['completed', 'submitted']
     ).order_by('-updated_at')
     
-    # Count total closed jobs
-    total_closed_jobs = closed_jobs.count()
-    
-    # Pagination - 25 per page
-    paginator = Paginator(closed_jobs, 25)
-    page_number = request.GET.get('page')
-    jobs = paginator.get_page(page_number)
+    # Pagination - 25 per page (keyset on updated_at)
+    paginator = CursorPaginator(closed_jobs, 25)
+    jobs = paginator.get_page(request.GET.get('page'))
     
     context = {
         'jobs': jobs,
-        'total_closed_jobs': total_closed_jobs,
+        'total_closed_jobs': paginator.count,
     }
     
     return render(request, 'process/all_closed_jobs.html', context)
@@ -122,6 +197,16 @@ def view_job(request, job_id):
         messages.warning(request, 'Writer has not uploaded the final file yet.')
         return redirect('process_dashboard')
     
+    # Opening the job claims it (or renews the member's lease)
+    queue_item = None
+    if job.process_member_id == request.user.id:
+        try:
+            queue_item = claim_item(job.pk, request.user) or get_item(job.pk)
+        except Exception as e:
+            logger.warning(f"Work queue claim failed for job {job_id}: {str(e)}")
+    if queue_item:
+        queue_item = dict(queue_item, lease_expires_at=_aware(queue_item.get('lease_expires_at')))
+    
     # Get previous submissions
     submissions = ProcessSubmission.objects.filter(
         job=job,
@@ -141,6 +226,7 @@ def view_job(request, job_id):
         'submissions': submissions,
         'comments': comments,
         'decoration_task': decoration_task,
+        'queue_item': queue_item,
     }
     
     return render(request, 'process/view_job.html', context)
@@ -174,6 +260,10 @@ def submit_check_stage(request, job_id):
         
         job.status = 'in_progress'
         job.save()
+        try:
+            renew_lease(job.pk, request.user)
+        except Exception as e:
+            logger.warning(f"Work queue lease renewal failed for job {job_id}: {str(e)}")
         
         logger.info(f"Check stage submitted by {request.user.email} for job {job_id}")
         messages.success(request, 'Check stage files uploaded successfully!')
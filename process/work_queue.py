@@ -0,0 +1,287 @@
+"""
+Process team work queue.
+
+A process job enters the ``process_work_queue`` collection once the writer
+has uploaded the final file, as one document keyed by the job's primary
+key::
+
+    {'_id': 17, 'job_id': 'CW-1042', 'deadline': ..., 'member_id': 5,
+     'state': 'claimed', 'claimed_by': 5, 'lease_expires_at': ...}
+
+``state`` moves ``queued`` -> ``claimed`` -> ``done``. Claiming is a single
+``findOneAndUpdate`` that takes the earliest-deadline item the member may
+work on: one assigned to them (``member_id``) or to nobody, that is queued
+or whose lease ran out. A claim holds a lease of ``PROCESS_LEASE``; opening
+or working on the job renews it, and an expired lease lets the item be
+claimed again without any sweep (``expire_leases`` only tidies the holders'
+dashboards). Submitting the final stage marks the item ``done``; completed,
+cancelled or deleted jobs leave the queue.
+
+Items follow ``process.Job`` through signals. Dashboards read a member's
+items through the ``(claimed_by, state, deadline)`` and
+``(state, member_id, deadline)`` indexes instead of filtering jobs on the
+writer file. ``rebuild_work_queue`` re-syncs the collection from the jobs.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+logger = logging.getLogger('process')
+
+QUEUE_COLLECTION = 'process_work_queue'
+QUEUE_INDEXES = {
+    'process_queue_pick': [('state', 1), ('member_id', 1), ('deadline', 1)],
+    'process_queue_holder': [('claimed_by', 1), ('state', 1), ('deadline', 1)],
+    'process_queue_lease': [('state', 1), ('lease_expires_at', 1)],
+}
+PROCESS_LEASE = timedelta(hours=2)
+OPEN_STATUSES = ('allocated', 'in_progress')
+DONE_STATUSES = ('submitted',)
+
+QUEUED = 'queued'
+CLAIMED = 'claimed'
+DONE = 'done'
+
+QUEUE_FIELDS = ('writer_final_file', 'status', 'deadline', 'process_member', 'job_id')
+
+
+def queue_collection(using='default'):
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection.connection[QUEUE_COLLECTION]
+
+
+def ensure_queue_indexes(using='default'):
+    collection = queue_collection(using)
+    for name, keys in QUEUE_INDEXES.items():
+        collection.create_index(keys, name=name)
+
+
+def _desired_state(job):
+    """Where ``job`` belongs: QUEUED (open), DONE, or None (not in the queue)."""
+    if not job.writer_final_file:
+        return None
+    if job.status in OPEN_STATUSES:
+        return QUEUED
+    if job.status in DONE_STATUSES:
+        return DONE
+    return None
+
+
+def sync_job(job, using='default'):
+    """Enter, update, complete or remove the queue item of ``job``."""
+    collection = queue_collection(using)
+    state = _desired_state(job)
+    if state is None:
+        collection.delete_one({'_id': job.pk})
+        return
+    now = timezone.now()
+    fields = {
+        'job_id': job.job_id,
+        'deadline': job.deadline,
+        'member_id': job.process_member_id,
+        'updated_at': now,
+    }
+    if state == DONE:
+        complete_item(job.pk, job.process_member_id, fields, using=using)
+        return
+    collection.update_one(
+        {'_id': job.pk},
+        {'$set': fields, '$setOnInsert': {
+            'state': QUEUED, 'claimed_by': None, 'lease_expires_at': None, 'enqueued_at': now,
+        }},
+        upsert=True,
+    )
+    # Reopened, or reassigned away from whoever holds it: back to the queue.
+    release = [{'state': DONE}]
+    if job.process_member_id is None:
+        release.append({'state': CLAIMED})
+    else:
+        release.append({'state': CLAIMED, 'claimed_by': {'$ne': job.process_member_id}})
+    collection.update_one(
+        {'_id': job.pk, '$or': release},
+        {'$set': {'state': QUEUED, 'claimed_by': None, 'lease_expires_at': None}},
+    )
+
+
+def _claimable(member_id, now, include_own=False):
+    states = [
+        {'state': QUEUED},
+        {'state': CLAIMED, 'lease_expires_at': {'$lte': now}},
+    ]
+    if include_own:
+        states.append({'state': CLAIMED, 'claimed_by': member_id})
+    return {'member_id': {'$in': [member_id, None]}, '$or': states}
+
+
+def _take(query, member, lease, using):
+    from pymongo import ReturnDocument
+
+    now = timezone.now()
+    item = queue_collection(using).find_one_and_update(
+        query,
+        {'$set': {
+            'state': CLAIMED,
+            'claimed_by': member.pk,
+            'member_id': member.pk,
+            'claimed_at': now,
+            'lease_expires_at': now + lease,
+        }},
+        sort=[('deadline', 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    if item is not None:
+        _assign_member(item['_id'], member, using)
+    return item
+
+
+def _assign_member(job_pk, member, using):
+    """Unassigned jobs picked from the queue become the member's job."""
+    Job = apps.get_model('process', 'Job')
+    job = Job.objects.using(using).filter(pk=job_pk, process_member__isnull=True).first()
+    if job is not None:
+        job.process_member = member
+        job.save(update_fields=['process_member', 'updated_at'])
+
+
+def claim_next(member, lease=PROCESS_LEASE, using='default'):
+    """Claim the earliest-deadline item ``member`` may take; None when there is none."""
+    return _take(_claimable(member.pk, timezone.now()), member, lease, using)
+
+
+def claim_item(job_pk, member, lease=PROCESS_LEASE, using='default'):
+    """
+    Claim (or renew the claim on) one job's item. Returns the item, or None
+    when another member holds a live lease or the job is not claimable.
+    """
+    query = _claimable(member.pk, timezone.now(), include_own=True)
+    query['_id'] = job_pk
+    return _take(query, member, lease, using)
+
+
+def renew_lease(job_pk, member, lease=PROCESS_LEASE, using='default'):
+    """Extend ``member``'s lease on the item; returns True while they hold it."""
+    result = queue_collection(using).update_one(
+        {'_id': job_pk, 'state': CLAIMED, 'claimed_by': member.pk},
+        {'$set': {'lease_expires_at': timezone.now() + lease}},
+    )
+    return bool(result.matched_count)
+
+
+def release_item(job_pk, member, using='default'):
+    """Hand a claimed item back to the queue (it stays assigned to the member)."""
+    result = queue_collection(using).update_one(
+        {'_id': job_pk, 'state': CLAIMED, 'claimed_by': member.pk},
+        {'$set': {'state': QUEUED, 'claimed_by': None, 'lease_expires_at': None}},
+    )
+    return bool(result.modified_count)
+
+
+def complete_item(job_pk, member_id, fields=None, using='default'):
+    """Mark the item done; it stays on the submitting member's dashboard."""
+    queue_collection(using).update_one(
+        {'_id': job_pk},
+        {
+            '$set': {
+                **(fields or {}),
+                'state': DONE,
+                'claimed_by': member_id,
+                'lease_expires_at': None,
+                'completed_at': timezone.now(),
+            },
+            '$setOnInsert': {'enqueued_at': timezone.now()},
+        },
+        upsert=True,
+    )
+
+
+def expire_leases(using='default'):
+    """Return items with lapsed leases to the queue. Returns how many."""
+    result = queue_collection(using).update_many(
+        {'state': CLAIMED, 'lease_expires_at': {'$lte': timezone.now()}},
+        {'$set': {'state': QUEUED, 'claimed_by': None, 'lease_expires_at': None}},
+    )
+    return result.modified_count
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+def held_items(member, states=(CLAIMED,), using='default'):
+    """The member's items in ``states``, earliest deadline first."""
+    return list(queue_collection(using).find(
+        {'claimed_by': member.pk, 'state': {'$in': list(states)}},
+    ).sort('deadline', 1))
+
+
+def queued_items(member, using='default'):
+    """Items waiting for ``member``: assigned to them and not yet claimed."""
+    return list(queue_collection(using).find(
+        {'state': QUEUED, 'member_id': member.pk},
+    ).sort('deadline', 1))
+
+
+def open_queue_size(member, using='default'):
+    """Items ``member`` could claim next (theirs or unassigned)."""
+    return queue_collection(using).count_documents(
+        {'state': QUEUED, 'member_id': {'$in': [member.pk, None]}},
+    )
+
+
+def get_item(job_pk, using='default'):
+    return queue_collection(using).find_one({'_id': job_pk})
+
+
+# ----------------------------------------------------------------------
+# Signal handlers
+# ----------------------------------------------------------------------
+def _job_saved(sender, instance, raw=False, update_fields=None, using='default', **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(QUEUE_FIELDS):
+        return
+    try:
+        sync_job(instance, using=using)
+    except Exception as exc:
+        logger.warning(f"Work queue update failed for process job {instance.pk}: {exc}")
+
+
+def _job_deleted(sender, instance, using='default', **kwargs):
+    try:
+        queue_collection(using).delete_one({'_id': instance.pk})
+    except Exception as exc:
+        logger.warning(f"Work queue removal failed for process job {instance.pk}: {exc}")
+
+
+def connect_work_queue():
+    """Wire the signal handlers; called from ProcessConfig.ready()."""
+    model = apps.get_model('process', 'Job')
+    uid = 'process_work_queue'
+    post_save.connect(_job_saved, sender=model, dispatch_uid=uid)
+    post_delete.connect(_job_deleted, sender=model, dispatch_uid=uid)
+
+
+# ----------------------------------------------------------------------
+# Rebuild
+# ----------------------------------------------------------------------
+def rebuild_work_queue(app_registry=None, using='default'):
+    """
+    Re-sync the queue from the process jobs, keeping live claims. Returns
+    ``(items, removed)``.
+    """
+    Job = (app_registry or apps).get_model('process', 'Job')
+    ensure_queue_indexes(using)
+    jobs = Job.objects.using(using).filter(
+        status__in=OPEN_STATUSES + DONE_STATUSES,
+    ).exclude(writer_final_file='').exclude(writer_final_file__isnull=True).only(*QUEUE_FIELDS)
+    kept = []
+    for job in jobs.iterator():
+        sync_job(job, using=using)
+        kept.append(job.pk)
+    removed = queue_collection(using).delete_many({'_id': {'$nin': kept}}).deleted_count
+    return len(kept), removed
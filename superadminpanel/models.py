@@ -418,19 +418,23 @@ class JobTemplate(models.Model):
                 return full_prefix
     
     @staticmethod
-    def generate_masking_id(category, project_prefix):
-        """Generate unique masking ID: JOB-{8_chars}-{Category}"""
+    def random_masking_id(category):
+        """Candidate masking ID: JOB-{8_chars}-{Category} (unique index decides)"""
         category_map = {
             'IT': 'IT',
             'NON-IT': 'NonIT',
             'Finance': 'Finance'
         }
         category_suffix = category_map.get(category, 'Other')
-        
+        # Generate 8 random alphanumeric characters
+        random_chars = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+        return f"JOB-{random_chars}-{category_suffix}"
+    
+    @staticmethod
+    def generate_masking_id(category, project_prefix):
+        """Generate unique masking ID: JOB-{8_chars}-{Category}"""
         while True:
-            # Generate 8 random alphanumeric characters
-            random_chars = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            masking_id = f"JOB-{random_chars}-{category_suffix}"
+            masking_id = JobTemplate.random_masking_id(category)
             
             # Check if exists
             if not JobTemplate.objects.filter(masking_id=masking_id).exists():
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WriterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'writer'
+
+    def ready(self):
+        from .statistics import connect_writer_statistics
+        connect_writer_statistics()
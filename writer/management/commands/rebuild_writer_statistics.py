@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from writer.statistics import rebuild_writer_statistics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every writer's statistics from their projects and correct "
+        "rows that the incremental updates let drift. Run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted statistics rows.',
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running and rebuild every SECONDS (e.g. 86400 for a nightly worker).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self._rebuild(options['dry_run'])
+            if options['every'] <= 0:
+                return
+            time.sleep(options['every'])
+
+    def _rebuild(self, dry_run):
+        drifted = rebuild_writer_statistics(dry_run=dry_run)
+        for writer_id, (stored, actual) in sorted(drifted.items()):
+            changed = {
+                field: f"{(stored or {}).get(field)} -> {value}"
+                for field, value in actual.items()
+                if (stored or {}).get(field) != value
+            }
+            self.stdout.write(f"  writer {writer_id}: {changed if stored else 'missing row'}")
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"Dry run: {len(drifted)} statistics rows have drifted."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Rewrote {len(drifted)} drifted statistics rows."))
@@ -0,0 +1,24 @@
+# Generated by Django 3.1.12 on 2026-10-19 00:39
+
+import common.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='writerproject',
+            name='attachments',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('project_attachments')),
+        ),
+        migrations.AlterField(
+            model_name='writerproject',
+            name='submission_file',
+            field=models.FileField(blank=True, null=True, upload_to=common.uploads.ShardedUploadTo('submissions')),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.1.12 on 2026-10-19 00:46
+
+from django.db import migrations, models
+
+from common.search import (
+    SEARCH_KEYS_INDEX,
+    SEARCH_TEXT_INDEX,
+    backfill_search_keys,
+    ensure_search_indexes,
+)
+
+SEARCH_ID_COLUMNS = ['job_id']
+SEARCH_TEXT_WEIGHTS = {'job_id': 10, 'topic': 5}
+
+
+def _get_collection(model, schema_editor):
+    db = schema_editor.connection.connection
+    return db[model._meta.db_table]
+
+
+def create_search_indexes(apps, schema_editor):
+    model = apps.get_model('writer', 'WriterProject')
+    collection = _get_collection(model, schema_editor)
+    backfill_search_keys(collection, SEARCH_ID_COLUMNS)
+    ensure_search_indexes(collection, SEARCH_TEXT_WEIGHTS)
+
+
+def drop_search_indexes(apps, schema_editor):
+    model = apps.get_model('writer', 'WriterProject')
+    collection = _get_collection(model, schema_editor)
+    for name in (SEARCH_KEYS_INDEX, SEARCH_TEXT_INDEX):
+        try:
+            collection.drop_index(name)
+        except Exception:
+            continue
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0002_auto_20261019_0609'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='writerproject',
+            name='search_keys',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from writer.statistics import rebuild_writer_statistics
+
+
+def build_statistics(apps, schema_editor):
+    rebuild_writer_statistics(app_registry=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0003_writerproject_search_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_statistics, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,8 @@
 from django.db import models
 from django.utils import timezone
 from accounts.models import CustomUser
+from common.search import SearchIndexedModel
+from common.uploads import ShardedUploadTo
 from decimal import Decimal
 try:
     from bson.decimal128 import Decimal128 as BsonDecimal128
@@ -9,8 +11,12 @@ except ImportError:  # pragma: no cover
     BsonDecimal128 = None
 
 
-class WriterProject(models.Model):
+class WriterProject(SearchIndexedModel):
     """Writer Project Model"""
+
+    # Indexed search (see common.search / rebuild_search_index)
+    SEARCH_ID_FIELDS = ('job_id',)
+    SEARCH_TEXT_WEIGHTS = {'job_id': 10, 'topic': 5}
     
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -59,10 +65,10 @@ class WriterProject(models.Model):
     # Additional Details
     description = models.TextField(blank=True, null=True)
     special_instructions = models.TextField(blank=True, null=True)
-    attachments = models.FileField(upload_to='project_attachments/', null=True, blank=True)
+    attachments = models.FileField(upload_to=ShardedUploadTo('project_attachments'), null=True, blank=True)
     
     # Submission
-    submission_file = models.FileField(upload_to='submissions/', null=True, blank=True)
+    submission_file = models.FileField(upload_to=ShardedUploadTo('submissions'), null=True, blank=True)
     submission_notes = models.TextField(blank=True, null=True)
     submitted_at = models.DateTimeField(null=True, blank=True)
     
@@ -271,25 +277,14 @@ class WriterStatistics(models.Model):
             self.average_rating = Decimal('0')
 
     def update_stats(self):
-        """Update writer statistics"""
-        projects = WriterProject.objects.filter(writer=self.writer)
-        
-        self.total_projects = projects.count()
-        self.completed_projects = projects.filter(status='completed').count()
-        self.pending_projects = projects.filter(status='pending').count()
-        self.in_progress_projects = projects.filter(status='in_progress').count()
-        self.issues_count = projects.filter(status='issues').count()
-        self.hold_count = projects.filter(status='hold').count()
-        
-        # Calculate total words
-        completed = projects.filter(status='completed')
-        self.total_words_written = sum(p.word_count for p in completed)
-        
-        # Calculate on-time delivery
-        self.on_time_delivery = sum(
-            1 for p in completed 
-            if p.completed_at and p.completed_at <= p.deadline
-        )
-        self.late_delivery = self.completed_projects - self.on_time_delivery
+        """
+        Recompute this writer's statistics from their projects. The row is
+        normally kept current by writer.statistics; this is for repairs.
+        """
+        from .statistics import compute_writer_statistics
+
+        counters = compute_writer_statistics([self.writer_id])[self.writer_id]
+        for field, value in counters.items():
+            setattr(self, field, value)
         self._normalize_average_rating()
         self.save()
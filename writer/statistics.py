@@ -0,0 +1,268 @@
+"""
+Event-driven writer statistics.
+
+``WriterStatistics`` rows used to be recomputed on the dashboard request
+(seven counts plus a Python loop over every completed project). They are
+now kept current from ``WriterProject`` signals instead: every project
+contributes a fixed set of counters to its writer's row::
+
+    total_projects      1
+    <status> counter    1       (pending/in_progress/completed/issues/hold)
+    total_words_written word_count          (completed only)
+    on_time_delivery    1 if completed_at <= deadline
+    late_delivery       1 otherwise        (completed only)
+
+A save applies the difference between the project's old and new
+contribution with one update on the statistics document, clamped at zero.
+``rebuild_writer_statistics`` recomputes every row with a single ``$group``
+over the projects collection and is meant to run nightly
+(``manage.py rebuild_writer_statistics --every 86400``) as a safety net for
+bulk writes that bypass signals.
+"""
+
+import logging
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.utils import timezone
+
+from common.mongo import get_collection
+
+logger = logging.getLogger('writer')
+
+STATUS_COUNTERS = {
+    'pending': 'pending_projects',
+    'in_progress': 'in_progress_projects',
+    'completed': 'completed_projects',
+    'issues': 'issues_count',
+    'hold': 'hold_count',
+}
+STATISTIC_FIELDS = [
+    'total_projects',
+    *STATUS_COUNTERS.values(),
+    'total_words_written',
+    'on_time_delivery',
+    'late_delivery',
+]
+PROJECT_FIELDS = ('writer_id', 'status', 'word_count', 'deadline', 'completed_at')
+
+_SNAPSHOT_ATTR = '_writer_statistics_contribution'
+
+
+def contribution(values):
+    """
+    ``(writer_id, {field: n})`` that a project with ``values`` adds to its
+    writer's statistics, or None when a needed field was deferred.
+    """
+    if any(field not in values for field in PROJECT_FIELDS):
+        return None
+    counters = {'total_projects': 1}
+    status = values['status']
+    if status in STATUS_COUNTERS:
+        counters[STATUS_COUNTERS[status]] = 1
+    if status == 'completed':
+        counters['total_words_written'] = values['word_count'] or 0
+        completed_at, deadline = values['completed_at'], values['deadline']
+        on_time = bool(completed_at and deadline and completed_at <= deadline)
+        counters['on_time_delivery' if on_time else 'late_delivery'] = 1
+    return values['writer_id'], counters
+
+
+def _stored_contribution(instance):
+    row = type(instance)._default_manager.filter(pk=instance.pk).values(*PROJECT_FIELDS).first()
+    return contribution(row) if row else None
+
+
+def _diff(before, after):
+    """``{writer_id: {field: delta}}`` between two contributions."""
+    deltas = {}
+    for sign, entry in ((-1, before), (1, after)):
+        if not entry or entry[0] is None:
+            continue
+        writer_id, counters = entry
+        writer_deltas = deltas.setdefault(writer_id, {})
+        for field, n in counters.items():
+            writer_deltas[field] = writer_deltas.get(field, 0) + sign * n
+    return {
+        writer_id: {field: n for field, n in counters.items() if n}
+        for writer_id, counters in deltas.items()
+        if any(counters.values())
+    }
+
+
+def _clamped_increments(deltas, now):
+    return [{'$set': {
+        **{
+            field: {'$max': [0, {'$add': [{'$ifNull': [f'${field}', 0]}, n]}]}
+            for field, n in deltas.items()
+        },
+        'last_updated': now,
+    }}]
+
+
+def apply_statistics_deltas(deltas, using='default'):
+    """
+    Apply ``{writer_id: {field: delta}}`` to the statistics rows. Writers
+    without a row get one, computed from their projects.
+    """
+    WriterStatistics = apps.get_model('writer', 'WriterStatistics')
+    collection = get_collection(WriterStatistics, using)
+    writer_column = WriterStatistics._meta.get_field('writer').column
+    now = timezone.now()
+    missing = []
+    for writer_id, writer_deltas in deltas.items():
+        result = collection.update_one({writer_column: writer_id}, _clamped_increments(writer_deltas, now))
+        if not result.matched_count:
+            missing.append(writer_id)
+    if missing:
+        rebuild_writer_statistics(writer_ids=missing, using=using)
+
+
+# ----------------------------------------------------------------------
+# Signal handlers
+# ----------------------------------------------------------------------
+def _remember_contribution(sender, instance, **kwargs):
+    setattr(instance, _SNAPSHOT_ATTR, contribution(instance.__dict__) if instance.pk else ())
+
+
+def _capture_previous(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, _SNAPSHOT_ATTR, ())
+    if previous is None and instance.pk is not None:
+        previous = _stored_contribution(instance)
+    instance._writer_statistics_previous = previous
+
+
+def _project_saved(sender, instance, created, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    previous = () if created else getattr(instance, '_writer_statistics_previous', ())
+    current = contribution(instance.__dict__)
+    if current is None:
+        current = _stored_contribution(instance)
+    deltas = _diff(previous, current)
+    setattr(instance, _SNAPSHOT_ATTR, current)
+    if not deltas:
+        return
+    try:
+        apply_statistics_deltas(deltas, using=using)
+    except Exception as exc:
+        logger.warning(f"Writer statistics update failed for project {instance.pk}: {exc}")
+
+
+def _project_deleted(sender, instance, using='default', **kwargs):
+    previous = getattr(instance, _SNAPSHOT_ATTR, None)
+    if previous is None:
+        previous = contribution(instance.__dict__)
+    deltas = _diff(previous, ())
+    if not deltas:
+        return
+    try:
+        apply_statistics_deltas(deltas, using=using)
+    except Exception as exc:
+        logger.warning(f"Writer statistics update failed for deleted project {instance.pk}: {exc}")
+
+
+def connect_writer_statistics():
+    """Wire the signal handlers; called from WriterConfig.ready()."""
+    model = apps.get_model('writer', 'WriterProject')
+    uid = 'writer_statistics'
+    post_init.connect(_remember_contribution, sender=model, dispatch_uid=uid)
+    pre_save.connect(_capture_previous, sender=model, dispatch_uid=uid)
+    post_save.connect(_project_saved, sender=model, dispatch_uid=uid)
+    post_delete.connect(_project_deleted, sender=model, dispatch_uid=uid)
+
+
+# ----------------------------------------------------------------------
+# Full recompute
+# ----------------------------------------------------------------------
+def _count_if(condition, value=1):
+    return {'$sum': {'$cond': [condition, value, 0]}}
+
+
+def compute_writer_statistics(writer_ids=None, app_registry=None, using='default'):
+    """``{writer_id: {field: n}}`` from the projects collection in one ``$group``."""
+    WriterProject = (app_registry or apps).get_model('writer', 'WriterProject')
+    meta = WriterProject._meta
+    writer = f"${meta.get_field('writer').column}"
+    status = f"${meta.get_field('status').column}"
+    completed_at = f"${meta.get_field('completed_at').column}"
+    deadline = f"${meta.get_field('deadline').column}"
+    is_completed = {'$eq': [status, 'completed']}
+
+    group = {
+        '_id': writer,
+        'total_projects': {'$sum': 1},
+        'total_words_written': _count_if(is_completed, f"${meta.get_field('word_count').column}"),
+        'on_time_delivery': _count_if({'$and': [
+            is_completed,
+            {'$eq': [{'$type': completed_at}, 'date']},
+            {'$lte': [completed_at, deadline]},
+        ]}),
+    }
+    for value, field in STATUS_COUNTERS.items():
+        group[field] = _count_if({'$eq': [status, value]})
+
+    pipeline = [{'$group': group}]
+    if writer_ids is not None:
+        pipeline.insert(0, {'$match': {meta.get_field('writer').column: {'$in': list(writer_ids)}}})
+
+    statistics = {}
+    for row in get_collection(WriterProject, using).aggregate(pipeline, allowDiskUse=True):
+        writer_id = row.pop('_id')
+        if writer_id is None:
+            continue
+        row['late_delivery'] = row['completed_projects'] - row['on_time_delivery']
+        statistics[writer_id] = {field: int(row.get(field) or 0) for field in STATISTIC_FIELDS}
+    if writer_ids is not None:
+        for writer_id in writer_ids:
+            statistics.setdefault(writer_id, {field: 0 for field in STATISTIC_FIELDS})
+    return statistics
+
+
+def rebuild_writer_statistics(writer_ids=None, app_registry=None, using='default', dry_run=False):
+    """
+    Overwrite the statistics rows (all, or only ``writer_ids``) with a full
+    recompute, creating missing rows. Returns ``{writer_id: (stored, actual)}``
+    for the rows that had drifted.
+    """
+    from pymongo import UpdateOne
+
+    registry = app_registry or apps
+    WriterStatistics = registry.get_model('writer', 'WriterStatistics')
+    writer_column = WriterStatistics._meta.get_field('writer').column
+    actual = compute_writer_statistics(writer_ids, registry, using)
+
+    stored_rows = WriterStatistics.objects.using(using).all()
+    if writer_ids is not None:
+        stored_rows = stored_rows.filter(writer_id__in=list(writer_ids))
+    stored = {}
+    for row in stored_rows.values('writer_id', *STATISTIC_FIELDS):
+        stored.setdefault(row.pop('writer_id'), row)
+    zeros = {field: 0 for field in STATISTIC_FIELDS}
+
+    drifted = {}
+    for writer_id in set(stored) | set(actual):
+        expected = actual.get(writer_id, zeros)
+        if stored.get(writer_id) != expected:
+            drifted[writer_id] = (stored.get(writer_id), expected)
+    if dry_run or not drifted:
+        return drifted
+
+    now = timezone.now()
+    operations = [
+        UpdateOne({writer_column: writer_id}, {'$set': {**expected, 'last_updated': now}})
+        for writer_id, (current, expected) in drifted.items()
+        if current is not None
+    ]
+    if operations:
+        get_collection(WriterStatistics, using).bulk_write(operations, ordered=False)
+    missing = [
+        WriterStatistics(writer_id=writer_id, **expected)
+        for writer_id, (current, expected) in drifted.items()
+        if current is None
+    ]
+    if missing:
+        WriterStatistics.objects.using(using).bulk_create(missing)
+    return drifted
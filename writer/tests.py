@@ -1,3 +1,72 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from writer.models import WriterProject
+from writer.statistics import _diff, contribution
+
+DEADLINE = timezone.make_aware(datetime(2026, 3, 2, 18, 0))
+
+
+def project(status, completed_at=None, writer_id=7, word_count=1500):
+    return {
+        'writer_id': writer_id,
+        'status': status,
+        'word_count': word_count,
+        'deadline': DEADLINE,
+        'completed_at': completed_at,
+    }
+
+
+class WriterStatisticsContributionTests(SimpleTestCase):
+    def test_open_project_counts_by_status(self):
+        self.assertEqual(contribution(project('hold')), (7, {'total_projects': 1, 'hold_count': 1}))
+
+    def test_completed_project_counts_words_and_punctuality(self):
+        on_time = contribution(project('completed', DEADLINE - timedelta(hours=1)))[1]
+        self.assertEqual(on_time['total_words_written'], 1500)
+        self.assertEqual(on_time['on_time_delivery'], 1)
+        self.assertNotIn('late_delivery', on_time)
+        late = contribution(project('completed', DEADLINE + timedelta(minutes=1)))[1]
+        self.assertEqual(late['late_delivery'], 1)
+
+    def test_deferred_fields_are_unknown(self):
+        values = project('pending')
+        del values['deadline']
+        self.assertIsNone(contribution(values))
+
+    def test_completing_moves_counters(self):
+        deltas = _diff(contribution(project('in_progress')), contribution(project('completed', DEADLINE)))
+        self.assertEqual(deltas, {7: {
+            'in_progress_projects': -1,
+            'completed_projects': 1,
+            'total_words_written': 1500,
+            'on_time_delivery': 1,
+        }})
+
+    def test_reassignment_moves_between_writers(self):
+        deltas = _diff(contribution(project('pending')), contribution(project('pending', writer_id=8)))
+        self.assertEqual(deltas, {
+            7: {'total_projects': -1, 'pending_projects': -1},
+            8: {'total_projects': 1, 'pending_projects': 1},
+        })
+
+    def test_unchanged_project_has_no_deltas(self):
+        self.assertEqual(_diff(contribution(project('pending')), contribution(project('pending'))), {})
+
+
+class AllProjectsSearchTests(TestCase):
+    def test_status_filter_is_applied_before_the_search_cap(self):
+        writer = CustomUser.objects.create(
+            email='writer@example.com', username='writer', role='writer', is_approved=True,
+        )
+        self.client.force_login(writer)
+        with mock.patch('writer.views.search_ranked_ids', return_value=[]) as search:
+            response = self.client.get('/writer/projects/', {'search': 'ACME', 'status': 'completed'})
+        self.assertEqual(response.status_code, 200)
+        search.assert_called_once_with(
+            WriterProject, 'ACME', filters={'writer_id': writer.pk, 'status': 'completed'},
+        )
@@ -3,9 +3,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Count
+from django.db.models import Count
 from django.http import JsonResponse
 from .models import WriterProject, ProjectIssue, ProjectComment, WriterStatistics
+from common.counters import get_status_counts
+from common.search import order_by_rank, search_ranked_ids
 from accounts.models import CustomUser
 import logging
 
@@ -28,21 +30,20 @@ def writer_dashboard(request):
     """Writer Dashboard View"""
     writer = request.user
     
-    # Get or create writer statistics (djongo-safe)
-    stats, created = WriterStatistics.fetch_or_create_single(writer)
-    if created or (timezone.now() - stats.last_updated).seconds > 300:  # Update every 5 mins
-        stats.update_stats()
+    # Writer statistics are maintained from project changes (writer.statistics)
+    stats, _ = WriterStatistics.fetch_or_create_single(writer)
     
     # Get all projects for the writer
     all_projects = WriterProject.objects.filter(writer=writer)
     
-    # Count by status
-    total_projects = all_projects.count()
-    pending_tasks = all_projects.filter(status='pending').count()
-    in_progress = all_projects.filter(status='in_progress').count()
-    completed = all_projects.filter(status='completed').count()
-    issues = all_projects.filter(status='issues').count()
-    hold = all_projects.filter(status='hold').count()
+    # Count by status (precomputed per-user status counters)
+    status_counts = get_status_counts('writer', writer)
+    total_projects = sum(status_counts.values())
+    pending_tasks = status_counts.get('pending', 0)
+    in_progress = status_counts.get('in_progress', 0)
+    completed = status_counts.get('completed', 0)
+    issues = status_counts.get('issues', 0)
+    hold = status_counts.get('hold', 0)
     
     # Recent projects for "My Tasks" table
     recent_projects = all_projects.exclude(status='completed').order_by('-created_at')[:5]
@@ -95,19 +96,19 @@ def all_projects(request):
     
     # Base queryset
     projects = WriterProject.objects.filter(writer=writer)
+    # The same filters in raw form, so the capped search applies them first.
+    search_filters = {WriterProject._meta.get_field('writer').column: writer.pk}
     
     # Apply filters
     if status_filter:
         projects = projects.filter(status=status_filter)
+        search_filters[WriterProject._meta.get_field('status').column] = status_filter
     
-    if search_query:
-        projects = projects.filter(
-            Q(job_id__icontains=search_query) |
-            Q(topic__icontains=search_query)
-        )
-    
-    # Order by created date
+    # Order by created date, or by relevance when searching
     projects = projects.order_by('-created_at')
+    if search_query:
+        ranked_ids = search_ranked_ids(WriterProject, search_query, filters=search_filters)
+        projects = order_by_rank(projects.filter(pk__in=ranked_ids), ranked_ids)
     
     context = {
         'projects': projects,